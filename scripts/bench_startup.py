@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+CLI startup benchmark.
+
+Runs ``annox --help`` and ``annox list-formats`` in fresh interpreters and
+reports the median wall time of each. With ``--max-ms`` it exits non-zero when
+a median exceeds the budget, so it can guard against import-time regressions.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+
+CLI = ["-m", "annox.cli.main"]
+COMMANDS = {
+    "help": CLI + ["--help"],
+    "list-formats": CLI + ["list-formats"],
+}
+
+
+def _time(args: list, env: dict) -> float:
+    t0 = time.perf_counter()
+    subprocess.run(
+        [sys.executable, *args],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        check=True,
+    )
+    return (time.perf_counter() - t0) * 1000.0
+
+
+def main(argv: list | None = None) -> int:
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument("--runs", type=int, default=10, help="Timed runs per command")
+    p.add_argument("--max-ms", type=float, default=None, help="Fail if a median exceeds this")
+    p.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = p.parse_args(argv)
+
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(SRC), env.get("PYTHONPATH")]))
+    # bare interpreter startup, for reference
+    results = {"python": round(statistics.median(_time(["-c", "pass"], env) for _ in range(args.runs)), 1)}
+    for name, cmd in COMMANDS.items():
+        _time(cmd, env)  # warm the entry-point index and bytecode caches
+        results[name] = round(statistics.median(_time(cmd, env) for _ in range(args.runs)), 1)
+
+    if args.json:
+        print(json.dumps(results))
+    else:
+        for name, ms in results.items():
+            print(f"{name:>14}: {ms:8.1f} ms")
+    if args.max_ms is not None:
+        slow = [n for n in COMMANDS if results[n] > args.max_ms]
+        if slow:
+            print(f"startup over budget ({args.max_ms} ms): {', '.join(slow)}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
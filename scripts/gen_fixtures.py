@@ -1,12 +1,162 @@
 #!/usr/bin/env python3
 """
-Generate tiny, license-clean fixtures for tests (placeholder).
+Generate synthetic, license-clean datasets for tests and benchmarks.
+
+Writes ``coco.json`` and, from it, the intermediate schema as ``dataset.json``
+and ``dataset.jsonl``. Sizes are configurable (images, annotations per image,
+polygon vertices, keypoints per instance, fraction of RLE crowd masks) and the
+output is reproducible for a given ``--seed``.
 """
+from __future__ import annotations
 
-def main():  # pragma: no cover - placeholder
-    print("Not implemented yet.")
+import argparse
+import sys
+from pathlib import Path
+from typing import Any, Dict, List
 
+import numpy as np
 
-if __name__ == "__main__":
-    main()
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from annox.io.jsonio import dump_json, dumps  # noqa: E402
+
+FORMATS = ("coco", "json", "jsonl")
+
+
+def _box_counts(x0: int, y0: int, bw: int, bh: int, w: int, h: int) -> List[int]:
+    # uncompressed column-major RLE of a filled box
+    counts = [x0 * h + y0]
+    for _ in range(bw - 1):
+        counts += [bh, h - bh]
+    counts += [bh, (w - x0 - bw + 1) * h - y0 - bh]
+    return counts
+
+
+def generate_coco(
+    images: int = 1000,
+    anns_per_image: int = 10,
+    vertices: int = 16,
+    keypoints: int = 0,
+    rle_fraction: float = 0.0,
+    categories: int = 20,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    rng = np.random.default_rng(seed)
+    cats = []
+    for i in range(1, categories + 1):
+        c: Dict[str, Any] = {"id": i, "name": f"class_{i}", "supercategory": "synthetic"}
+        if keypoints:
+            c["keypoints"] = [f"kp_{k}" for k in range(keypoints)]
+        cats.append(c)
+
+    sizes = rng.choice([(640, 480), (1280, 720), (800, 600)], size=images)
+    imgs = [
+        {"id": i + 1, "file_name": f"{i + 1:08d}.jpg", "width": int(w), "height": int(h)}
+        for i, (w, h) in enumerate(sizes)
+    ]
+
+    n = images * anns_per_image
+    img_idx = np.repeat(np.arange(images), anns_per_image)
+    iw, ih = sizes[img_idx, 0].astype(np.float64), sizes[img_idx, 1].astype(np.float64)
+    bw = np.maximum(2.0, np.floor(rng.uniform(0.05, 0.4, n) * iw))
+    bh = np.maximum(2.0, np.floor(rng.uniform(0.05, 0.4, n) * ih))
+    x0 = np.floor(rng.uniform(0, 1, n) * (iw - bw))
+    y0 = np.floor(rng.uniform(0, 1, n) * (ih - bh))
+    cat = rng.integers(1, categories + 1, n)
+    crowd = rng.uniform(0, 1, n) < rle_fraction
+
+    # polygons: jittered ellipses inscribed in the boxes
+    theta = np.linspace(0, 2 * np.pi, vertices, endpoint=False)
+    r = rng.uniform(0.7, 1.0, (n, vertices))
+    px = x0[:, None] + bw[:, None] / 2 * (1 + r * np.cos(theta))
+    py = y0[:, None] + bh[:, None] / 2 * (1 + r * np.sin(theta))
+    poly = np.round(np.stack([px, py], axis=2).reshape(n, -1), 2)
+    if keypoints:
+        kx = np.round(x0[:, None] + rng.uniform(0, 1, (n, keypoints)) * bw[:, None], 2)
+        ky = np.round(y0[:, None] + rng.uniform(0, 1, (n, keypoints)) * bh[:, None], 2)
+        kv = rng.integers(0, 3, (n, keypoints)).astype(np.float64)
+        kps = np.stack([kx, ky, kv], axis=2).reshape(n, -1)
+
+    anns = []
+    for j in range(n):
+        a: Dict[str, Any] = {
+            "id": j + 1,
+            "image_id": int(img_idx[j]) + 1,
+            "category_id": int(cat[j]),
+            "bbox": [float(x0[j]), float(y0[j]), float(bw[j]), float(bh[j])],
+            "area": float(bw[j] * bh[j]),
+            "iscrowd": int(crowd[j]),
+        }
+        if crowd[j]:
+            w, h = int(iw[j]), int(ih[j])
+            counts = _box_counts(int(x0[j]), int(y0[j]), int(bw[j]), int(bh[j]), w, h)
+            a["segmentation"] = {"counts": counts, "size": [h, w]}
+        elif vertices:
+            a["segmentation"] = [poly[j].tolist()]
+        if keypoints:
+            a["keypoints"] = kps[j].tolist()
+            a["num_keypoints"] = int((kv[j] > 0).sum())
+        anns.append(a)
+    return {"images": imgs, "annotations": anns, "categories": cats}
 
+
+def write_fixtures(out: Path, formats=FORMATS, **params: Any) -> Dict[str, Path]:
+    out.mkdir(parents=True, exist_ok=True)
+    written: Dict[str, Path] = {}
+    coco = out / "coco.json"
+    dump_json(coco, generate_coco(**params))
+    if "coco" in formats:
+        written["coco"] = coco
+    if "json" in formats or "jsonl" in formats:
+        from annox.adapters.coco.coco import COCOAdapter
+
+        ds = COCOAdapter().load(str(coco)).model_dump(mode="json")
+        if "json" in formats:
+            written["json"] = out / "dataset.json"
+            dump_json(written["json"], ds)
+        if "jsonl" in formats:
+            written["jsonl"] = out / "dataset.jsonl"
+            with written["jsonl"].open("wb") as f:
+                for it in ds["items"]:
+                    f.write(dumps(it) + b"\n")
+    if "coco" not in formats:
+        coco.unlink()
+    return written
+
+
+def add_arguments(p: argparse.ArgumentParser) -> None:
+    p.add_argument("--images", type=int, default=1000)
+    p.add_argument("--anns-per-image", type=int, default=10)
+    p.add_argument("--vertices", type=int, default=16, help="Polygon vertices (0 = boxes only)")
+    p.add_argument("--keypoints", type=int, default=0, help="Keypoints per instance")
+    p.add_argument("--rle-fraction", type=float, default=0.0, help="Fraction of RLE crowd masks")
+    p.add_argument("--categories", type=int, default=20)
+    p.add_argument("--seed", type=int, default=0)
+
+
+def params_of(args: argparse.Namespace) -> Dict[str, Any]:
+    return {
+        "images": args.images,
+        "anns_per_image": args.anns_per_image,
+        "vertices": args.vertices,
+        "keypoints": args.keypoints,
+        "rle_fraction": args.rle_fraction,
+        "categories": args.categories,
+        "seed": args.seed,
+    }
+
+
+def main(argv: List[str] | None = None) -> int:
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument("out", help="Output directory")
+    p.add_argument("--formats", default=",".join(FORMATS), help="Comma-separated: coco,json,jsonl")
+    add_arguments(p)
+    args = p.parse_args(argv)
+    formats = tuple(f for f in args.formats.split(",") if f)
+    for name, path in write_fixtures(Path(args.out), formats, **params_of(args)).items():
+        print(f"{name}: {path} ({path.stat().st_size / 1e6:.1f} MB)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,311 @@
 #!/usr/bin/env python3
 """
-Quick performance smoke (placeholder).
+Performance benchmarks over synthetic fixtures.
+
+Each benchmark runs in a fresh interpreter so peak RSS is measured per
+benchmark. Results (best-of-N seconds per stage, throughput, peak RSS) are
+written as JSON and can be compared against a saved baseline:
+
+    python scripts/perf_smoke.py --out perf.json --save-baseline base.json
+    python scripts/perf_smoke.py --baseline base.json --max-regression 0.15
 """
+from __future__ import annotations
 
-def main():  # pragma: no cover - placeholder
-    print("Not implemented yet.")
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
+SCRIPTS = Path(__file__).resolve().parent
+sys.path.insert(0, str(SCRIPTS.parent / "src"))
+sys.path.insert(0, str(SCRIPTS))
 
-if __name__ == "__main__":
-    main()
+import gen_fixtures  # noqa: E402
+
+# name -> (fixture file, unit counted for throughput)
+BENCHMARKS: Dict[str, Tuple[str, str]] = {
+    "coco_load": ("coco.json", "annotations"),
+    "coco_load_columnar": ("coco.json", "annotations"),
+    "coco_stream": ("coco.json", "annotations"),
+    "coco_dump": ("coco.json", "annotations"),
+    "coco_dump_stream": ("coco.json", "annotations"),
+    "validate_json": ("dataset.json", "items"),
+    "validate_jsonl": ("dataset.jsonl", "items"),
+    "json_read": ("dataset.json", "bytes"),
+    "json_write": ("dataset.json", "bytes"),
+    "jsonl_read": ("dataset.jsonl", "bytes"),
+    "jsonl_write": ("dataset.jsonl", "bytes"),
+    "map_parallel": ("coco.json", "annotations"),
+}
+# JSON benchmarks run with and without orjson
+_JSON = ("json_read", "json_write", "jsonl_read", "jsonl_write", "validate_json", "validate_jsonl")
+
+
+def _peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1 << 20) if sys.platform == "darwin" else rss / 1024
+
+
+# -- benchmark bodies ---------------------------------------------------------
+# Each takes the fixture path and returns (setup, run): ``setup`` prepares
+# untimed state, ``run`` is timed and returns the number of units processed.
+
+
+def _rasterize(args: Tuple[List[float], int, int]) -> int:
+    from annox.io import maskio
+
+    poly, h, w = args
+    return maskio.area(maskio.from_polygons([poly], h, w))
+
+
+def _bench(name: str, path: Path, workers: int, tmp: Path) -> Callable[[], int]:
+    from annox.adapters.coco.coco import COCOAdapter
+    from annox.io import jsonio
+
+    coco = COCOAdapter()
+    if name == "coco_load":
+        return lambda: sum(len(it.annotations) for it in coco.load(str(path)).items)
+    if name == "coco_load_columnar":
+        return lambda: len(coco.load_columnar(str(path)).ann_id)
+    if name == "coco_stream":
+        return lambda: sum(len(it.annotations) for it in coco.stream(str(path)).items)
+    if name == "coco_dump":
+        ds = coco.load(str(path))
+        n = sum(len(it.annotations) for it in ds.items)
+        return lambda: (coco.dump(ds, str(tmp / "out.json")), n)[1]
+    if name == "coco_dump_stream":
+        ds = coco.load(str(path))
+        n = sum(len(it.annotations) for it in ds.items)
+
+        def run() -> int:
+            from annox.adapters.base import DatasetStream
+
+            coco.dump_stream(DatasetStream(categories=ds.categories, items=iter(ds.items)), str(tmp / "out.json"))
+            return n
+
+        return run
+    if name in ("validate_json", "validate_jsonl"):
+        from annox.core.validate import validate_dataset_file
+
+        def run() -> int:
+            ok, report = validate_dataset_file(path)
+            if not ok:
+                raise RuntimeError(f"perf: fixture failed validation: {report}")
+            return int(report["items"])
+
+        return run
+    size = path.stat().st_size
+    if name == "json_read":
+        return lambda: (jsonio.load_json(path), size)[1]
+    if name == "json_write":
+        obj = jsonio.load_json(path)
+        return lambda: (jsonio.dump_json(tmp / "out.json", obj), size)[1]
+    if name == "jsonl_read":
+        return lambda: (list(jsonio.load_jsonl(path)), size)[1]
+    if name == "jsonl_write":
+        rows = list(jsonio.load_jsonl(path))
+
+        def run() -> int:
+            with (tmp / "out.jsonl").open("wb") as f:
+                for r in rows:
+                    f.write(jsonio.dumps(r) + b"\n")
+            return size
+
+        return run
+    if name == "map_parallel":
+        from annox.io.parallel import map_parallel, shutdown_pools
+
+        obj = jsonio.load_json(path)
+        sizes = {im["id"]: (im["height"], im["width"]) for im in obj["images"]}
+        work = [
+            (a["segmentation"][0], *sizes[a["image_id"]])
+            for a in obj["annotations"]
+            if isinstance(a.get("segmentation"), list)
+        ]
+        map_parallel(_rasterize, work[:workers * 4], workers)  # start the pool untimed
+
+        def run() -> int:
+            map_parallel(_rasterize, work, workers)
+            return len(work)
 
+        import atexit
+
+        atexit.register(shutdown_pools)
+        return run
+    raise ValueError(f"perf: unknown benchmark {name!r}")
+
+
+def _child(args: argparse.Namespace) -> int:
+    if args.no_orjson:
+        from annox.io import jsonio
+
+        jsonio._orjson = None
+    rss_start = _peak_rss_mb()
+    path = Path(args.fixtures) / BENCHMARKS[args.child][0]
+    with tempfile.TemporaryDirectory() as d:
+        t0 = time.perf_counter()
+        run = _bench(args.child, path, args.workers, Path(d))
+        setup = time.perf_counter() - t0
+        times = []
+        units = 0
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            units = run()
+            times.append(time.perf_counter() - t0)
+    print(
+        json.dumps(
+            {
+                "setup_s": round(setup, 4),
+                "runs_s": [round(t, 4) for t in times],
+                "units": units,
+                "rss_start_mb": round(rss_start, 1),
+                "peak_rss_mb": round(_peak_rss_mb(), 1),
+            }
+        )
+    )
+    return 0
+
+
+# -- driver -------------------------------------------------------------------
+
+
+def _run_child(name: str, fixtures: Path, args: argparse.Namespace, workers: int, no_orjson: bool) -> Dict[str, Any]:
+    cmd = [sys.executable, __file__, "--child", name, "--fixtures", str(fixtures)]
+    cmd += ["--repeat", str(args.repeat), "--workers", str(workers)]
+    if no_orjson:
+        cmd.append("--no-orjson")
+    out = subprocess.run(cmd, capture_output=True, text=True)
+    if out.returncode != 0:
+        raise RuntimeError(f"perf: benchmark {name} failed:\n{out.stderr}")
+    raw = json.loads(out.stdout.strip().splitlines()[-1])
+    best = min(raw["runs_s"])
+    unit = BENCHMARKS[name][1]
+    return {
+        "seconds": best,
+        "median_s": sorted(raw["runs_s"])[len(raw["runs_s"]) // 2],
+        "setup_s": raw["setup_s"],
+        "units": raw["units"],
+        "unit": unit,
+        "throughput": round(raw["units"] / best, 1) if best else None,
+        "peak_rss_mb": raw["peak_rss_mb"],
+        "rss_start_mb": raw["rss_start_mb"],
+    }
+
+
+def _meta(params: Dict[str, Any]) -> Dict[str, Any]:
+    import numpy
+
+    from annox import __version__
+    from annox.io import jsonio
+
+    commit = None
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=SCRIPTS, capture_output=True, text=True
+        ).stdout.strip() or None
+    except OSError:
+        pass
+    return {
+        "annox": __version__,
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": numpy.__version__,
+        "orjson": jsonio._orjson is not None,
+        "fixtures": params,
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], max_regression: float) -> List[str]:
+    """Benchmarks slower than baseline by more than ``max_regression`` (a fraction)."""
+    regressions = []
+    base = baseline.get("results", {})
+    for name, r in results["results"].items():
+        b = base.get(name)
+        if not b or not b.get("seconds"):
+            continue
+        ratio = r["seconds"] / b["seconds"]
+        r["baseline_s"] = b["seconds"]
+        r["ratio"] = round(ratio, 3)
+        if ratio > 1 + max_regression:
+            regressions.append(f"{name}: {b['seconds']:.4f}s -> {r['seconds']:.4f}s ({ratio:.2f}x)")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument("--only", default="", help="Comma-separated benchmark names (default: all)")
+    p.add_argument("--repeat", type=int, default=3, help="Timed runs per benchmark (best is reported)")
+    p.add_argument("--workers", default="1,2,4", help="Worker counts for map_parallel scaling")
+    p.add_argument("--fixtures", default=None, help="Reuse fixtures from this directory")
+    p.add_argument("--out", default=None, help="Write results JSON here (default: stdout)")
+    p.add_argument("--baseline", default=None, help="Compare against this results JSON")
+    p.add_argument("--save-baseline", default=None, help="Also write results to this path")
+    p.add_argument("--max-regression", type=float, default=0.2, help="Allowed slowdown vs baseline")
+    p.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    p.add_argument("--no-orjson", action="store_true", help=argparse.SUPPRESS)
+    gen_fixtures.add_arguments(p)
+    args = p.parse_args(argv)
+    if args.child:
+        args.workers = int(args.workers)
+        return _child(args)
+
+    names = [n for n in args.only.split(",") if n] or list(BENCHMARKS)
+    for n in names:
+        if n not in BENCHMARKS:
+            p.error(f"unknown benchmark {n!r}; choose from {', '.join(BENCHMARKS)}")
+    params = gen_fixtures.params_of(args)
+    meta = _meta(params)
+
+    with tempfile.TemporaryDirectory() as d:
+        fixtures = Path(args.fixtures) if args.fixtures else Path(d)
+        if not (fixtures / "coco.json").exists():
+            t0 = time.perf_counter()
+            gen_fixtures.write_fixtures(fixtures, **params)
+            meta["fixture_gen_s"] = round(time.perf_counter() - t0, 3)
+        results: Dict[str, Any] = {}
+        for name in names:
+            variants: List[Tuple[str, int, bool]] = [(name, 0, False)]
+            if name == "map_parallel":
+                variants = [(f"{name}[w={w}]", int(w), False) for w in args.workers.split(",")]
+            elif name in _JSON and meta["orjson"]:
+                variants.append((f"{name}[stdlib]", 0, True))
+            for label, workers, no_orjson in variants:
+                results[label] = _run_child(name, fixtures, args, workers, no_orjson)
+                r = results[label]
+                print(
+                    f"{label:>28}: {r['seconds']:8.4f}s  {r['throughput']:>12} {r['unit']}/s"
+                    f"  peak {r['peak_rss_mb']:7.1f} MB",
+                    file=sys.stderr,
+                )
+
+    report = {"meta": meta, "results": results}
+    regressions: List[str] = []
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        regressions = compare(report, baseline, args.max_regression)
+        report["regressions"] = regressions
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).write_text(text + "\n")
+    else:
+        print(text)
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(text + "\n")
+    if regressions:
+        print("regressions vs baseline:\n  " + "\n  ".join(regressions), file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
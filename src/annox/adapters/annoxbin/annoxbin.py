@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import mmap
+import struct
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from annox.adapters.base import BaseAdapter, DatasetStream
+from annox.io import maskio
+from annox.io.jsonio import dumps, loads
+from annox.schema.columnar import ColumnarBuilder, ColumnarDataset
+from annox.schema.dataset import Category, Dataset, License, SplitInfo
+from annox.schema.versioning import SCHEMA_VERSION
+
+# Binary container for the intermediate schema.
+#
+#   magic (8 bytes) | header length (u64 LE) | header JSON | pad | arrays
+#
+# The header holds the schema version, categories/licenses/splits, item ids and
+# file names, sparse per-row extras and a directory {name: [dtype, shape,
+# offset]} of the ColumnarDataset arrays. Arrays are stored little-endian at
+# 64-byte aligned offsets from the aligned end of the header and are
+# memory-mapped on load. RLE counts are stored uncompressed (uint32) in one
+# flat buffer addressed by offsets.
+
+MAGIC = b"ANNOXBIN"
+FORMAT_VERSION = 1
+_ALIGN = 64
+_LEN = struct.Struct("<Q")
+
+_ARRAYS = (
+    "widths", "heights", "item_offsets", "ann_id", "ann_item", "ann_category", "ann_kind",
+    "ann_normalized", "bbox", "ring_offsets", "coord_offsets", "ring_normalized", "coords",
+    "kp_offsets", "kp_values",
+)
+
+# how RLE counts were given, so loading returns the same form
+_COUNTS_LIST, _COUNTS_STR, _COUNTS_BYTES = 0, 1, 2
+
+
+def _major(version: str) -> str:
+    return str(version).split(".", 1)[0]
+
+
+def _aligned(n: int) -> int:
+    return -(-n // _ALIGN) * _ALIGN
+
+
+def _le(a: np.ndarray) -> np.ndarray:
+    dt = a.dtype.newbyteorder("<") if a.dtype.byteorder not in ("|", "<", "=") else a.dtype
+    return np.ascontiguousarray(a, dtype=dt)
+
+
+def _split_rle(cd: ColumnarDataset) -> Tuple[Dict[str, np.ndarray], Dict[str, Dict[str, Any]]]:
+    rows: List[int] = []
+    sizes: List[Tuple[int, int]] = []
+    forms: List[int] = []
+    counts: List[np.ndarray] = []
+    extras: Dict[str, Dict[str, Any]] = {}
+    for row in sorted(cd.extras):
+        extra = dict(cd.extras[row])
+        rle = extra.pop("rle", None)
+        if rle is not None:
+            raw = rle["counts"] if isinstance(rle, dict) else rle.counts
+            if isinstance(raw, bytes):
+                forms.append(_COUNTS_BYTES)
+            elif isinstance(raw, str):
+                forms.append(_COUNTS_STR)
+            else:
+                forms.append(_COUNTS_LIST)
+            rows.append(row)
+            sizes.append(maskio.size_of(rle))
+            counts.append(maskio.counts_of(rle))
+        if extra:
+            extras[str(row)] = extra
+    lengths = np.array([len(c) for c in counts], dtype=np.int64)
+    arrays = {
+        "rle_row": np.array(rows, dtype=np.int64),
+        "rle_size": np.array(sizes, dtype=np.int64).reshape(-1, 2),
+        "rle_form": np.array(forms, dtype=np.uint8),
+        "rle_offsets": np.concatenate(([0], np.cumsum(lengths))).astype(np.int64),
+        "rle_counts": (np.concatenate(counts) if counts else np.zeros(0)).astype(np.uint32),
+    }
+    return arrays, extras
+
+
+def write_columnar(cd: ColumnarDataset, path: str) -> None:
+    p = Path(path)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    arrays = {name: _le(getattr(cd, name)) for name in _ARRAYS}
+    rle_arrays, extras = _split_rle(cd)
+    arrays.update((k, _le(v)) for k, v in rle_arrays.items())
+
+    layout: Dict[str, List[Any]] = {}
+    offset = 0
+    for name, a in arrays.items():
+        offset = _aligned(offset)
+        layout[name] = [a.dtype.str, list(a.shape), offset]
+        offset += a.nbytes
+    header: Dict[str, Any] = {
+        "format": FORMAT_VERSION,
+        "schema_version": cd.schema_version,
+        "categories": [c.model_dump() for c in cd.categories],
+        "licenses": [lic.model_dump() for lic in cd.licenses],
+        "splits": [s.model_dump() for s in cd.splits],
+        "item_ids": cd.item_ids,
+        "file_names": cd.file_names,
+        "extras": extras,
+        "arrays": layout,
+    }
+    blob = dumps(header)
+    prefix = MAGIC + _LEN.pack(len(blob)) + blob
+    data_start = _aligned(len(prefix))
+
+    with p.open("wb") as f:
+        f.write(prefix)
+        for name, a in arrays.items():
+            f.write(b"\0" * (data_start + layout[name][2] - f.tell()))
+            f.write(a.tobytes())
+
+
+def read_columnar(path: str) -> ColumnarDataset:
+    """Memory-map an annoxbin file; arrays are read-only views of the file."""
+    p = Path(path)
+    if not p.exists():
+        raise FileNotFoundError(f"annoxbin: file not found: {p}")
+    with p.open("rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"annoxbin: not an annoxbin file: {p}")
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    (n,) = _LEN.unpack_from(mm, len(MAGIC))
+    start = len(MAGIC) + _LEN.size
+    header = loads(mm[start : start + n])
+    data_start = _aligned(start + n)
+    if header.get("format") != FORMAT_VERSION:
+        raise ValueError(f"annoxbin: unsupported container format {header.get('format')!r}")
+    version = header["schema_version"]
+    if _major(version) != _major(SCHEMA_VERSION):
+        raise ValueError(f"annoxbin: schema version {version} is incompatible with {SCHEMA_VERSION}")
+
+    arrays: Dict[str, np.ndarray] = {}
+    for name, (dtype, shape, offset) in header["arrays"].items():
+        count = int(np.prod(shape)) if shape else 1
+        arrays[name] = np.frombuffer(mm, dtype=dtype, count=count, offset=data_start + offset).reshape(shape)
+
+    extras: Dict[int, Dict[str, Any]] = {int(k): v for k, v in header["extras"].items()}
+    offs = arrays.pop("rle_offsets")
+    counts = arrays.pop("rle_counts")
+    for i, (row, form) in enumerate(zip(arrays.pop("rle_row").tolist(), arrays.pop("rle_form").tolist())):
+        h, w = (int(v) for v in arrays["rle_size"][i])
+        c = counts[offs[i] : offs[i + 1]]
+        if form == _COUNTS_LIST:
+            value: Any = c.tolist()
+        else:
+            value = maskio.compress_counts(c)
+            if form == _COUNTS_BYTES:
+                value = value.encode("ascii")
+        extras.setdefault(row, {})["rle"] = {"counts": value, "size": [h, w]}
+    arrays.pop("rle_size")
+
+    return ColumnarDataset(
+        schema_version=version,
+        categories=[Category.model_validate(c) for c in header["categories"]],
+        licenses=[License.model_validate(x) for x in header["licenses"]],
+        splits=[SplitInfo.model_validate(x) for x in header["splits"]],
+        item_ids=header["item_ids"],
+        file_names=header["file_names"],
+        extras=extras,
+        **arrays,
+    )
+
+
+class AnnoxBinAdapter(BaseAdapter):
+    def capabilities(self) -> Dict[str, bool]:
+        return {
+            "det": True,
+            "segm_poly": True,
+            "segm_rle": True,
+            "panoptic": True,
+            "keypoints": True,
+            "attributes": True,
+        }
+
+    def load_columnar(self, path: str) -> ColumnarDataset:
+        return self.project_columnar(read_columnar(path))
+
+    def load(self, path: str) -> Dataset:
+        return self.load_columnar(path).to_dataset(self.trusted)
+
+    def stream(self, path: str) -> DatasetStream:
+        cd = self.load_columnar(path)
+        return DatasetStream(cd.categories, cd.iter_items(self.trusted), cd.licenses, cd.splits)
+
+    def dump_columnar(self, cd: ColumnarDataset, path: str) -> None:
+        write_columnar(cd, path)
+
+    def dump(self, dataset: Dataset, path: str) -> None:
+        write_columnar(ColumnarDataset.from_dataset(dataset), path)
+
+    def dump_stream(self, stream: DatasetStream, path: str) -> None:
+        # only the columnar tables are held, not the item models
+        b = ColumnarBuilder(stream.categories, licenses=stream.licenses, splits=stream.splits)
+        for it in stream.items:
+            b.add_item(it.id, it.image.file_name, it.image.width, it.image.height)
+            for ann in it.annotations:
+                b.add_annotation(ann)
+        write_columnar(b.build(), path)
@@ -1,8 +1,33 @@
 from __future__ import annotations
 
-from typing import Dict, Protocol
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, Optional, Protocol, Sequence
 
-from annox.schema.dataset import Dataset
+from annox.io.imagemeta import IMAGE_EXTENSIONS
+from annox.schema.columnar import KINDS, ColumnarDataset
+from annox.schema.dataset import Category, Dataset, License, SplitInfo
+
+
+# Tasks are the geometry keys of ``capabilities()``; each maps to the
+# annotation type that carries it.
+TASK_KINDS: Dict[str, str] = {
+    "det": "bbox",
+    "segm_poly": "polygon",
+    "segm_rle": "mask",
+    "panoptic": "panoptic_segment",
+    "keypoints": "keypoints",
+}
+
+
+@dataclass
+class DatasetStream:
+    # categories (and licenses/splits) are known up front; items are
+    # produced lazily
+    categories: List[Category]
+    items: Iterator[Dataset.Item]
+    licenses: List[License] = field(default_factory=list)
+    splits: List[SplitInfo] = field(default_factory=list)
 
 
 class Adapter(Protocol):
@@ -16,7 +41,70 @@ class Adapter(Protocol):
         ...
 
 
+class ShardedWriter(Protocol):
+    # Optional export interface used by parallel conversion. Fragments must be
+    # picklable and are passed to write_shards in shard order; ids that depend
+    # on earlier shards (e.g. record ids) are assigned there.
+    def encode_shard(
+        self, items: Sequence[Dataset.Item], item_start: int
+    ) -> Any:  # pragma: no cover - interface only
+        ...
+
+    def write_shards(
+        self, categories: Sequence[Category], fragments: Iterable[Any], path: str
+    ) -> None:  # pragma: no cover - interface only
+        ...
+
+
 class BaseAdapter:
+    # Importers build schema objects without validation when set (see
+    # annox.schema.trusted); for inputs known to be valid, e.g. own exports.
+    trusted: bool = False
+    # Importers skip (do not parse or build) annotations of tasks not in this
+    # set; None keeps everything. See annox.core.convert.resolve_tasks.
+    tasks: Optional[FrozenSet[str]] = None
+    # Exporters that write one output stream hand their writes to a
+    # background thread with up to this many pending (annox.io.pipeline.
+    # WriteBehind); 0 writes inline.
+    write_behind: int = 0
+    # Directory that relative MaskAnnotation.png_path values are resolved
+    # against when an exporter needs the mask; None: the working directory.
+    mask_root: Optional[str] = None
+
+    def annotation_files(self, path: str) -> List[Path]:
+        # files of a source whose content the importer parses; the conversion
+        # cache hashes these and only stats the rest (e.g. images)
+        p = Path(path)
+        if p.is_file():
+            return [p]
+        return [f for f in p.rglob("*") if f.is_file() and f.suffix.lower() not in IMAGE_EXTENSIONS]
+
+    def kinds(self) -> Optional[FrozenSet[str]]:
+        # annotation types to import, None for all
+        if self.tasks is None:
+            return None
+        return frozenset(TASK_KINDS[t] for t in self.tasks)
+
+    def project_columnar(self, cd: ColumnarDataset) -> ColumnarDataset:
+        kinds = self.kinds()
+        return cd if kinds is None else cd.select_kinds(KINDS.index(k) for k in kinds)
+
+    def stream(self, path: str) -> DatasetStream:
+        # adapters that can parse incrementally override this
+        ds = self.load(path)  # type: ignore[attr-defined]
+        kinds = self.kinds()
+        if kinds is not None:
+            for it in ds.items:
+                it.annotations = [a for a in it.annotations if a.type in kinds]
+        return DatasetStream(ds.categories, iter(ds.items), ds.licenses, ds.splits)
+
+    def dump_stream(self, stream: DatasetStream, path: str) -> None:
+        # adapters that can write incrementally override this
+        ds = Dataset(
+            licenses=stream.licenses, splits=stream.splits, categories=stream.categories, items=list(stream.items)
+        )
+        self.dump(ds, path)  # type: ignore[attr-defined]
+
     def capabilities(self) -> Dict[str, bool]:
         return {
             "det": False,
@@ -1,44 +1,151 @@
 from __future__ import annotations
 
+import logging
+import shutil
+import tempfile
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import AbstractSet, Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
-from annox.adapters.base import BaseAdapter
-from annox.io.jsonio import load_json, dump_json
+import numpy as np
+
+from annox.adapters.base import BaseAdapter, DatasetStream
+from annox.core import metrics, polygons
+from annox.io import maskio
+from annox.io.jsonio import dumps, load_json, loads
+from annox.io.jsonstream import iter_array_items
+from annox.io.maskcache import prefetch_masks
+from annox.io.pipeline import WriteBehind
+from annox.io.spill import SpillIndex
+from annox.schema.columnar import ColumnarBuilder, ColumnarDataset
 from annox.schema.dataset import (
     Annotation,
-    BBox,
     BBoxAnnotation,
     Category,
     Dataset,
-    Image,
-    Keypoints,
     KeypointsAnnotation,
     MaskAnnotation,
-    Polygon,
     PolygonAnnotation,
 )
+from annox.schema.geometry import RLE
+from annox.schema.trusted import VALIDATED, Builders, builders
+
+log = logging.getLogger("annox.coco")
+
+
+def _batch_geometry(
+    anns: Iterable[Annotation],
+) -> Tuple[Iterator[Tuple[List[float], float]], Iterator[List[float]]]:
+    # bbox/area of every polygon annotation and bbox of every keypoints
+    # annotation, computed in bulk; the iterators follow the input order
+    coords: List[float] = []
+    ring_offsets = [0]
+    ann_rings = [0]
+    kps: List[float] = []
+    kp_offsets = [0]
+    for ann in anns:
+        if isinstance(ann, PolygonAnnotation):
+            for poly in ann.polygons:
+                coords.extend(poly.points)
+                ring_offsets.append(len(coords))
+            ann_rings.append(len(ring_offsets) - 1)
+        elif isinstance(ann, KeypointsAnnotation):
+            kps.extend(ann.keypoints.points)
+            kp_offsets.append(len(kps))
+    c = np.fromiter(coords, dtype=np.float64, count=len(coords))
+    offs = np.array(ring_offsets, dtype=np.int64)
+    groups = np.array(ann_rings, dtype=np.int64)
+    areas = polygons.group_sum(polygons.ring_areas(c, offs), groups).tolist()
+    # flat float lists, sliced per annotation: far cheaper than nested tolist()
+    boxes = _xywh(polygons.group_bounds(polygons.ring_bounds(c, offs), groups)).ravel().tolist()
+    kp = np.fromiter(kps, dtype=np.float64, count=len(kps))
+    kp_boxes = _xywh(polygons.strided_bounds(kp, kp_offsets, 3)).ravel().tolist()
+    return (
+        ((boxes[4 * i : 4 * i + 4], areas[i]) for i in range(len(areas))),
+        (kp_boxes[4 * i : 4 * i + 4] for i in range(len(kp_offsets) - 1)),
+    )
+
+
+def _number_records(records: Sequence[bytes], start: int) -> bytes:
+    # comma-joined records encoded without "id", with ids from start; the
+    # same bytes as records encoded with "id" as their first key
+    return b",".join([b'{"id":%d,' % n + rec[1:] for n, rec in enumerate(records, start)])
+
+
+def image_id(item: Dataset.Item, index: int) -> int:
+    # numeric item ids are kept; others fall back to the 1-based position
+    try:
+        return int(item.id)
+    except Exception:
+        return index
+
 
+def _xywh(bounds: np.ndarray) -> np.ndarray:
+    out = np.stack([bounds[:, 0], bounds[:, 1], bounds[:, 2] - bounds[:, 0], bounds[:, 3] - bounds[:, 1]], axis=1)
+    return np.nan_to_num(out, nan=0.0)
 
-def _shoelace_area(points: List[float]) -> float:
-    it = list(zip(points[0::2], points[1::2]))
-    if len(it) < 3:
-        return 0.0
-    s = 0.0
-    for i in range(len(it)):
-        x1, y1 = it[i]
-        x2, y2 = it[(i + 1) % len(it)]
-        s += x1 * y2 - x2 * y1
-    return abs(s) / 2.0
 
+def _coco_category(c: Dict[str, Any]) -> Category:
+    kp = c.get("keypoints")
+    sk = c.get("skeleton")
+    if sk is not None:
+        # COCO skeleton is 1-based; convert to 0-based
+        sk = [[a - 1, b - 1] for a, b in sk]
+    return Category(
+        id=int(c["id"]),
+        name=c.get("name", str(c["id"])),
+        supercategory=c.get("supercategory"),
+        keypoint_names=kp,
+        skeleton=sk,
+    )
 
-def _poly_bbox(points: List[float]) -> Tuple[float, float, float, float]:
-    xs = points[0::2]
-    ys = points[1::2]
-    minx, maxx = min(xs), max(xs)
-    miny, maxy = min(ys), max(ys)
-    return minx, miny, maxx - minx, maxy - miny
+
+def _coco_item(im: Dict[str, Any], b: Builders = VALIDATED) -> Dataset.Item:
+    iid = int(im["id"])
+    image = b.image(im.get("file_name", f"{iid}.jpg"), int(im.get("width", 0)), int(im.get("height", 0)))
+    return b.item(str(iid), image, [])
+
+
+def _append_coco_ann(item: Dataset.Item, a: Dict[str, Any], b: Builders = VALIDATED) -> None:
+    # annotation ids are assigned per item, starting at 1
+    anns = item.annotations
+    cat_id = a.get("category_id")
+    # segmentation: polygons or RLE
+    seg = a.get("segmentation")
+    if isinstance(seg, list) and seg:
+        rings = [b.ring(list(map(float, pts))) for pts in seg]
+        anns.append(b.polygon(len(anns) + 1, cat_id, rings))
+    elif isinstance(seg, dict) and seg:
+        # RLE
+        rle = {
+            "counts": seg.get("counts"),
+            "size": tuple(seg.get("size", [0, 0])),
+        }
+        anns.append(b.mask(len(anns) + 1, cat_id, rle=rle))
+
+    # bbox
+    if "bbox" in a:
+        x, y, w, h = map(float, a["bbox"])
+        anns.append(b.bbox(len(anns) + 1, cat_id, x, y, w, h))
+
+    # keypoints
+    if "keypoints" in a and a["keypoints"]:
+        anns.append(b.keypoints(len(anns) + 1, cat_id, list(map(float, a["keypoints"]))))
+
+
+def _project_coco_ann(a: Dict[str, Any], kinds: Optional[AbstractSet[str]]) -> Dict[str, Any]:
+    # drop the geometry of annotation types outside ``kinds`` before it is
+    # converted or copied anywhere (in place)
+    if kinds is None:
+        return a
+    seg = a.get("segmentation")
+    if seg is not None and ("polygon" if isinstance(seg, list) else "mask") not in kinds:
+        del a["segmentation"]
+    if "bbox" not in kinds:
+        a.pop("bbox", None)
+    if "keypoints" not in kinds:
+        a.pop("keypoints", None)
+    return a
 
 
 @dataclass
@@ -50,6 +157,106 @@ class _COCO:
     categories: List[Dict[str, Any]]
 
 
+def _category_to_coco(c: Category) -> Dict[str, Any]:
+    sk = c.skeleton
+    if sk is not None:
+        sk = [[a + 1, b + 1] for a, b in sk]  # back to 1-based
+    return {
+        "id": int(c.id),
+        "name": c.name,
+        "supercategory": c.supercategory,
+        "keypoints": c.keypoint_names,
+        "skeleton": sk,
+    }
+
+
+class COCOWriter:
+    """Incremental COCO JSON writer.
+
+    Images are written to the output as they arrive while annotations are
+    spooled to a temporary segment next to it; closing appends the spool and
+    the categories. Memory use does not depend on the dataset size. With
+    ``adapter.write_behind`` set, the writes run on a background thread while
+    the next batch is encoded.
+    """
+
+    _BUFFER = 1 << 20
+    _BATCH = 512  # items encoded together, so geometry is computed in bulk
+
+    def __init__(self, adapter: "COCOAdapter", path: str, categories: Sequence[Category]) -> None:
+        self._adapter = adapter
+        self._path = Path(path)
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._categories = list(categories)
+        self._out: BinaryIO = self._path.open("wb", buffering=self._BUFFER)
+        self._spool: BinaryIO = tempfile.TemporaryFile(dir=self._path.parent, buffering=self._BUFFER)
+        self._out.write(b'{"info":' + dumps({"description": "annox export"}) + b',"licenses":[],"images":[')
+        self._writes = WriteBehind(adapter.write_behind)
+        self._has_images = False
+        self._has_anns = False
+        self._pending: List[Dataset.Item] = []
+        self.items = 0
+        self.records = 0
+
+    def add(self, item: Dataset.Item) -> None:
+        self._pending.append(item)
+        if len(self._pending) >= self._BATCH:
+            self._flush()
+
+    def _flush(self) -> None:
+        if not self._pending:
+            return
+        with metrics.span("coco.encode"):
+            images, per_item = self._adapter.encode_items(self._pending, self.items, self.records + 1)
+        anns = [rec for recs in per_item for rec in recs]
+        self.items += len(self._pending)
+        self.records += len(anns)
+        self._pending = []
+        self.add_fragment(b",".join(images), b",".join(anns))
+
+    def add_fragment(self, images: bytes, annotations: bytes) -> None:
+        # pre-encoded, comma-joined elements (see COCOAdapter.encode_shard)
+        self._flush()
+        if images:
+            self._writes.write(self._out, b"," + images if self._has_images else images)
+            self._has_images = True
+        if annotations:
+            self._writes.write(self._spool, b"," + annotations if self._has_anns else annotations)
+            self._has_anns = True
+
+    def close(self) -> None:
+        try:
+            self._flush()
+            self._writes.close()
+            with metrics.span("coco.finalize"):
+                self._out.write(b'],"annotations":[')
+                self._spool.seek(0)
+                shutil.copyfileobj(self._spool, self._out, self._BUFFER)
+                cats = [_category_to_coco(c) for c in self._categories]
+                self._out.write(b'],"categories":' + dumps(cats) + b"}")
+            metrics.count("items", self.items)
+            metrics.count("coco.records", self.records)
+        finally:
+            self._writes.abort()
+            self._spool.close()
+            self._out.close()
+
+    def abort(self) -> None:
+        self._writes.abort()
+        self._spool.close()
+        self._out.close()
+        self._path.unlink(missing_ok=True)
+
+    def __enter__(self) -> "COCOWriter":
+        return self
+
+    def __exit__(self, exc_type: Any, *exc: Any) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
 class COCOAdapter(BaseAdapter):
     def capabilities(self) -> Dict[str, bool]:
         caps = super().capabilities()
@@ -62,163 +269,225 @@ class COCOAdapter(BaseAdapter):
         })
         return caps
 
-    def load(self, path: str) -> Dataset:
+    def _json_path(self, path: str) -> Path:
         p = Path(path)
         if p.is_dir():
             # look for instances.json
             json_path = p / "annotations.json"
             if not json_path.exists():
                 raise FileNotFoundError("COCO: expected annotations.json in directory")
-        else:
-            json_path = p
-        coco: Dict[str, Any] = load_json(json_path)
+            return json_path
+        return p
+
+    def load(self, path: str) -> Dataset:
+        with metrics.span("coco.read"):
+            coco: Dict[str, Any] = load_json(self._json_path(path))
         images = coco.get("images", [])
         anns = coco.get("annotations", [])
         cats = coco.get("categories", [])
 
-        categories: List[Category] = []
-        for c in cats:
-            kp = c.get("keypoints")
-            sk = c.get("skeleton")
-            if sk is not None:
-                # COCO skeleton is 1-based; convert to 0-based
-                sk = [[a - 1, b - 1] for a, b in sk]
-            categories.append(
-                Category(
-                    id=int(c["id"]),
-                    name=c.get("name", str(c["id"])),
-                    supercategory=c.get("supercategory"),
-                    keypoint_names=kp,
-                    skeleton=sk,
-                )
-            )
+        with metrics.span("coco.build"):
+            b = builders(self.trusted)
+            categories = [_coco_category(c) for c in cats]
+
+            # Build items
+            items: List[Dataset.Item] = []
+            by_image_id: Dict[int, Dataset.Item] = {}
+            for im in images:
+                item = _coco_item(im, b)
+                by_image_id[int(im["id"])] = item
+                items.append(item)
+
+            # Convert annotations
+            kinds = self.kinds()
+            for a in anns:
+                item = by_image_id.get(int(a["image_id"]))
+                if item is None:
+                    continue
+                _append_coco_ann(item, _project_coco_ann(a, kinds), b)
+
+            ds = b.dataset(categories, items)
+        return ds
 
-        # Build items
-        items: List[Dataset.Item] = []
-        by_image_id: Dict[int, Dataset.Item] = {}
-        for im in images:
+    def load_columnar(self, path: str) -> ColumnarDataset:
+        # Same mapping as load(), filled straight into array tables
+        with metrics.span("coco.read"):
+            coco: Dict[str, Any] = load_json(self._json_path(path))
+        with metrics.span("coco.build"):
+            return self._build_columnar(coco)
+
+    def _build_columnar(self, coco: Dict[str, Any]) -> ColumnarDataset:
+        images = coco.get("images", [])
+        b = ColumnarBuilder([_coco_category(c) for c in coco.get("categories", [])])
+
+        kinds = self.kinds()
+        grouped: Dict[int, List[Dict[str, Any]]] = {}
+        for a in coco.get("annotations", []):
+            grouped.setdefault(int(a["image_id"]), []).append(_project_coco_ann(a, kinds))
+        # duplicate image ids: annotations go to the last occurrence, as in load()
+        last = {int(im["id"]): i for i, im in enumerate(images)}
+
+        for i, im in enumerate(images):
             iid = int(im["id"])
-            item = Dataset.Item(
-                id=str(iid),
-                image=Image(
-                    file_name=im.get("file_name", f"{iid}.jpg"),
-                    width=int(im.get("width", 0)),
-                    height=int(im.get("height", 0)),
-                ),
-                annotations=[],
-            )
-            by_image_id[iid] = item
-            items.append(item)
-
-        # Per-item annotation id counter
-        counters: Dict[str, int] = {it.id: 1 for it in items}
-
-        def _next_id(item_id: str) -> int:
-            v = counters[item_id]
-            counters[item_id] = v + 1
-            return v
-
-        # Convert annotations
-        for a in anns:
-            iid = int(a["image_id"])  # image_id
-            item = by_image_id.get(iid)
-            if item is None:
+            b.add_item(str(iid), im.get("file_name", f"{iid}.jpg"), int(im.get("width", 0)), int(im.get("height", 0)))
+            if last[iid] != i:
                 continue
-            cat_id = a.get("category_id")
-            # segmentation: polygons or RLE
-            seg = a.get("segmentation")
-            if isinstance(seg, list) and seg:
-                polys = [Polygon(points=list(map(float, pts))) for pts in seg]
-                item.annotations.append(
-                    PolygonAnnotation(id=_next_id(item.id), category_id=cat_id, polygons=polys)
-                )
-            elif isinstance(seg, dict) and seg:
-                # RLE
-                rle = {
-                    "counts": seg.get("counts"),
-                    "size": tuple(seg.get("size", [0, 0])),
-                }
-                item.annotations.append(
-                    MaskAnnotation(id=_next_id(item.id), category_id=cat_id, rle=rle)  # type: ignore[arg-type]
-                )
+            n = 0
+            for a in grouped.get(iid, ()):
+                cat_id = a.get("category_id")
+                seg = a.get("segmentation")
+                if isinstance(seg, list) and seg:
+                    n += 1
+                    b.add_polygon(n, cat_id, seg)
+                elif isinstance(seg, dict) and seg:
+                    n += 1
+                    b.add_mask(n, cat_id, rle=RLE(counts=seg.get("counts"), size=tuple(seg.get("size", [0, 0]))))
+                if "bbox" in a:
+                    n += 1
+                    x, y, w, h = a["bbox"]
+                    b.add_bbox(n, cat_id, x, y, w, h)
+                if "keypoints" in a and a["keypoints"]:
+                    n += 1
+                    b.add_keypoints(n, cat_id, a["keypoints"])
+        return b.build()
 
-            # bbox
-            if "bbox" in a:
-                x, y, w, h = map(float, a["bbox"])
-                item.annotations.append(
-                    BBoxAnnotation(id=_next_id(item.id), category_id=cat_id, bbox=BBox(x=x, y=y, w=w, h=h))
-                )
+    def stream(self, path: str) -> DatasetStream:
+        # Incremental load: one scan spills images and annotations to on-disk
+        # indexes (annotations need not be grouped by image), then items are
+        # assembled one at a time in image order.
+        json_path = self._json_path(path)
+        images = SpillIndex()
+        anns = SpillIndex()
+        categories: List[Category] = []
+        kinds = self.kinds()
+        try:
+            with metrics.span("coco.index"):
+                for key, obj in iter_array_items(json_path, ("images", "annotations", "categories")):
+                    if key == "annotations":
+                        # unwanted geometry is not spilled
+                        anns.add(int(obj["image_id"]), dumps(_project_coco_ann(obj, kinds)))
+                    elif key == "images":
+                        images.add(int(obj["id"]), dumps(obj))
+                    else:
+                        categories.append(_coco_category(obj))
+        except BaseException:
+            images.close()
+            anns.close()
+            raise
+        cmap = {c.id: c for c in categories}
+        b = builders(self.trusted)
 
-            # keypoints
-            if "keypoints" in a and a["keypoints"]:
-                kps = list(map(float, a["keypoints"]))
-                item.annotations.append(
-                    KeypointsAnnotation(
-                        id=_next_id(item.id), category_id=cat_id, keypoints=Keypoints(points=kps)
-                    )
-                )
+        def _items() -> Iterator[Dataset.Item]:
+            try:
+                for iid, raw in images:
+                    with metrics.span("coco.assemble"):
+                        item = _coco_item(loads(raw), b)
+                        item._category_map = cmap
+                        for raw_ann in anns.get(iid):
+                            _append_coco_ann(item, loads(raw_ann), b)
+                    yield item
+            finally:
+                images.close()
+                anns.close()
 
-        ds = Dataset(categories=categories, items=items)
-        return ds
+        return DatasetStream(categories=categories, items=_items())
 
     def dump(self, dataset: Dataset, path: str) -> None:
-        p = Path(path)
-        p.parent.mkdir(parents=True, exist_ok=True)
-
-        images: List[Dict[str, Any]] = []
-        annotations: List[Dict[str, Any]] = []
-        categories: List[Dict[str, Any]] = []
-
-        # categories
-        for c in dataset.categories:
-            sk = c.skeleton
-            if sk is not None:
-                sk = [[a + 1, b + 1] for a, b in sk]  # back to 1-based
-            categories.append(
-                {
-                    "id": int(c.id),
-                    "name": c.name,
-                    "supercategory": c.supercategory,
-                    "keypoints": c.keypoint_names,
-                    "skeleton": sk,
-                }
-            )
+        self.dump_stream(DatasetStream(dataset.categories, iter(dataset.items), dataset.licenses, dataset.splits), path)
 
-        # image id mapping
-        img_id_map: Dict[str, int] = {}
-        for idx, item in enumerate(dataset.items, start=1):
-            try:
-                iid = int(item.id)
-            except Exception:
-                iid = idx
-            img_id_map[item.id] = iid
+    def dump_stream(self, stream: DatasetStream, path: str) -> None:
+        # Constant-memory export: output starts with the first item
+        with COCOWriter(self, path, stream.categories) as w:
+            for item in stream.items:
+                w.add(item)
+
+    # Sharded export: items are encoded in independent shards (possibly in
+    # worker processes) and the fragments are concatenated in shard order.
+    # Image ids fall back to the global item position and annotation ids are
+    # sequential, so the caller passes each shard's starting offsets.
+
+    def encode_item(self, item: Dataset.Item, index: int, record_start: int) -> Tuple[bytes, List[bytes]]:
+        # index is the 1-based item position, used when the id is not numeric
+        images, annotations = self.encode_items([item], index - 1, record_start)
+        return images[0], annotations[0]
+
+    def encode_items(
+        self,
+        items: Sequence[Dataset.Item],
+        item_start: int,
+        record_start: Optional[int],
+        image_ids: Optional[Sequence[int]] = None,
+    ) -> Tuple[List[bytes], List[List[bytes]]]:
+        # Image record and annotation records of each item. item_start: number
+        # of items before this batch; image_ids overrides the ids derived from
+        # item ids/positions. With record_start None the annotation records
+        # are encoded without "id" (see _number_records). Polygon and keypoint
+        # geometry of the whole batch is computed in bulk, and the batch's
+        # PNG masks are decoded together into the shared mask cache
+        poly_geom, kp_boxes = _batch_geometry(a for it in items for a in it.annotations)
+        prefetch_masks(
+            [a for it in items for a in it.annotations if isinstance(a, MaskAnnotation)], root=self.mask_root
+        )
+        images: List[bytes] = []
+        annotations: List[List[bytes]] = []
+        n = 0
+        for index, item in enumerate(items, start=item_start + 1):
+            if image_ids is not None:
+                iid = image_ids[index - item_start - 1]
+            else:
+                iid = image_id(item, index)
             images.append(
-                {
-                    "id": iid,
-                    "file_name": item.image.file_name,
-                    "width": item.image.width,
-                    "height": item.image.height,
-                }
+                dumps(
+                    {
+                        "id": iid,
+                        "file_name": item.image.file_name,
+                        "width": item.image.width,
+                        "height": item.image.height,
+                    }
+                )
             )
-
-        # annotations
-        ann_id = 1
-        for item in dataset.items:
-            img_id = img_id_map[item.id]
+            records: List[bytes] = []
             for ann in item.annotations:
-                annotations.extend(self._ann_to_coco(ann, img_id, item, start_id=ann_id))
-                ann_id = len(annotations) + 1
-
-        coco = {
-            "info": {"description": "annox export"},
-            "licenses": [],
-            "images": images,
-            "annotations": annotations,
-            "categories": categories,
-        }
-        dump_json(p, coco)
+                if isinstance(ann, PolygonAnnotation):
+                    geom: Any = next(poly_geom)
+                elif isinstance(ann, KeypointsAnnotation):
+                    geom = next(kp_boxes)
+                else:
+                    geom = None
+                for rec in self._ann_to_coco(ann, iid, item, (record_start or 0) + n, geom):
+                    if record_start is None:
+                        del rec["id"]
+                    records.append(dumps(rec))
+                    n += 1
+            annotations.append(records)
+        return images, annotations
+
+    def encode_shard(self, items: Sequence[Dataset.Item], item_start: int) -> Tuple[bytes, List[bytes]]:
+        # annotation ids depend on the records of all earlier shards, so they
+        # are assigned in write_shards
+        images, annotations = self.encode_items(items, item_start, None)
+        return b",".join(images), [rec for recs in annotations for rec in recs]
+
+    def write_shards(
+        self, categories: Sequence[Category], fragments: Iterable[Tuple[bytes, List[bytes]]], path: str
+    ) -> None:
+        with COCOWriter(self, path, categories) as w:
+            for images, records in fragments:
+                w.add_fragment(images, _number_records(records, w.records + 1))
+                w.records += len(records)
 
-    def _ann_to_coco(self, ann: Annotation, image_id: int, item: Dataset.Item, start_id: int) -> List[Dict[str, Any]]:
+    def write_fragments(
+        self, categories: Sequence[Category], fragments: Iterable[Tuple[bytes, bytes]], path: str
+    ) -> None:
+        # pre-encoded, numbered fragments, e.g. from an incremental manifest
+        with COCOWriter(self, path, categories) as w:
+            for images, anns in fragments:
+                w.add_fragment(images, anns)
+
+    def _ann_to_coco(
+        self, ann: Annotation, image_id: int, item: Dataset.Item, start_id: int, geom: Any = None
+    ) -> List[Dict[str, Any]]:
+        # geom: precomputed (bbox, area) for polygons, bbox for keypoints
         out: List[Dict[str, Any]] = []
         cat_id = ann.category_id if getattr(ann, "category_id", None) is not None else 0
         if isinstance(ann, BBoxAnnotation):
@@ -235,10 +504,9 @@ class COCOAdapter(BaseAdapter):
                 }
             )
         elif isinstance(ann, PolygonAnnotation):
-            # compute bbox and area
-            all_points = [pt for poly in ann.polygons for pt in poly.points]
-            x, y, w, h = _poly_bbox(all_points) if all_points else (0.0, 0.0, 0.0, 0.0)
-            area = sum(_shoelace_area(poly.points) for poly in ann.polygons)
+            if geom is None:
+                (geom,), _ = _batch_geometry([ann])
+            (x, y, w, h), area = geom
             out.append(
                 {
                     "id": start_id,
@@ -251,32 +519,41 @@ class COCOAdapter(BaseAdapter):
                 }
             )
         elif isinstance(ann, MaskAnnotation):
-            rle = ann.rle
             seg = None
+            bbox, area = [0.0, 0.0, 0.0, 0.0], 0.0
+            rle = None
+            if ann.rle is not None or ann.png_path:
+                try:
+                    rle = ann.load_rle(self.mask_root)  # a PNG comes from the mask cache
+                except OSError as e:
+                    log.warning(
+                        "COCO: mask %s of item %s is not readable (%s); exported without segmentation",
+                        ann.id,
+                        item.id,
+                        e,
+                    )
             if rle is not None:
-                h, w = rle.size
-                seg = {"counts": rle.counts, "size": [h, w]}
+                h, w = rle["size"]
+                counts = rle["counts"]
+                counts = counts.decode("ascii") if isinstance(counts, bytes) else counts
+                seg = {"counts": counts, "size": [h, w]}
+                bbox, area = maskio.to_bbox(rle), float(maskio.area(rle))
             out.append(
                 {
                     "id": start_id,
                     "image_id": image_id,
                     "category_id": cat_id,
-                    "bbox": [0.0, 0.0, 0.0, 0.0],
-                    "area": 0.0,
+                    "bbox": bbox,
+                    "area": area,
                     "iscrowd": 1 if seg else 0,
                     "segmentation": seg or [],
                 }
             )
         elif isinstance(ann, KeypointsAnnotation):
             pts = ann.keypoints.points
-            xs = pts[0::3]
-            ys = pts[1::3]
-            if xs and ys:
-                minx, maxx = min(xs), max(xs)
-                miny, maxy = min(ys), max(ys)
-                bbox = [minx, miny, maxx - minx, maxy - miny]
-            else:
-                bbox = [0.0, 0.0, 0.0, 0.0]
+            if geom is None:
+                geom = next(_batch_geometry([ann])[1])
+            bbox = geom
             out.append(
                 {
                     "id": start_id,
@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+import shutil
+from pathlib import Path, PurePosixPath
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from annox.adapters.base import BaseAdapter, DatasetStream
+from annox.adapters.coco.coco import image_id
+from annox.core import metrics
+from annox.core.panoptic import id_to_rgb, rgb_to_id, rles_to_ids, segment_stats, segments_to_rles
+from annox.io.jsonio import dumps, load_json
+from annox.io.parallel import imap_parallel
+from annox.io.png import read_png, write_png
+from annox.schema.dataset import Category, Dataset, PanopticSegmentAnnotation
+from annox.schema.trusted import builders
+
+# COCO panoptic: one JSON with images, categories (with isthing/color) and one
+# record {image_id, file_name, segments_info} per image, plus a folder of RGB
+# segment-id PNGs, by default named after the JSON (panoptic_val2017.json ->
+# panoptic_val2017/).
+#
+# Import decodes the PNGs in parallel and takes each segment's area and bbox
+# from the pixels, all segments of an image in one pass; with ``rle`` every
+# segment also gets its own COCO RLE. Export paints the segments' RLEs into an
+# id image per item; an item whose segments have no RLE gets its source PNG
+# copied. See annox.core.panoptic for the kernels.
+
+DEFAULT_WORKERS = 8
+
+_Decoded = Optional[Tuple[List[int], List[List[int]], Optional[List[Dict[str, Any]]]]]
+
+
+def png_dir_for(json_path: Path) -> Path:
+    return Path(json_path).with_suffix("")
+
+
+def _panoptic_category(c: Dict[str, Any]) -> Category:
+    return Category(
+        id=int(c["id"]),
+        name=c.get("name", str(c["id"])),
+        supercategory=c.get("supercategory"),
+        isthing=bool(c["isthing"]) if "isthing" in c else None,
+        color=c.get("color"),
+    )
+
+
+def _category_to_panoptic(c: Category) -> Dict[str, Any]:
+    out: Dict[str, Any] = {
+        "id": int(c.id),
+        "name": c.name,
+        "supercategory": c.supercategory,
+        "isthing": 1 if c.isthing is None else int(c.isthing),
+    }
+    if c.color is not None:
+        out["color"] = c.color
+    return out
+
+
+def _select(ids: np.ndarray, seg_ids: Sequence[int]) -> Tuple[List[int], List[List[int]]]:
+    # areas and boxes of the listed segments (zero for ids not in the image)
+    present, areas, boxes = segment_stats(ids)
+    if not len(present):
+        return [0] * len(seg_ids), [[0, 0, 0, 0] for _ in seg_ids]
+    want = np.asarray(seg_ids, dtype=np.int64)
+    pos = np.minimum(np.searchsorted(present, want), len(present) - 1)
+    found = present[pos] == want
+    return np.where(found, areas[pos], 0).tolist(), np.where(found[:, None], boxes[pos], 0).tolist()
+
+
+def _decode(job: Tuple[Optional[str], List[int], bool]) -> _Decoded:
+    path, seg_ids, with_rle = job
+    if path is None:
+        return None
+    ids = rgb_to_id(read_png(path))
+    areas, boxes = _select(ids, seg_ids)
+    return areas, boxes, segments_to_rles(ids, seg_ids) if with_rle else None
+
+
+_EncodeJob = Tuple[str, int, int, List[Tuple[int, Any]], Optional[str], bool]
+
+
+def _encode(job: _EncodeJob) -> Tuple[List[int], List[List[int]]]:
+    # write one item's PNG; returns the segments' areas and boxes, or empty
+    # lists when the stored ones are kept
+    out, h, w, segments, source, need_stats = job
+    seg_ids = [sid for sid, _ in segments]
+    if all(rle is not None for _, rle in segments):
+        ids = rles_to_ids([rle for _, rle in segments], seg_ids, h, w)
+        write_png(out, id_to_rgb(ids))
+        return _select(ids, seg_ids)
+    if source is None or not Path(source).is_file():
+        raise ValueError(f"COCO panoptic: no RLE or source PNG for the segments of {out}")
+    Path(out).parent.mkdir(parents=True, exist_ok=True)
+    shutil.copyfile(source, out)
+    if not need_stats:
+        return [], []
+    return _select(rgb_to_id(read_png(out)), seg_ids)
+
+
+def _png_name(file_name: str, image_id: int, used: Set[str]) -> str:
+    # the image's base name; images of the same name in other directories
+    # get their image id appended so no PNG is overwritten
+    name = PurePosixPath(file_name.replace("\\", "/")).with_suffix(".png").name
+    stem = name[:-4]
+    while name in used:
+        stem = f"{stem}_{image_id}"
+        name = f"{stem}.png"
+    used.add(name)
+    return name
+
+
+class COCOPanopticAdapter(BaseAdapter):
+    def __init__(
+        self,
+        png_dir: Optional[str] = None,
+        rle: bool = True,
+        decode: bool = True,
+        workers: int = DEFAULT_WORKERS,
+        backend: str = "thread",
+    ) -> None:
+        # png_dir: segment PNG folder (default: next to the JSON, see
+        # png_dir_for); decode=False trusts segments_info instead of the PNGs
+        self.png_dir = png_dir
+        self.rle = rle
+        self.decode = decode
+        self.workers = workers
+        self.backend = backend
+
+    def capabilities(self) -> Dict[str, bool]:
+        caps = super().capabilities()
+        caps.update({"panoptic": True})
+        return caps
+
+    def _paths(self, path: str) -> Tuple[Path, Path]:
+        p = Path(path)
+        if p.is_dir() or not p.suffix:
+            p = p / "panoptic.json"
+        return p, Path(self.png_dir) if self.png_dir is not None else png_dir_for(p)
+
+    # -- import -----------------------------------------------------------
+
+    def stream(self, path: str) -> DatasetStream:
+        json_path, png_dir = self._paths(path)
+        with metrics.span("coco_panoptic.read"):
+            coco: Dict[str, Any] = load_json(json_path)
+        categories = [_panoptic_category(c) for c in coco.get("categories", [])]
+        records = {int(r["image_id"]): r for r in coco.get("annotations", [])}
+        images = coco.get("images", [])
+        kinds = self.kinds()
+        wanted = kinds is None or "panoptic_segment" in kinds
+        decode = self.decode and wanted
+        b = builders(self.trusted)
+        cmap = {c.id: c for c in categories}
+
+        def jobs() -> Iterator[Tuple[Optional[str], List[int], bool]]:
+            for im in images:
+                rec = records.get(int(im["id"])) if decode else None
+                if rec is None:
+                    yield None, [], False
+                else:
+                    segs = [int(s["id"]) for s in rec.get("segments_info", [])]
+                    yield str(png_dir / rec["file_name"]), segs, self.rle
+
+        def items() -> Iterator[Dataset.Item]:
+            decoded = imap_parallel(_decode, jobs(), self.workers, chunk_size=1, backend=self.backend)
+            for im, res in zip(images, decoded):
+                iid = int(im["id"])
+                image = b.image(im.get("file_name", f"{iid}.jpg"), int(im.get("width", 0)), int(im.get("height", 0)))
+                item = b.item(str(iid), image)
+                item._category_map = cmap
+                rec = records.get(iid) if wanted else None
+                if rec is not None:
+                    png = str(png_dir / rec["file_name"])
+                    for k, seg in enumerate(rec.get("segments_info", [])):
+                        area, box, rle = seg.get("area", 0), seg.get("bbox"), None
+                        if res is not None:
+                            area, box = res[0][k], res[1][k]
+                            rle = res[2][k] if res[2] is not None else None
+                        attrs = {"iscrowd": seg["iscrowd"]} if "iscrowd" in seg else {}
+                        item.annotations.append(
+                            b.panoptic(k + 1, int(seg["category_id"]), int(seg["id"]), int(area), attrs, box, rle, png)
+                        )
+                yield item
+
+        return DatasetStream(categories=categories, items=items())
+
+    def load(self, path: str) -> Dataset:
+        stream = self.stream(path)
+        return builders(self.trusted).dataset(stream.categories, list(stream.items))
+
+    # -- export -----------------------------------------------------------
+
+    def dump(self, dataset: Dataset, path: str) -> None:
+        self.dump_stream(DatasetStream(dataset.categories, iter(dataset.items), dataset.licenses, dataset.splits), path)
+
+    def dump_stream(self, stream: DatasetStream, path: str) -> None:
+        json_path, png_dir = self._paths(path)
+        images: List[Dict[str, Any]] = []
+        records: List[Dict[str, Any]] = []
+        pending: List[List[PanopticSegmentAnnotation]] = []
+        used: Set[str] = set()
+
+        def jobs() -> Iterator[_EncodeJob]:
+            for index, item in enumerate(stream.items, start=1):
+                segs = [a for a in item.annotations if isinstance(a, PanopticSegmentAnnotation)]
+                iid = image_id(item, index)
+                im = item.image
+                name = _png_name(im.file_name, iid, used)
+                images.append({"id": iid, "file_name": im.file_name, "width": im.width, "height": im.height})
+                records.append({"image_id": iid, "file_name": name})
+                pending.append(segs)
+                source = next((s.png_path for s in segs if s.png_path), None)
+                need_stats = any(s.bbox is None for s in segs)
+                segments = [(s.segment_id, s.rle) for s in segs]
+                yield str(png_dir / name), im.height, im.width, segments, source, need_stats
+
+        with metrics.span("coco_panoptic.encode"):
+            for k, (areas, boxes) in enumerate(
+                imap_parallel(_encode, jobs(), self.workers, chunk_size=1, backend=self.backend)
+            ):
+                records[k]["segments_info"] = [_segment_info(s, areas, boxes, j) for j, s in enumerate(pending[k])]
+                pending[k] = []
+        out = {
+            "info": {"description": "annox export"},
+            "licenses": [],
+            "images": images,
+            "annotations": records,
+            "categories": [_category_to_panoptic(c) for c in stream.categories],
+        }
+        json_path.parent.mkdir(parents=True, exist_ok=True)
+        json_path.write_bytes(dumps(out))
+
+
+def _segment_info(
+    s: PanopticSegmentAnnotation, areas: Sequence[int], boxes: Sequence[List[int]], j: int
+) -> Dict[str, Any]:
+    # pixel stats of a painted (or re-read) PNG win over stored ones
+    if areas:
+        area, box = areas[j], boxes[j]
+    else:
+        area = s.area
+        box = [s.bbox.x, s.bbox.y, s.bbox.w, s.bbox.h] if s.bbox is not None else [0, 0, 0, 0]
+    return {
+        "id": s.segment_id,
+        "category_id": s.category_id,
+        "area": int(area),
+        "bbox": [int(v) for v in box],
+        "iscrowd": int(s.attributes.get("iscrowd", 0)),
+    }
@@ -1,4 +1,592 @@
 from __future__ import annotations
 
-# Placeholder for YOLO adapter implementation
+import os
+from dataclasses import dataclass, field
+from pathlib import Path, PurePosixPath
+from typing import Any, Collection, Dict, List, Optional, Sequence, Tuple, Union
 
+import numpy as np
+
+from annox.adapters.base import BaseAdapter, DatasetStream
+from annox.io.imagemeta import ImageSizeCache, probe_sizes, scan_images
+from annox.io.parallel import imap_parallel
+from annox.schema.columnar import (
+    KIND_BBOX,
+    KIND_KEYPOINTS,
+    KIND_POLYGON,
+    KINDS,
+    ColumnarBuilder,
+    ColumnarDataset,
+)
+from annox.schema.dataset import Category, Dataset, SplitInfo
+
+try:  # optional; a small subset parser is used otherwise
+    import yaml as _yaml  # type: ignore
+except Exception:  # pragma: no cover - optional
+    _yaml = None
+
+# Ultralytics-style YOLO datasets: images under ``.../images/...`` with one
+# ``.txt`` label file per image under the matching ``.../labels/...`` path,
+# and an optional ``data.yaml`` listing splits, class names and ``kpt_shape``.
+# Label rows are normalized to the image size:
+#
+#   detect   cls cx cy w h
+#   segment  cls x1 y1 x2 y2 ...
+#   pose     cls cx cy w h px1 py1 [v1] ...
+#
+# Loading converts to pixel coordinates. Label files and image headers are
+# read on a thread pool; all rows are tokenized in one pass over the
+# concatenated label bytes.
+
+TASKS = ("detect", "segment", "pose")
+DEFAULT_IO_WORKERS = 16
+
+_SPLIT_KEYS = {"train": "train", "val": "val", "valid": "val", "test": "test"}
+
+
+# -- data.yaml ------------------------------------------------------------
+
+
+def _yaml_scalar(s: str) -> Any:
+    s = s.strip()
+    if len(s) >= 2 and s[0] == s[-1] and s[0] in "'\"":
+        return s[1:-1].replace("''", "'") if s[0] == "'" else s[1:-1]
+    if s.startswith("[") and s.endswith("]"):
+        inner = s[1:-1].strip()
+        return [_yaml_scalar(v) for v in inner.split(",")] if inner else []
+    if s.startswith("{") and s.endswith("}"):
+        inner = s[1:-1].strip()
+        pairs = [p.split(":", 1) for p in inner.split(",")] if inner else []
+        return {_yaml_scalar(k): _yaml_scalar(v) for k, v in pairs}
+    if s in ("", "~", "null"):
+        return None
+    for conv in (int, float):
+        try:
+            return conv(s)
+        except ValueError:
+            pass
+    return s
+
+
+def _strip_comment(line: str) -> str:
+    quote = None
+    for i, ch in enumerate(line):
+        if ch in "'\"":
+            quote = None if quote == ch else (quote or ch)
+        elif ch == "#" and quote is None and (i == 0 or line[i - 1].isspace()):
+            return line[:i]
+    return line.rstrip()
+
+
+def _parse_yaml(text: str) -> Dict[str, Any]:
+    # Subset used by data.yaml: top-level ``key: value`` pairs whose value is
+    # a scalar, a flow list/map, or an indented block of ``- item`` / ``k: v``.
+    out: Dict[str, Any] = {}
+    key: Optional[str] = None
+    for raw in text.splitlines():
+        line = _strip_comment(raw)
+        if not line.strip():
+            continue
+        if not line[0].isspace():
+            k, _, v = line.partition(":")
+            key = k.strip()
+            out[key] = _yaml_scalar(v) if v.strip() else None
+            continue
+        if key is None:
+            continue
+        entry = line.strip()
+        if entry.startswith("- "):
+            if not isinstance(out[key], list):
+                out[key] = []
+            out[key].append(_yaml_scalar(entry[2:]))
+        else:
+            k, _, v = entry.partition(":")
+            if not isinstance(out[key], dict):
+                out[key] = {}
+            out[key][_yaml_scalar(k)] = _yaml_scalar(v)
+    return out
+
+
+def _read_yaml(path: Path) -> Dict[str, Any]:
+    text = path.read_text(encoding="utf-8")
+    if _yaml is not None:
+        return _yaml.safe_load(text) or {}
+    return _parse_yaml(text)
+
+
+def _quote(s: str) -> str:
+    return "'" + s.replace("'", "''") + "'"
+
+
+def _format_yaml(names: Sequence[str], kpt_shape: Optional[Tuple[int, int]]) -> str:
+    lines = ["path: .", "train: images", "val: images", f"nc: {len(names)}"]
+    if kpt_shape is not None:
+        lines.append(f"kpt_shape: [{kpt_shape[0]}, {kpt_shape[1]}]")
+    lines.append("names:")
+    lines.extend(f"  {i}: {_quote(n)}" for i, n in enumerate(names))
+    return "\n".join(lines) + "\n"
+
+
+def _names(obj: Any) -> Dict[int, str]:
+    if isinstance(obj, dict):
+        return {int(k): str(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return {i: str(v) for i, v in enumerate(obj)}
+    return {}
+
+
+# -- layout -----------------------------------------------------------------
+
+
+@dataclass
+class _Layout:
+    root: Path
+    # (split name or None, image root, image paths)
+    sources: List[Tuple[Optional[str], Path, List[str]]] = field(default_factory=list)
+    names: Dict[int, str] = field(default_factory=dict)
+    kpt_shape: Optional[Tuple[int, int]] = None
+
+
+def _relative(path: str, root: str) -> str:
+    prefix = root.rstrip(os.sep) + os.sep
+    rel = path[len(prefix) :] if path.startswith(prefix) else os.path.relpath(path, root)
+    return rel.replace(os.sep, "/")
+
+
+def _image_list(path: Path, root: Path) -> List[str]:
+    # split given as a .txt file listing image paths
+    out = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if line:
+            p = Path(line)
+            out.append(str(p if p.is_absolute() else root / p))
+    return out
+
+
+def _find_yaml(path: Path) -> Optional[Path]:
+    if path.is_file() and path.suffix.lower() in (".yaml", ".yml"):
+        return path
+    for name in ("data.yaml", "data.yml", "dataset.yaml"):
+        if (path / name).is_file():
+            return path / name
+    return None
+
+
+def _layout(path: Path) -> _Layout:
+    if not path.exists():
+        raise FileNotFoundError(f"YOLO: dataset not found: {path}")
+    cfg_path = _find_yaml(path)
+    if cfg_path is not None:
+        cfg = _read_yaml(cfg_path)
+        root = cfg_path.parent
+        if cfg.get("path"):
+            root = (root / str(cfg["path"])).resolve()
+        lay = _Layout(root=root, names=_names(cfg.get("names")))
+        if cfg.get("kpt_shape"):
+            k, d = cfg["kpt_shape"]
+            lay.kpt_shape = (int(k), int(d))
+        seen = set()
+        for key, split in _SPLIT_KEYS.items():
+            entries = cfg.get(key)
+            if entries is None:
+                continue
+            for entry in entries if isinstance(entries, list) else [entries]:
+                p = root / str(entry)
+                if p.is_file() and p.suffix.lower() == ".txt":
+                    lay.sources.append((split, root, _image_list(p, root)))
+                elif p.is_dir() and p.resolve() not in seen:
+                    # the same directory may serve several splits
+                    seen.add(p.resolve())
+                    lay.sources.append((split, p, scan_images(p)))
+        return lay
+
+    lay = _Layout(root=path)
+    classes = path / "classes.txt"
+    if classes.is_file():
+        lay.names = dict(enumerate(n.strip() for n in classes.read_text(encoding="utf-8").splitlines() if n.strip()))
+    images = path / "images" if (path / "images").is_dir() else path
+    subdirs = [images / k for k in _SPLIT_KEYS if (images / k).is_dir()]
+    if subdirs:
+        for d in subdirs:
+            lay.sources.append((_SPLIT_KEYS[d.name], d, scan_images(d)))
+    else:
+        lay.sources.append((None, images, scan_images(images)))
+    return lay
+
+
+def label_path(image_path: str) -> str:
+    # /images/ -> /labels/ (last occurrence, or a leading images/ of a
+    # relative path), extension -> .txt
+    sa, sb = f"{os.sep}images{os.sep}", f"{os.sep}labels{os.sep}"
+    if sa in image_path:
+        image_path = sb.join(image_path.rsplit(sa, 1))
+    elif image_path.startswith(sa[1:]):
+        image_path = sb[1:] + image_path[len(sa) - 1 :]
+    return os.path.splitext(image_path)[0] + ".txt"
+
+
+def _existing_labels(paths: Sequence[str]) -> List[bool]:
+    # one directory listing per label directory instead of a stat per file
+    listings: Dict[str, set] = {}
+    out = []
+    for p in paths:
+        d, name = os.path.split(p)
+        names = listings.get(d)
+        if names is None:
+            try:
+                with os.scandir(d) as it:
+                    names = {e.name for e in it}
+            except OSError:
+                names = set()
+            listings[d] = names
+        out.append(name in names)
+    return out
+
+
+def _read_bytes(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+# -- label parsing ----------------------------------------------------------
+
+
+@dataclass
+class _Rows:
+    values: np.ndarray  # all numbers, row-major
+    image: np.ndarray  # image index of each row
+    start: np.ndarray  # index of the row's first value
+    count: np.ndarray  # values in the row
+    line: np.ndarray  # 1-based line number within its file
+
+
+def _tokenize(chunks: Sequence[bytes]) -> _Rows:
+    parts: List[bytes] = []
+    nlines = np.zeros(len(chunks), dtype=np.int64)
+    for i, c in enumerate(chunks):
+        if c:
+            if not c.endswith(b"\n"):
+                c += b"\n"
+            parts.append(c)
+            nlines[i] = c.count(b"\n")
+    buf = b"".join(parts)
+    a = np.frombuffer(buf, dtype=np.uint8)
+    sep = (a == 0x20) | ((a >= 0x09) & (a <= 0x0D))  # same set as bytes.split()
+    starts = np.flatnonzero(~sep & np.concatenate(([True], sep[:-1])))
+    newlines = np.cumsum(a == 0x0A, dtype=np.int64)
+    tok_line = newlines[starts] if len(starts) else np.zeros(0, dtype=np.int64)
+    try:
+        values = np.array(buf.split(), dtype=np.float64)
+    except ValueError as e:
+        raise ValueError(f"YOLO: non-numeric value in label files ({e})") from None
+    per_line = np.bincount(tok_line, minlength=int(nlines.sum()))
+    row_line = np.flatnonzero(per_line)
+    count = per_line[row_line]
+    start = np.cumsum(count) - count
+    line_end = np.cumsum(nlines)
+    image = np.searchsorted(line_end, row_line, side="right")
+    line = row_line - (line_end - nlines)[image] + 1
+    return _Rows(values=values, image=image, start=start, count=count, line=line)
+
+
+def _classify(rows: _Rows, kpt_shape: Optional[Tuple[int, int]]) -> np.ndarray:
+    n = rows.count
+    kind = np.full(len(n), -1, dtype=np.int64)
+    kind[(n >= 7) & (n % 2 == 1)] = KIND_POLYGON
+    kind[n == 5] = KIND_BBOX
+    if kpt_shape is not None:
+        kind[n == 5 + kpt_shape[0] * kpt_shape[1]] = KIND_KEYPOINTS
+    return kind
+
+
+def _columns(
+    rows: _Rows, kind: np.ndarray, w: np.ndarray, h: np.ndarray, kpt_dim: int, n_images: int
+) -> Dict[str, np.ndarray]:
+    # ColumnarDataset arrays straight from the parsed rows, in pixel space.
+    # Each row gives one annotation; pose rows give a bbox and a keypoints one.
+    nrows = len(rows.count)
+    owner = np.repeat(np.arange(nrows), rows.count)
+    local = np.arange(len(rows.values)) - rows.start[owner]
+    tok_kind = kind[owner]
+    ww, hh = w[rows.image][owner], h[rows.image][owner]
+    # x at odd positions, y at even ones; keypoints after the box follow
+    # their own x,y[,v] cycle
+    scale = np.where(local % 2 == 1, ww, hh)
+    kp_tok = (tok_kind == KIND_KEYPOINTS) & (local >= 5)
+    if kp_tok.any():
+        j = (local[kp_tok] - 5) % kpt_dim
+        scale[kp_tok] = np.select([j == 0, j == 1], [ww[kp_tok], hh[kp_tok]], 1.0)
+    v = rows.values * scale
+
+    is_pose = kind == KIND_KEYPOINTS
+    n_ann = 1 + is_pose
+    first = np.cumsum(n_ann) - n_ann  # annotation index of each row's first annotation
+    total = int(n_ann.sum())
+    ann_kind = np.repeat(np.where(kind == KIND_POLYGON, KIND_POLYGON, KIND_BBOX), n_ann).astype(np.uint8)
+    ann_kind[first[is_pose] + 1] = KIND_KEYPOINTS
+    ann_item = np.repeat(rows.image, n_ann).astype(np.int64)
+    item_offsets = np.searchsorted(ann_item, np.arange(n_images + 1)).astype(np.int64)
+    ann_id = np.arange(total, dtype=np.int64) - item_offsets[ann_item] + 1
+
+    bbox = np.full((total, 4), np.nan)
+    has_box = kind != KIND_POLYGON
+    st = rows.start[has_box]
+    cx, cy, bw, bh = v[st + 1], v[st + 2], v[st + 3], v[st + 4]
+    bbox[first[has_box]] = np.stack([cx - bw / 2, cy - bh / 2, bw, bh], axis=1)
+
+    is_poly = ann_kind == KIND_POLYGON
+    ring_offsets = np.concatenate(([0], np.cumsum(is_poly))).astype(np.int64)
+    poly_len = rows.count[kind == KIND_POLYGON] - 1
+    coord_offsets = np.concatenate(([0], np.cumsum(poly_len))).astype(np.int64)
+    coords = v[(tok_kind == KIND_POLYGON) & (local >= 1)]
+
+    kp = v[kp_tok].reshape(-1, kpt_dim)
+    if kpt_dim == 2:
+        kp = np.hstack([kp, np.full((len(kp), 1), 2.0)])  # visible
+    kp_len = np.zeros(total, dtype=np.int64)
+    kp_len[first[is_pose] + 1] = (rows.count[is_pose] - 5) // kpt_dim * 3
+    return {
+        "item_offsets": item_offsets,
+        "ann_id": ann_id,
+        "ann_item": ann_item,
+        "ann_category": np.repeat(rows.values[rows.start], n_ann).astype(np.int64),
+        "ann_kind": ann_kind,
+        "ann_normalized": np.zeros(total, dtype=bool),
+        "bbox": bbox,
+        "ring_offsets": ring_offsets,
+        "coord_offsets": coord_offsets,
+        "ring_normalized": np.zeros(len(poly_len), dtype=bool),
+        "coords": coords,
+        "kp_offsets": np.concatenate(([0], np.cumsum(kp_len))).astype(np.int64),
+        "kp_values": kp.reshape(-1),
+    }
+
+
+class YOLOAdapter(BaseAdapter):
+    def __init__(
+        self,
+        task: Optional[str] = None,
+        workers: int = DEFAULT_IO_WORKERS,
+        size_cache: Union[bool, str, Path] = True,
+    ) -> None:
+        if task is not None and task not in TASKS:
+            raise ValueError(f"YOLO: unknown task {task!r}; expected one of {TASKS}")
+        self.task = task
+        self.workers = workers
+        # True: shared cache under $ANNOX_CACHE_DIR; a path: that file; False: off
+        self.size_cache = size_cache
+
+    def _sizes(self, images: List[str]) -> List[Any]:
+        if self.size_cache is False:
+            return probe_sizes(images, self.workers)
+        cache = ImageSizeCache.default() if self.size_cache is True else ImageSizeCache(self.size_cache)
+        with cache:
+            return probe_sizes(images, self.workers, cache)
+
+    def capabilities(self) -> Dict[str, bool]:
+        caps = super().capabilities()
+        caps.update({"det": True, "segm_poly": True, "keypoints": True, "attributes": False})
+        if self.task is not None:
+            # a fixed task writes one kind of row (pose rows carry a box)
+            used = {"detect": {"det"}, "segment": {"segm_poly"}, "pose": {"det", "keypoints"}}[self.task]
+            caps.update({t: False for t in ("det", "segm_poly", "keypoints") if t not in used})
+        return caps
+
+    def _map(self, func: Any, items: Sequence[Any]) -> List[Any]:
+        return list(imap_parallel(func, items, self.workers, backend="thread"))
+
+    # -- import -----------------------------------------------------------
+
+    def load_columnar(self, path: str) -> ColumnarDataset:
+        lay = _layout(Path(path))
+        images: List[str] = []
+        names: List[str] = []
+        splits: List[str] = []
+        for split, img_root, paths in lay.sources:
+            images.extend(paths)
+            names.extend(_relative(p, str(img_root)) for p in paths)
+            if split is not None and split not in splits:
+                splits.append(split)
+
+        labels = [label_path(p) for p in images]
+        has_label = _existing_labels(labels)
+        to_read = [lab for lab, ok in zip(labels, has_label) if ok]
+        contents = iter(self._map(_read_bytes, to_read))
+        chunks = [next(contents) if ok else b"" for ok in has_label]
+        sizes = self._sizes(images)
+        for img, size in zip(images, sizes):
+            if size is None:
+                raise ValueError(f"YOLO: cannot read image size from {img}")
+        w = np.array([s[0] for s in sizes], dtype=np.float64).reshape(-1)
+        h = np.array([s[1] for s in sizes], dtype=np.float64).reshape(-1)
+
+        rows = _tokenize(chunks)
+        kind = _classify(rows, lay.kpt_shape)
+        cls = rows.values[rows.start] if len(rows.start) else np.zeros(0)
+        bad = (kind < 0) | (cls < 0) | (cls != np.floor(cls))
+        if bad.any():
+            r = int(np.flatnonzero(bad)[0])
+            raise ValueError(f"YOLO: malformed label row in {labels[rows.image[r]]}:{rows.line[r]}")
+        kpt_dim = lay.kpt_shape[1] if lay.kpt_shape else 3
+        cols = _columns(rows, kind, w, h, kpt_dim, len(images))
+
+        classes = sorted(set(lay.names) | set(int(c) for c in np.unique(cls)))
+        kp_names = [str(i) for i in range(lay.kpt_shape[0])] if lay.kpt_shape else None
+        cd = ColumnarDataset(
+            categories=[Category(id=c, name=lay.names.get(c, str(c)), keypoint_names=kp_names) for c in classes],
+            splits=[SplitInfo(name=s) for s in splits],  # type: ignore[arg-type]
+            # relative to the dataset root, so train/ and val/ images of the
+            # same name stay distinct
+            item_ids=[os.path.splitext(_relative(p, str(lay.root)))[0] for p in images],
+            file_names=names,
+            widths=w.astype(np.int64),
+            heights=h.astype(np.int64),
+            **cols,
+        )
+        return self.project_columnar(cd)
+
+    def load(self, path: str) -> Dataset:
+        return self.load_columnar(path).to_dataset(self.trusted)
+
+    def stream(self, path: str) -> DatasetStream:
+        cd = self.load_columnar(path)
+        return DatasetStream(cd.categories, cd.iter_items(self.trusted), cd.licenses, cd.splits)
+
+    # -- export -----------------------------------------------------------
+
+    def task_for(self, kinds: Collection[str]) -> str:
+        # export task for a dataset holding these annotation types
+        if self.task is not None:
+            return self.task
+        if "keypoints" in kinds:
+            return "pose"
+        if "polygon" in kinds:
+            return "segment"
+        return "detect"
+
+    def _auto_task(self, cd: ColumnarDataset) -> str:
+        return self.task_for({KINDS[k] for k in np.unique(cd.ann_kind).tolist()})
+
+    def dump_columnar(self, cd: ColumnarDataset, path: str) -> None:
+        out = Path(path)
+        self._write_yaml(cd, out, self._write_labels(cd, out, self._auto_task(cd)))
+
+    def patch_columnar(self, cd: ColumnarDataset, path: str, task: str, stale: Sequence[str] = ()) -> None:
+        # Incremental export: delete the label files of the images in
+        # ``stale`` (file names), then write those of ``cd``'s items.
+        # data.yaml is rewritten only when it is missing or cd has pose rows.
+        out = Path(path)
+        for name in stale:
+            (out / "labels" / self._label_name(name)).unlink(missing_ok=True)
+        kpt_shape = self._write_labels(cd, out, task)
+        if kpt_shape is not None or not (out / "data.yaml").is_file():
+            self._write_yaml(cd, out, kpt_shape)
+
+    @staticmethod
+    def _write_yaml(cd: ColumnarDataset, out: Path, kpt_shape: Optional[Tuple[int, int]]) -> None:
+        names = [c.name for c in sorted(cd.categories, key=lambda c: c.id)]
+        out.mkdir(parents=True, exist_ok=True)
+        (out / "data.yaml").write_text(_format_yaml(names, kpt_shape), encoding="utf-8")
+
+    def _write_labels(self, cd: ColumnarDataset, out: Path, task: str) -> Optional[Tuple[int, int]]:
+        cats = sorted(cd.categories, key=lambda c: c.id)
+        cat_ids = np.array([c.id for c in cats], dtype=np.int64)
+        want = {"detect": KIND_BBOX, "segment": KIND_POLYGON, "pose": KIND_KEYPOINTS}[task]
+        rows = np.flatnonzero(cd.ann_kind == want)
+
+        cls = np.searchsorted(cat_ids, cd.ann_category[rows])
+        known = (cls < len(cat_ids)) & (cat_ids[np.minimum(cls, max(len(cat_ids) - 1, 0))] == cd.ann_category[rows])
+        if not known.all():
+            r = int(rows[np.flatnonzero(~known)[0]])
+            raise ValueError(f"YOLO: annotation {int(cd.ann_id[r])} in item {cd.item_ids[cd.ann_item[r]]} has no known category")
+        item = cd.ann_item[rows]
+        W = cd.widths[item].astype(np.float64)
+        H = cd.heights[item].astype(np.float64)
+        norm = cd.ann_normalized[rows]
+        W1, H1 = np.where(norm, 1.0, W), np.where(norm, 1.0, H)
+
+        lines: List[str] = []
+        kpt_shape: Optional[Tuple[int, int]] = None
+        if task == "detect":
+            x, y, w, h = cd.bbox[rows].T
+            table = np.stack([(x + w / 2) / W1, (y + h / 2) / H1, w / W1, h / H1], axis=1)
+            fmt = "%d %.6g %.6g %.6g %.6g"
+            lines = [fmt % (c, *vals) for c, vals in zip(cls.tolist(), table.tolist())]
+        elif task == "segment":
+            for j, r in enumerate(rows.tolist()):
+                lo, hi = int(cd.ring_offsets[r]), int(cd.ring_offsets[r + 1])
+                # YOLO holds one ring per object: keep the one with most points
+                ring = max(range(lo, hi), key=lambda k: cd.coord_offsets[k + 1] - cd.coord_offsets[k])
+                pts = cd.coords[cd.coord_offsets[ring] : cd.coord_offsets[ring + 1]]
+                if not cd.ring_normalized[ring]:
+                    pts = pts / np.resize([W[j], H[j]], len(pts))
+                lines.append(f"{cls[j]} " + " ".join("%.6g" % v for v in pts.tolist()))
+        else:
+            for j, r in enumerate(rows.tolist()):
+                kp = cd.kp_values[cd.kp_offsets[r] : cd.kp_offsets[r + 1]].reshape(-1, 3)
+                if kpt_shape is None:
+                    kpt_shape = (len(kp), 3)
+                elif len(kp) != kpt_shape[0]:
+                    raise ValueError("YOLO: pose export needs the same keypoint count for all annotations")
+                box = self._pose_box(cd, r, kp)
+                xy = kp[:, :2] / [W1[j], H1[j]]
+                cx, cy = (box[0] + box[2] / 2) / W1[j], (box[1] + box[3] / 2) / H1[j]
+                vals = [cx, cy, box[2] / W1[j], box[3] / H1[j]] + np.hstack([xy, kp[:, 2:]]).reshape(-1).tolist()
+                lines.append(f"{cls[j]} " + " ".join("%.6g" % v for v in vals))
+
+        # group rows per item and write one label file per item with rows
+        per_item: Dict[int, List[str]] = {}
+        for it, line in zip(item.tolist(), lines):
+            per_item.setdefault(it, []).append(line)
+        files: Dict[str, List[str]] = {}
+        for it, rs in per_item.items():
+            files.setdefault(self._label_name(cd.file_names[it]), []).extend(rs)
+        labels = out / "labels"
+        for d in {os.path.dirname(n) for n in files}:
+            (labels / d).mkdir(parents=True, exist_ok=True)
+        jobs = [(str(labels / n), ("\n".join(rs) + "\n").encode("utf-8")) for n, rs in files.items()]
+        self._map(_write_bytes, jobs)
+        return kpt_shape
+
+    @staticmethod
+    def _label_name(file_name: str) -> str:
+        rel = PurePosixPath(file_name.replace("\\", "/"))
+        if rel.is_absolute() or ".." in rel.parts:
+            rel = PurePosixPath(rel.name)
+        return str(rel.with_suffix(".txt"))
+
+    @staticmethod
+    def _pose_box(cd: ColumnarDataset, row: int, kp: np.ndarray) -> List[float]:
+        # the object's box is the bbox row just before it (as loaded from
+        # COCO or YOLO); otherwise the extent of the labelled keypoints
+        prev = row - 1
+        if (
+            prev >= 0
+            and cd.ann_item[prev] == cd.ann_item[row]
+            and cd.ann_kind[prev] == KIND_BBOX
+            and cd.ann_category[prev] == cd.ann_category[row]
+            and cd.ann_normalized[prev] == cd.ann_normalized[row]
+        ):
+            return cd.bbox[prev].tolist()
+        pts = kp[kp[:, 2] > 0, :2] if (kp[:, 2] > 0).any() else kp[:, :2]
+        lo, hi = pts.min(axis=0), pts.max(axis=0)
+        return [float(lo[0]), float(lo[1]), float(hi[0] - lo[0]), float(hi[1] - lo[1])]
+
+    def dump(self, dataset: Dataset, path: str) -> None:
+        self.dump_columnar(ColumnarDataset.from_dataset(dataset), path)
+
+    def dump_stream(self, stream: DatasetStream, path: str) -> None:
+        # the task is chosen from all annotations, so collect the (compact) tables first
+        b = ColumnarBuilder(stream.categories)
+        for it in stream.items:
+            b.add_item(it.id, it.image.file_name, it.image.width, it.image.height)
+            for ann in it.annotations:
+                b.add_annotation(ann)
+        self.dump_columnar(b.build(), path)
+
+
+def _write_bytes(job: Tuple[str, bytes]) -> None:
+    path, data = job
+    with open(path, "wb") as f:
+        f.write(data)
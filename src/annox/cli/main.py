@@ -3,17 +3,26 @@ from __future__ import annotations
 import argparse
 import sys
 from pathlib import Path
+from typing import Any
 
-from annox.core import registry as reg
-from annox.core.validate import validate_dataset_file
-from annox.core.convert import convert as core_convert
+# Subcommand implementations (and numpy/pydantic with them) are imported inside
+# the handlers so that building the parser and --help stay cheap.
 
 
 def _cmd_validate(args: argparse.Namespace) -> int:
+    from annox.core.validate import validate_dataset_file
+
     path = Path(args.path)
-    ok, report = validate_dataset_file(path)
+    ok, report = validate_dataset_file(
+        path, check_duplicates=args.check_duplicates, duplicate_iou=args.duplicate_iou
+    )
     if ok:
         print(f"OK: {report['items']} items, {report['annotations']} annotations")
+        dups = [i for i in report.get("issues", []) if i["rule"] == "near_duplicate"]
+        if dups:
+            print(f"{len(dups)} near-duplicate annotations:")
+            for issue in dups:
+                print(f"- {issue['message']}")
         return 0
     else:
         print("Validation failed:")
@@ -22,44 +31,184 @@ def _cmd_validate(args: argparse.Namespace) -> int:
         return 2
 
 
-def _cmd_list_formats(_: argparse.Namespace) -> int:
-    adapters = reg.AdapterRegistry().list_adapters()
-    if not adapters:
+def _cmd_list_formats(args: argparse.Namespace) -> int:
+    from annox.core.registry import AdapterRegistry
+
+    # read from the cached entry-point index; adapters are imported only
+    # when it is (re)built
+    caps = AdapterRegistry().capabilities(refresh=args.refresh)
+    if not caps:
         print("No adapters discovered yet. Install plugins exposing 'annox.adapters'.")
         return 0
-    for name, adapter in adapters.items():
-        caps = {}
-        try:
-            caps = adapter.capabilities()  # type: ignore[attr-defined]
-        except Exception:
-            pass
-        print(f"{name}: {caps if caps else '{}'}")
+    for name, c in sorted(caps.items()):
+        print(f"{name}: {c if c else '{}'}")
     return 0
 
 
 def _cmd_convert(args: argparse.Namespace) -> int:
+    from contextlib import nullcontext
+
+    from annox.core import metrics
+    from annox.core.cache import ConversionCache
+    from annox.core.convert import convert as core_convert
+    from annox.io.pipeline import DEFAULT_WRITE_BEHIND
+
     src_fmt = args.source_format
     dst_fmt = args.dest_format
     src = Path(args.src)
     dst = Path(args.dst)
+    sinks: list = []
+    if args.metrics_json:
+        sinks.append(metrics.JsonSink(args.metrics_json))
+    if args.metrics_prom:
+        sinks.append(metrics.PrometheusSink(args.metrics_prom))
+    recorder = metrics.Recorder(sinks) if args.profile or sinks else None
     try:
-        core_convert(src, dst, src_fmt, dst_fmt)
+        with recorder if recorder is not None else nullcontext():
+            cache = ConversionCache() if args.cache else None
+            delta = core_convert(
+                src,
+                dst,
+                src_fmt,
+                dst_fmt,
+                workers=args.workers,
+                cache=cache,
+                incremental=args.incremental,
+                tasks=[t.strip() for t in args.tasks.split(",")] if args.tasks else None,
+                trusted=args.trusted,
+                read_ahead=args.read_ahead,
+                write_behind=DEFAULT_WRITE_BEHIND if args.write_behind is None else args.write_behind,
+                mask_root=Path(args.mask_root) if args.mask_root else None,
+            )
     except Exception as e:
         print(f"convert failed: {e}")
         return 2
     print(f"Wrote: {dst}")
+    if delta is not None:
+        print(delta)
+    if args.profile and recorder is not None:
+        print(metrics.format_report(recorder.report()))
     return 0
 
 
+def _print_stats(dst: Any, stats: Any) -> None:
+    print(f"Wrote: {dst} ({stats.items} items, {stats.annotations} annotations)")
+
+
+def _cmd_merge(args: argparse.Namespace) -> int:
+    from annox.core import ops
+
+    try:
+        stats = ops.merge(
+            [Path(p) for p in args.src],
+            Path(args.dst),
+            args.source_format,
+            args.dest_format,
+            workers=args.workers,
+            renumber_ids=not args.keep_ids,
+        )
+    except Exception as e:
+        print(f"merge failed: {e}")
+        return 2
+    _print_stats(args.dst, stats)
+    return 0
+
+
+def _cmd_filter(args: argparse.Namespace) -> int:
+    from annox.core import ops
+
+    flt = ops.ItemFilter(
+        categories=set(args.category) if args.category else None,
+        exclude=set(args.exclude or ()),
+        types=set(args.type) if args.type else None,
+        min_annotations=args.min_annotations,
+    )
+    try:
+        stats = ops.filter_dataset(
+            [Path(p) for p in args.src],
+            Path(args.dst),
+            args.source_format,
+            args.dest_format,
+            flt,
+            workers=args.workers,
+            renumber_ids=args.renumber,
+        )
+    except Exception as e:
+        print(f"filter failed: {e}")
+        return 2
+    _print_stats(args.dst, stats)
+    return 0
+
+
+def _cmd_split(args: argparse.Namespace) -> int:
+    from annox.core import ops
+
+    try:
+        splits = ops.parse_splits(args.splits)
+        stats = ops.split(
+            [Path(p) for p in args.src],
+            args.dst,
+            args.source_format,
+            args.dest_format,
+            splits,
+            seed=args.seed,
+            workers=args.workers,
+            renumber_ids=args.renumber,
+        )
+    except Exception as e:
+        print(f"split failed: {e}")
+        return 2
+    paths = ops.split_paths(args.dst, stats)
+    for name, s in stats.items():
+        _print_stats(paths[name], s)
+    return 0
+
+
+def _cmd_stats(args: argparse.Namespace) -> int:
+    from annox.core.stats import dataset_stats
+    from annox.io.jsonio import dumps
+
+    try:
+        stats = dataset_stats(Path(args.path), fmt=args.source_format, workers=args.workers)
+    except Exception as e:
+        print(f"stats failed: {e}")
+        return 2
+    out = dumps(stats.to_dict())
+    if args.out:
+        Path(args.out).write_bytes(out)
+        print(f"Wrote: {args.out} ({stats.items} items, {stats.annotations} annotations)")
+    else:
+        print(out.decode("utf-8"))
+    return 0
+
+
+def _add_io_arguments(p: argparse.ArgumentParser) -> None:
+    p.add_argument("--from", dest="source_format", required=True, help="Source format name")
+    p.add_argument("--to", dest="dest_format", required=True, help="Destination format name")
+    p.add_argument("--src", required=True, nargs="+", help="Source path(s); several are read as one dataset")
+    p.add_argument(
+        "--workers", type=int, default=0, help="Parse inputs and encode output shards in N worker processes"
+    )
+
+
 def build_parser() -> argparse.ArgumentParser:
     p = argparse.ArgumentParser(prog="annox", description="Annotation Exchange Tool")
     sub = p.add_subparsers(dest="cmd", required=True)
 
     pv = sub.add_parser("validate", help="Validate an intermediate dataset JSON/JSONL file")
     pv.add_argument("path", help="Path to dataset file (.json or .jsonl)")
+    pv.add_argument(
+        "--check-duplicates",
+        action="store_true",
+        help="Warn about near-duplicate annotations (same item, kind and category)",
+    )
+    pv.add_argument(
+        "--duplicate-iou", type=float, default=0.9, help="IoU at which annotations count as duplicates"
+    )
     pv.set_defaults(func=_cmd_validate)
 
     pl = sub.add_parser("list-formats", help="List discovered adapters and capabilities")
+    pl.add_argument("--refresh", action="store_true", help="Rebuild the cached adapter index first")
     pl.set_defaults(func=_cmd_list_formats)
 
     pc = sub.add_parser("convert", help="Convert datasets between formats")
@@ -67,8 +216,90 @@ def build_parser() -> argparse.ArgumentParser:
     pc.add_argument("--to", dest="dest_format", required=True, help="Destination format name")
     pc.add_argument("--src", required=True, help="Source path")
     pc.add_argument("--dst", required=True, help="Destination path (file or dir)")
+    pc.add_argument(
+        "--workers", type=int, default=0, help="Convert item shards in N worker processes (0 = serial)"
+    )
+    pc.add_argument(
+        "--cache",
+        action="store_true",
+        help="Reuse and store outputs and parsed sources in the conversion cache ($ANNOX_CACHE_DIR)",
+    )
+    pc.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only re-export items added, changed or removed since the last incremental run into --dst",
+    )
+    pc.add_argument(
+        "--tasks",
+        default=None,
+        help="Comma-separated tasks to convert, e.g. det,keypoints (det, segm_poly, segm_rle, panoptic, "
+        "keypoints); other annotations are skipped while reading. Default: all the target supports",
+    )
+    pc.add_argument(
+        "--trusted",
+        action="store_true",
+        help="Skip schema validation while reading --src (for inputs known to be valid, e.g. annox exports)",
+    )
+    pc.add_argument(
+        "--read-ahead",
+        type=int,
+        default=0,
+        help="Source items to read ahead of the writer on a background thread (default 0 = off); helps when "
+        "reading each item blocks on slow storage",
+    )
+    pc.add_argument(
+        "--write-behind",
+        type=int,
+        default=None,
+        help="Output writes queued for a background thread before the encoder waits (0 = off; default 64)",
+    )
+    pc.add_argument(
+        "--mask-root",
+        default=None,
+        help="Directory that relative mask PNG paths are read from when exporting (default: the --src directory)",
+    )
+    pc.add_argument("--profile", action="store_true", help="Print a per-stage time/memory breakdown")
+    pc.add_argument("--metrics-json", default=None, help="Write stage metrics as JSON to this file")
+    pc.add_argument(
+        "--metrics-prom", default=None, help="Write stage metrics in Prometheus text format to this file"
+    )
     pc.set_defaults(func=_cmd_convert)
 
+    pm = sub.add_parser("merge", help="Merge datasets, joining categories by name")
+    _add_io_arguments(pm)
+    pm.add_argument("--dst", required=True, help="Destination path (file or dir)")
+    pm.add_argument("--keep-ids", action="store_true", help="Keep item/annotation ids instead of renumbering")
+    pm.set_defaults(func=_cmd_merge)
+
+    pf = sub.add_parser("filter", help="Keep annotations/items matching category, type and count filters")
+    _add_io_arguments(pf)
+    pf.add_argument("--dst", required=True, help="Destination path (file or dir)")
+    pf.add_argument("--category", action="append", help="Keep this category name (repeatable)")
+    pf.add_argument("--exclude", action="append", help="Drop this category name (repeatable)")
+    pf.add_argument("--type", action="append", help="Keep this annotation type, e.g. bbox (repeatable)")
+    pf.add_argument("--min-annotations", type=int, default=0, help="Drop items with fewer annotations left")
+    pf.add_argument("--renumber", action="store_true", help="Renumber item and annotation ids")
+    pf.set_defaults(func=_cmd_filter)
+
+    ps = sub.add_parser("split", help="Split a dataset deterministically by hashed item id")
+    _add_io_arguments(ps)
+    ps.add_argument(
+        "--dst", required=True, help="Output template containing {split}, or a directory for one output per split"
+    )
+    ps.add_argument("--splits", default="train=0.8,val=0.2", help="Comma-separated name=fraction pairs")
+    ps.add_argument("--seed", default="", help="Salt for the item id hash")
+    ps.add_argument("--renumber", action="store_true", help="Renumber item and annotation ids per split")
+    ps.set_defaults(func=_cmd_split)
+
+    pst = sub.add_parser("stats", help="Print dataset statistics as JSON")
+    pst.add_argument("path", help="Dataset file: annox .json/.jsonl or COCO .json (any format with --from)")
+    pst.add_argument("--from", dest="source_format", default=None, help="Read the dataset with this adapter")
+    pst.add_argument(
+        "--workers", type=int, default=0, help="Accumulate parts of a .jsonl file in N worker processes"
+    )
+    pst.add_argument("--out", default=None, help="Write the JSON to this file instead of stdout")
+    pst.set_defaults(func=_cmd_stats)
+
     return p
 
 
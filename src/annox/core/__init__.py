@@ -1,2 +0,0 @@
-from . import registry  # noqa: F401
-
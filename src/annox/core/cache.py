@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from annox import __version__
+from annox.adapters.annoxbin.annoxbin import read_columnar, write_columnar
+from annox.core.paths import default_cache_dir
+from annox.io.jsonio import dumps
+from annox.schema.columnar import ColumnarDataset
+from annox.schema.versioning import SCHEMA_VERSION
+
+# Content-addressed store for conversion results. Each entry is a directory
+# under ``<root>/entries`` named by a key derived from the source content and
+# the adapters/options used, holding one of:
+#
+#   output               the converted output (file or directory) for a
+#                        source + destination format + options
+#   dataset.annoxbin     the parsed source in annoxbin form, shared by every
+#                        destination format
+#
+# Source digests are memoized by (path, size, mtime, inode) in a small SQLite
+# table so unchanged multi-GB inputs are not re-read on every run. For a
+# directory source only the adapter's ``annotation_files`` are hashed; the
+# other files (images) enter the key by size and mtime. Entries are
+# evicted least-recently-used first (by directory mtime, refreshed on hit) once
+# the store exceeds ``max_bytes``.
+
+DEFAULT_MAX_BYTES = 5 << 30
+_CHUNK = 1 << 20
+_OUTPUT = "output"
+_DATASET = "dataset.annoxbin"
+
+
+def adapter_version(adapter: Any) -> Optional[str]:
+    version = getattr(adapter, "version", None)
+    if version is not None:
+        return str(version)
+    mod = sys.modules.get(type(adapter).__module__.split(".", 1)[0])
+    return getattr(mod, "__version__", None)
+
+
+def _hash_file(path: Path) -> str:
+    h = hashlib.blake2b(digest_size=32)
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _files(path: Path) -> Iterator[Tuple[str, Path]]:
+    if path.is_dir():
+        for p in sorted(path.rglob("*")):
+            if p.is_file():
+                yield p.relative_to(path).as_posix(), p
+    else:
+        yield "", path
+
+
+def _tree_size(path: Path) -> int:
+    if path.is_file():
+        return path.stat().st_size
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+
+
+def _copy(src: Path, dst: Path) -> None:
+    if src.is_dir():
+        shutil.copytree(src, dst, dirs_exist_ok=True)
+    else:
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(src, dst)
+
+
+def _replace_with_copy(src: Path, dst: Path) -> None:
+    # dst ends up exactly like src: nothing of an earlier output (e.g. stale
+    # label files in a directory) survives. The copy is made next to dst and
+    # swapped in, so a failed copy leaves dst as it was.
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = Path(tempfile.mkdtemp(prefix=f".{dst.name}.", dir=dst.parent))
+    try:
+        _copy(src, tmp / "output")
+        if dst.is_dir() and not dst.is_symlink():
+            shutil.rmtree(dst)
+        elif dst.exists() or dst.is_symlink():
+            dst.unlink()
+        os.replace(tmp / "output", dst)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+class ConversionCache:
+    def __init__(self, root: Optional[Path] = None, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.root = Path(root) if root is not None else default_cache_dir()
+        self.max_bytes = max_bytes
+        self._entries = self.root / "entries"
+        self._entries.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.root / "digests.sqlite"))
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS digests "
+            "(path TEXT PRIMARY KEY, size INTEGER, mtime INTEGER, ino INTEGER, digest TEXT)"
+        )
+
+    # -- keys -------------------------------------------------------------
+
+    def _file_digest(self, path: Path) -> str:
+        st = path.stat()
+        key = str(path.resolve())
+        row = self._db.execute("SELECT size, mtime, ino, digest FROM digests WHERE path = ?", (key,)).fetchone()
+        if row is not None and tuple(row[:3]) == (st.st_size, st.st_mtime_ns, st.st_ino):
+            return row[3]
+        digest = _hash_file(path)
+        self._db.execute(
+            "INSERT OR REPLACE INTO digests VALUES (?, ?, ?, ?, ?)",
+            (key, st.st_size, st.st_mtime_ns, st.st_ino, digest),
+        )
+        self._db.commit()
+        return digest
+
+    def source_digest(self, path: Path, adapter: Any = None) -> str:
+        path = Path(path)
+        if not path.exists():
+            raise FileNotFoundError(f"cache: source not found: {path}")
+        if path.is_file():
+            return self._file_digest(path)
+        listed = getattr(adapter, "annotation_files", None)
+        hashed = None if listed is None else {p.resolve() for p in listed(str(path))}
+        h = hashlib.blake2b(digest_size=32)
+        for rel, p in _files(path):
+            if hashed is None or p.resolve() in hashed:
+                h.update(dumps([rel, self._file_digest(p)]))
+            else:
+                st = p.stat()
+                h.update(dumps([rel, st.st_size, st.st_mtime_ns]))
+        return h.hexdigest()
+
+    def _key(self, parts: Dict[str, Any]) -> str:
+        parts = dict(parts, annox=__version__, schema=SCHEMA_VERSION)
+        return hashlib.blake2b(dumps(parts), digest_size=20).hexdigest()
+
+    def dataset_key(self, src: Path, src_fmt: str, a_src: Any, options: Optional[Dict[str, Any]] = None) -> str:
+        key: Dict[str, Any] = {
+            "source": self.source_digest(src, a_src),
+            "from": [src_fmt, adapter_version(a_src)],
+        }
+        if options:
+            key["options"] = options
+        return self._key(key)
+
+    def output_key(
+        self,
+        src: Path,
+        src_fmt: str,
+        dst_fmt: str,
+        a_src: Any,
+        a_dst: Any,
+        options: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        return self._key(
+            {
+                "source": self.source_digest(src, a_src),
+                "from": [src_fmt, adapter_version(a_src)],
+                "to": [dst_fmt, adapter_version(a_dst)],
+                "options": options or {},
+            }
+        )
+
+    # -- entries ----------------------------------------------------------
+
+    def _entry(self, key: str) -> Path:
+        return self._entries / key
+
+    def _hit(self, entry: Path) -> bool:
+        if not entry.is_dir():
+            return False
+        os.utime(entry)  # recency for LRU
+        return True
+
+    def _commit(self, key: str, fill: Callable[[Path], None]) -> None:
+        # fill a private directory, then publish it under the key atomically
+        entry = self._entry(key)
+        tmp = Path(tempfile.mkdtemp(prefix=".tmp-", dir=self._entries))
+        try:
+            fill(tmp)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        try:
+            if entry.exists():
+                shutil.rmtree(entry, ignore_errors=True)
+            os.replace(tmp, entry)
+        except OSError:
+            # another process stored the same key first
+            shutil.rmtree(tmp, ignore_errors=True)
+        self.evict()
+
+    def restore_output(self, key: str, dst: Path) -> bool:
+        entry = self._entry(key)
+        if not self._hit(entry):
+            return False
+        _replace_with_copy(entry / _OUTPUT, Path(dst))
+        return True
+
+    def store_output(self, key: str, dst: Path) -> None:
+        self._commit(key, lambda tmp: _copy(Path(dst), tmp / _OUTPUT))
+
+    def load_dataset(self, key: str) -> Optional[ColumnarDataset]:
+        entry = self._entry(key)
+        if not self._hit(entry):
+            return None
+        return read_columnar(str(entry / _DATASET))
+
+    def store_dataset(self, key: str, cd: ColumnarDataset) -> None:
+        self._commit(key, lambda tmp: write_columnar(cd, str(tmp / _DATASET)))
+
+    # -- eviction ---------------------------------------------------------
+
+    def size(self) -> int:
+        return sum(_tree_size(e) for e in self._entries.iterdir() if not e.name.startswith("."))
+
+    def evict(self) -> List[str]:
+        entries = []
+        for e in self._entries.iterdir():
+            if e.name.startswith("."):
+                continue
+            entries.append((e.stat().st_mtime_ns, _tree_size(e), e))
+        total = sum(size for _, size, _ in entries)
+        removed: List[str] = []
+        for _, size, e in sorted(entries, key=lambda t: t[0]):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(e, ignore_errors=True)
+            total -= size
+            removed.append(e.name)
+        return removed
+
+    def clear(self) -> None:
+        for e in self._entries.iterdir():
+            shutil.rmtree(e, ignore_errors=True)
+
+    def close(self) -> None:
+        self._db.close()
@@ -1,18 +1,308 @@
 from __future__ import annotations
 
+import os
+from dataclasses import replace
+from itertools import islice
 from pathlib import Path
-from typing import Optional
+from typing import Any, FrozenSet, Iterable, Iterator, List, Optional, Tuple
 
+from annox.adapters.base import TASK_KINDS, DatasetStream
+from annox.core import metrics
+from annox.core.cache import ConversionCache
+from annox.core.incremental import DeltaReport, convert_incremental
 from annox.core.registry import AdapterRegistry
+from annox.io.parallel import imap_parallel
+from annox.io.pipeline import read_ahead as _read_ahead
+from annox.schema.columnar import ColumnarDataset
 from annox.schema.dataset import Dataset
 
+DEFAULT_SHARD_SIZE = 1000
 
-def convert(src: Path, dst: Path, src_fmt: str, dst_fmt: str, tasks: Optional[list[str]] = None) -> None:
+
+def resolve_tasks(a_src: Any, a_dst: Any, tasks: Optional[Iterable[str]] = None) -> Optional[FrozenSet[str]]:
+    """Tasks to import: supported by both adapters and, if given, in ``tasks``.
+
+    None when that is everything the source supports (nothing to skip).
+    """
+    src_caps, dst_caps = a_src.capabilities(), a_dst.capabilities()
+    source = {t for t in TASK_KINDS if src_caps.get(t)}
+    wanted = {t for t in source if dst_caps.get(t)}
+    if tasks is not None:
+        tasks = set(tasks)
+        unknown = tasks - set(TASK_KINDS)
+        if unknown:
+            raise ValueError(f"convert: unknown task(s) {sorted(unknown)}; expected some of {list(TASK_KINDS)}")
+        wanted &= tasks
+    return None if wanted == source else frozenset(wanted)
+
+
+def _encode_shard(task: Tuple[Any, List[Dataset.Item], int]) -> Any:
+    adapter, items, item_start = task
+    return adapter.encode_shard(items, item_start)
+
+
+def _shards(a_dst: Any, items: Iterator[Dataset.Item], shard_size: int) -> Iterator[Tuple[Any, List[Dataset.Item], int]]:
+    # item offsets are fixed here so workers produce the same ids as a serial
+    # run; record ids are assigned by write_shards
+    item_start = 0
+    while True:
+        shard = list(islice(items, shard_size))
+        if not shard:
+            return
+        yield a_dst, shard, item_start
+        item_start += len(shard)
+
+
+def write_stream(
+    a_dst: Any,
+    stream: DatasetStream,
+    dst: Path,
+    workers: int = 0,
+    shard_size: int = DEFAULT_SHARD_SIZE,
+    read_ahead: int = 0,
+) -> None:
+    # items to dst in one pass; shards are encoded in worker processes when
+    # the writer supports it (see ShardedWriter). With read_ahead the source
+    # produces up to that many items on a background thread meanwhile.
+    items = _read_ahead(stream.items, read_ahead)
+    if workers > 1 and hasattr(a_dst, "encode_shard"):
+        # shards are produced lazily and at most 2 * workers are in flight
+        fragments = imap_parallel(_encode_shard, _shards(a_dst, items, shard_size), workers, chunk_size=1)
+        with metrics.span("sharded"):
+            a_dst.write_shards(stream.categories, fragments, str(dst))
+        return
+    with metrics.span("stream"):
+        a_dst.dump_stream(replace(stream, items=items), str(dst))
+
+
+def _convert_sharded(
+    a_src: Any, a_dst: Any, src: Path, dst: Path, workers: int, shard_size: int, read_ahead: int
+) -> None:
+    with metrics.span("load.index"):
+        stream = a_src.stream(str(src))
+    write_stream(a_dst, stream, dst, workers, shard_size, read_ahead)
+
+
+class _ColumnarSource:
+    # stands in for the source adapter when the parsed dataset is cached
+    in_memory = True
+
+    def __init__(self, cd: ColumnarDataset, trusted: bool = False) -> None:
+        self._cd = cd
+        self.trusted = trusted
+
+    def load_columnar(self, path: str) -> ColumnarDataset:
+        return self._cd
+
+    def stream(self, path: str) -> DatasetStream:
+        cd = self._cd
+        return DatasetStream(cd.categories, cd.iter_items(self.trusted), cd.licenses, cd.splits)
+
+    def load(self, path: str) -> Dataset:
+        return self._cd.to_dataset(self.trusted)
+
+
+def _png_masks(cd: ColumnarDataset) -> bool:
+    # masks or panoptic segments read from PNG files, whose contents are not
+    # part of any cache key
+    return any("png_path" in extra for extra in cd.extras.values())
+
+
+def _items_png_masks(items: Iterable[Dataset.Item]) -> bool:
+    return any(getattr(a, "png_path", None) for it in items for a in it.annotations)
+
+
+class _MaskWatch:
+    # the source on an output-cache miss: notes whether the converted items
+    # reference PNG masks, in which case the output is not stored
+    def __init__(self, a_src: Any) -> None:
+        self._a_src = a_src
+        self.png_masks = False
+
+    def _watch(self, items: Iterator[Dataset.Item]) -> Iterator[Dataset.Item]:
+        for item in items:
+            if not self.png_masks and _items_png_masks([item]):
+                self.png_masks = True
+            yield item
+
+    def _stream(self, path: str) -> DatasetStream:
+        stream = self._a_src.stream(path)
+        return replace(stream, items=self._watch(stream.items))
+
+    def _load(self, path: str) -> Dataset:
+        ds = self._a_src.load(path)
+        self.png_masks = _items_png_masks(ds.items)
+        return ds
+
+    def _load_columnar(self, path: str) -> ColumnarDataset:
+        cd = self._a_src.load_columnar(path)
+        self.png_masks = _png_masks(cd)
+        return cd
+
+    def __getattr__(self, name: str) -> Any:
+        # only what the source has, so hasattr() checks still see its capabilities
+        attr = getattr(self._a_src, name)
+        if name in ("stream", "load", "load_columnar"):
+            return getattr(self, f"_{name}")
+        return attr
+
+
+def _task_options(a_src: Any) -> Optional[dict]:
+    tasks = getattr(a_src, "tasks", None)
+    return None if tasks is None else {"tasks": sorted(tasks)}
+
+
+class _StoringSource:
+    # the source adapter on a cache miss: conversions still stream, and a
+    # dataset is only stored when it was loaded as tables anyway
+    def __init__(self, a_src: Any, cache: ConversionCache, key: str) -> None:
+        self._a_src = a_src
+        self._cache = cache
+        self._key = key
+
+    def load_columnar(self, path: str) -> ColumnarDataset:
+        cd = self._a_src.load_columnar(path)
+        if not _png_masks(cd):
+            with metrics.span("cache.store"):
+                self._cache.store_dataset(self._key, cd)
+        return cd
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._a_src, name)
+
+
+def _cached_source(cache: ConversionCache, a_src: Any, src: Path, src_fmt: str) -> Any:
+    if not hasattr(a_src, "load_columnar"):
+        return a_src
+    with metrics.span("cache.lookup"):
+        key = cache.dataset_key(src, src_fmt, a_src, _task_options(a_src))
+        cd = cache.load_dataset(key)
+    if cd is None:
+        return _StoringSource(a_src, cache, key)
+    metrics.count("cache_hits")
+    return _ColumnarSource(cd, getattr(a_src, "trusted", False))
+
+
+def _convert(
+    a_src: Any, a_dst: Any, src: Path, dst: Path, workers: int, shard_size: int, read_ahead: int = 0
+) -> None:
+    # read_ahead only applies where items are streamed; an in-memory
+    # (cached) source has no I/O to overlap
+    read_ahead = read_ahead if not getattr(a_src, "in_memory", False) else 0
+    if workers > 1 and hasattr(a_dst, "encode_shard"):
+        _convert_sharded(a_src, a_dst, src, dst, workers, shard_size, read_ahead)
+        return
+    if hasattr(a_src, "load_columnar") and hasattr(a_dst, "dump_columnar"):
+        # table to table, no item models (e.g. writing annoxbin)
+        with metrics.span("load"):
+            cd = a_src.load_columnar(str(src))
+        metrics.count("items", len(cd))
+        metrics.count("annotations", cd.num_annotations)
+        with metrics.span("dump"):
+            a_dst.dump_columnar(cd, str(dst))
+        return
+    if hasattr(a_src, "stream") and hasattr(a_dst, "dump_stream"):
+        # items flow from reader to writer one at a time, so load and dump
+        # time are not separable here
+        with metrics.span("load.index"):
+            stream = a_src.stream(str(src))
+        write_stream(a_dst, stream, dst, read_ahead=read_ahead)
+        return
+    with metrics.span("load"):
+        ds: Dataset = a_src.load(str(src))  # type: ignore[attr-defined]
+    metrics.count("items", len(ds.items))
+    metrics.count("annotations", sum(len(it.annotations) for it in ds.items))
+    with metrics.span("dump"):
+        a_dst.dump(ds, str(dst))  # type: ignore[attr-defined]
+
+
+def _convert_cached(
+    a_src: Any,
+    a_dst: Any,
+    src: Path,
+    dst: Path,
+    src_fmt: str,
+    dst_fmt: str,
+    tasks: Optional[list[str]],
+    workers: int,
+    shard_size: int,
+    cache: Optional[ConversionCache],
+    incremental: bool = False,
+    read_ahead: int = 0,
+) -> Optional[DeltaReport]:
+    if incremental:
+        # the output is patched in place, so only the parsed source is cached
+        source = a_src if cache is None else _cached_source(cache, a_src, src, src_fmt)
+        return convert_incremental(source, a_dst, src, dst, dst_fmt)
+    if cache is None:
+        _convert(a_src, a_dst, src, dst, workers, shard_size, read_ahead)
+        return None
+    # workers/shard_size do not change the output, so they are not part of the key
+    options = {"tasks": tasks, "mask_root": _abspath(getattr(a_dst, "mask_root", None))}
+    with metrics.span("cache.lookup"):
+        key = cache.output_key(src, src_fmt, dst_fmt, a_src, a_dst, options)
+        hit = cache.restore_output(key, dst)
+    if hit:
+        metrics.count("cache_hits")
+        return None
+    source = _MaskWatch(_cached_source(cache, a_src, src, src_fmt))
+    _convert(source, a_dst, src, dst, workers, shard_size, read_ahead)
+    if source.png_masks:
+        # the output depends on PNG files the key does not cover
+        metrics.count("cache_bypassed")
+        return None
+    with metrics.span("cache.store"):
+        cache.store_output(key, dst)
+    return None
+
+
+def _abspath(path: Optional[str]) -> Optional[str]:
+    return None if path is None else os.path.abspath(path)
+
+
+def convert(
+    src: Path,
+    dst: Path,
+    src_fmt: str,
+    dst_fmt: str,
+    tasks: Optional[list[str]] = None,
+    workers: int = 0,
+    shard_size: int = DEFAULT_SHARD_SIZE,
+    cache: Optional[ConversionCache] = None,
+    incremental: bool = False,
+    trusted: bool = False,
+    read_ahead: int = 0,
+    write_behind: int = 0,
+    mask_root: Optional[Path] = None,
+) -> Optional[DeltaReport]:
+    # incremental: patch dst using the manifest of the previous incremental
+    # run (see annox.core.incremental); returns what changed
+    # trusted: build source items without validation (see annox.schema.trusted)
+    # tasks: capability names ("det", "segm_poly", ...) to keep; others are
+    # skipped while parsing (see resolve_tasks)
+    # read_ahead / write_behind: queue depths of the background source reader
+    # (items) and output writer (write calls), 0 to run inline; see
+    # annox.io.pipeline
+    # mask_root: directory relative mask png_path values are read from when
+    # the exporter needs the masks; default the source dataset's directory
     reg = AdapterRegistry()
-    a_src = reg.get(src_fmt)
-    a_dst = reg.get(dst_fmt)
+    a_src = reg.create(src_fmt)
+    a_dst = reg.create(dst_fmt)
     if a_src is None or a_dst is None:
         raise RuntimeError("Adapters not found. Install plugins providing 'annox.adapters'.")
-    ds: Dataset = a_src.load(str(src))  # type: ignore[assignment]
-    a_dst.dump(ds, str(dst))  # type: ignore[arg-type]
+    a_src.trusted = trusted
+    a_dst.write_behind = write_behind
+    if mask_root is None:
+        mask_root = src if src.is_dir() else src.parent
+    a_dst.mask_root = str(mask_root)
+    # skip geometry the destination cannot use, or that was not asked for
+    a_src.tasks = resolve_tasks(a_src, a_dst, tasks)
+    tasks = None if a_src.tasks is None else sorted(a_src.tasks)
+    with metrics.span("convert"):
+        metrics.count_file("bytes_read", src)
+        report = _convert_cached(
+            a_src, a_dst, src, dst, src_fmt, dst_fmt, tasks, workers, shard_size, cache, incremental, read_ahead
+        )
+        metrics.count_file("bytes_written", dst)
+    return report
 
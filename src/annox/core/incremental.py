@@ -0,0 +1,316 @@
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from annox import __version__
+from annox.core import metrics
+from annox.core.cache import adapter_version
+from annox.io.jsonio import dumps
+from annox.schema.columnar import ColumnarBuilder
+from annox.schema.dataset import Category, Dataset
+from annox.schema.versioning import SCHEMA_VERSION
+
+# Incremental (delta) conversion into an existing output.
+#
+# A manifest next to the output records, per source item, a digest of its
+# content and what was written for it. The next run compares digests to find
+# added, changed and removed items and re-encodes only those:
+#
+#   fragment writers (COCO)  the output is reassembled from the stored
+#                            per-item fragments. Unchanged items keep their
+#                            image and annotation ids; new and changed items
+#                            get annotation ids after the highest ever assigned
+#   label writers (YOLO)     label files of changed and removed items are
+#                            rewritten or deleted in place
+#
+# A different destination format, adapter version, category list or export
+# task, or a missing output, makes the run a full rebuild. The manifest is
+# committed only after the output has been written, so a failed run is
+# redone on the next one.
+
+MANIFEST_NAME = ".annox-manifest.sqlite"
+_WINDOW = 4096  # items between writes of the reassembled output
+_BATCH = 512  # changed items encoded together
+
+
+def manifest_path(dst: Path) -> Path:
+    dst = Path(dst)
+    if dst.is_dir() or not dst.suffix:
+        return dst / MANIFEST_NAME
+    return dst.with_name(dst.name + MANIFEST_NAME)
+
+
+def item_digest(item: Dataset.Item) -> bytes:
+    return hashlib.blake2b(item.model_dump_json().encode("utf-8"), digest_size=16).digest()
+
+
+def _categories_digest(categories: Sequence[Category]) -> str:
+    return hashlib.blake2b(dumps([c.model_dump(mode="json") for c in categories]), digest_size=16).hexdigest()
+
+
+@dataclass
+class DeltaReport:
+    added: int = 0
+    changed: int = 0
+    removed: int = 0
+    unchanged: int = 0
+    full: bool = False
+
+    def __str__(self) -> str:
+        kind = "full rebuild" if self.full else "delta"
+        return (
+            f"{kind}: {self.added} added, {self.changed} changed, "
+            f"{self.removed} removed, {self.unchanged} unchanged"
+        )
+
+
+class Manifest:
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path))
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS items (id TEXT PRIMARY KEY, digest BLOB, file_name TEXT, "
+            "image_id INTEGER, image BLOB, records BLOB)"
+        )
+
+    def meta(self) -> Dict[str, str]:
+        return dict(self._db.execute("SELECT key, value FROM meta"))
+
+    def set_meta(self, values: Dict[str, Any]) -> None:
+        self._db.executemany(
+            "INSERT OR REPLACE INTO meta VALUES (?, ?)", [(k, str(v)) for k, v in values.items()]
+        )
+
+    def lookup(self, item_id: str) -> Optional[Tuple[bytes, str, Optional[int]]]:
+        # (digest, file_name, image_id) of a recorded item
+        return self._db.execute(
+            "SELECT digest, file_name, image_id FROM items WHERE id = ?", (item_id,)
+        ).fetchone()
+
+    def fragment(self, item_id: str) -> Tuple[bytes, bytes]:
+        row = self._db.execute("SELECT image, records FROM items WHERE id = ?", (item_id,)).fetchone()
+        if row is None or row[0] is None:
+            raise RuntimeError(f"incremental: no stored output for item {item_id!r}")
+        return bytes(row[0]), bytes(row[1])
+
+    def put(self, rows: Sequence[Tuple[str, bytes, str, Optional[int], Optional[bytes], Optional[bytes]]]) -> None:
+        self._db.executemany("INSERT OR REPLACE INTO items VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    def remove_missing(self, seen: Set[str]) -> List[str]:
+        # drop items not in ``seen``; returns their file names
+        gone = [(i, f) for i, f in self._db.execute("SELECT id, file_name FROM items") if i not in seen]
+        self._db.executemany("DELETE FROM items WHERE id = ?", [(i,) for i, _ in gone])
+        return [f for _, f in gone]
+
+    def file_names(self) -> List[str]:
+        return [f for (f,) in self._db.execute("SELECT file_name FROM items")]
+
+    def clear(self) -> None:
+        self._db.execute("DELETE FROM items")
+        self._db.execute("DELETE FROM meta")
+
+    def commit(self) -> None:
+        self._db.commit()
+
+    def close(self) -> None:
+        self._db.rollback()
+        self._db.close()
+
+    def __enter__(self) -> "Manifest":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def supports_incremental(adapter: Any) -> bool:
+    return hasattr(adapter, "patch_columnar") or (
+        hasattr(adapter, "encode_items") and hasattr(adapter, "write_fragments")
+    )
+
+
+def _state(a_dst: Any, dst_fmt: str, categories: Sequence[Category]) -> Dict[str, str]:
+    return {
+        "format": dst_fmt,
+        "adapter": str(adapter_version(a_dst)),
+        "annox": __version__,
+        "schema": SCHEMA_VERSION,
+        "categories": _categories_digest(categories),
+    }
+
+
+def _unique(items: Iterator[Dataset.Item], seen: Set[str]) -> Iterator[Dataset.Item]:
+    for item in items:
+        if item.id in seen:
+            raise ValueError(f"incremental: duplicate item id {item.id!r} in source")
+        seen.add(item.id)
+        yield item
+
+
+# -- fragment writers (COCO) ------------------------------------------------
+
+
+def _numeric_id(item: Dataset.Item) -> Optional[int]:
+    try:
+        return int(item.id)
+    except Exception:
+        return None
+
+
+class _FragmentSync:
+    def __init__(self, a_dst: Any, manifest: Manifest, full: bool, meta: Dict[str, str]) -> None:
+        self.a_dst = a_dst
+        self.manifest = manifest
+        self.full = full
+        self.next_image = 1 if full else int(meta.get("next_image", 1))
+        self.next_record = 1 if full else int(meta.get("next_record", 1))
+        self.report = DeltaReport(full=full)
+        self.position = 0
+
+    def _encode(self, todo: List[Tuple[Dataset.Item, bytes, Optional[int]]]) -> Dict[str, Tuple[bytes, bytes]]:
+        items = [item for item, _, _ in todo]
+        image_ids = []
+        for item, _, old in todo:
+            iid = _numeric_id(item)
+            if iid is None:
+                iid = old if old is not None else self.next_image
+            self.next_image = max(self.next_image, iid + 1)
+            image_ids.append(iid)
+        with metrics.span("incremental.encode"):
+            images, records = self.a_dst.encode_items(items, 0, self.next_record, image_ids=image_ids)
+        self.next_record += sum(len(recs) for recs in records)
+        out: Dict[str, Tuple[bytes, bytes]] = {}
+        rows = []
+        for (item, digest, _), iid, image, recs in zip(todo, image_ids, images, records):
+            anns = b",".join(recs)
+            out[item.id] = (image, anns)
+            rows.append((item.id, digest, item.image.file_name, iid, image, anns))
+        self.manifest.put(rows)
+        return out
+
+    def fragments(self, items: Iterator[Dataset.Item]) -> Iterator[Tuple[bytes, bytes]]:
+        window: List[Tuple[str, bool]] = []  # (item id, re-encoded)
+        todo: List[Tuple[Dataset.Item, bytes, Optional[int]]] = []
+        for item in items:
+            self.position += 1
+            digest = item_digest(item)
+            row = None if self.full else self.manifest.lookup(item.id)
+            if row is not None and bytes(row[0]) == digest:
+                self.report.unchanged += 1
+                self.next_image = max(self.next_image, (row[2] or 0) + 1)
+                window.append((item.id, False))
+            else:
+                if row is None:
+                    self.report.added += 1
+                else:
+                    self.report.changed += 1
+                # a full build numbers non-numeric items by position, as a
+                # plain conversion does
+                old = self.position if self.full else (row[2] if row is not None else None)
+                todo.append((item, digest, old))
+                window.append((item.id, True))
+            if len(todo) >= _BATCH or len(window) >= _WINDOW:
+                yield from self._flush(window, todo)
+                window, todo = [], []
+        yield from self._flush(window, todo)
+
+    def _flush(
+        self, window: List[Tuple[str, bool]], todo: List[Tuple[Dataset.Item, bytes, Optional[int]]]
+    ) -> Iterator[Tuple[bytes, bytes]]:
+        fresh = self._encode(todo) if todo else {}
+        for item_id, encoded in window:
+            yield fresh[item_id] if encoded else self.manifest.fragment(item_id)
+
+
+def _sync_fragments(
+    a_dst: Any, stream: Any, dst: Path, dst_fmt: str, manifest: Manifest
+) -> DeltaReport:
+    state = _state(a_dst, dst_fmt, stream.categories)
+    meta = manifest.meta()
+    full = not dst.is_file() or any(meta.get(k) != v for k, v in state.items())
+    if full:
+        manifest.clear()
+    sync = _FragmentSync(a_dst, manifest, full, meta)
+    seen: Set[str] = set()
+    with metrics.span("incremental.write"):
+        a_dst.write_fragments(stream.categories, sync.fragments(_unique(stream.items, seen)), str(dst))
+    sync.report.removed = len(manifest.remove_missing(seen))
+    manifest.set_meta(dict(state, next_image=sync.next_image, next_record=sync.next_record))
+    return sync.report
+
+
+# -- label writers (YOLO) ---------------------------------------------------
+
+
+def _sync_labels(a_dst: Any, a_src: Any, src: Path, dst: Path, dst_fmt: str, manifest: Manifest) -> DeltaReport:
+    meta = manifest.meta()
+    full = not (dst / "data.yaml").is_file()
+    for _ in range(2):
+        stream = a_src.stream(str(src))
+        state = _state(a_dst, dst_fmt, stream.categories)
+        full = full or any(meta.get(k) != v for k, v in state.items())
+        report = DeltaReport(full=full)
+        builder = ColumnarBuilder(stream.categories)
+        stale: List[str] = []
+        rows = []
+        kinds: Set[str] = set()
+        seen: Set[str] = set()
+        for item in _unique(stream.items, seen):
+            kinds.update(ann.type for ann in item.annotations)
+            digest = item_digest(item)
+            row = None if full else manifest.lookup(item.id)
+            if row is not None and bytes(row[0]) == digest:
+                report.unchanged += 1
+                continue
+            if row is None:
+                report.added += 1
+            else:
+                report.changed += 1
+                stale.append(row[1])
+            builder.add_item(item.id, item.image.file_name, item.image.width, item.image.height)
+            for ann in item.annotations:
+                builder.add_annotation(ann)
+            rows.append((item.id, digest, item.image.file_name, None, None, None))
+        task = a_dst.task_for(kinds)
+        if not full and meta.get("task") != task:
+            # the task follows the annotation types; a new one changes every label file
+            full = True
+            continue
+        break
+    if full:
+        stale = manifest.file_names()
+        manifest.clear()
+    else:
+        removed = manifest.remove_missing(seen)
+        report.removed = len(removed)
+        stale.extend(removed)
+    with metrics.span("incremental.write"):
+        a_dst.patch_columnar(builder.build(), str(dst), task, stale)
+    manifest.put(rows)
+    manifest.set_meta(dict(state, task=task))
+    return report
+
+
+def convert_incremental(a_src: Any, a_dst: Any, src: Path, dst: Path, dst_fmt: str) -> DeltaReport:
+    if not supports_incremental(a_dst):
+        raise ValueError(f"incremental: format {dst_fmt!r} does not support incremental export")
+    dst = Path(dst)
+    with Manifest(manifest_path(dst)) as manifest:
+        if hasattr(a_dst, "patch_columnar"):
+            report = _sync_labels(a_dst, a_src, src, dst, dst_fmt, manifest)
+        else:
+            with metrics.span("load.index"):
+                stream = a_src.stream(str(src))
+            report = _sync_fragments(a_dst, stream, dst, dst_fmt, manifest)
+        manifest.commit()
+    metrics.count("delta.added", report.added)
+    metrics.count("delta.changed", report.changed)
+    metrics.count("delta.removed", report.removed)
+    metrics.count("delta.unchanged", report.unchanged)
+    return report
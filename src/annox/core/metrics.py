@@ -0,0 +1,290 @@
+from __future__ import annotations
+
+import itertools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Union
+
+# Instrumentation: timed spans, counters and peak-memory sampling.
+#
+# Nothing is recorded unless a ``Recorder`` is active:
+#
+#     with Recorder(sinks=[JsonSink("profile.json")]) as rec:
+#         convert(...)
+#     print(format_report(rec.report()))
+#
+# ``span(name)`` and ``count(name, n)`` are cheap no-ops otherwise, so they can
+# sit on hot paths. Spans nest per thread and are reported by their path
+# ("convert/load/coco.read").
+
+log = logging.getLogger("annox.metrics")
+
+_active: Optional["Recorder"] = None
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc: Any) -> None:
+        return None
+
+
+_NULL = _NullSpan()
+
+
+def enabled() -> bool:
+    return _active is not None
+
+
+def span(name: str) -> Any:
+    """Context manager timing ``name`` under the active recorder, if any."""
+    rec = _active
+    if rec is None:
+        return _NULL
+    return rec.span(name)
+
+
+def count(name: str, n: int = 1) -> None:
+    rec = _active
+    if rec is not None:
+        rec.count(name, n)
+
+
+def count_file(name: str, path: Union[str, Path]) -> None:
+    # bytes of a file, or of all files below a directory
+    rec = _active
+    if rec is None:
+        return
+    p = Path(path)
+    try:
+        size = p.stat().st_size if p.is_file() else sum(f.stat().st_size for f in p.rglob("*") if f.is_file())
+    except OSError:
+        return
+    rec.count(name, size)
+
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes (peak RSS where unavailable)."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss if sys.platform == "darwin" else rss * 1024
+    except Exception:  # pragma: no cover - no resource module (Windows)
+        return 0
+
+
+class _SpanStats:
+    __slots__ = ("calls", "seconds", "peak_rss")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.seconds = 0.0
+        self.peak_rss = 0
+
+
+class Recorder:
+    """Collects spans, counters and peak RSS while active; emits to sinks on exit.
+
+    RSS is sampled every ``sample_interval`` seconds on a daemon thread
+    (``None`` disables sampling).
+    """
+
+    def __init__(self, sinks: Sequence["Sink"] = (), sample_interval: Optional[float] = 0.05) -> None:
+        self.sinks = list(sinks)
+        self.sample_interval = sample_interval
+        self.spans: Dict[str, _SpanStats] = {}
+        self.counters: Dict[str, int] = defaultdict(int)
+        self.peak_rss = 0
+        self.start_rss = 0
+        self.wall = 0.0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._open: Dict[int, _SpanStats] = {}
+        self._tokens = itertools.count()
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._prev: Optional[Recorder] = None
+        self._t0 = 0.0
+
+    # -- recording ----------------------------------------------------------
+
+    def _stack(self) -> List[str]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        stack = self._stack()
+        stack.append(name)
+        path = "/".join(stack)
+        with self._lock:
+            stats = self.spans.get(path)
+            if stats is None:
+                stats = self.spans[path] = _SpanStats()
+            token = next(self._tokens)
+            self._open[token] = stats
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            dt = time.perf_counter() - t0
+            stack.pop()
+            with self._lock:
+                del self._open[token]
+                stats.calls += 1
+                stats.seconds += dt
+            if not stats.peak_rss and self.sample_interval is not None:
+                # too short to have been sampled
+                stats.peak_rss = current_rss()
+
+    def count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[name] += n
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.sample_interval):
+            rss = current_rss()
+            with self._lock:
+                self.peak_rss = max(self.peak_rss, rss)
+                for stats in self._open.values():
+                    stats.peak_rss = max(stats.peak_rss, rss)
+
+    # -- lifecycle ----------------------------------------------------------
+
+    def __enter__(self) -> "Recorder":
+        global _active
+        self._prev, _active = _active, self
+        self.start_rss = self.peak_rss = current_rss()
+        if self.sample_interval is not None:
+            self._stop.clear()
+            self._sampler = threading.Thread(target=self._sample, name="annox-rss", daemon=True)
+            self._sampler.start()
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        global _active
+        self.wall = time.perf_counter() - self._t0
+        if self._sampler is not None:
+            self._stop.set()
+            self._sampler.join()
+            self._sampler = None
+        self.peak_rss = max(self.peak_rss, current_rss())
+        _active = self._prev
+        report = self.report()
+        for sink in self.sinks:
+            try:
+                sink.emit(report)
+            except Exception as e:  # a broken sink must not fail the run
+                log.warning("metrics: sink %s failed: %s", type(sink).__name__, e)
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            spans = {
+                path: {"calls": s.calls, "seconds": round(s.seconds, 6), "peak_rss_bytes": s.peak_rss}
+                for path, s in self.spans.items()
+            }
+            counters = dict(self.counters)
+        return {
+            "wall_seconds": round(self.wall, 6),
+            "start_rss_bytes": self.start_rss,
+            "peak_rss_bytes": self.peak_rss,
+            "spans": spans,
+            "counters": counters,
+        }
+
+
+# -- sinks ----------------------------------------------------------------------
+
+
+class Sink:
+    def emit(self, report: Dict[str, Any]) -> None:  # pragma: no cover - interface
+        raise NotImplementedError
+
+
+class LogSink(Sink):
+    def __init__(self, logger: Optional[logging.Logger] = None, level: int = logging.INFO) -> None:
+        self.logger = logger or log
+        self.level = level
+
+    def emit(self, report: Dict[str, Any]) -> None:
+        for line in format_report(report).splitlines():
+            self.logger.log(self.level, line)
+
+
+class JsonSink(Sink):
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.path = Path(path)
+
+    def emit(self, report: Dict[str, Any]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class PrometheusSink(Sink):
+    """Prometheus text exposition file, e.g. for the node_exporter textfile collector."""
+
+    def __init__(self, path: Union[str, Path], prefix: str = "annox") -> None:
+        self.path = Path(path)
+        self.prefix = prefix
+
+    def emit(self, report: Dict[str, Any]) -> None:
+        p = self.prefix
+        lines = [
+            f"# TYPE {p}_span_seconds gauge",
+            *(f'{p}_span_seconds{{span="{_label(k)}"}} {v["seconds"]}' for k, v in report["spans"].items()),
+            f"# TYPE {p}_span_calls gauge",
+            *(f'{p}_span_calls{{span="{_label(k)}"}} {v["calls"]}' for k, v in report["spans"].items()),
+            f"# TYPE {p}_count gauge",
+            *(f'{p}_count{{name="{_label(k)}"}} {v}' for k, v in report["counters"].items()),
+            f"# TYPE {p}_peak_rss_bytes gauge",
+            f"{p}_peak_rss_bytes {report['peak_rss_bytes']}",
+            f"# TYPE {p}_wall_seconds gauge",
+            f"{p}_wall_seconds {report['wall_seconds']}",
+        ]
+        # write then rename so collectors never read a partial file
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """Stage breakdown as an indented table, stages in first-entered order."""
+    wall = report["wall_seconds"] or 1e-12
+    rows = [f"{'stage':<44} {'calls':>8} {'seconds':>10} {'%':>6} {'peak MB':>9}"]
+    for path in report["spans"]:
+        s = report["spans"][path]
+        depth = path.count("/")
+        name = "  " * depth + path.rsplit("/", 1)[-1]
+        rows.append(
+            f"{name:<44} {s['calls']:>8} {s['seconds']:>10.4f} {100 * s['seconds'] / wall:>6.1f}"
+            f" {s['peak_rss_bytes'] / 2**20:>9.1f}"
+        )
+    rows.append(f"{'total':<44} {'':>8} {report['wall_seconds']:>10.4f}")
+    for name in sorted(report["counters"]):
+        rows.append(f"{name:<44} {report['counters'][name]:>8}")
+    rows.append(f"{'peak RSS (MB)':<44} {report['peak_rss_bytes'] / 2**20:>8.1f}")
+    return "\n".join(rows)
@@ -0,0 +1,397 @@
+from __future__ import annotations
+
+import hashlib
+import queue
+import tempfile
+import threading
+from contextlib import ExitStack
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from annox.adapters.base import DatasetStream
+from annox.core import metrics
+from annox.core.convert import DEFAULT_SHARD_SIZE, write_stream
+from annox.core.registry import AdapterRegistry
+from annox.io.parallel import imap_parallel
+from annox.schema.columnar import ColumnarBuilder
+from annox.schema.dataset import Category, Dataset
+
+# Streaming dataset operations: merge, filter and split.
+#
+# Every operation is a pipeline over item iterators, from the source
+# adapters' ``stream`` to the destination adapter's ``dump_stream`` (or its
+# sharded writer with ``workers``), so memory does not grow with the dataset.
+# Several inputs are always read as one merged stream:
+#
+#   categories   joined on name across inputs; the first input keeps its ids,
+#                names new to the merge get ids after the largest one so far
+#   ids          with ``renumber_ids``, items get ids "1", "2", ... and
+#                annotations 1, 2, ... in output order; otherwise an item id
+#                found in more than one input is an error
+#
+# Items are updated in place: adapter streams yield fresh objects.
+#
+# With ``workers`` > 1, inputs are first parsed in parallel, one per worker
+# process, into temporary memory-mapped annoxbin files that are then streamed.
+
+_QUEUE = 256  # items buffered per split output
+
+
+@dataclass
+class OpStats:
+    items: int = 0
+    annotations: int = 0
+
+
+def merge_categories(lists: Sequence[Sequence[Category]]) -> Tuple[List[Category], List[Dict[int, int]]]:
+    """Join category lists on name; returns the merged list and an old -> new id map per list."""
+    merged: List[Category] = []
+    by_name: Dict[str, Category] = {}
+    used: Set[int] = set()
+    maps: List[Dict[int, int]] = []
+    for cats in lists:
+        mapping: Dict[int, int] = {}
+        for c in cats:
+            hit = by_name.get(c.name)
+            if hit is None:
+                new_id = c.id if c.id not in used else max(used) + 1
+                hit = by_name[c.name] = c.model_copy(update={"id": new_id})
+                used.add(new_id)
+                merged.append(hit)
+            mapping[c.id] = hit.id
+        maps.append(mapping)
+    return merged, maps
+
+
+def _unique_models(models: Iterable[Any]) -> List[Any]:
+    # licenses / splits of several inputs: equal entries are kept once, in order
+    seen: Set[Tuple[Any, ...]] = set()
+    out: List[Any] = []
+    for m in models:
+        key = tuple(m.model_dump().items())
+        if key not in seen:
+            seen.add(key)
+            out.append(m)
+    return out
+
+
+def _remap(items: Iterable[Dataset.Item], mapping: Dict[int, int]) -> Iterator[Dataset.Item]:
+    if all(k == v for k, v in mapping.items()):
+        yield from items
+        return
+    for item in items:
+        for a in item.annotations:
+            if a.category_id is not None:
+                a.category_id = mapping.get(a.category_id, a.category_id)
+        yield item
+
+
+def renumber(items: Iterable[Dataset.Item]) -> Iterator[Dataset.Item]:
+    ann_id = 0
+    for n, item in enumerate(items, start=1):
+        item.id = str(n)
+        for a in item.annotations:
+            ann_id += 1
+            a.id = ann_id
+        yield item
+
+
+# -- filters ------------------------------------------------------------------
+
+
+@dataclass
+class ItemFilter:
+    """Annotation and item predicates.
+
+    Annotations are kept when their category name is in ``categories`` (all
+    when None) and not in ``exclude``, and their type is in ``types`` (all
+    when None). Items are kept when ``predicate`` (if any) accepts them and
+    they have at least ``min_annotations`` annotations left.
+    """
+
+    categories: Optional[Set[str]] = None
+    exclude: Set[str] = field(default_factory=set)
+    types: Optional[Set[str]] = None
+    min_annotations: int = 0
+    predicate: Optional[Callable[[Dataset.Item], bool]] = None
+
+    def keep_category(self, c: Category) -> bool:
+        return (self.categories is None or c.name in self.categories) and c.name not in self.exclude
+
+    def apply(self, items: Iterable[Dataset.Item], categories: Sequence[Category]) -> Iterator[Dataset.Item]:
+        keep_ids = {c.id for c in categories if self.keep_category(c)}
+        all_cats = len(keep_ids) == len(categories)
+        for item in items:
+            if self.predicate is not None and not self.predicate(item):
+                continue
+            anns = [
+                a
+                for a in item.annotations
+                if (all_cats or a.category_id in keep_ids) and (self.types is None or a.type in self.types)
+            ]
+            if len(anns) < self.min_annotations:
+                continue
+            item.annotations = anns
+            yield item
+
+
+# -- splits -------------------------------------------------------------------
+
+
+def parse_splits(spec: str) -> List[Tuple[str, float]]:
+    """``"train=0.8,val=0.2"`` -> [("train", 0.8), ("val", 0.2)], normalized to sum to 1."""
+    out: List[Tuple[str, float]] = []
+    for part in spec.split(","):
+        name, sep, frac = part.partition("=")
+        try:
+            value = float(frac)
+        except ValueError:
+            value = -1.0
+        if not sep or not name.strip() or value < 0:
+            raise ValueError(f"split: expected name=fraction, got {part!r}")
+        out.append((name.strip(), value))
+    total = sum(f for _, f in out)
+    if total <= 0 or len({n for n, _ in out}) != len(out):
+        raise ValueError(f"split: invalid split spec {spec!r}")
+    return [(n, f / total) for n, f in out]
+
+
+def split_of(item_id: str, splits: Sequence[Tuple[str, float]], seed: str = "") -> str:
+    # deterministic: a hash of the item id picks the split, independent of
+    # input order and of the other items
+    h = hashlib.blake2b(f"{seed}\0{item_id}".encode("utf-8"), digest_size=8).digest()
+    u = int.from_bytes(h, "big") / 2.0**64
+    acc = 0.0
+    for name, frac in splits:
+        acc += frac
+        if u < acc:
+            return name
+    return splits[-1][0]
+
+
+_DONE = object()
+_ABORT = object()
+
+
+def _fan_out(
+    items: Iterable[Dataset.Item],
+    route: Callable[[Dataset.Item], str],
+    sinks: Dict[str, Callable[[Iterator[Dataset.Item]], None]],
+) -> None:
+    # One writer thread per sink, fed through bounded queues, so a single
+    # pass over the source feeds several pull-based writers.
+    queues = {k: queue.Queue(_QUEUE) for k in sinks}  # type: ignore[var-annotated]
+    errors: List[BaseException] = []
+
+    def run(key: str) -> None:
+        q = queues[key]
+        finished = False
+
+        def feed() -> Iterator[Dataset.Item]:
+            nonlocal finished
+            while True:
+                x = q.get()
+                if x is _DONE or x is _ABORT:
+                    finished = True
+                    if x is _ABORT:
+                        raise RuntimeError("split: input or another output failed")
+                    return
+                yield x
+
+        try:
+            sinks[key](feed())
+        except BaseException as e:
+            errors.append(e)
+        while not finished:  # keep draining so the producer never blocks
+            x = q.get()
+            finished = x is _DONE or x is _ABORT
+
+    threads = [threading.Thread(target=run, args=(k,), name=f"annox-split-{k}") for k in sinks]
+    for t in threads:
+        t.start()
+    end = _DONE
+    try:
+        for item in items:
+            if errors:
+                break
+            queues[route(item)].put(item)
+    except BaseException:
+        end = _ABORT
+        raise
+    finally:
+        if errors:
+            end = _ABORT
+        for q in queues.values():
+            q.put(end)
+        for t in threads:
+            t.join()
+    if errors:
+        raise errors[0]
+
+
+# -- inputs -------------------------------------------------------------------
+
+
+def _stage(task: Tuple[Any, str, str]) -> str:
+    # parse one input into a temporary annoxbin (runs in a worker process)
+    from annox.adapters.annoxbin.annoxbin import write_columnar
+
+    adapter, src, out = task
+    if hasattr(adapter, "load_columnar"):
+        cd = adapter.load_columnar(src)
+    else:
+        stream = adapter.stream(src)
+        b = ColumnarBuilder(stream.categories)
+        for it in stream.items:
+            b.add_item(it.id, it.image.file_name, it.image.width, it.image.height)
+            for ann in it.annotations:
+                b.add_annotation(ann)
+        cd = b.build()
+    write_columnar(cd, out)
+    return out
+
+
+def _count(items: Iterable[Dataset.Item], stats: OpStats) -> Iterator[Dataset.Item]:
+    for item in items:
+        stats.items += 1
+        stats.annotations += len(item.annotations)
+        yield item
+
+
+def _adapter(fmt: str) -> Any:
+    adapter = AdapterRegistry().create(fmt)
+    if adapter is None:
+        raise RuntimeError(f"Adapter {fmt!r} not found. Install plugins providing 'annox.adapters'.")
+    return adapter
+
+
+def open_inputs(
+    srcs: Sequence[Path], src_fmt: str, stack: ExitStack, workers: int = 0, unique_ids: bool = False
+) -> DatasetStream:
+    """One stream over all inputs with categories joined on name.
+
+    With ``unique_ids``, an item id that occurs in more than one input raises
+    ValueError while streaming. Temporary files live until ``stack`` is closed.
+    """
+    if not srcs:
+        raise ValueError("ops: no input datasets")
+    a_src = _adapter(src_fmt)
+    if workers > 1 and len(srcs) > 1:
+        from annox.adapters.annoxbin.annoxbin import read_columnar
+
+        tmp = Path(stack.enter_context(tempfile.TemporaryDirectory(prefix="annox-ops-")))
+        tasks = [(a_src, str(p), str(tmp / f"{i}.annoxbin")) for i, p in enumerate(srcs)]
+        with metrics.span("stage"):
+            staged = list(imap_parallel(_stage, tasks, workers, chunk_size=1))
+        streams = []
+        for path in staged:
+            cd = read_columnar(path)
+            # written just above from parsed items
+            items = cd.iter_items(trusted=True)
+            streams.append(DatasetStream(cd.categories, items, cd.licenses, cd.splits))
+    else:
+        with metrics.span("load.index"):
+            streams = [a_src.stream(str(p)) for p in srcs]
+    categories, maps = merge_categories([s.categories for s in streams])
+
+    def items() -> Iterator[Dataset.Item]:
+        # the ids of earlier inputs are kept in memory, only when checked
+        seen: Optional[Set[str]] = set() if unique_ids and len(streams) > 1 else None
+        for n, (s, mapping) in enumerate(zip(streams, maps)):
+            if seen is None:
+                yield from _remap(s.items, mapping)
+                continue
+            ids: Set[str] = set()
+            for item in _remap(s.items, mapping):
+                if item.id in seen:
+                    raise ValueError(
+                        f"ops: item id {item.id!r} of {srcs[n]} also occurs in an earlier input; "
+                        "renumber ids to combine them"
+                    )
+                ids.add(item.id)
+                yield item
+            seen |= ids
+
+    licenses = _unique_models(lic for s in streams for lic in s.licenses)
+    splits = _unique_models(sp for s in streams for sp in s.splits)
+    return DatasetStream(categories, items(), licenses, splits)
+
+
+# -- operations ---------------------------------------------------------------
+
+
+def merge(
+    srcs: Sequence[Path],
+    dst: Path,
+    src_fmt: str,
+    dst_fmt: str,
+    workers: int = 0,
+    renumber_ids: bool = True,
+    shard_size: int = DEFAULT_SHARD_SIZE,
+) -> OpStats:
+    return filter_dataset(srcs, dst, src_fmt, dst_fmt, None, workers, renumber_ids, shard_size)
+
+
+def filter_dataset(
+    srcs: Sequence[Path],
+    dst: Path,
+    src_fmt: str,
+    dst_fmt: str,
+    flt: Optional[ItemFilter],
+    workers: int = 0,
+    renumber_ids: bool = False,
+    shard_size: int = DEFAULT_SHARD_SIZE,
+) -> OpStats:
+    a_dst = _adapter(dst_fmt)
+    stats = OpStats()
+    with ExitStack() as stack:
+        stream = open_inputs(srcs, src_fmt, stack, workers, unique_ids=not renumber_ids)
+        items: Iterable[Dataset.Item] = stream.items
+        categories = stream.categories
+        if flt is not None:
+            items = flt.apply(items, categories)
+            if flt.categories is not None or flt.exclude:
+                categories = [c for c in categories if flt.keep_category(c)]
+        if renumber_ids:
+            items = renumber(items)
+        out = replace(stream, categories=categories, items=_count(items, stats))
+        write_stream(a_dst, out, Path(dst), workers, shard_size)
+    return stats
+
+
+def split_paths(dst: str, names: Iterable[str]) -> Dict[str, Path]:
+    # "out/{split}.json" is a template; otherwise one output per split below dst
+    if "{split}" in dst:
+        return {n: Path(dst.replace("{split}", n)) for n in names}
+    return {n: Path(dst) / n for n in names}
+
+
+def split(
+    srcs: Sequence[Path],
+    dst: str,
+    src_fmt: str,
+    dst_fmt: str,
+    splits: Sequence[Tuple[str, float]],
+    seed: str = "",
+    workers: int = 0,
+    renumber_ids: bool = False,
+    shard_size: int = DEFAULT_SHARD_SIZE,
+) -> Dict[str, OpStats]:
+    a_dst = _adapter(dst_fmt)
+    paths = split_paths(dst, [n for n, _ in splits])
+    stats = {n: OpStats() for n in paths}
+    with ExitStack() as stack:
+        stream = open_inputs(srcs, src_fmt, stack, workers, unique_ids=not renumber_ids)
+
+        def sink(name: str) -> Callable[[Iterator[Dataset.Item]], None]:
+            def write(items: Iterator[Dataset.Item]) -> None:
+                its: Iterable[Dataset.Item] = renumber(items) if renumber_ids else items
+                out = replace(stream, items=_count(its, stats[name]))
+                write_stream(a_dst, out, paths[name], workers, shard_size)
+
+            return write
+
+        with metrics.span("split"):
+            _fan_out(stream.items, lambda it: split_of(it.id, splits, seed), {n: sink(n) for n in paths})
+    return stats
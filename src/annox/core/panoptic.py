@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+from annox.io import maskio
+
+# Panoptic segment-id images, COCO-panoptic style.
+#
+# Segment ids are stored in RGB PNGs as id = R + 256 * G + 256**2 * B; id 0
+# is void. Every kernel takes a whole ``(h, w)`` id image and handles all of
+# its segments at once, without per-segment masks. The import kernels work on
+# the maximal runs of the column-major image (a few per segment and column
+# instead of one entry per pixel):
+#
+#   segment_stats     areas and bounding boxes reduced over the runs of each id
+#   segments_to_rles  runs grouped by id, emitted as back-to-back counts and
+#                     compressed in one batch
+#   rles_to_ids       foreground intervals of all RLEs, sorted and expanded
+#                     in one ``np.repeat``
+
+
+def rgb_to_id(rgb: np.ndarray) -> np.ndarray:
+    c = np.asarray(rgb)
+    if c.ndim != 3 or c.shape[2] < 3:
+        raise ValueError(f"panoptic: expected an (h, w, 3) RGB image, got shape {c.shape}")
+    ids = c[:, :, 2].astype(np.int64)
+    ids <<= 8
+    ids |= c[:, :, 1]
+    ids <<= 8
+    ids |= c[:, :, 0]
+    return ids
+
+
+def id_to_rgb(ids: np.ndarray) -> np.ndarray:
+    ids = np.asarray(ids, dtype=np.int64)
+    return np.stack([ids & 0xFF, (ids >> 8) & 0xFF, (ids >> 16) & 0xFF], axis=-1).astype(np.uint8)
+
+
+def _runs(ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # maximal runs of the column-major image: (starts, ends, values)
+    flat = ids.ravel(order="F")
+    n = flat.size
+    if n == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, flat[:0]
+    change = np.flatnonzero(flat[1:] != flat[:-1]) + 1
+    starts = np.concatenate(([0], change)).astype(np.int64)
+    ends = np.concatenate((change, [n])).astype(np.int64)
+    return starts, ends, flat[starts]
+
+
+def segment_stats(ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """``(segment ids, areas, [x, y, w, h] boxes)`` of the non-void segments of an id image."""
+    ids = np.asarray(ids)
+    h, w = ids.shape
+    starts, ends, values = _runs(ids)
+    uniq, inv = np.unique(values, return_inverse=True)
+    areas = np.bincount(inv, weights=ends - starts, minlength=len(uniq)).astype(np.int64)
+    # a run spanning a column boundary covers the last row of its first
+    # column and the first row of the next
+    c0, c1 = starts // h, (ends - 1) // h
+    one = c0 == c1
+    y0 = np.where(one, starts - c0 * h, 0)
+    y1 = np.where(one, ends - c0 * h, h)
+    x0, x1, top, bottom = (np.full(len(uniq), v, dtype=np.int64) for v in (w, 0, h, 0))
+    np.minimum.at(x0, inv, c0)
+    np.maximum.at(x1, inv, c1 + 1)
+    np.minimum.at(top, inv, y0)
+    np.maximum.at(bottom, inv, y1)
+    boxes = np.stack([x0, top, x1 - x0, bottom - top], axis=1)
+    keep = uniq != 0
+    return uniq[keep].astype(np.int64), areas[keep], boxes[keep]
+
+
+def segments_to_rles(ids: np.ndarray, segment_ids: Sequence[int], compressed: bool = True) -> List[maskio.RLEDict]:
+    """One COCO RLE per requested segment id (empty for ids not in the image)."""
+    ids = np.asarray(ids)
+    h, w = ids.shape
+    n = h * w
+    starts, ends, values = _runs(ids)
+    order = np.argsort(values, kind="stable")
+    grouped = values[order]
+    seg = np.asarray(segment_ids, dtype=np.int64)
+    lo = np.searchsorted(grouped, seg, side="left")
+    k = np.searchsorted(grouped, seg, side="right") - lo
+    # the runs of each segment, in image order (maximal runs never touch)
+    first = np.cumsum(k) - k
+    local = np.arange(int(k.sum())) - np.repeat(first, k)
+    runs = order[np.repeat(lo, k) + local]
+    s, e = starts[runs], ends[runs]
+    prev = np.concatenate(([0], e[:-1]))
+    prev[local == 0] = 0
+    last = np.zeros(len(seg), dtype=np.int64)
+    last[k > 0] = e[first[k > 0] + k[k > 0] - 1]
+    tail = n - last
+    # counts per segment: (gap, run) pairs, then the trailing background
+    lengths = 2 * k + (tail > 0)
+    offsets = np.concatenate(([0], np.cumsum(lengths)))
+    counts = np.empty(int(offsets[-1]), dtype=np.int64)
+    at = np.repeat(offsets[:-1], k) + 2 * local
+    counts[at] = s - prev
+    counts[at + 1] = e - s
+    counts[offsets[1:][tail > 0] - 1] = tail[tail > 0]
+    bounds = offsets.tolist()
+    if compressed:
+        strings = maskio.compress_counts_many(counts, offsets)
+        return [{"size": [h, w], "counts": c} for c in strings]
+    return [{"size": [h, w], "counts": counts[a:b].tolist()} for a, b in zip(bounds[:-1], bounds[1:])]
+
+
+def rles_to_ids(rles: Sequence[maskio.RLELike], segment_ids: Sequence[int], h: int, w: int) -> np.ndarray:
+    """Paint non-overlapping RLEs into an ``(h, w)`` int64 id image."""
+    n = h * w
+    starts, ends, values = [], [], []
+    for rle, sid in zip(rles, segment_ids):
+        if maskio.size_of(rle) != (h, w):
+            raise ValueError(f"panoptic: segment {sid} mask size {maskio.size_of(rle)} != image size {(h, w)}")
+        s, e = maskio.intervals_of(rle)
+        starts.append(s)
+        ends.append(e)
+        values.append(np.full(len(s), sid, dtype=np.int64))
+    if not starts:
+        return np.zeros((h, w), dtype=np.int64)
+    s, e, v = np.concatenate(starts), np.concatenate(ends), np.concatenate(values)
+    order = np.argsort(s, kind="stable")
+    s, e, v = s[order], e[order], v[order]
+    if (s[1:] < e[:-1]).any():
+        raise ValueError("panoptic: segment masks overlap")
+    if len(e) and e[-1] > n:
+        raise ValueError("panoptic: mask runs exceed the image size")
+    gaps = s - np.concatenate(([0], e[:-1]))
+    lengths = np.empty(2 * len(s) + 1, dtype=np.int64)
+    lengths[0:-1:2] = gaps
+    lengths[1::2] = e - s
+    lengths[-1] = n - (e[-1] if len(e) else 0)
+    fill = np.zeros(len(lengths), dtype=np.int64)
+    fill[1::2] = v
+    return np.repeat(fill, lengths).reshape((h, w), order="F")
@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+from typing import Sequence, Tuple
+
+import numpy as np
+
+# Batched polygon kernels over a flat coordinate buffer.
+#
+# ``coords`` holds the xy pairs of many rings back to back and ``offsets``
+# (length rings + 1) delimits them in coordinate units, the same layout as
+# ColumnarDataset.coords / coord_offsets. A trailing odd coordinate in a ring
+# is ignored. Every kernel handles all rings in one pass; per-annotation
+# results are reduced from per-ring ones with ``group_sum``/``group_bounds``.
+
+
+def _vertices(coords: np.ndarray, offsets: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # x, y and ring id of every vertex, plus vertex offsets per ring
+    coords = np.asarray(coords, dtype=np.float64)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    if len(offsets) and offsets[0] == 0 and offsets[-1] == len(coords) and not (offsets & 1).any():
+        # contiguous even-length rings: plain strided views
+        return coords[0::2], coords[1::2], offsets // 2
+    nv = np.diff(offsets) // 2
+    ring = np.repeat(np.arange(len(nv)), nv)
+    voff = np.concatenate(([0], np.cumsum(nv)))
+    first = offsets[:-1][ring] + 2 * (np.arange(len(ring)) - voff[ring])
+    return coords[first], coords[first + 1], voff
+
+
+def _next(voff: np.ndarray) -> np.ndarray:
+    # index of the following vertex, wrapping within each ring
+    n = int(voff[-1])
+    nxt = np.arange(1, n + 1)
+    ends = voff[1:][np.diff(voff) > 0] - 1
+    nxt[ends] = voff[:-1][np.diff(voff) > 0]
+    return nxt
+
+
+def _reduce(ufunc: np.ufunc, values: np.ndarray, offsets: np.ndarray, empty: float) -> np.ndarray:
+    # ufunc.reduceat per segment, with ``empty`` for zero-length segments
+    out = np.full(len(offsets) - 1, empty, dtype=np.float64)
+    nonempty = np.diff(offsets) > 0
+    if nonempty.any():
+        out[nonempty] = ufunc.reduceat(values, offsets[:-1][nonempty])
+    return out
+
+
+def ring_areas(coords: np.ndarray, offsets: np.ndarray, signed: bool = False) -> np.ndarray:
+    """Shoelace area of every ring (0 for rings with fewer than 3 vertices)."""
+    x, y, voff = _vertices(coords, offsets)
+    nxt = _next(voff)
+    cross = x * y[nxt] - x[nxt] * y
+    area = _reduce(np.add, cross, voff, 0.0) / 2.0
+    area[np.diff(voff) < 3] = 0.0
+    return area if signed else np.abs(area)
+
+
+def ring_bounds(coords: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """``(rings, 4)`` ``[x0, y0, x1, y1]`` per ring; NaN for empty rings."""
+    x, y, voff = _vertices(coords, offsets)
+    return np.stack(
+        [
+            _reduce(np.minimum, x, voff, np.nan),
+            _reduce(np.minimum, y, voff, np.nan),
+            _reduce(np.maximum, x, voff, np.nan),
+            _reduce(np.maximum, y, voff, np.nan),
+        ],
+        axis=1,
+    )
+
+
+def ring_centroids(coords: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """``(rings, 2)`` area centroids; the vertex mean for degenerate rings."""
+    x, y, voff = _vertices(coords, offsets)
+    nxt = _next(voff)
+    cross = x * y[nxt] - x[nxt] * y
+    a = _reduce(np.add, cross, voff, 0.0) / 2.0
+    cx = _reduce(np.add, (x + x[nxt]) * cross, voff, 0.0)
+    cy = _reduce(np.add, (y + y[nxt]) * cross, voff, 0.0)
+    nv = np.diff(voff)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_x = _reduce(np.add, x, voff, np.nan) / nv
+        mean_y = _reduce(np.add, y, voff, np.nan) / nv
+        ok = np.abs(a) > 1e-12
+        out_x = np.where(ok, cx / (6.0 * a), mean_x)
+        out_y = np.where(ok, cy / (6.0 * a), mean_y)
+    return np.stack([out_x, out_y], axis=1)
+
+
+def group_sum(values: np.ndarray, group_offsets: np.ndarray) -> np.ndarray:
+    """Sum of per-ring ``values`` for each group (e.g. rings of an annotation)."""
+    return _reduce(np.add, np.asarray(values, dtype=np.float64), np.asarray(group_offsets), 0.0)
+
+
+def group_bounds(bounds: np.ndarray, group_offsets: np.ndarray) -> np.ndarray:
+    """Union of per-ring ``[x0, y0, x1, y1]`` bounds for each group; NaN if empty."""
+    offs = np.asarray(group_offsets)
+    return np.stack(
+        [
+            _reduce(np.fmin, bounds[:, 0], offs, np.nan),
+            _reduce(np.fmin, bounds[:, 1], offs, np.nan),
+            _reduce(np.fmax, bounds[:, 2], offs, np.nan),
+            _reduce(np.fmax, bounds[:, 3], offs, np.nan),
+        ],
+        axis=1,
+    )
+
+
+def strided_bounds(values: np.ndarray, offsets: np.ndarray, stride: int) -> np.ndarray:
+    """Bounds of x/y in a flat buffer of ``stride``-tuples (e.g. x,y,v keypoints)."""
+    values = np.asarray(values, dtype=np.float64)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    if len(offsets) and offsets[0] == 0 and offsets[-1] == len(values) and not (offsets % stride).any():
+        x, y, toff = values[0::stride], values[1::stride], offsets // stride
+    else:
+        n = np.diff(offsets) // stride
+        seg = np.repeat(np.arange(len(n)), n)
+        toff = np.concatenate(([0], np.cumsum(n)))
+        first = offsets[:-1][seg] + stride * (np.arange(len(seg)) - toff[seg])
+        x, y = values[first], values[first + 1]
+    return np.stack(
+        [
+            _reduce(np.minimum, x, toff, np.nan),
+            _reduce(np.minimum, y, toff, np.nan),
+            _reduce(np.maximum, x, toff, np.nan),
+            _reduce(np.maximum, y, toff, np.nan),
+        ],
+        axis=1,
+    )
+
+
+def _pack(x: np.ndarray, y: np.ndarray, ring: np.ndarray, rings: int) -> Tuple[np.ndarray, np.ndarray]:
+    # vertices (grouped by ring, in order) back into coords/offsets
+    counts = np.bincount(ring, minlength=rings)
+    offsets = np.concatenate(([0], np.cumsum(2 * counts))).astype(np.int64)
+    coords = np.empty(2 * len(x), dtype=np.float64)
+    coords[0::2] = x
+    coords[1::2] = y
+    return coords, offsets
+
+
+def simplify_rings(
+    coords: np.ndarray, offsets: np.ndarray, tolerance: float, min_vertices: int = 3
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Drop vertices closer than ``tolerance`` to the chord of their neighbours.
+
+    Each pass removes the locally least significant vertices of all rings at
+    once, until none is below the tolerance; rings keep ``min_vertices``.
+    """
+    x, y, voff = _vertices(coords, offsets)
+    ring = np.repeat(np.arange(len(voff) - 1), np.diff(voff))
+    while len(x):
+        voff = np.concatenate(([0], np.cumsum(np.bincount(ring, minlength=len(voff) - 1))))
+        nv = np.diff(voff)
+        nxt = _next(voff)
+        prv = np.empty_like(nxt)
+        prv[nxt] = np.arange(len(nxt))
+        dx, dy = x[nxt] - x[prv], y[nxt] - y[prv]
+        chord = np.hypot(dx, dy)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            dist = np.abs(dx * (y[prv] - y) - dy * (x[prv] - x)) / chord
+        dist = np.where(chord > 0, dist, np.hypot(x - x[prv], y - y[prv]))
+        # drop local minima only (ties broken by position), so two neighbours
+        # are never removed in the same pass
+        idx = np.arange(len(x))
+
+        def below(j: np.ndarray) -> np.ndarray:
+            return (dist < dist[j]) | ((dist == dist[j]) & (idx < j))
+
+        drop = (dist < tolerance) & below(prv) & below(nxt) & (nv[ring] > min_vertices)
+        if not drop.any():
+            break
+        # never take a ring below min_vertices in one pass
+        cum = np.cumsum(drop)
+        before = np.concatenate(([0], cum))[voff[:-1]]
+        drop &= cum - 1 - before[ring] < (nv - min_vertices)[ring]
+        keep = ~drop
+        x, y, ring = x[keep], y[keep], ring[keep]
+    return _pack(x, y, ring, len(offsets) - 1)
+
+
+def clip_rings(coords: np.ndarray, offsets: np.ndarray, box: Sequence[float]) -> Tuple[np.ndarray, np.ndarray]:
+    """Clip every ring to ``[x0, y0, x1, y1]`` (Sutherland-Hodgman, all rings at once).
+
+    Ring count is preserved; rings entirely outside the box become empty.
+    """
+    x, y, voff = _vertices(coords, offsets)
+    rings = len(voff) - 1
+    ring = np.repeat(np.arange(rings), np.diff(voff))
+    x0, y0, x1, y1 = (float(v) for v in box)
+    for axis, bound, keep_low in ((0, x0, False), (0, x1, True), (1, y0, False), (1, y1, True)):
+        if not len(x):
+            break
+        voff = np.concatenate(([0], np.cumsum(np.bincount(ring, minlength=rings))))
+        nxt = _next(voff)
+        v = x if axis == 0 else y
+        inside = v <= bound if keep_low else v >= bound
+        cur_in, nxt_in = inside, inside[nxt]
+        # per edge (i -> nxt): emitted points are [intersection?] then [next?]
+        emit_cross = cur_in != nxt_in
+        emit_next = nxt_in
+        with np.errstate(invalid="ignore", divide="ignore"):
+            t = (bound - v) / (v[nxt] - v)
+        t = np.where(emit_cross, t, 0.0)
+        cx = x + t * (x[nxt] - x)
+        cy = y + t * (y[nxt] - y)
+        if axis == 0:
+            cx = np.where(emit_cross, bound, cx)
+        else:
+            cy = np.where(emit_cross, bound, cy)
+        n_out = emit_cross.astype(np.int64) + emit_next
+        total = int(n_out.sum())
+        start = np.cumsum(n_out) - n_out
+        nx = np.empty(total)
+        ny = np.empty(total)
+        nr = np.repeat(ring, n_out)
+        c_idx = start[emit_cross]
+        nx[c_idx], ny[c_idx] = cx[emit_cross], cy[emit_cross]
+        n_idx = (start + emit_cross)[emit_next]
+        nx[n_idx], ny[n_idx] = x[nxt][emit_next], y[nxt][emit_next]
+        x, y, ring = nx, ny, nr
+    return _pack(x, y, ring, rings)
@@ -1,8 +1,27 @@
 from __future__ import annotations
 
+import hashlib
+import json
+import os
+import sys
 from dataclasses import dataclass
-from importlib.metadata import entry_points
-from typing import Dict, Optional
+from importlib import import_module
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from annox.core.paths import default_cache_dir
+
+# Entry points are resolved without importing the adapters: the registry keeps
+# an index {name: "module:attr"} of the "annox.adapters" group and imports only
+# the adapter that is asked for. Building the index scans the metadata of every
+# installed distribution, so it is kept in ``entry-points.json`` in the cache
+# directory, keyed by the sys.path entries and their mtimes (installing or
+# removing a distribution touches its site-packages directory). The adapters'
+# capabilities are stored there too, so ``list-formats`` imports no adapter
+# while the index is current.
+
+_INDEX_FILE = "entry-points.json"
+_memo: Dict[str, Dict[str, str]] = {}
 
 
 @dataclass
@@ -11,30 +30,159 @@ class AdapterInfo:
     obj: object
 
 
+def _fingerprint() -> str:
+    parts: List[str] = []
+    for p in sys.path:
+        try:
+            parts.append(f"{p}\0{os.stat(p or '.').st_mtime_ns}")
+        except OSError:
+            parts.append(p)
+    return hashlib.blake2b("\n".join(parts).encode("utf-8", "surrogateescape"), digest_size=16).hexdigest()
+
+
+def _scan(group: str) -> Dict[str, str]:
+    from importlib.metadata import entry_points
+
+    eps = entry_points()
+    try:
+        group_eps = eps.select(group=group)  # type: ignore[attr-defined]
+    except Exception:
+        group_eps = eps.get(group, [])  # type: ignore[attr-defined]
+    return {e.name: e.value for e in group_eps}
+
+
+def _read(path: Path) -> Dict[str, Any]:
+    # the stored index, or an empty one when missing or outdated
+    key = _fingerprint()
+    data: Dict[str, Any] = {}
+    try:
+        data = json.loads(path.read_text("utf-8"))
+    except (OSError, ValueError):
+        pass
+    if not isinstance(data, dict) or data.get("fingerprint") != key:
+        data = {"fingerprint": key, "groups": {}}
+    data.setdefault("capabilities", {})
+    return data
+
+
+def entry_point_index(group: str, refresh: bool = False) -> Dict[str, str]:
+    """``{name: "module:attr"}`` for an entry-point group, cached on disk."""
+    if not refresh and group in _memo:
+        return _memo[group]
+    path = default_cache_dir() / _INDEX_FILE
+    data = _read(path)
+    index = data["groups"].get(group)
+    if refresh or index is None:
+        index = _scan(group)
+        data["groups"][group] = index
+        data["capabilities"].pop(group, None)
+        _save(path, data)
+    _memo[group] = index
+    return index
+
+
+def cached_capabilities(
+    group: str, compute: Callable[[], Dict[str, Dict[str, bool]]], refresh: bool = False
+) -> Dict[str, Dict[str, bool]]:
+    """``{name: capabilities}`` of a group's adapters, stored with the entry-point index."""
+    path = default_cache_dir() / _INDEX_FILE
+    data = _read(path)
+    caps = data["capabilities"].get(group)
+    if refresh or caps is None or group not in data["groups"]:
+        caps = compute()
+        data = _read(path)  # compute() may have stored the entry points
+        data["capabilities"][group] = caps
+        _save(path, data)
+    return caps
+
+
+def _save(path: Path, data: Dict[str, Any]) -> None:
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp.write_text(json.dumps(data), "utf-8")
+        os.replace(tmp, path)
+    except OSError:
+        # read-only cache location: the index is rebuilt on next start
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+
+
+def _resolve(spec: str) -> object:
+    module, _, attr = spec.partition(":")
+    obj: Any = import_module(module.strip())
+    for part in attr.strip().split(".") if attr.strip() else ():
+        obj = getattr(obj, part)
+    return obj
+
+
 class AdapterRegistry:
     group = "annox.adapters"
 
     def __init__(self) -> None:
         self._cache: Dict[str, object] = {}
 
-    def discover(self) -> Dict[str, object]:
-        if self._cache:
-            return self._cache
-        eps = entry_points()
+    def index(self) -> Dict[str, str]:
+        return entry_point_index(self.group)
+
+    def names(self) -> List[str]:
+        return sorted(self.index())
+
+    def _load(self, name: str, spec: str) -> Optional[object]:
         try:
-            group_eps = eps.select(group=self.group)  # type: ignore[attr-defined]
-        except Exception:
-            group_eps = [e for e in eps if getattr(e, "group", None) == self.group]
-        for e in group_eps:
-            try:
-                self._cache[e.name] = e.load()
-            except Exception:  # pragma: no cover - best effort
-                continue
+            obj = _resolve(spec)
+        except Exception:  # pragma: no cover - best effort
+            return None
+        self._cache[name] = obj
+        return obj
+
+    def discover(self) -> Dict[str, object]:
+        for name, spec in self.index().items():
+            if name not in self._cache:
+                self._load(name, spec)
         return self._cache
 
     def list_adapters(self) -> Dict[str, object]:
         return self.discover()
 
+    def capabilities(self, refresh: bool = False) -> Dict[str, Dict[str, bool]]:
+        """``{name: capabilities()}`` of the loadable adapters.
+
+        Kept in the on-disk index, so adapters are only imported (and
+        instantiated) when the index is built or ``refresh`` is set.
+        """
+
+        def compute() -> Dict[str, Dict[str, bool]]:
+            if refresh:
+                entry_point_index(self.group, refresh=True)
+            out: Dict[str, Dict[str, bool]] = {}
+            for name, adapter in sorted(self.discover().items()):
+                try:
+                    obj = adapter() if isinstance(adapter, type) else adapter
+                    out[name] = dict(obj.capabilities())  # type: ignore[attr-defined]
+                except Exception:
+                    out[name] = {}
+            return out
+
+        return cached_capabilities(self.group, compute, refresh)
+
     def get(self, name: str) -> Optional[object]:
-        return self.discover().get(name)
+        # only the named adapter's module is imported
+        if name in self._cache:
+            return self._cache[name]
+        spec = self.index().get(name)
+        obj = self._load(name, spec) if spec is not None else None
+        if obj is None:
+            # the on-disk index may predate an install/uninstall
+            spec = entry_point_index(self.group, refresh=True).get(name)
+            obj = self._load(name, spec) if spec is not None else None
+        return obj
 
+    def create(self, name: str, **options: Any) -> Optional[object]:
+        # entry points usually reference adapter classes; instantiate those
+        obj = self.get(name)
+        if isinstance(obj, type):
+            return obj(**options)
+        return obj
@@ -0,0 +1,387 @@
+from __future__ import annotations
+
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from annox.io import maskio
+from annox.schema.columnar import (
+    KIND_BBOX,
+    KIND_KEYPOINTS,
+    KIND_MASK,
+    KIND_PANOPTIC,
+    KIND_POLYGON,
+    ColumnarDataset,
+)
+
+# Bulk geometry queries over a ColumnarDataset.
+#
+# Every annotation gets pixel-space bounds [x0, y0, x1, y1] (boxes as given,
+# polygons/keypoints/RLE masks by their extent; NaN when there is no
+# geometry). Per item, bounds are packed into a static R-tree (Sort-Tile-
+# Recursive); queries descend it level by level for a whole batch of query
+# boxes at once, so overlap searches cost O(n log n + k) instead of O(n^2).
+
+NODE_SIZE = 16
+DENSE_LIMIT = 64  # below this many boxes a full IoU matrix is cheaper than a tree
+
+
+class Pairs(NamedTuple):
+    """Annotation row pairs (``a < b``) with their IoU."""
+
+    a: np.ndarray
+    b: np.ndarray
+    iou: np.ndarray
+
+
+def _segment_extent(values: np.ndarray, owner: np.ndarray, n: int) -> Tuple[np.ndarray, np.ndarray]:
+    # min/max of ``values`` per owner (owner sorted ascending); NaN where empty
+    lo = np.full(n, np.nan)
+    hi = np.full(n, np.nan)
+    if values.size:
+        starts = np.flatnonzero(np.r_[True, owner[1:] != owner[:-1]])
+        rows = owner[starts]
+        lo[rows] = np.minimum.reduceat(values, starts)
+        hi[rows] = np.maximum.reduceat(values, starts)
+    return lo, hi
+
+
+def _extent(
+    flat: np.ndarray, offsets: np.ndarray, owner_of_segment: np.ndarray, stride: int, keep: Optional[np.ndarray], n: int
+) -> np.ndarray:
+    # bounds of x/y values in a flat buffer of ``stride``-tuples per segment
+    seg = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+    local = np.arange(len(flat)) - offsets[seg]
+    row = owner_of_segment[seg]
+    sel_x = local % stride == 0
+    sel_y = local % stride == 1
+    if keep is not None:
+        sel_x &= keep
+        sel_y &= keep
+    out = np.full((n, 4), np.nan)
+    out[:, 0], out[:, 2] = _segment_extent(flat[sel_x], row[sel_x], n)
+    out[:, 1], out[:, 3] = _segment_extent(flat[sel_y], row[sel_y], n)
+    return out
+
+
+def annotation_bounds(cd: ColumnarDataset) -> np.ndarray:
+    """``(n, 4)`` float64 pixel-space ``[x0, y0, x1, y1]`` per annotation row."""
+    n = cd.num_annotations
+    out = np.full((n, 4), np.nan)
+    if n == 0:
+        return out
+    w = cd.widths[cd.ann_item].astype(np.float64)
+    h = cd.heights[cd.ann_item].astype(np.float64)
+
+    # panoptic segments keep their (optional) box in the bbox column
+    box = (cd.ann_kind == KIND_BBOX) | (cd.ann_kind == KIND_PANOPTIC)
+    x, y, bw, bh = cd.bbox.T
+    nrm = cd.ann_normalized.astype(bool)
+    sx, sy = np.where(nrm, w, 1.0), np.where(nrm, h, 1.0)
+    out[box] = np.stack([x * sx, y * sy, (x + bw) * sx, (y + bh) * sy], axis=1)[box]
+
+    if len(cd.coords):
+        # polygons: rings may be normalized independently
+        ring_row = np.repeat(np.arange(n), np.diff(cd.ring_offsets))
+        coords = cd.coords.astype(np.float64, copy=True)
+        seg = np.repeat(np.arange(len(cd.coord_offsets) - 1), np.diff(cd.coord_offsets))
+        local = np.arange(len(coords)) - cd.coord_offsets[seg]
+        norm = cd.ring_normalized[seg].astype(bool)
+        r = ring_row[seg]
+        coords[norm] *= np.where(local[norm] % 2 == 0, w[r[norm]], h[r[norm]])
+        poly = _extent(coords, cd.coord_offsets, ring_row, 2, None, n)
+        sel = cd.ann_kind == KIND_POLYGON
+        out[sel] = poly[sel]
+
+    if len(cd.kp_values):
+        # keypoints: extent of the labelled (v > 0) points
+        vals = cd.kp_values.astype(np.float64, copy=True)
+        row = np.repeat(np.arange(n), np.diff(cd.kp_offsets))
+        local = np.arange(len(vals)) - cd.kp_offsets[row]
+        trip = local - local % 3
+        vis = np.zeros(len(vals), dtype=bool)
+        has_v = trip + 2 < np.diff(cd.kp_offsets)[row]
+        vis[has_v] = vals[cd.kp_offsets[row[has_v]] + trip[has_v] + 2] > 0
+        nrm = cd.ann_normalized[row].astype(bool)
+        vals[nrm] *= np.where(local[nrm] % 3 == 0, w[row[nrm]], h[row[nrm]])
+        kp = _extent(vals, cd.kp_offsets, np.arange(n), 3, vis, n)
+        sel = cd.ann_kind == KIND_KEYPOINTS
+        out[sel] = kp[sel]
+
+    for r in np.flatnonzero(cd.ann_kind == KIND_MASK):
+        rle = cd.extras.get(int(r), {}).get("rle")
+        if rle is None:
+            continue
+        if maskio.area(rle):
+            bx, by, bw_, bh_ = maskio.to_bbox(rle)
+            out[r] = (bx, by, bx + bw_, by + bh_)
+    return out
+
+
+def pairwise_iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """IoU matrix between ``(n, 4)`` and ``(m, 4)`` xyxy boxes."""
+    a = np.asarray(a, dtype=np.float64).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float64).reshape(-1, 4)
+    iw = np.minimum(a[:, None, 2], b[None, :, 2]) - np.maximum(a[:, None, 0], b[None, :, 0])
+    ih = np.minimum(a[:, None, 3], b[None, :, 3]) - np.maximum(a[:, None, 1], b[None, :, 1])
+    inter = np.clip(iw, 0, None) * np.clip(ih, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    with np.errstate(invalid="ignore", divide="ignore"):
+        iou = np.where(union > 0, inter / union, 0.0)
+    return np.nan_to_num(iou, nan=0.0)
+
+
+def paired_iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """IoU of ``a[i]`` with ``b[i]`` for equally long box arrays."""
+    iw = np.minimum(a[:, 2], b[:, 2]) - np.maximum(a[:, 0], b[:, 0])
+    ih = np.minimum(a[:, 3], b[:, 3]) - np.maximum(a[:, 1], b[:, 1])
+    inter = np.clip(iw, 0, None) * np.clip(ih, 0, None)
+    union = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1]) + (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1]) - inter
+    with np.errstate(invalid="ignore", divide="ignore"):
+        iou = np.where(union > 0, inter / union, 0.0)
+    return np.nan_to_num(iou, nan=0.0)
+
+
+def _intersects(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    # row-wise: box a[i] touches box b[i] (NaN never matches)
+    return (a[:, 0] <= b[:, 2]) & (b[:, 0] <= a[:, 2]) & (a[:, 1] <= b[:, 3]) & (b[:, 1] <= a[:, 3])
+
+
+class SpatialIndex:
+    """Static STR-packed R-tree over xyxy boxes (rows with NaN are skipped)."""
+
+    def __init__(self, boxes: np.ndarray, node_size: int = NODE_SIZE) -> None:
+        self.boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        self.node_size = node_size
+        valid = np.flatnonzero(~np.isnan(self.boxes).any(axis=1))
+        # _order: box ids in packed order (the leaf level). _levels: node
+        # bounds from the root level down; the children of node k are entries
+        # k * node_size ... (k + 1) * node_size - 1 of the level below
+        self._order = self._pack(valid, self.boxes[valid])
+        self._levels: List[np.ndarray] = []
+        bounds = self.boxes[self._order]
+        while len(bounds) > node_size:
+            bounds = self._parents(bounds)
+            self._levels.append(bounds)
+        self._levels.reverse()
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def _pack(self, ids: np.ndarray, boxes: np.ndarray) -> np.ndarray:
+        n = len(ids)
+        if n <= self.node_size:
+            return ids
+        cx = (boxes[:, 0] + boxes[:, 2]) / 2
+        cy = (boxes[:, 1] + boxes[:, 3]) / 2
+        leaves = -(-n // self.node_size)
+        slices = int(np.ceil(np.sqrt(leaves)))
+        per_slice = slices * self.node_size
+        by_x = np.argsort(cx, kind="stable")
+        out = []
+        for s in range(0, n, per_slice):
+            part = by_x[s : s + per_slice]
+            out.append(part[np.argsort(cy[part], kind="stable")])
+        return ids[np.concatenate(out)]
+
+    def _parents(self, bounds: np.ndarray) -> np.ndarray:
+        starts = np.arange(0, len(bounds), self.node_size)
+        return np.stack(
+            [
+                np.minimum.reduceat(bounds[:, 0], starts),
+                np.minimum.reduceat(bounds[:, 1], starts),
+                np.maximum.reduceat(bounds[:, 2], starts),
+                np.maximum.reduceat(bounds[:, 3], starts),
+            ],
+            axis=1,
+        )
+
+    def _children(self, q: np.ndarray, node: np.ndarray, count: int) -> Tuple[np.ndarray, np.ndarray]:
+        first = node * self.node_size
+        n_child = np.minimum(first + self.node_size, count) - first
+        q = np.repeat(q, n_child)
+        offs = np.arange(len(q)) - np.repeat(np.cumsum(n_child) - n_child, n_child)
+        return q, np.repeat(first, n_child) + offs
+
+    def query_many(self, regions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """``(query index, box id)`` pairs for every box touching each region."""
+        regions = np.asarray(regions, dtype=np.float64).reshape(-1, 4)
+        if len(self._order) == 0 or len(regions) == 0:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty
+        top = self._levels[0] if self._levels else self.boxes[self._order]
+        q = np.repeat(np.arange(len(regions)), len(top))
+        node = np.tile(np.arange(len(top)), len(regions))
+        for depth in range(len(self._levels)):
+            keep = _intersects(self._levels[depth][node], regions[q])
+            q, node = q[keep], node[keep]
+            count = len(self._levels[depth + 1]) if depth + 1 < len(self._levels) else len(self._order)
+            q, node = self._children(q, node, count)
+        ids = self._order[node]
+        keep = _intersects(self.boxes[ids], regions[q])
+        return q[keep], ids[keep]
+
+    def query(self, region: Sequence[float], within: bool = False) -> np.ndarray:
+        """Ids of boxes touching ``region`` (or lying inside it), ascending."""
+        region = np.asarray(region, dtype=np.float64).reshape(1, 4)
+        _, ids = self.query_many(region)
+        if within:
+            b = self.boxes[ids]
+            r = region[0]
+            ids = ids[(b[:, 0] >= r[0]) & (b[:, 1] >= r[1]) & (b[:, 2] <= r[2]) & (b[:, 3] <= r[3])]
+        return np.sort(ids)
+
+    def overlapping_pairs(self, min_iou: float = 0.0) -> Pairs:
+        """All pairs ``a < b`` of touching boxes with IoU >= ``min_iou``."""
+        q, ids = self.query_many(self.boxes)
+        keep = q < ids
+        a, b = q[keep], ids[keep]
+        iou = paired_iou(self.boxes[a], self.boxes[b])
+        keep = iou >= min_iou if min_iou > 0 else iou > 0
+        return Pairs(a[keep], b[keep], iou[keep])
+
+
+def _group_keys(cd: ColumnarDataset, by_kind: bool, by_category: bool) -> np.ndarray:
+    # rows sorted so that comparable rows (same item, kind, category) are adjacent
+    keys = [np.arange(cd.num_annotations)]
+    if by_category:
+        keys.append(cd.ann_category)
+    if by_kind:
+        keys.append(cd.ann_kind.astype(np.int64))
+    keys.append(cd.ann_item)
+    return np.lexsort(keys)
+
+
+def find_overlaps(
+    cd: ColumnarDataset,
+    min_iou: float = 0.0,
+    same_kind: bool = True,
+    same_category: bool = False,
+    bounds: Optional[np.ndarray] = None,
+) -> Pairs:
+    """Pairs of annotation rows in the same item whose bounds overlap by ``min_iou``.
+
+    Small groups are compared all-pairs in one vectorized pass over the whole
+    dataset; groups larger than ``DENSE_LIMIT`` go through an R-tree.
+    """
+    if bounds is None:
+        bounds = annotation_bounds(cd)
+    n = cd.num_annotations
+    empty = np.zeros(0, dtype=np.int64)
+    if n < 2:
+        return Pairs(empty, empty, np.zeros(0))
+    order = _group_keys(cd, same_kind, same_category)
+    cols = [cd.ann_item[order]]
+    if same_kind:
+        cols.append(cd.ann_kind[order].astype(np.int64))
+    if same_category:
+        cols.append(cd.ann_category[order])
+    brk = np.zeros(n, dtype=bool)
+    brk[0] = True
+    for c in cols:
+        brk[1:] |= c[1:] != c[:-1]
+    starts = np.flatnonzero(brk)
+    sizes = np.diff(np.append(starts, n))
+
+    parts_a: List[np.ndarray] = []
+    parts_b: List[np.ndarray] = []
+    small = np.repeat(sizes <= DENSE_LIMIT, sizes)
+    # all pairs within small groups: position p pairs with p+1 .. group end - 1
+    end = np.repeat(starts + sizes, sizes)
+    pos = np.flatnonzero(small)
+    cnt = end[pos] - pos - 1
+    pa = np.repeat(pos, cnt)
+    pb = pa + 1 + (np.arange(len(pa)) - np.repeat(np.cumsum(cnt) - cnt, cnt))
+    parts_a.append(order[pa])
+    parts_b.append(order[pb])
+    for s, size in zip(starts[sizes > DENSE_LIMIT].tolist(), sizes[sizes > DENSE_LIMIT].tolist()):
+        rows = order[s : s + size]
+        q, ids = SpatialIndex(bounds[rows]).query_many(bounds[rows])
+        keep = q < ids
+        parts_a.append(rows[q[keep]])
+        parts_b.append(rows[ids[keep]])
+
+    a, b = np.concatenate(parts_a), np.concatenate(parts_b)
+    a, b = np.minimum(a, b), np.maximum(a, b)
+    iou = paired_iou(bounds[a], bounds[b])
+    keep = iou >= min_iou if min_iou > 0 else iou > 0
+    a, b, iou = a[keep], b[keep], iou[keep]
+    srt = np.lexsort((b, a))
+    return Pairs(a[srt], b[srt], iou[srt])
+
+
+def find_duplicates(cd: ColumnarDataset, iou: float = 0.9, bounds: Optional[np.ndarray] = None) -> Pairs:
+    """Near-duplicate annotations: same item, kind and category, bounds IoU >= ``iou``."""
+    return find_overlaps(cd, iou, same_kind=True, same_category=True, bounds=bounds)
+
+
+def in_region(
+    cd: ColumnarDataset,
+    item: int,
+    region: Sequence[float],
+    within: bool = False,
+    bounds: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Rows of item ``item`` whose bounds touch (or lie ``within``) a pixel region."""
+    if bounds is None:
+        bounds = annotation_bounds(cd)
+    lo, hi = int(cd.item_offsets[item]), int(cd.item_offsets[item + 1])
+    return lo + SpatialIndex(bounds[lo:hi]).query(region, within=within)
+
+
+class DatasetIndex:
+    """Bounds of a whole dataset with lazily built per-item R-trees.
+
+    Results refer to item ids and annotation ids rather than columnar rows.
+    """
+
+    def __init__(self, cd: ColumnarDataset) -> None:
+        self.cd = cd
+        self.bounds = annotation_bounds(cd)
+        self._pos = {iid: i for i, iid in enumerate(cd.item_ids)}
+        self._trees: dict = {}
+
+    def _item(self, item_id: str) -> int:
+        pos = self._pos.get(item_id)
+        if pos is None:
+            raise KeyError(item_id)
+        return pos
+
+    def tree(self, item_id: str) -> SpatialIndex:
+        i = self._item(item_id)
+        tree = self._trees.get(i)
+        if tree is None:
+            lo, hi = int(self.cd.item_offsets[i]), int(self.cd.item_offsets[i + 1])
+            tree = self._trees[i] = SpatialIndex(self.bounds[lo:hi])
+        return tree
+
+    def query(self, item_id: str, region: Sequence[float], within: bool = False) -> List[int]:
+        """Annotation ids in ``item_id`` touching (or ``within``) ``[x0, y0, x1, y1]``."""
+        i = self._item(item_id)
+        lo = int(self.cd.item_offsets[i])
+        rows = lo + self.tree(item_id).query(region, within=within)
+        return self.cd.ann_id[rows].tolist()
+
+    def iou(self, item_id: str) -> np.ndarray:
+        """IoU matrix of the item's annotation bounds, in annotation order."""
+        i = self._item(item_id)
+        lo, hi = int(self.cd.item_offsets[i]), int(self.cd.item_offsets[i + 1])
+        return pairwise_iou(self.bounds[lo:hi], self.bounds[lo:hi])
+
+    def _named(self, p: Pairs) -> List[Tuple[str, int, int, float]]:
+        ids = self.cd.item_ids
+        return [
+            (ids[int(self.cd.ann_item[a])], int(self.cd.ann_id[a]), int(self.cd.ann_id[b]), float(v))
+            for a, b, v in zip(p.a, p.b, p.iou)
+        ]
+
+    def overlaps(
+        self, min_iou: float = 0.0, same_kind: bool = True, same_category: bool = False
+    ) -> List[Tuple[str, int, int, float]]:
+        """``(item_id, ann_id, other_ann_id, iou)`` for overlapping annotations."""
+        return self._named(find_overlaps(self.cd, min_iou, same_kind, same_category, bounds=self.bounds))
+
+    def duplicates(self, iou: float = 0.9) -> List[Tuple[str, int, int, float]]:
+        return self._named(find_duplicates(self.cd, iou, bounds=self.bounds))
@@ -0,0 +1,508 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from annox.core import metrics
+from annox.core.registry import AdapterRegistry
+from annox.io.jsonio import loads
+from annox.io.jsonstream import iter_array_items
+from annox.io.parallel import imap_parallel
+from annox.schema.columnar import (
+    KIND_BBOX,
+    KIND_KEYPOINTS,
+    KIND_MASK,
+    KIND_POLYGON,
+    KINDS,
+    ColumnarBuilder,
+    ColumnarDataset,
+)
+
+# Dataset statistics in one streaming pass.
+#
+# ``DatasetStats`` keeps only counters and fixed-edge histograms, so its size
+# does not depend on the dataset and two of them merge by adding counts:
+# shards can be accumulated independently and combined in any order. Inputs
+# are fed in batches: one light pass over the parsed JSON of a batch gathers
+# the numbers into flat arrays, and the histograms are updated with array
+# operations. Columnar tables (e.g. from an adapter's ``load_columnar``) are
+# reduced directly.
+#
+# ``dataset_stats`` reads
+#
+#   .jsonl   annox items, one per line; split into byte ranges that worker
+#            processes accumulate in parallel
+#   .json    an annox dataset ("items") or a COCO file ("images",
+#            "annotations"), streamed element by element in one process
+#
+# COCO annotations need not be grouped by image, so per-image counts are
+# completed from the image ids once the stream ends.
+
+DEFAULT_BATCH_SIZE = 5000  # items or COCO records per accumulator update
+
+SIZE_EDGES = [0] + [2**k for k in range(15)]  # pixels, 1 .. 16384
+AREA_EDGES = [0] + [4**k for k in range(15)]  # square pixels
+ASPECT_EDGES = [2.0 ** (k / 2) for k in range(-8, 9)]  # w / h, 1/16 .. 16
+COUNT_EDGES = [0, 1, 2, 3, 4, 5, 10, 20, 50, 100, 200, 500, 1000]
+VERTEX_EDGES = [0, 3, 4, 5, 6, 8, 12, 16, 32, 64, 128, 256, 512, 1024]
+# COCO's small / medium / large object split
+AREA_RANGES = (("small", 0.0), ("medium", 32.0**2), ("large", 96.0**2))
+
+_BLOCK = 1 << 22  # bytes read at a time from a JSONL range
+_KIND_INDEX = {k: i for i, k in enumerate(KINDS)}
+
+
+class Histogram:
+    """Fixed-edge histogram with count, sum, min and max; merges by addition.
+
+    ``counts[i]`` covers ``[edges[i-1], edges[i])``; ``counts[0]`` holds values
+    below ``edges[0]`` and ``counts[-1]`` values at or above ``edges[-1]``.
+    Non-finite values are ignored.
+    """
+
+    def __init__(self, edges: Sequence[float]) -> None:
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.counts = np.zeros(len(self.edges) + 1, dtype=np.int64)
+        self.count = 0
+        self.total = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def add(self, values: Any) -> None:
+        v = np.asarray(values, dtype=np.float64).reshape(-1)
+        v = v[np.isfinite(v)]
+        if not v.size:
+            return
+        self.counts += np.bincount(np.searchsorted(self.edges, v, side="right"), minlength=len(self.counts))
+        self.count += int(v.size)
+        self.total += float(v.sum())
+        self.min = min(self.min, float(v.min()))
+        self.max = max(self.max, float(v.max()))
+
+    def merge(self, other: "Histogram") -> None:
+        if not np.array_equal(self.edges, other.edges):
+            raise ValueError("stats: cannot merge histograms with different edges")
+        self.counts += other.counts
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def to_dict(self) -> Dict[str, Any]:
+        empty = self.count == 0
+        return {
+            "count": self.count,
+            "mean": None if empty else self.total / self.count,
+            "min": None if empty else _number(self.min),
+            "max": None if empty else _number(self.max),
+            "edges": [_number(e) for e in self.edges.tolist()],
+            "counts": self.counts.tolist(),
+        }
+
+
+def _number(x: float) -> Any:
+    return int(x) if float(x).is_integer() else x
+
+
+class DatasetStats:
+    """Mergeable dataset statistics; see the module comment."""
+
+    def __init__(self) -> None:
+        self.items = 0
+        self.annotations = 0
+        self.by_type = np.zeros(len(KINDS), dtype=np.int64)
+        self.by_category: Dict[int, int] = {}
+        self.category_names: Dict[int, str] = {}
+        self.per_item = Histogram(COUNT_EDGES)
+        self.image_width = Histogram(SIZE_EDGES)
+        self.image_height = Histogram(SIZE_EDGES)
+        self.bbox_width = Histogram(SIZE_EDGES)
+        self.bbox_height = Histogram(SIZE_EDGES)
+        self.bbox_area = Histogram(AREA_EDGES)
+        self.bbox_aspect = Histogram(ASPECT_EDGES)
+        self.area_ranges = np.zeros(len(AREA_RANGES), dtype=np.int64)
+        self.keypoint_annotations = 0
+        self.visibility = np.zeros(3, dtype=np.int64)  # v = 0, 1, 2
+        self.polygon_annotations = 0
+        self.polygon_rings = 0
+        self.polygon_vertices = Histogram(VERTEX_EDGES)
+
+    # -- accumulation -----------------------------------------------------
+
+    def add_categories(self, categories: Iterable[Tuple[int, str]]) -> None:
+        for cid, name in categories:
+            self.category_names[int(cid)] = name
+            self.by_category.setdefault(int(cid), 0)
+
+    def add_images(self, widths: Any, heights: Any) -> None:
+        self.items += len(widths)
+        self.image_width.add(widths)
+        self.image_height.add(heights)
+
+    def add_category_ids(self, category_ids: Any) -> None:
+        ids, counts = np.unique(np.asarray(category_ids, dtype=np.int64), return_counts=True)
+        for cid, n in zip(ids.tolist(), counts.tolist()):
+            self.by_category[cid] = self.by_category.get(cid, 0) + n
+
+    def add_boxes(self, w: Any, h: Any) -> None:
+        w = np.asarray(w, dtype=np.float64)
+        h = np.asarray(h, dtype=np.float64)
+        area = w * h
+        self.bbox_width.add(w)
+        self.bbox_height.add(h)
+        self.bbox_area.add(area)
+        ok = (w > 0) & (h > 0)
+        self.bbox_aspect.add(w[ok] / h[ok])
+        starts = np.array([lo for _, lo in AREA_RANGES])
+        area = area[np.isfinite(area) & (area >= 0)]
+        self.area_ranges += np.bincount(np.searchsorted(starts, area, side="right") - 1, minlength=len(starts))
+
+    def add_visibility(self, v: Any) -> None:
+        v = np.asarray(v, dtype=np.float64)
+        v = np.clip(v[np.isfinite(v)], 0, 2).astype(np.int64)
+        self.visibility += np.bincount(v, minlength=3)
+
+    def add_polygons(self, vertices: Any, rings: int) -> None:
+        self.polygon_annotations += len(vertices)
+        self.polygon_rings += int(rings)
+        self.polygon_vertices.add(vertices)
+
+    def add_columnar(self, cd: ColumnarDataset) -> None:
+        """Accumulate a table of annox items (counts every item and annotation)."""
+        n = cd.num_annotations
+        self.add_images(cd.widths, cd.heights)
+        self.per_item.add(np.diff(cd.item_offsets))
+        self.annotations += n
+        self.by_type += np.bincount(cd.ann_kind, minlength=len(KINDS))[: len(KINDS)]
+        has_cat = cd.ann_category >= 0
+        self.add_category_ids(cd.ann_category[has_cat])
+
+        rows = cd.ann_kind == KIND_BBOX
+        box = cd.bbox[rows]
+        # normalized boxes are measured in pixels of their item
+        scale = cd.ann_normalized[rows]
+        item = cd.ann_item[rows]
+        w = np.where(scale, box[:, 2] * cd.widths[item], box[:, 2])
+        h = np.where(scale, box[:, 3] * cd.heights[item], box[:, 3])
+        self.add_boxes(w, h)
+
+        kp = cd.ann_kind == KIND_KEYPOINTS
+        self.keypoint_annotations += int(kp.sum())
+        self.add_visibility(cd.kp_values[2::3])
+
+        poly = np.flatnonzero(cd.ann_kind == KIND_POLYGON)
+        rings = np.diff(cd.ring_offsets)
+        owner = np.repeat(np.arange(n), rings)
+        vertices = np.bincount(owner, weights=np.diff(cd.coord_offsets) // 2, minlength=n)
+        self.add_polygons(vertices[poly], int(rings[poly].sum()))
+
+    def add_items(self, objs: Sequence[Dict[str, Any]]) -> None:
+        """Accumulate annox items in their JSON form (``Dataset.Item`` dumps)."""
+        widths: List[int] = []
+        heights: List[int] = []
+        per_item: List[int] = []
+        kinds = [0] * len(KINDS)
+        cats: List[int] = []
+        boxes: List[float] = []
+        vis: List[float] = []
+        vertices: List[int] = []
+        rings = 0
+        for obj in objs:
+            im = obj["image"]
+            iw, ih = im["width"], im["height"]
+            widths.append(iw)
+            heights.append(ih)
+            anns = obj.get("annotations") or ()
+            per_item.append(len(anns))
+            for a in anns:
+                kind = _KIND_INDEX.get(a.get("type"))
+                if kind is None:
+                    raise ValueError(f"stats: unknown annotation type {a.get('type')!r}")
+                kinds[kind] += 1
+                cid = a.get("category_id")
+                if cid is not None:
+                    cats.append(cid)
+                if kind == KIND_BBOX:
+                    bb = a["bbox"]
+                    if bb.get("normalized"):
+                        boxes += (bb["w"] * iw, bb["h"] * ih)
+                    else:
+                        boxes += (bb["w"], bb["h"])
+                elif kind == KIND_POLYGON:
+                    polys = a["polygons"]
+                    vertices.append(sum(len(p["points"]) for p in polys) // 2)
+                    rings += len(polys)
+                elif kind == KIND_KEYPOINTS:
+                    vis.extend(a["keypoints"]["points"][2::3])
+        self.add_images(widths, heights)
+        self.per_item.add(per_item)
+        self.annotations += sum(kinds)
+        self.by_type += np.array(kinds, dtype=np.int64)
+        self.add_category_ids(cats)
+        box = np.asarray(boxes, dtype=np.float64).reshape(-1, 2)
+        self.add_boxes(box[:, 0], box[:, 1])
+        self.keypoint_annotations += kinds[KIND_KEYPOINTS]
+        self.add_visibility(vis)
+        self.add_polygons(vertices, rings)
+
+    def add_coco(self, anns: Sequence[Dict[str, Any]]) -> np.ndarray:
+        """Accumulate COCO annotation records; returns the image id of each annotation.
+
+        Records are counted as the COCO importer splits them: a polygon or
+        RLE segmentation, a bbox and keypoints each make one annotation.
+        Items and per-item counts are added separately (see add_images and
+        add_item_counts), since records are not grouped by image.
+        """
+        image_ids = np.empty(len(anns), dtype=np.int64)
+        per_record = np.zeros(len(anns), dtype=np.int64)
+        kinds = [0] * len(KINDS)
+        cats: List[int] = []
+        boxes: List[float] = []
+        vis: List[float] = []
+        vertices: List[int] = []
+        rings = 0
+        for k, a in enumerate(anns):
+            image_ids[k] = a["image_id"]
+            m = 0
+            seg = a.get("segmentation")
+            if isinstance(seg, list) and seg:
+                vertices.append(sum(len(r) for r in seg) // 2)
+                rings += len(seg)
+                kinds[KIND_POLYGON] += 1
+                m += 1
+            elif isinstance(seg, dict) and seg:
+                kinds[KIND_MASK] += 1
+                m += 1
+            bb = a.get("bbox")
+            if bb is not None:
+                boxes += (bb[2], bb[3])
+                kinds[KIND_BBOX] += 1
+                m += 1
+            kp = a.get("keypoints")
+            if kp:
+                vis.extend(kp[2::3])
+                kinds[KIND_KEYPOINTS] += 1
+                m += 1
+            cid = a.get("category_id")
+            if cid is not None:
+                cats += [cid] * m
+            per_record[k] = m
+        self.annotations += sum(kinds)
+        self.by_type += np.array(kinds, dtype=np.int64)
+        self.add_category_ids(cats)
+        box = np.asarray(boxes, dtype=np.float64).reshape(-1, 2)
+        self.add_boxes(box[:, 0], box[:, 1])
+        self.keypoint_annotations += kinds[KIND_KEYPOINTS]
+        self.add_visibility(vis)
+        self.add_polygons(vertices, rings)
+        return np.repeat(image_ids, per_record)
+
+    def add_item_counts(self, counts: Any) -> None:
+        self.per_item.add(counts)
+
+    def merge(self, other: "DatasetStats") -> "DatasetStats":
+        self.items += other.items
+        self.annotations += other.annotations
+        self.by_type += other.by_type
+        for cid, n in other.by_category.items():
+            self.by_category[cid] = self.by_category.get(cid, 0) + n
+        for cid, name in other.category_names.items():
+            self.category_names.setdefault(cid, name)
+        for name in ("per_item", "image_width", "image_height", "bbox_width", "bbox_height", "bbox_area",
+                     "bbox_aspect", "polygon_vertices"):
+            getattr(self, name).merge(getattr(other, name))
+        self.area_ranges += other.area_ranges
+        self.keypoint_annotations += other.keypoint_annotations
+        self.visibility += other.visibility
+        self.polygon_annotations += other.polygon_annotations
+        self.polygon_rings += other.polygon_rings
+        return self
+
+    # -- report -----------------------------------------------------------
+
+    def to_dict(self) -> Dict[str, Any]:
+        points = int(self.visibility.sum())
+        return {
+            "items": self.items,
+            "annotations": self.annotations,
+            "annotation_types": dict(zip(KINDS, self.by_type.tolist())),
+            "categories": [
+                {"id": cid, "name": self.category_names.get(cid), "annotations": self.by_category[cid]}
+                for cid in sorted(self.by_category)
+            ],
+            "annotations_per_item": self.per_item.to_dict(),
+            "image_width": self.image_width.to_dict(),
+            "image_height": self.image_height.to_dict(),
+            "bbox": {
+                "width": self.bbox_width.to_dict(),
+                "height": self.bbox_height.to_dict(),
+                "area": self.bbox_area.to_dict(),
+                "aspect_ratio": self.bbox_aspect.to_dict(),
+                "area_ranges": {name: int(n) for (name, _), n in zip(AREA_RANGES, self.area_ranges)},
+            },
+            "keypoints": {
+                "annotations": self.keypoint_annotations,
+                "points": points,
+                "visibility": {str(v): int(n) for v, n in enumerate(self.visibility)},
+                "labeled_rate": None if not points else float(self.visibility[1:].sum()) / points,
+                "visible_rate": None if not points else float(self.visibility[2]) / points,
+            },
+            "polygons": {
+                "annotations": self.polygon_annotations,
+                "rings": self.polygon_rings,
+                "vertices": self.polygon_vertices.to_dict(),
+            },
+        }
+
+
+# -- readers ------------------------------------------------------------------
+
+
+def _jsonl_ranges(path: Path, parts: int) -> List[Tuple[int, int]]:
+    # byte ranges starting at line starts
+    size = path.stat().st_size
+    bounds = [0]
+    with path.open("rb") as f:
+        for k in range(1, max(1, parts)):
+            f.seek(size * k // parts)
+            f.readline()
+            pos = f.tell()
+            if bounds[-1] < pos < size:
+                bounds.append(pos)
+    bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _jsonl_shard(task: Tuple[str, int, int, int]) -> DatasetStats:
+    path, start, end, batch_size = task
+    stats = DatasetStats()
+    objs: List[Dict[str, Any]] = []
+    rest = b""
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            block = f.read(min(_BLOCK, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            lines = (rest + block).split(b"\n")
+            rest = lines.pop()
+            for line in lines:
+                if line.strip():
+                    objs.append(loads(line))
+            if len(objs) >= batch_size:
+                stats.add_items(objs)
+                objs = []
+    if rest.strip():
+        objs.append(loads(rest))
+    if objs:
+        stats.add_items(objs)
+    return stats
+
+
+def _stats_jsonl(path: Path, workers: int, batch_size: int) -> DatasetStats:
+    tasks = [(str(path), a, b, batch_size) for a, b in _jsonl_ranges(path, max(1, workers) * 4)]
+    stats = DatasetStats()
+    for part in imap_parallel(_jsonl_shard, tasks, workers, chunk_size=1):
+        stats.merge(part)
+    return stats
+
+
+def _stats_json(path: Path, batch_size: int) -> DatasetStats:
+    stats = DatasetStats()
+    items: List[Dict[str, Any]] = []
+    images: List[Dict[str, Any]] = []
+    anns: List[Dict[str, Any]] = []
+    image_ids: List[np.ndarray] = []
+    ann_images: List[np.ndarray] = []
+
+    def flush_images() -> None:
+        image_ids.append(np.array([im["id"] for im in images], dtype=np.int64))
+        stats.add_images([im.get("width", 0) for im in images], [im.get("height", 0) for im in images])
+        images.clear()
+
+    for key, obj in iter_array_items(path, ("categories", "items", "images", "annotations")):
+        if key == "annotations":
+            anns.append(obj)
+            if len(anns) >= batch_size:
+                ann_images.append(stats.add_coco(anns))
+                anns.clear()
+        elif key == "items":
+            items.append(obj)
+            if len(items) >= batch_size:
+                stats.add_items(items)
+                items.clear()
+        elif key == "images":
+            images.append(obj)
+            if len(images) >= batch_size:
+                flush_images()
+        else:
+            stats.add_categories([(obj["id"], obj.get("name"))])
+    if anns:
+        ann_images.append(stats.add_coco(anns))
+    if items:
+        stats.add_items(items)
+    if images:
+        flush_images()
+    if image_ids or ann_images:
+        # annotations per COCO image, including images without any
+        ids = np.concatenate(image_ids) if image_ids else np.zeros(0, dtype=np.int64)
+        refs = np.concatenate(ann_images) if ann_images else np.zeros(0, dtype=np.int64)
+        order = np.argsort(ids, kind="stable")
+        pos = np.searchsorted(ids, refs, sorter=order)
+        pos = np.minimum(pos, max(len(ids) - 1, 0))
+        known = (ids[order[pos]] == refs) if len(ids) else np.zeros(len(refs), dtype=bool)
+        stats.add_item_counts(np.bincount(order[pos[known]], minlength=len(ids)))
+    return stats
+
+
+def _stats_adapter(path: Path, fmt: str, batch_size: int) -> DatasetStats:
+    adapter: Any = AdapterRegistry().create(fmt)
+    if adapter is None:
+        raise RuntimeError(f"stats: no adapter for format {fmt!r}")
+    stats = DatasetStats()
+    if hasattr(adapter, "load_columnar"):
+        cd = adapter.load_columnar(str(path))
+        stats.add_categories((c.id, c.name) for c in cd.categories)
+        stats.add_columnar(cd)
+        return stats
+    stream = adapter.stream(str(path))
+    stats.add_categories((c.id, c.name) for c in stream.categories)
+    b = ColumnarBuilder()
+    for it in stream.items:
+        b.add_item(it.id, it.image.file_name, it.image.width, it.image.height)
+        for ann in it.annotations:
+            b.add_annotation(ann)
+        if len(b.item_ids) >= batch_size:
+            stats.add_columnar(b.build())
+            b = ColumnarBuilder()
+    if b.item_ids:
+        stats.add_columnar(b.build())
+    return stats
+
+
+def dataset_stats(
+    path: Path, fmt: Optional[str] = None, workers: int = 0, batch_size: int = DEFAULT_BATCH_SIZE
+) -> DatasetStats:
+    """Statistics of a dataset in one pass.
+
+    Without ``fmt``, ``path`` is an annox JSON/JSONL dataset or a COCO JSON
+    file; ``workers`` > 1 accumulates byte ranges of a JSONL file in worker
+    processes (JSON documents are streamed in this process). With ``fmt`` the
+    dataset is read through that adapter.
+    """
+    path = Path(path)
+    with metrics.span("stats"):
+        metrics.count_file("bytes_read", path)
+        if fmt is not None:
+            stats = _stats_adapter(path, fmt, batch_size)
+        elif path.suffix.lower() == ".jsonl":
+            stats = _stats_jsonl(path, workers, batch_size)
+        else:
+            stats = _stats_json(path, batch_size)
+        metrics.count("items", stats.items)
+        metrics.count("annotations", stats.annotations)
+    return stats
@@ -1,43 +1,267 @@
 from __future__ import annotations
 
+from dataclasses import asdict, dataclass
 from pathlib import Path
-from typing import Any, Dict, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
+import numpy as np
+
+from annox.core import metrics
 from annox.io.jsonio import load_json, load_jsonl
-from annox.schema.dataset import Dataset
-
-
-def _validate_dataset(ds: Dataset) -> Tuple[bool, Dict[str, Any]]:
-    errors = []
-    item_ids = set()
-    ann_count = 0
-    for item in ds.items:
-        if item.id in item_ids:
-            errors.append(f"Duplicate item id: {item.id}")
-        else:
-            item_ids.add(item.id)
-        seen_ann = set()
-        for ann in item.annotations:
-            ann_count += 1
-            if ann.id in seen_ann:
-                errors.append(f"Duplicate annotation id {ann.id} in item {item.id}")
-            else:
-                seen_ann.add(ann.id)
-            try:
-                ann.validate_consistency(item)
-            except Exception as e:  # collect as error
-                errors.append(str(e))
+from annox.schema.columnar import (
+    KIND_BBOX,
+    KIND_KEYPOINTS,
+    KIND_MASK,
+    ColumnarBuilder,
+    ColumnarDataset,
+)
+from annox.schema.dataset import Category, Dataset
+
+
+@dataclass
+class ValidationIssue:
+    rule: str
+    message: str
+    item_id: Optional[str] = None
+    annotation_id: Optional[int] = None
+    severity: str = "error"
+
+
+# Issues are reported in document order: categories first, then per item
+# (item-level rules before its annotations), then per annotation in rule order.
+_RULES = (
+    "skeleton_index",
+    "duplicate_item_id",
+    "duplicate_annotation_id",
+    "bbox_negative_size",
+    "bbox_normalized_range",
+    "bbox_negative_coords",
+    "bbox_out_of_image",
+    "polygon_too_short",
+    "polygon_parity",
+    "polygon_normalized_range",
+    "keypoints_parity",
+    "keypoints_normalized_range",
+    "keypoints_count",
+    "mask_missing",
+    "near_duplicate",
+)
+_RULE_ORDER = {r: i for i, r in enumerate(_RULES)}
+
+DUPLICATE_IOU = 0.9
+
+
+def _rows_by_ring(cd: ColumnarDataset) -> np.ndarray:
+    counts = np.diff(cd.ring_offsets)
+    return np.repeat(np.arange(cd.num_annotations), counts)
+
+
+def _any_per_segment(bad: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    # bad: bool per element of a flat buffer segmented by offsets
+    n = len(offsets) - 1
+    if n == 0:
+        return np.zeros(0, dtype=bool)
+    owner = np.repeat(np.arange(n), np.diff(offsets))
+    return np.bincount(owner[bad], minlength=n) > 0
+
+
+def _out_of_unit(v: np.ndarray) -> np.ndarray:
+    return (v < 0) | (v > 1)
+
+
+def validate_columnar(
+    cd: ColumnarDataset, check_duplicates: bool = False, duplicate_iou: float = DUPLICATE_IOU
+) -> List[ValidationIssue]:
+    """Run all dataset checks as array operations over whole columns.
+
+    With ``check_duplicates``, annotations of the same item, kind and category
+    whose bounds overlap by at least ``duplicate_iou`` are reported as warnings.
+    """
+    found: List[Tuple[int, int, int, ValidationIssue]] = []
+    ids = cd.item_ids
+
+    def add(item: int, row: int, rule: str, message: str, severity: str = "error") -> None:
+        issue = ValidationIssue(
+            rule=rule,
+            message=message,
+            item_id=ids[item] if item >= 0 else None,
+            annotation_id=int(cd.ann_id[row]) if row >= 0 else None,
+            severity=severity,
+        )
+        found.append((item, row, _RULE_ORDER[rule], issue))
+
+    # categories: skeleton indices must reference keypoint_names
+    for c in cd.categories:
+        if c.skeleton is None or c.keypoint_names is None:
+            continue
+        sk = np.asarray(c.skeleton, dtype=np.int64).reshape(-1, 2)
+        if ((sk < 0) | (sk >= len(c.keypoint_names))).any():
+            add(-1, -1, "skeleton_index", "skeleton indices must reference keypoint_names")
+
+    # duplicate item ids (reported at every repeated occurrence)
+    if ids:
+        _, first, inv = np.unique(np.array(ids, dtype=str), return_index=True, return_inverse=True)
+        for i in np.flatnonzero(first[inv.reshape(-1)] != np.arange(len(ids))):
+            add(int(i), -1, "duplicate_item_id", f"Duplicate item id: {ids[i]}")
+
+    n = cd.num_annotations
+    rows = np.arange(n)
+    item_of = cd.ann_item
+
+    # duplicate annotation ids within an item
+    if n:
+        order = np.lexsort((rows, cd.ann_id, item_of))
+        same = (item_of[order][1:] == item_of[order][:-1]) & (cd.ann_id[order][1:] == cd.ann_id[order][:-1])
+        for r in order[1:][same]:
+            add(int(item_of[r]), int(r), "duplicate_annotation_id",
+                f"Duplicate annotation id {int(cd.ann_id[r])} in item {ids[item_of[r]]}")
+
+    # boxes
+    is_box = cd.ann_kind == KIND_BBOX
+    x, y, w, h = cd.bbox.T
+    norm = cd.ann_normalized
+    with np.errstate(invalid="ignore"):
+        for r in np.flatnonzero(is_box & ((w < 0) | (h < 0))):
+            add(int(item_of[r]), int(r), "bbox_negative_size", "bbox w and h must be >= 0")
+        unit_bad = _out_of_unit(x) | _out_of_unit(y) | _out_of_unit(w) | _out_of_unit(h)
+        for r in np.flatnonzero(is_box & norm & unit_bad):
+            add(int(item_of[r]), int(r), "bbox_normalized_range", "normalized bbox must be within [0,1]")
+        pix = is_box & ~norm
+        for r in np.flatnonzero(pix & ((x < 0) | (y < 0))):
+            add(int(item_of[r]), int(r), "bbox_negative_coords", f"bbox has negative coords in item {ids[item_of[r]]}")
+        outside = (x + w > cd.widths[item_of]) | (y + h > cd.heights[item_of])
+        for r in np.flatnonzero(pix & outside):
+            add(int(item_of[r]), int(r), "bbox_out_of_image",
+                f"bbox extends outside the image in item {ids[item_of[r]]}", "warning")
+
+    # polygons: one issue per annotation and rule
+    ring_row = _rows_by_ring(cd)
+    ring_len = np.diff(cd.coord_offsets)
+    short = np.flatnonzero(ring_len < 6)
+    short_rows, first = np.unique(ring_row[short], return_index=True)
+    for r, ring in zip(short_rows, short[first]):
+        # the text of Polygon.points' min_length check
+        add(int(item_of[r]), int(r), "polygon_too_short",
+            f"List should have at least 6 items after validation, not {ring_len[ring]}")
+    for rule, bad_ring, msg in (
+        ("polygon_parity", ring_len % 2 != 0, "polygon points length must be even"),
+        (
+            "polygon_normalized_range",
+            cd.ring_normalized & _any_per_segment(_out_of_unit(cd.coords), cd.coord_offsets),
+            "normalized polygon coords must be within [0,1]",
+        ),
+    ):
+        for r in np.unique(ring_row[bad_ring]):
+            add(int(item_of[r]), int(r), rule, msg)
+
+    # keypoints
+    is_kp = cd.ann_kind == KIND_KEYPOINTS
+    kp_len = np.diff(cd.kp_offsets)
+    for r in np.flatnonzero(is_kp & (kp_len % 3 != 0)):
+        add(int(item_of[r]), int(r), "keypoints_parity", "keypoints length must be multiple of 3")
+    if len(cd.kp_values):
+        owner = np.repeat(rows, kp_len)
+        local = np.arange(len(cd.kp_values)) - cd.kp_offsets[owner]
+        # visibility flags may be any value; only xy are normalized
+        bad = _out_of_unit(cd.kp_values) & (local % 3 != 2)
+        for r in np.flatnonzero(is_kp & norm & _any_per_segment(bad, cd.kp_offsets)):
+            add(int(item_of[r]), int(r), "keypoints_normalized_range",
+                "normalized keypoints coords must be within [0,1]")
+    kp_cats = {c.id: c for c in cd.categories if c.keypoint_names is not None}
+    if kp_cats and is_kp.any():
+        cat_ids = np.fromiter(kp_cats, dtype=np.int64)
+        expected = np.array([len(kp_cats[c].keypoint_names) * 3 for c in cat_ids], dtype=np.int64)
+        srt = np.argsort(cat_ids)
+        pos = np.searchsorted(cat_ids[srt], cd.ann_category).clip(0, len(cat_ids) - 1)
+        hit = cat_ids[srt][pos] == cd.ann_category
+        exp = expected[srt][pos]
+        for r in np.flatnonzero(is_kp & hit & (kp_len != exp)):
+            cat = kp_cats[int(cd.ann_category[r])]
+            add(int(item_of[r]), int(r), "keypoints_count",
+                f"keypoints length {int(kp_len[r])} != expected {int(exp[r])} for category {cat.name}")
+
+    # masks
+    for r in np.flatnonzero(cd.ann_kind == KIND_MASK):
+        extra = cd.extras.get(int(r), {})
+        if extra.get("rle") is None and extra.get("png_path") is None:
+            add(int(item_of[r]), int(r), "mask_missing", "mask must have rle or png_path")
+
+    if check_duplicates:
+        from annox.core.spatial import find_duplicates
+
+        dup = find_duplicates(cd, duplicate_iou)
+        for a, b, v in zip(dup.a.tolist(), dup.b.tolist(), dup.iou.tolist()):
+            add(int(item_of[b]), b, "near_duplicate",
+                f"annotation {int(cd.ann_id[b])} duplicates {int(cd.ann_id[a])} (IoU {v:.2f}) "
+                f"in item {ids[item_of[b]]}", "warning")
+
+    found.sort(key=lambda t: t[:3])
+    return [t[3] for t in found]
+
+
+def _report(cd: ColumnarDataset, **checks: Any) -> Tuple[bool, Dict[str, Any]]:
+    with metrics.span("validate.check"):
+        issues = validate_columnar(cd, **checks)
+    metrics.count("items", len(cd))
+    metrics.count("annotations", cd.num_annotations)
+    errors = [i.message for i in issues if i.severity == "error"]
+    warnings = [i.message for i in issues if i.severity != "error"]
     ok = len(errors) == 0
-    return ok, {"items": len(ds.items), "annotations": ann_count, "errors": errors}
+    return ok, {
+        "items": len(cd),
+        "annotations": cd.num_annotations,
+        "errors": errors,
+        "warnings": warnings,
+        "issues": [asdict(i) for i in issues],
+    }
+
+
+def _validate_dataset(ds: Dataset, **checks: Any) -> Tuple[bool, Dict[str, Any]]:
+    return _report(ColumnarDataset.from_dataset(ds), **checks)
 
 
-def validate_dataset_file(path: Path):
+def _category(c: Dict[str, Any]) -> Category:
+    # no model validation: skeleton problems are reported by the bulk checks
+    return Category.model_construct(
+        id=int(c["id"]),
+        name=str(c["name"]),
+        supercategory=c.get("supercategory"),
+        keypoint_names=c.get("keypoint_names"),
+        skeleton=c.get("skeleton"),
+    )
+
+
+def _columnar_from_file(path: Path) -> ColumnarDataset:
     if path.suffix.lower() == ".jsonl":
-        # JSONL: items, rebuild Dataset with minimal metadata
-        items = [Dataset.Item.model_validate(obj) for obj in load_jsonl(path)]
-        ds = Dataset(items=items)
-    else:
-        obj = load_json(path)
-        ds = Dataset.model_validate(obj)
-    return _validate_dataset(ds)
+        b = ColumnarBuilder()
+        for obj in load_jsonl(path):
+            b.add_item_obj(obj)
+        return b.build()
+    obj = load_json(path)
+    b = ColumnarBuilder([_category(c) for c in obj.get("categories", [])])
+    for it in obj.get("items", []):
+        b.add_item_obj(it)
+    return b.build()
 
+
+def validate_dataset_file(path: Path, check_duplicates: bool = False, duplicate_iou: float = DUPLICATE_IOU):
+    checks = {"check_duplicates": check_duplicates, "duplicate_iou": duplicate_iou}
+    with metrics.span("validate"):
+        metrics.count_file("bytes_read", path)
+        try:
+            with metrics.span("validate.parse"):
+                cd = _columnar_from_file(path)
+        except (KeyError, TypeError, ValueError, AttributeError):
+            # malformed structure: let pydantic produce its detailed error
+            cd = None
+        if cd is not None:
+            return _report(cd, **checks)
+        with metrics.span("validate.model"):
+            if path.suffix.lower() == ".jsonl":
+                # JSONL: items, rebuild Dataset with minimal metadata
+                items = [Dataset.Item.model_validate(obj) for obj in load_jsonl(path)]
+                ds = Dataset(items=items)
+            else:
+                obj = load_json(path)
+                ds = Dataset.model_validate(obj)
+        return _validate_dataset(ds, **checks)
@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import struct
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, List, Optional, Sequence, Tuple, Union
+
+from annox.io.parallel import imap_parallel
+
+# Image dimensions from file headers, without decoding pixels. Supports PNG,
+# JPEG (and MPO), GIF, BMP, WebP, TIFF (and DNG) and PFM; only the first few
+# bytes are read except for JPEG, where markers are skipped until the frame
+# header, and TIFF, where the first image file directory is read. Other
+# headers are handed to Pillow when it is installed.
+#
+# ``probe_sizes`` runs over many files on a thread pool and can consult an
+# ``ImageSizeCache``, a SQLite table keyed by path, size and mtime, so
+# unchanged files are not opened again on later runs.
+
+IMAGE_EXTENSIONS = frozenset(
+    {".jpg", ".jpeg", ".png", ".bmp", ".gif", ".webp", ".tif", ".tiff", ".dng", ".mpo", ".pfm"}
+)
+
+_HEAD = 32
+_BUFFER = 512  # enough for every header except JPEGs with large metadata
+_BATCH = 500  # SQLite host parameters per lookup
+DEFAULT_WORKERS = 16
+
+Size = Tuple[int, int]
+
+# SOFn markers carrying the frame size (excluding DHT, JPG and DAC)
+_SOF = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def _jpeg_size(f: BinaryIO) -> Optional[Tuple[int, int]]:
+    f.seek(2)
+    while True:
+        b = f.read(1)
+        while b and b != b"\xff":
+            b = f.read(1)
+        while b == b"\xff":  # fill bytes
+            b = f.read(1)
+        if not b:
+            return None
+        marker = b[0]
+        if marker in (0x01, 0xD8) or 0xD0 <= marker <= 0xD7:
+            continue  # standalone markers
+        seg = f.read(2)
+        if len(seg) < 2:
+            return None
+        (length,) = struct.unpack(">H", seg)
+        if marker in _SOF:
+            data = f.read(5)
+            if len(data) < 5:
+                return None
+            h, w = struct.unpack(">HH", data[1:5])
+            return w, h
+        f.seek(length - 2, 1)
+
+
+def _tiff_size(head: bytes, f: BinaryIO) -> Optional[Tuple[int, int]]:
+    order = "<" if head[:2] == b"II" else ">"
+    (offset,) = struct.unpack(order + "I", head[4:8])
+    for _ in range(4):  # a reduced-resolution first IFD (DNG) points to the full image
+        f.seek(offset)
+        data = f.read(2)
+        if len(data) < 2:
+            return None
+        (n,) = struct.unpack(order + "H", data)
+        entries = f.read(12 * n)
+        if len(entries) < 12 * n:
+            return None
+        tags: Dict[int, Tuple[int, int]] = {}
+        for i in range(n):
+            tag, typ, count, raw = struct.unpack(order + "HHI4s", entries[12 * i : 12 * i + 12])
+            if tag in (254, 256, 257, 330):  # NewSubfileType, ImageWidth, ImageLength, SubIFDs
+                fmt = "H" if typ == 3 else "I"
+                tags[tag] = (struct.unpack(order + fmt, raw[: struct.calcsize(fmt)])[0], count)
+        if tags.get(254, (0, 0))[0] & 1 and 330 in tags:
+            offset, count = tags[330]
+            if count > 1:  # the value points to the list of SubIFD offsets
+                f.seek(offset)
+                data = f.read(4)
+                if len(data) < 4:
+                    return None
+                (offset,) = struct.unpack(order + "I", data)
+            continue
+        if 256 in tags and 257 in tags:
+            return tags[256][0], tags[257][0]
+        return None
+    return None
+
+
+def _header_size(head: bytes, f: BinaryIO) -> Optional[Tuple[int, int]]:
+    if head[:8] == b"\x89PNG\r\n\x1a\n" and head[12:16] == b"IHDR":
+        return struct.unpack(">II", head[16:24])
+    if head[:2] == b"\xff\xd8":
+        return _jpeg_size(f)
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return struct.unpack("<HH", head[6:10])
+    if head[:2] == b"BM" and len(head) >= 26:
+        (hdr,) = struct.unpack("<I", head[14:18])
+        if hdr == 12:  # OS/2 BITMAPCOREHEADER
+            return struct.unpack("<HH", head[18:22])
+        w, h = struct.unpack("<ii", head[18:26])
+        return w, abs(h)
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        kind = head[12:16]
+        if kind == b"VP8 ":
+            w, h = struct.unpack("<HH", head[26:30])
+            return w & 0x3FFF, h & 0x3FFF
+        if kind == b"VP8L":
+            b0, b1, b2, b3 = head[21:25]
+            return 1 + (((b1 & 0x3F) << 8) | b0), 1 + (((b3 & 0xF) << 10) | (b2 << 2) | ((b1 & 0xC0) >> 6))
+        if kind == b"VP8X":
+            w = int.from_bytes(head[24:27], "little") + 1
+            h = int.from_bytes(head[27:30], "little") + 1
+            return w, h
+    if head[:4] in (b"II*\x00", b"MM\x00*"):
+        return _tiff_size(head, f)
+    if head[:2] in (b"PF", b"Pf") and head[2:3].isspace():
+        fields = head.split()
+        if len(fields) >= 3 and fields[1].isdigit() and fields[2].isdigit():
+            return int(fields[1]), int(fields[2])
+    return None
+
+
+def _pillow_size(path: Union[str, Path]) -> Optional[Tuple[int, int]]:
+    try:
+        from PIL import Image  # type: ignore
+    except ImportError:
+        return None
+    try:
+        with Image.open(path) as im:
+            return im.size
+    except (OSError, ValueError):
+        return None
+
+
+def read_image_size(path: Union[str, Path]) -> Size:
+    """Return ``(width, height)`` of an image read from its header."""
+    with open(path, "rb", buffering=_BUFFER) as f:
+        head = f.read(_HEAD)
+        size = _header_size(head, f)
+    if size is None:
+        size = _pillow_size(path)
+    if size is None:
+        raise ValueError(f"unsupported or truncated image header: {path}")
+    return int(size[0]), int(size[1])
+
+
+def _try_size(path: str) -> Optional[Size]:
+    try:
+        return read_image_size(path)
+    except (OSError, ValueError, struct.error):
+        return None
+
+
+def _stat(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def scan_images(root: Union[str, Path]) -> List[str]:
+    """Image files below ``root``, sorted; one ``scandir`` per directory."""
+    found: List[str] = []
+    stack = [str(root)]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for e in it:
+                if e.is_dir(follow_symlinks=True):
+                    stack.append(e.path)
+                elif os.path.splitext(e.name)[1].lower() in IMAGE_EXTENSIONS:
+                    found.append(e.path)
+    found.sort()
+    return found
+
+
+class ImageSizeCache:
+    """Persistent ``path -> (width, height)`` table, valid while size and mtime match."""
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sizes "
+            "(path TEXT PRIMARY KEY, size INTEGER, mtime INTEGER, width INTEGER, height INTEGER)"
+        )
+
+    @classmethod
+    def default(cls) -> "ImageSizeCache":
+        from annox.core.paths import default_cache_dir
+
+        return cls(default_cache_dir() / "image-sizes.sqlite")
+
+    def get_many(self, keys: Sequence[Tuple[str, int, int]]) -> List[Optional[Size]]:
+        # keys: (absolute path, size, mtime_ns)
+        found: Dict[str, Tuple[int, int, int, int]] = {}
+        for i in range(0, len(keys), _BATCH):
+            paths = [k[0] for k in keys[i : i + _BATCH]]
+            q = "SELECT path, size, mtime, width, height FROM sizes WHERE path IN (%s)" % ",".join("?" * len(paths))
+            for path, size, mtime, w, h in self._db.execute(q, paths):
+                found[path] = (size, mtime, w, h)
+        out: List[Optional[Size]] = []
+        for path, size, mtime in keys:
+            hit = found.get(path)
+            out.append((hit[2], hit[3]) if hit is not None and hit[:2] == (size, mtime) else None)
+        return out
+
+    def put_many(self, rows: Sequence[Tuple[str, int, int, int, int]]) -> None:
+        # rows: (absolute path, size, mtime_ns, width, height)
+        with self._db:
+            self._db.executemany("INSERT OR REPLACE INTO sizes VALUES (?, ?, ?, ?, ?)", rows)
+
+    def close(self) -> None:
+        self._db.close()
+
+    def __enter__(self) -> "ImageSizeCache":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def probe_sizes(
+    paths: Sequence[Union[str, Path]],
+    workers: int = DEFAULT_WORKERS,
+    cache: Optional[ImageSizeCache] = None,
+) -> List[Optional[Size]]:
+    """``(width, height)`` for each path, ``None`` where the header is unreadable.
+
+    Headers (and, with a cache, file stats) are read on a thread pool.
+    """
+    names = [os.path.abspath(p) for p in paths]
+    if cache is None:
+        return list(imap_parallel(_try_size, names, workers, backend="thread"))
+    stats = list(imap_parallel(_stat, names, workers, backend="thread"))
+    keyed = [(i, (n, st[0], st[1])) for i, (n, st) in enumerate(zip(names, stats)) if st is not None]
+    sizes: List[Optional[Size]] = [None] * len(names)
+    for (i, _), hit in zip(keyed, cache.get_many([k for _, k in keyed])):
+        sizes[i] = hit
+    missing = [(i, k) for i, k in keyed if sizes[i] is None]
+    fresh = list(imap_parallel(_try_size, [k[0] for _, k in missing], workers, backend="thread"))
+    rows = []
+    for (i, (name, size, mtime)), dims in zip(missing, fresh):
+        sizes[i] = dims
+        if dims is not None:
+            rows.append((name, size, mtime, dims[0], dims[1]))
+    if rows:
+        cache.put_many(rows)
+    return sizes
+
+
+def scan_sizes(
+    root: Union[str, Path],
+    workers: int = DEFAULT_WORKERS,
+    cache: Optional[ImageSizeCache] = None,
+) -> Dict[str, Optional[Size]]:
+    """Sizes of every image below ``root``, keyed by path."""
+    paths = scan_images(root)
+    return dict(zip(paths, probe_sizes(paths, workers, cache)))
@@ -18,6 +18,18 @@ def load_json(path: Path) -> Any:
             return json.load(f)
 
 
+def loads(data: bytes) -> Any:
+    if _orjson is not None:
+        return _orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj: Any) -> bytes:
+    if _orjson is not None:
+        return _orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
 def dump_json(path: Path, obj: Any) -> None:
     if _orjson is not None:
         path.write_bytes(_orjson.dumps(obj))
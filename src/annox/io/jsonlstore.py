@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import re
+import struct
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+from annox.io.jsonio import dumps, loads
+from annox.schema.dataset import Dataset
+
+# Random-access view over a JSONL dataset (one Dataset.Item per line).
+# Opening builds a byte-offset index of the lines and their item ids, stored
+# beside the file as ``<name>.idx`` and reused while the file's size and mtime
+# are unchanged. Items are parsed from the memory-mapped file on access only.
+
+_MAGIC = b"AXJLIDX1"
+_HEADER = struct.Struct("<8sQqQQ")  # magic, file size, mtime_ns, lines, ids length
+_SCAN_CHUNK = 64 << 20
+
+# fast path for the id when it is the first member (as written by model_dump)
+_LEAD_ID = re.compile(rb'[ \t]*\{[ \t]*"id"[ \t]*:[ \t]*("(?:[^"\\\n]|\\.)*"|-?[0-9]+)[ \t]*[,}]')
+
+
+def index_path(path: Path) -> Path:
+    return path.with_name(path.name + ".idx")
+
+
+def _line_bounds(buf: Any, size: int) -> Tuple[np.ndarray, np.ndarray]:
+    # start/end (newline excluded) of every line, scanning in bounded chunks
+    cuts: List[np.ndarray] = []
+    for off in range(0, size, _SCAN_CHUNK):
+        chunk = np.frombuffer(buf, dtype=np.uint8, count=min(_SCAN_CHUNK, size - off), offset=off)
+        cuts.append(np.flatnonzero(chunk == 0x0A) + off)
+    nl = np.concatenate(cuts) if cuts else np.zeros(0, dtype=np.int64)
+    starts = np.concatenate(([0], nl + 1)).astype(np.int64)
+    ends = np.concatenate((nl, [size])).astype(np.int64)
+    return starts, ends
+
+
+def _decode_id(tok: bytes) -> str:
+    if tok[:1] != b'"':
+        return tok.decode("ascii")
+    return json.loads(tok) if b"\\" in tok else tok[1:-1].decode("utf-8")
+
+
+def _parse_id(line: bytes) -> Optional[str]:
+    if not line.strip():
+        return None
+    obj = loads(line)
+    if not isinstance(obj, dict) or "id" not in obj:
+        raise ValueError("JSONL: every line must be an object with an 'id'")
+    return str(obj["id"])
+
+
+def _build_index(buf: Any, size: int) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+    starts, ends = _line_bounds(buf, size)
+    keep: List[int] = []
+    ids: List[str] = []
+    match = _LEAD_ID.match
+    for i, (s, e) in enumerate(zip(starts.tolist(), ends.tolist())):
+        m = match(buf, s, e)
+        iid = _decode_id(m.group(1)) if m is not None else _parse_id(buf[s:e])
+        if iid is not None:
+            keep.append(i)
+            ids.append(iid)
+    sel = np.asarray(keep, dtype=np.int64)
+    return starts[sel], ends[sel], ids
+
+
+def _read_index(path: Path, st: os.stat_result) -> Optional[Tuple[np.ndarray, np.ndarray, List[str]]]:
+    try:
+        data = index_path(path).read_bytes()
+        magic, size, mtime, n, ids_len = _HEADER.unpack_from(data)
+    except (OSError, struct.error):
+        return None
+    if magic != _MAGIC or size != st.st_size or mtime != st.st_mtime_ns:
+        return None
+    off = _HEADER.size
+    bounds = np.frombuffer(data, dtype="<i8", count=2 * n, offset=off).reshape(2, n)
+    ids = loads(data[off + 16 * n : off + 16 * n + ids_len])
+    if len(ids) != n:
+        return None
+    return bounds[0].copy(), bounds[1].copy(), ids
+
+
+def _write_index(path: Path, st: os.stat_result, starts: np.ndarray, ends: np.ndarray, ids: List[str]) -> None:
+    blob = dumps(ids)
+    header = _HEADER.pack(_MAGIC, st.st_size, st.st_mtime_ns, len(ids), len(blob))
+    tmp = index_path(path).with_suffix(".idx.tmp")
+    try:
+        with tmp.open("wb") as f:
+            f.write(header)
+            f.write(starts.astype("<i8").tobytes())
+            f.write(ends.astype("<i8").tobytes())
+            f.write(blob)
+        os.replace(tmp, index_path(path))
+    except OSError:
+        # read-only location: the index just isn't persisted
+        tmp.unlink(missing_ok=True)
+
+
+class JsonlDataset:
+    """Lazily parsed, indexed JSONL dataset.
+
+    ``ds[item_id]`` and ``ds[i]`` return a single ``Dataset.Item``, slices a
+    list; iteration and ``iter_items`` parse lines one at a time. Duplicate
+    ids resolve to their first occurrence.
+    """
+
+    def __init__(self, path: Union[str, Path], *, cache_index: bool = True) -> None:
+        self.path = Path(path)
+        self._file = self.path.open("rb")
+        st = os.fstat(self._file.fileno())
+        self._mm: Optional[mmap.mmap] = None
+        buf: Any = b""
+        if st.st_size:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            buf = self._mm
+        index = _read_index(self.path, st) if cache_index else None
+        if index is None:
+            index = _build_index(buf, st.st_size)
+            if cache_index:
+                _write_index(self.path, st, *index)
+        self._starts, self._ends, self._ids = index
+        self._pos: Dict[str, int] = {}
+        for i, iid in enumerate(self._ids):
+            self._pos.setdefault(iid, i)
+
+    @property
+    def ids(self) -> List[str]:
+        return list(self._ids)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, item_id: object) -> bool:
+        return item_id in self._pos
+
+    def raw(self, index: int) -> bytes:
+        if self._mm is None:
+            raise IndexError(index)
+        return self._mm[int(self._starts[index]) : int(self._ends[index])]
+
+    def _parse(self, index: int) -> Dataset.Item:
+        return Dataset.Item.model_validate(loads(self.raw(index)))
+
+    def __getitem__(self, key: Union[str, int, slice]) -> Any:
+        if isinstance(key, str):
+            pos = self._pos.get(key)
+            if pos is None:
+                raise KeyError(key)
+            return self._parse(pos)
+        if isinstance(key, slice):
+            return [self._parse(i) for i in range(*key.indices(len(self)))]
+        n = len(self)
+        i = int(key)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError(key)
+        return self._parse(i)
+
+    def get(self, item_id: str, default: Any = None) -> Any:
+        return self[item_id] if item_id in self._pos else default
+
+    def __iter__(self) -> Iterator[Dataset.Item]:
+        for i in range(len(self)):
+            yield self._parse(i)
+
+    def iter_items(
+        self,
+        ids: Optional[Iterable[str]] = None,
+        where: Optional[Callable[[Dataset.Item], bool]] = None,
+    ) -> Iterator[Dataset.Item]:
+        """Iterate items in file order, optionally restricted to ``ids`` and/or ``where``.
+
+        Lines whose id is not selected are never parsed.
+        """
+        if ids is None:
+            rows: Iterable[int] = range(len(self))
+        else:
+            rows = sorted({self._pos[i] for i in ids if i in self._pos})
+        for i in rows:
+            item = self._parse(i)
+            if where is None or where(item):
+                yield item
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._file.close()
+
+    def __enter__(self) -> "JsonlDataset":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
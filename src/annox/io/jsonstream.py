@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+import codecs
+import json
+import re
+from pathlib import Path
+from typing import Any, BinaryIO, Container, Iterator, Optional, Tuple
+
+from annox.io.pipeline import DEFAULT_CHUNKS, ReadAheadFile
+
+# Incremental reader for large JSON documents. The top-level object is walked
+# structurally; elements of the selected arrays are decoded one at a time with
+# the C scanner of the stdlib decoder, and unselected members are skipped by a
+# regex tokenizer without being buffered. The next ``read_ahead`` chunks of
+# the file are read on a background thread while the current one is parsed.
+
+_WS = re.compile(r"[ \t\r\n]*")
+# a complete string, a lone quote (string cut by the buffer end) or a bracket
+_TOKEN = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|"|[\[\]{}]')
+_STRING = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"')
+_SCALAR_END = re.compile(r"[,\]}\s]")
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+_decoder = json.JSONDecoder()
+
+
+class _Reader:
+    # Positions are absolute character offsets; ``buf`` holds [base, base+len).
+    def __init__(self, f: BinaryIO, chunk_size: int) -> None:
+        self._f = f
+        self._chunk = chunk_size
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.buf = ""
+        self.base = 0
+        self.pos = 0
+        self.eof = False
+
+    def fill(self, keep_from: int, size: Optional[int] = None) -> bool:
+        if self.eof:
+            return False
+        data = self._f.read(size or self._chunk)
+        text = self._utf8.decode(data, final=not data)
+        if not data:
+            self.eof = True
+            if not text:
+                return False
+        drop = keep_from - self.base
+        if drop > 0:
+            self.buf = self.buf[drop:] + text
+            self.base = keep_from
+        else:
+            self.buf += text
+        return True
+
+    def peek(self) -> str:
+        while self.pos - self.base >= len(self.buf):
+            if not self.fill(self.pos):
+                raise ValueError(f"unexpected end of JSON at offset {self.pos}")
+        return self.buf[self.pos - self.base]
+
+    def skip_ws(self) -> None:
+        while True:
+            m = _WS.match(self.buf, self.pos - self.base)
+            self.pos = self.base + m.end()
+            if m.end() < len(self.buf) or not self.fill(self.pos):
+                return
+
+    def expect(self, ch: str) -> None:
+        self.skip_ws()
+        if self.peek() != ch:
+            raise ValueError(f"expected {ch!r} at offset {self.pos}, got {self.peek()!r}")
+        self.pos += 1
+
+    def read_string(self) -> str:
+        start = self.pos
+        while True:
+            m = _STRING.match(self.buf, start - self.base)
+            if m is not None:
+                self.pos = self.base + m.end()
+                return m.group(0)
+            if not self.fill(start):
+                raise ValueError(f"unterminated string at offset {start}")
+
+    def decode_value(self) -> Tuple[Any, int, int]:
+        # Decode the value at ``pos``; returns (value, start, end) offsets.
+        start = self.pos
+        if self.peek() not in '{["':
+            # numbers and literals need their terminator in the buffer
+            while _SCALAR_END.search(self.buf, start - self.base) is None:
+                if not self.fill(start):
+                    break
+        while True:
+            i = start - self.base
+            try:
+                value, end = _decoder.raw_decode(self.buf, i)
+            except json.JSONDecodeError:
+                # most likely cut by the buffer end; grow geometrically
+                if not self.fill(start, max(self._chunk, len(self.buf) - i)):
+                    raise
+                continue
+            self.pos = self.base + end
+            return value, start, self.pos
+
+    def skip_value(self) -> None:
+        # Advance past the value at ``pos`` releasing consumed bytes as we go.
+        c = self.peek()
+        if c == '"':
+            self.read_string()
+            return
+        if c not in "{[":
+            while True:
+                m = _SCALAR_END.search(self.buf, self.pos - self.base)
+                if m is not None:
+                    self.pos = self.base + m.start()
+                    return
+                self.pos = self.base + len(self.buf)
+                if not self.fill(self.pos):
+                    return
+        depth = 0
+        while True:
+            m = _TOKEN.search(self.buf, self.pos - self.base)
+            if m is None or m.group(0) == '"':
+                # need more data; resume at the cut string (if any)
+                self.pos = self.base + (m.start() if m is not None else len(self.buf))
+                if not self.fill(self.pos):
+                    raise ValueError(f"unexpected end of JSON at offset {self.pos}")
+                continue
+            tok = m.group(0)
+            self.pos = self.base + m.end()
+            if tok in ("{", "["):
+                depth += 1
+            elif tok in ("}", "]"):
+                depth -= 1
+                if depth == 0:
+                    return
+
+    def next_member(self, first: bool) -> Optional[str]:
+        # Position after the ':' of the next top-level member; None at the end.
+        self.skip_ws()
+        c = self.peek()
+        if c == "}":
+            self.pos += 1
+            return None
+        if not first:
+            if c != ",":
+                raise ValueError(f"expected ',' or '}}' at offset {self.pos}")
+            self.pos += 1
+            self.skip_ws()
+        key = json.loads(self.read_string())
+        self.expect(":")
+        self.skip_ws()
+        return key
+
+
+def _iter_members(path: Path, chunk_size: int, read_ahead: int) -> Iterator[Tuple[str, _Reader]]:
+    f: Any = Path(path).open("rb")
+    if read_ahead > 0:
+        f = ReadAheadFile(f, chunk_size, read_ahead)
+    with f:
+        r = _Reader(f, chunk_size)
+        r.expect("{")
+        first = True
+        while True:
+            key = r.next_member(first)
+            if key is None:
+                return
+            first = False
+            pos = r.pos
+            yield key, r
+            if r.pos == pos:  # consumer did not take the value
+                r.skip_value()
+
+
+def iter_array_items(
+    path: Path,
+    keys: Container[str],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    read_ahead: int = DEFAULT_CHUNKS,
+) -> Iterator[Tuple[str, Any]]:
+    """Yield ``(key, element)`` for every element of the selected top-level arrays.
+
+    Memory use is bounded by the largest single element plus ``chunk_size``;
+    members not listed in ``keys`` are skipped without being buffered.
+    """
+    for key, r in _iter_members(path, chunk_size, read_ahead):
+        if key not in keys or r.peek() != "[":
+            continue
+        r.pos += 1
+        r.skip_ws()
+        if r.peek() == "]":
+            r.pos += 1
+            continue
+        while True:
+            r.skip_ws()
+            value, _, _ = r.decode_value()
+            yield key, value
+            r.skip_ws()
+            c = r.peek()
+            r.pos += 1
+            if c == "]":
+                break
+            if c != ",":
+                raise ValueError(f"expected ',' or ']' at offset {r.pos - 1}")
+
+
+def read_member(
+    path: Path, key: str, chunk_size: int = DEFAULT_CHUNK_SIZE, read_ahead: int = DEFAULT_CHUNKS
+) -> Any:
+    """Decode a single top-level member; returns None if it is absent."""
+    for name, r in _iter_members(path, chunk_size, read_ahead):
+        if name == key:
+            return r.decode_value()[0]
+    return None
@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from annox.core import metrics
+from annox.io import maskio
+from annox.io.parallel import imap_parallel
+from annox.io.png import read_png
+
+# Decoded PNG masks shared across consumers. A mask PNG is a label image whose
+# non-zero pixels (in any colour channel; alpha is ignored) are foreground.
+#
+# ``MaskCache`` keeps decoded masks in LRU order up to ``max_bytes``, either as
+# read-only ``(h, w)`` uint8 arrays or, when requested, as compressed RLE
+# dicts, which are usually far smaller. Entries are keyed by absolute path,
+# file size and mtime, so a rewritten file is decoded again. ``prefetch``
+# decodes the missing files of a batch on a thread pool (zlib inflate
+# releases the GIL). Hits and misses are counted on the cache and as
+# ``maskcache.hits`` / ``maskcache.misses`` (see annox.core.metrics).
+#
+# ``MaskCache.default()`` is the process-wide cache used by
+# ``MaskAnnotation.load_mask`` / ``load_rle`` and the COCO exporter; its size
+# is $ANNOX_MASK_CACHE_MB (default 256).
+
+DEFAULT_MAX_BYTES = 256 << 20
+DEFAULT_WORKERS = 8
+
+PathLike = Union[str, Path]
+_Key = Tuple[str, int, int, bool]
+
+
+def _to_mask(pixels: np.ndarray) -> np.ndarray:
+    if pixels.ndim == 2:
+        return (pixels != 0).view(np.uint8)
+    colour = pixels[:, :, :3] if pixels.shape[2] >= 3 else pixels[:, :, :1]
+    return colour.any(axis=2).view(np.uint8)
+
+
+def decode_mask_png(path: PathLike, as_rle: bool = False) -> Any:
+    """Mask of a PNG file: ``(h, w)`` uint8 array of 0/1, or an RLE dict."""
+    mask = _to_mask(read_png(path))
+    return maskio.encode(mask) if as_rle else mask
+
+
+def _nbytes(value: Any) -> int:
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    return len(value["counts"]) + 64
+
+
+def _decode(job: Tuple[str, bool]) -> Any:
+    path, as_rle = job
+    return decode_mask_png(path, as_rle)
+
+
+class MaskCache:
+    """Memory-bounded LRU cache of decoded PNG masks; safe to share between threads."""
+
+    _default: Optional["MaskCache"] = None
+    _default_lock = threading.Lock()
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[_Key, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def default(cls) -> "MaskCache":
+        with cls._default_lock:
+            if cls._default is None:
+                mb = os.environ.get("ANNOX_MASK_CACHE_MB")
+                cls._default = cls(int(mb) << 20 if mb else DEFAULT_MAX_BYTES)
+            return cls._default
+
+    @staticmethod
+    def _key(path: PathLike, as_rle: bool) -> _Key:
+        name = os.path.abspath(path)
+        st = os.stat(name)
+        return name, st.st_size, st.st_mtime_ns, as_rle
+
+    def _lookup(self, key: _Key) -> Any:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        metrics.count("maskcache.hits" if value is not None else "maskcache.misses")
+        return value
+
+    def _store(self, key: _Key, value: Any) -> Any:
+        if isinstance(value, np.ndarray):
+            value.setflags(write=False)  # shared between callers
+        size = _nbytes(value)
+        if size > self.max_bytes:
+            return value
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= _nbytes(old)
+            self._entries[key] = value
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.nbytes -= _nbytes(evicted)
+        return value
+
+    def get(self, path: PathLike, as_rle: bool = False) -> Any:
+        """Decoded mask of ``path``; an RLE dict with ``as_rle``.
+
+        Arrays are read-only; copy them before modifying.
+        """
+        key = self._key(path, as_rle)
+        value = self._lookup(key)
+        if value is not None:
+            return value
+        if as_rle:
+            # reuse a cached array rather than decoding the file again
+            with self._lock:
+                arr = self._entries.get(key[:3] + (False,))
+            value = maskio.encode(arr) if arr is not None else decode_mask_png(key[0], True)
+        else:
+            value = decode_mask_png(key[0])
+        return self._store(key, value)
+
+    def prefetch(self, paths: Iterable[PathLike], as_rle: bool = False, workers: int = DEFAULT_WORKERS) -> int:
+        """Decode the uncached ``paths`` on a thread pool; returns how many were decoded.
+
+        Each decoded file counts as a miss; files that do not exist are skipped.
+        """
+        missing: Dict[_Key, None] = {}
+        for p in paths:
+            try:
+                key = self._key(p, as_rle)
+            except OSError:
+                continue  # missing files surface when the mask is used
+            with self._lock:
+                cached = key in self._entries
+            if not cached:
+                missing[key] = None
+        keys = list(missing)
+        if keys:
+            with self._lock:
+                self.misses += len(keys)
+            metrics.count("maskcache.misses", len(keys))
+        jobs = [(k[0], as_rle) for k in keys]
+        for key, value in zip(keys, imap_parallel(_decode, jobs, workers, backend="thread")):
+            self._store(key, value)
+        return len(keys)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self.nbytes, "hits": self.hits, "misses": self.misses}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+
+def resolve(path: str, root: Optional[PathLike] = None) -> str:
+    # png_path values are relative to the dataset root when one is known
+    if root is None or os.path.isabs(path):
+        return path
+    return os.path.join(root, path)
+
+
+def prefetch_masks(
+    annotations: Sequence[Any],
+    root: Optional[PathLike] = None,
+    cache: Optional[MaskCache] = None,
+    as_rle: bool = True,
+    workers: int = DEFAULT_WORKERS,
+) -> int:
+    """Decode the PNGs of the given mask annotations that have no RLE of their own."""
+    paths: List[str] = [
+        resolve(a.png_path, root)
+        for a in annotations
+        if getattr(a, "rle", None) is None and getattr(a, "png_path", None)
+    ]
+    if not paths:
+        return 0
+    return (cache or MaskCache.default()).prefetch(paths, as_rle, workers)
@@ -1,4 +1,332 @@
 from __future__ import annotations
 
-# Placeholder for mask encode/decode helpers (Python fallback)
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
 
+import numpy as np
+
+from annox import rust as _rust
+
+# COCO-style run-length encoding. Masks are flattened column-major (Fortran
+# order); counts alternate background/foreground runs starting with
+# background. Compressed counts use the COCO LEB128-like string codec.
+#
+# Everything here works on runs directly where possible (area, bbox, merge,
+# IoU, polygon rasterization); dense masks are only built by ``decode``.
+# When the optional Rust extension exposes a function of the same name
+# (prefixed ``rle_``) it is used instead of the NumPy implementation.
+
+RLEDict = Dict[str, Any]
+RLELike = Union[RLEDict, Any]  # dict or annox.schema.geometry.RLE
+
+_MAX_GROUPS = 13  # 5-bit groups needed for a 64-bit value
+
+
+def _native(name: str):
+    if not _rust.HAS_RUST:
+        return None
+    return getattr(_rust, f"rle_{name}", None)
+
+
+# -- counts codec ---------------------------------------------------------
+
+
+def decompress_counts(s: Union[str, bytes]) -> np.ndarray:
+    """Decode a compressed COCO counts string into uncompressed counts."""
+    fn = _native("decompress_counts")
+    if fn is not None:
+        return np.asarray(fn(s), dtype=np.int64)
+    raw = np.frombuffer(s.encode("ascii") if isinstance(s, str) else bytes(s), dtype=np.uint8)
+    if raw.size == 0:
+        return np.zeros(0, dtype=np.int64)
+    c = raw.astype(np.int64) - 48
+    more = (c & 0x20) != 0
+    ends = np.flatnonzero(~more)
+    if ends.size == 0 or ends[-1] != c.size - 1:
+        raise ValueError("truncated RLE counts string")
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    token = np.repeat(np.arange(ends.size), ends - starts + 1)
+    k = np.arange(c.size) - starts[token]
+    if k.max() >= _MAX_GROUPS:
+        raise ValueError("RLE count overflows 64 bits")
+    x = np.add.reduceat((c & 0x1F) << (5 * k), starts)
+    # sign extension from the last group of each token
+    width = 5 * (ends - starts + 1)
+    neg = ((c[ends] & 0x10) != 0) & (width < 64)
+    x[neg] |= np.left_shift(np.int64(-1), width[neg])
+    # deltas are taken against the count two positions back (from index 3 on)
+    cnts = x.copy()
+    cnts[2::2] = np.cumsum(x[2::2])
+    cnts[1::2] = np.cumsum(x[1::2])
+    return cnts
+
+
+def compress_counts(counts: Sequence[int]) -> str:
+    """Encode uncompressed counts into a compressed COCO counts string."""
+    fn = _native("compress_counts")
+    if fn is not None:
+        return fn(list(map(int, counts)))
+    cnts = np.asarray(counts, dtype=np.int64)
+    if cnts.size == 0:
+        return ""
+    x = cnts.copy()
+    x[3:] -= cnts[1:-2]
+    out = np.zeros((x.size, _MAX_GROUPS), dtype=np.uint8)
+    valid = np.zeros((x.size, _MAX_GROUPS), dtype=bool)
+    alive = np.ones(x.size, dtype=bool)
+    for k in range(_MAX_GROUPS):
+        c = x & 0x1F
+        x = x >> 5
+        more = np.where((c & 0x10) != 0, x != -1, x != 0)
+        valid[:, k] = alive
+        out[:, k] = (c | (more.astype(np.int64) << 5)) + 48
+        alive &= more
+        if not alive.any():
+            break
+    return out[valid].tobytes().decode("ascii")
+
+
+def compress_counts_many(values: np.ndarray, offsets: np.ndarray) -> List[str]:
+    """Compress many counts sequences at once.
+
+    ``values`` holds the sequences back to back and ``offsets`` their
+    ``len + 1`` boundaries; the result equals ``compress_counts`` per sequence.
+    """
+    values = np.asarray(values, dtype=np.int64)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    fn = _native("compress_counts")
+    if fn is not None or values.size == 0:
+        return [compress_counts(values[a:b]) for a, b in zip(offsets[:-1].tolist(), offsets[1:].tolist())]
+    lengths = np.diff(offsets)
+    local = np.arange(values.size) - np.repeat(offsets[:-1], lengths)
+    x = values.copy()
+    delta = np.flatnonzero(local >= 3)
+    x[delta] -= values[delta - 2]
+    out = np.zeros((x.size, _MAX_GROUPS), dtype=np.uint8)
+    valid = np.zeros((x.size, _MAX_GROUPS), dtype=bool)
+    alive = np.ones(x.size, dtype=bool)
+    for k in range(_MAX_GROUPS):
+        c = x & 0x1F
+        x = x >> 5
+        more = np.where((c & 0x10) != 0, x != -1, x != 0)
+        valid[:, k] = alive
+        out[:, k] = (c | (more.astype(np.int64) << 5)) + 48
+        alive &= more
+        if not alive.any():
+            break
+    text = out[valid].tobytes().decode("ascii")
+    chars = np.concatenate(([0], np.cumsum(valid.sum(axis=1))))[offsets].tolist()
+    return [text[a:b] for a, b in zip(chars[:-1], chars[1:])]
+
+
+def size_of(rle: RLELike) -> Tuple[int, int]:
+    """``(height, width)`` of an RLE given as dict or RLE model."""
+    size = rle["size"] if isinstance(rle, dict) else rle.size
+    return int(size[0]), int(size[1])
+
+
+def counts_of(rle: RLELike) -> np.ndarray:
+    """Uncompressed counts of an RLE given as dict or RLE model."""
+    counts = rle["counts"] if isinstance(rle, dict) else rle.counts
+    if isinstance(counts, (str, bytes)):
+        return decompress_counts(counts)
+    return np.asarray(counts, dtype=np.int64)
+
+
+def _make(counts: np.ndarray, h: int, w: int, compressed: bool = True) -> RLEDict:
+    return {
+        "size": [h, w],
+        "counts": compress_counts(counts) if compressed else [int(v) for v in counts],
+    }
+
+
+# -- runs <-> intervals ---------------------------------------------------
+
+
+def _intervals(counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # foreground runs as [start, end) offsets into the column-major flat mask
+    ends = np.cumsum(counts)
+    starts = ends - counts
+    fg_starts, fg_ends = starts[1::2], ends[1::2]
+    keep = fg_ends > fg_starts
+    return fg_starts[keep], fg_ends[keep]
+
+
+def intervals_of(rle: RLELike) -> Tuple[np.ndarray, np.ndarray]:
+    """Foreground runs of an RLE as ``[start, end)`` offsets into the column-major flat mask."""
+    return _intervals(counts_of(rle))
+
+
+def _from_intervals(starts: np.ndarray, ends: np.ndarray, n: int) -> np.ndarray:
+    # disjoint, sorted intervals -> counts (background first)
+    if starts.size == 0:
+        return np.array([n], dtype=np.int64) if n else np.zeros(0, dtype=np.int64)
+    # fuse touching intervals
+    gap = starts[1:] > ends[:-1]
+    s = np.concatenate((starts[:1], starts[1:][gap]))
+    e = np.concatenate((ends[:-1][gap], ends[-1:]))
+    bounds = np.empty(2 * s.size, dtype=np.int64)
+    bounds[0::2] = s
+    bounds[1::2] = e
+    counts = np.diff(np.concatenate(([0], bounds)))
+    if e[-1] < n:
+        counts = np.concatenate((counts, [n - e[-1]]))
+    return counts
+
+
+def _combine(sets: Sequence[Tuple[np.ndarray, np.ndarray]], need: int) -> Tuple[np.ndarray, np.ndarray]:
+    # sweep over interval sets keeping positions covered by >= ``need`` sets
+    if not sets:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    pos = np.concatenate([np.concatenate((s, e)) for s, e in sets])
+    delta = np.concatenate([np.concatenate((np.ones_like(s), -np.ones_like(e))) for s, e in sets])
+    if pos.size == 0:
+        return pos, pos
+    upos, inv = np.unique(pos, return_inverse=True)
+    cover = np.cumsum(np.bincount(inv.reshape(-1), weights=delta).astype(np.int64))
+    inside = cover >= need
+    # segment k spans [upos[k], upos[k+1])
+    edge = np.diff(np.concatenate(([False], inside[:-1], [False])).astype(np.int8))
+    return upos[np.flatnonzero(edge == 1)], upos[np.flatnonzero(edge == -1)]
+
+
+# -- public API ------------------------------------------------------------
+
+
+def encode(mask: np.ndarray, compressed: bool = True) -> RLEDict:
+    """Run-length encode a dense (h, w) binary mask."""
+    m = np.asarray(mask)
+    if m.ndim != 2:
+        raise ValueError("mask must be 2-D")
+    h, w = m.shape
+    fn = _native("encode")
+    if fn is not None:
+        counts = np.asarray(fn(np.asfortranarray(m, dtype=np.uint8)), dtype=np.int64)
+        return _make(counts, h, w, compressed)
+    flat = m.ravel(order="F").astype(bool)
+    if flat.size == 0:
+        return _make(np.zeros(0, dtype=np.int64), h, w, compressed)
+    change = np.flatnonzero(flat[1:] != flat[:-1]) + 1
+    bounds = np.concatenate(([0], change, [flat.size]))
+    counts = np.diff(bounds)
+    if flat[0]:
+        counts = np.concatenate(([0], counts))
+    return _make(counts, h, w, compressed)
+
+
+def decode(rle: RLELike) -> np.ndarray:
+    """Expand an RLE into a dense (h, w) uint8 mask."""
+    h, w = size_of(rle)
+    counts = counts_of(rle)
+    if counts.sum() != h * w:
+        raise ValueError(f"RLE counts sum to {int(counts.sum())}, expected {h * w}")
+    fn = _native("decode")
+    if fn is not None:
+        return np.asarray(fn(counts, h, w), dtype=np.uint8)
+    values = (np.arange(counts.size) % 2).astype(np.uint8)
+    return np.repeat(values, counts).reshape((h, w), order="F")
+
+
+def area(rle: RLELike) -> int:
+    return int(counts_of(rle)[1::2].sum())
+
+
+def to_bbox(rle: RLELike) -> List[float]:
+    """Tight [x, y, w, h] box of the foreground, computed from the runs."""
+    h, _ = size_of(rle)
+    starts, ends = _intervals(counts_of(rle))
+    if starts.size == 0 or h == 0:
+        return [0.0, 0.0, 0.0, 0.0]
+    last = ends - 1
+    xs, xe = starts // h, last // h
+    ys, ye = starts % h, last % h
+    crosses = xe > xs
+    if crosses.any():
+        # a run wrapping into the next column covers the top and bottom rows
+        ymin, ymax = 0, h - 1
+    else:
+        ymin, ymax = int(ys.min()), int(ye.max())
+    xmin, xmax = int(xs.min()), int(xe.max())
+    return [float(xmin), float(ymin), float(xmax - xmin + 1), float(ymax - ymin + 1)]
+
+
+def merge(rles: Sequence[RLELike], intersect: bool = False, compressed: bool = True) -> RLEDict:
+    """Union (or intersection) of RLEs of the same size, without decoding."""
+    if not rles:
+        raise ValueError("merge needs at least one RLE")
+    h, w = size_of(rles[0])
+    for r in rles[1:]:
+        if size_of(r) != (h, w):
+            raise ValueError("cannot merge RLEs of different sizes")
+    sets = [_intervals(counts_of(r)) for r in rles]
+    s, e = _combine(sets, len(sets) if intersect else 1)
+    return _make(_from_intervals(s, e, h * w), h, w, compressed)
+
+
+def _overlap(a: Tuple[np.ndarray, np.ndarray], b: Tuple[np.ndarray, np.ndarray]) -> int:
+    s, e = _combine([a, b], 2)
+    return int((e - s).sum())
+
+
+def _boxes_overlap(a: List[float], b: List[float]) -> bool:
+    return a[0] < b[0] + b[2] and b[0] < a[0] + a[2] and a[1] < b[1] + b[3] and b[1] < a[1] + a[3]
+
+
+def iou(dt: Sequence[RLELike], gt: Sequence[RLELike], iscrowd: Optional[Sequence[bool]] = None) -> np.ndarray:
+    """Pairwise mask IoU matrix (len(dt), len(gt)); crowd gts use IoU over dt area."""
+    crowd = np.zeros(len(gt), dtype=bool) if iscrowd is None else np.asarray(iscrowd, dtype=bool)
+    dt_iv = [_intervals(counts_of(r)) for r in dt]
+    gt_iv = [_intervals(counts_of(r)) for r in gt]
+    dt_area = np.array([int((e - s).sum()) for s, e in dt_iv], dtype=np.float64)
+    gt_area = np.array([int((e - s).sum()) for s, e in gt_iv], dtype=np.float64)
+    dt_box = [to_bbox(r) for r in dt]
+    gt_box = [to_bbox(r) for r in gt]
+    out = np.zeros((len(dt), len(gt)), dtype=np.float64)
+    for i in range(len(dt)):
+        for j in range(len(gt)):
+            if not _boxes_overlap(dt_box[i], gt_box[j]):
+                continue
+            inter = _overlap(dt_iv[i], gt_iv[j])
+            union = dt_area[i] if crowd[j] else dt_area[i] + gt_area[j] - inter
+            out[i, j] = inter / union if union > 0 else 0.0
+    return out
+
+
+def from_polygons(polygons: Sequence[Sequence[float]], h: int, w: int, compressed: bool = True) -> RLEDict:
+    """Rasterize flat xy polygons (union) straight into runs.
+
+    A pixel is foreground when its center lies inside a ring (even-odd rule).
+    Scanlines run down each image column, so the intervals found are already
+    column-major runs and no dense mask is allocated.
+    """
+    fn = _native("from_polygons")
+    if fn is not None:
+        counts = np.asarray(fn([list(map(float, p)) for p in polygons], h, w), dtype=np.int64)
+        return _make(counts, h, w, compressed)
+    sets = []
+    for poly in polygons:
+        pts = np.asarray(poly, dtype=np.float64).reshape(-1, 2)
+        if len(pts) < 3:
+            continue
+        x0, y0 = pts[:, 0], pts[:, 1]
+        x1, y1 = np.roll(x0, -1), np.roll(y0, -1)
+        # columns whose center c + 0.5 lies in [min(x0, x1), max(x0, x1))
+        lo = np.clip(np.ceil(np.minimum(x0, x1) - 0.5), 0, w).astype(np.int64)
+        hi = np.clip(np.ceil(np.maximum(x0, x1) - 0.5), 0, w).astype(np.int64)
+        n = np.maximum(hi - lo, 0)
+        if n.sum() == 0:
+            continue
+        edge = np.repeat(np.arange(len(pts)), n)
+        col = lo[edge] + np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)
+        xc = col + 0.5
+        t = (xc - x0[edge]) / (x1[edge] - x0[edge])
+        yi = y0[edge] + t * (y1[edge] - y0[edge])
+        order = np.lexsort((yi, col))
+        col, yi = col[order], yi[order]
+        # crossings pair up within each column: inside between 2k and 2k+1
+        c, ya, yb = col[0::2], yi[0::2], yi[1::2]
+        ys = np.clip(np.ceil(ya - 0.5), 0, h).astype(np.int64)
+        ye = np.clip(np.ceil(yb - 0.5), 0, h).astype(np.int64)
+        keep = ye > ys
+        sets.append((c[keep] * h + ys[keep], c[keep] * h + ye[keep]))
+    s, e = _combine(sets, 1)
+    return _make(_from_intervals(s, e, h * w), h, w, compressed)
@@ -1,21 +1,188 @@
 from __future__ import annotations
 
-from concurrent.futures import ProcessPoolExecutor, as_completed
-from typing import Callable, Iterable, List, Tuple, TypeVar
+import atexit
+import threading
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+from multiprocessing import shared_memory
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+import numpy as np
 
 T = TypeVar("T")
 R = TypeVar("R")
 
+BACKENDS = ("process", "thread")
+
+# Pools are created lazily and reused across calls (one per backend and size).
+_pools: Dict[Tuple[str, int], Executor] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(workers: int, backend: str = "process") -> Executor:
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown backend {backend!r}; expected one of {BACKENDS}")
+    key = (backend, workers)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            if backend == "process":
+                pool = ProcessPoolExecutor(max_workers=workers)
+            else:
+                pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="annox")
+            _pools[key] = pool
+        return pool
+
+
+def _discard_pool(workers: int, backend: str) -> None:
+    with _pools_lock:
+        pool = _pools.pop((backend, workers), None)
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+@atexit.register
+def shutdown_pools() -> None:
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _run_chunk(func: Callable[[T], R], chunk: List[T]) -> List[R]:
+    return [func(x) for x in chunk]
+
+
+def _auto_chunk_size(items: Iterable[Any], workers: int) -> int:
+    # aim for ~4 chunks per worker when the input size is known
+    try:
+        n = len(items)  # type: ignore[arg-type]
+    except TypeError:
+        return 1
+    return max(1, min(1024, n // (workers * 4)))
+
+
+def imap_parallel(
+    func: Callable[[T], R],
+    items: Iterable[T],
+    workers: int = 0,
+    *,
+    chunk_size: Optional[int] = None,
+    max_in_flight: Optional[int] = None,
+    backend: str = "process",
+) -> Iterator[R]:
+    """Apply ``func`` to ``items`` on a shared pool, yielding results in input order.
+
+    Input is consumed lazily in chunks of ``chunk_size``; at most
+    ``max_in_flight`` chunks (default ``2 * workers``) are pending at any time,
+    so memory stays bounded for long or unbounded inputs. With ``workers`` 0 or
+    1 everything runs in-process.
+    """
+    if workers in (0, 1):
+        for x in items:
+            yield func(x)
+        return
+    size = chunk_size or _auto_chunk_size(items, workers)
+    limit = max_in_flight or 2 * workers
+    pool = get_pool(workers, backend)
+    it = iter(items)
+    pending: Deque[Future] = deque()
+    try:
+        while True:
+            chunk = list(islice(it, size))
+            if chunk:
+                pending.append(pool.submit(_run_chunk, func, chunk))
+            if pending and (len(pending) >= limit or not chunk):
+                yield from pending.popleft().result()
+            elif not chunk:
+                return
+    except BrokenProcessPool:
+        _discard_pool(workers, backend)
+        raise
+    finally:
+        for fut in pending:
+            fut.cancel()
+
+
+def map_parallel(
+    func: Callable[[T], R],
+    items: Iterable[T],
+    workers: int = 0,
+    *,
+    chunk_size: Optional[int] = None,
+    max_in_flight: Optional[int] = None,
+    backend: str = "process",
+) -> List[Tuple[int, R]]:
+    results = imap_parallel(
+        func, items, workers, chunk_size=chunk_size, max_in_flight=max_in_flight, backend=backend
+    )
+    return list(enumerate(results))  # deterministic order
+
+
+class SharedArray:
+    """NumPy array backed by ``multiprocessing.shared_memory``.
+
+    Pickling transfers only the block name, shape and dtype, so passing a
+    SharedArray to (or returning one from) a process-pool task is zero-copy.
+    The creating side should ``unlink`` it (or use it as a context manager)
+    once every consumer is done. An unpickled copy only attaches to the
+    block: its handle is closed by ``close``, on leaving a ``with`` block or
+    when the copy is garbage collected, and never unlinks the block.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, shape: Sequence[int], dtype: Any) -> None:
+        self._shm = shm
+        self._owner = True
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.array = np.ndarray(self.shape, dtype=self.dtype, buffer=shm.buf)
+
+    @classmethod
+    def empty(cls, shape: Sequence[int], dtype: Any) -> "SharedArray":
+        nbytes = max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize)
+        return cls(shared_memory.SharedMemory(create=True, size=nbytes), shape, dtype)
+
+    @classmethod
+    def copy_of(cls, arr: np.ndarray) -> "SharedArray":
+        out = cls.empty(arr.shape, arr.dtype)
+        out.array[...] = arr
+        return out
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {"name": self._shm.name, "shape": self.shape, "dtype": self.dtype.str}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__init__(shared_memory.SharedMemory(name=state["name"]), state["shape"], state["dtype"])
+        self._owner = False
+
+    def close(self) -> None:
+        if self.array is None:
+            return
+        self.array = None  # type: ignore[assignment]
+        self._shm.close()
+
+    def __del__(self) -> None:
+        try:
+            self.close()
+        except (AttributeError, BufferError):
+            pass  # never initialised, or views of the block are still alive
+
+    def unlink(self) -> None:
+        self.close()
+        self._shm.unlink()
 
-def map_parallel(func: Callable[[T], R], items: Iterable[T], workers: int = 0) -> List[Tuple[int, R]]:
-    seq = list(items)
-    if workers in (0, 1):  # run in-process
-        return [(i, func(x)) for i, x in enumerate(seq)]
-    out: List[Tuple[int, R]] = []
-    with ProcessPoolExecutor(max_workers=workers) as ex:
-        futs = {ex.submit(func, x): i for i, x in enumerate(seq)}
-        for fut in as_completed(futs):
-            out.append((futs[fut], fut.result()))
-    out.sort(key=lambda t: t[0])  # deterministic order
-    return out
+    def __enter__(self) -> "SharedArray":
+        return self
 
+    def __exit__(self, *exc: Any) -> None:
+        if self._owner:
+            self.unlink()
+        else:
+            self.close()
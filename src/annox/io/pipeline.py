@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import queue
+import threading
+from typing import Any, BinaryIO, Callable, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+from annox.core import metrics
+
+T = TypeVar("T")
+
+# Overlapped I/O for conversion pipelines: a background producer runs ahead
+# of the consumer (read-ahead) and a background writer runs behind it
+# (write-behind), so disk or network waits overlap with encoding on the
+# calling thread.
+#
+#   read_ahead     iterate any iterable on a thread, at most ``depth`` items
+#                  ahead (e.g. a source adapter's items)
+#   ReadAheadFile  binary file whose next ``depth`` chunks are read on a thread
+#   WriteBehind    bounded queue of write calls run in order on a thread
+#
+# Queues are bounded, so a fast side blocks on a slow one (backpressure) and
+# memory stays at ``depth`` elements. Errors raised on the background thread
+# surface on the calling thread at its next read, write or close. Each time
+# the calling thread has to wait, ``pipeline.read_stalls`` or
+# ``pipeline.write_stalls`` is counted (see annox.core.metrics); with few
+# stalls a smaller depth does as well.
+#
+# The threads share the GIL: overlap comes from blocking reads and writes,
+# not from parallel Python. Coarse I/O (file chunks, batched writes) gains
+# the most; a producer doing many small reads waits for the GIL after each
+# one while the consumer computes, which can cost more than it saves.
+
+DEFAULT_READ_AHEAD = 256  # items
+DEFAULT_WRITE_BEHIND = 64  # write calls
+DEFAULT_CHUNKS = 4  # file chunks
+
+_DONE = object()
+_POLL = 0.1  # seconds between checks for a cancelled consumer
+
+
+def _put(q: "queue.Queue[Any]", value: Any, stop: threading.Event) -> bool:
+    # blocks while the queue is full; False once the consumer went away
+    while not stop.is_set():
+        try:
+            q.put(value, timeout=_POLL)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _produce(items: Iterable[Any], q: "queue.Queue[Any]", stop: threading.Event, batch: int) -> None:
+    buf: List[Any] = []
+    try:
+        for x in items:
+            buf.append(x)
+            if len(buf) >= batch:
+                if not _put(q, (True, buf), stop):
+                    return
+                buf = []
+        if buf and not _put(q, (True, buf), stop):
+            return
+        _put(q, (True, _DONE), stop)
+    except BaseException as e:
+        # the items before the error are still delivered
+        if not buf or _put(q, (True, buf), stop):
+            _put(q, (False, e), stop)
+    finally:
+        # after an early stop the source is left suspended; release it (files,
+        # spill indexes) from the thread that iterated it
+        close = getattr(items, "close", None)
+        if close is not None:
+            close()
+
+
+def read_ahead(items: Iterable[T], depth: int = DEFAULT_READ_AHEAD, batch: int = 0) -> Iterator[T]:
+    """Iterate ``items`` on a background thread, up to ``depth`` items ahead.
+
+    Items cross the thread boundary in lists of ``batch`` (default: an
+    eighth of ``depth``, at most 64), which keeps the hand-off cheap for
+    small items. ``items`` must not be touched elsewhere while this runs.
+    With ``depth`` 0 the items are passed through unchanged.
+    """
+    if depth <= 0:
+        yield from items
+        return
+    if not batch:
+        batch = min(64, depth // 8)
+    batch = max(1, min(batch, depth))
+    q: "queue.Queue[Tuple[bool, Any]]" = queue.Queue(maxsize=max(1, depth // batch))
+    stop = threading.Event()
+    t = threading.Thread(target=_produce, args=(items, q, stop, batch), name="annox-read-ahead", daemon=True)
+    t.start()
+    try:
+        while True:
+            if q.empty():
+                metrics.count("pipeline.read_stalls")
+            ok, x = q.get()
+            if not ok:
+                raise x
+            if x is _DONE:
+                return
+            yield from x
+    finally:
+        stop.set()
+        t.join()
+
+
+def _chunks(f: BinaryIO, size: int) -> Iterator[bytes]:
+    while True:
+        data = f.read(size)
+        if not data:
+            return
+        yield data
+
+
+class ReadAheadFile:
+    """Read-only binary file whose next ``depth`` chunks are read in the background.
+
+    Supports ``read`` only, which is enough for sequential parsers such as
+    annox.io.jsonstream. Closing the wrapper closes the underlying file.
+    """
+
+    def __init__(self, f: BinaryIO, chunk_size: int, depth: int = DEFAULT_CHUNKS) -> None:
+        self._f = f
+        self._it = read_ahead(_chunks(f, chunk_size), depth, batch=1)
+        self._buf = b""
+        self._eof = False
+
+    def read(self, n: int = -1) -> bytes:
+        parts = [self._buf] if self._buf else []
+        have = len(self._buf)
+        while not self._eof and (n < 0 or have < n):
+            data = next(self._it, b"")
+            if not data:
+                self._eof = True
+                break
+            parts.append(data)
+            have += len(data)
+        buf = b"".join(parts)
+        if n < 0 or n >= len(buf):
+            self._buf = b""
+            return buf
+        self._buf = buf[n:]
+        return buf[:n]
+
+    def close(self) -> None:
+        self._it.close()  # type: ignore[attr-defined]
+        self._f.close()
+
+    def __enter__(self) -> "ReadAheadFile":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+class WriteBehind:
+    """Run write calls in submission order on a background thread.
+
+    ``submit`` returns at once unless ``depth`` calls are already pending, in
+    which case it blocks until the writer catches up. ``close`` waits for all
+    pending calls; the first error raised by a call is re-raised by the next
+    ``submit`` or by ``close``, and the calls after it are dropped. With
+    ``depth`` 0 every call runs inline.
+    """
+
+    def __init__(self, depth: int = DEFAULT_WRITE_BEHIND) -> None:
+        self.depth = depth
+        self._error: Optional[BaseException] = None
+        self._thread: Optional[threading.Thread] = None
+        if depth > 0:
+            self._q: "queue.Queue[Any]" = queue.Queue(maxsize=depth)
+            self._thread = threading.Thread(target=self._run, name="annox-write-behind", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            job = self._q.get()
+            if job is _DONE:
+                return
+            if self._error is None:
+                func, args = job
+                try:
+                    func(*args)
+                except BaseException as e:
+                    self._error = e
+
+    def _raise(self) -> None:
+        if self._error is not None:
+            raise self._error
+
+    def submit(self, func: Callable[..., Any], *args: Any) -> None:
+        if self._thread is None:
+            func(*args)
+            return
+        self._raise()
+        if self._q.full():
+            metrics.count("pipeline.write_stalls")
+        self._q.put((func, args))
+
+    def write(self, f: BinaryIO, data: bytes) -> None:
+        self.submit(f.write, data)
+
+    def close(self) -> None:
+        """Wait for the pending calls; raises the first error of any of them."""
+        if self._thread is not None:
+            self._q.put(_DONE)
+            self._thread.join()
+            self._thread = None
+        self._raise()
+
+    def abort(self) -> None:
+        """Wait for the pending calls, ignoring their errors (for cleanup paths)."""
+        try:
+            self.close()
+        except BaseException:
+            pass
+
+    def __enter__(self) -> "WriteBehind":
+        return self
+
+    def __exit__(self, exc_type: Any, *exc: Any) -> None:
+        # an exception in flight wins over write errors
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import struct
+import zlib
+from pathlib import Path
+from typing import List, Union
+
+import numpy as np
+
+try:  # optional; decodes every PNG variant at C speed
+    from PIL import Image as _PIL  # type: ignore
+except Exception:  # pragma: no cover - optional
+    _PIL = None
+
+# 8-bit PNG codec for label images (panoptic segment ids, masks).
+#
+# Reading uses Pillow when it is installed. The NumPy fallback handles
+# non-interlaced 8-bit grey, grey+alpha, RGB, RGBA and palette images
+# (palettes are expanded to RGB, as with Pillow's ``convert("RGB")``). Rows
+# with the None, Sub and Up filters are reconstructed with array operations;
+# Average and Paeth rows depend on their own previous pixels and take a
+# per-byte loop.
+#
+# Writing always goes through the NumPy encoder: every row uses the Up
+# filter, which suits label images (long vertical runs) and keeps the output
+# identical with or without Pillow.
+
+_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+_CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+_COLOR_TYPE = {1: 0, 2: 4, 3: 2, 4: 6}
+
+PathLike = Union[str, Path]
+
+
+def _chunks(data: bytes):
+    pos = len(_SIGNATURE)
+    while pos + 8 <= len(data):
+        length, kind = struct.unpack(">I4s", data[pos : pos + 8])
+        yield kind, data[pos + 8 : pos + 8 + length]
+        pos += 12 + length
+
+
+def _paeth_row(line: bytearray, prev: bytes, bpp: int) -> None:
+    for i in range(len(line)):
+        a = line[i - bpp] if i >= bpp else 0
+        b = prev[i]
+        c = prev[i - bpp] if i >= bpp else 0
+        p = a + b - c
+        pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+        pred = a if pa <= pb and pa <= pc else (b if pb <= pc else c)
+        line[i] = (line[i] + pred) & 0xFF
+
+
+def _average_row(line: bytearray, prev: bytes, bpp: int) -> None:
+    for i in range(len(line)):
+        a = line[i - bpp] if i >= bpp else 0
+        line[i] = (line[i] + ((a + prev[i]) >> 1)) & 0xFF
+
+
+def _unfilter(raw: bytes, h: int, stride: int, bpp: int) -> np.ndarray:
+    rows = np.frombuffer(raw, dtype=np.uint8, count=h * (stride + 1)).reshape(h, stride + 1)
+    filters = rows[:, 0]
+    out = rows[:, 1:].copy()
+    if not filters.any():
+        return out
+    zero = np.zeros(stride, dtype=np.uint8)
+    for y in np.flatnonzero(filters).tolist():
+        f = int(filters[y])
+        prev = out[y - 1] if y else zero
+        if f == 1:
+            out[y] = np.cumsum(out[y].reshape(-1, bpp), axis=0, dtype=np.uint8).reshape(-1)
+        elif f == 2:
+            out[y] += prev
+        elif f in (3, 4):
+            line = bytearray(out[y].tobytes())
+            (_average_row if f == 3 else _paeth_row)(line, prev.tobytes(), bpp)
+            out[y] = np.frombuffer(bytes(line), dtype=np.uint8)
+        else:
+            raise ValueError(f"png: invalid filter type {f}")
+    return out
+
+
+def decode_png(data: bytes) -> np.ndarray:
+    """Pixels of an 8-bit PNG as ``(h, w)`` or ``(h, w, channels)`` uint8."""
+    if data[:8] != _SIGNATURE:
+        raise ValueError("png: not a PNG file")
+    header = b""
+    palette = b""
+    idat: List[bytes] = []
+    for kind, body in _chunks(data):
+        if kind == b"IHDR":
+            header = body
+        elif kind == b"PLTE":
+            palette = body
+        elif kind == b"IDAT":
+            idat.append(body)
+        elif kind == b"IEND":
+            break
+    if len(header) != 13:
+        raise ValueError("png: missing IHDR chunk")
+    w, h, depth, color, _, _, interlace = struct.unpack(">IIBBBBB", header)
+    if depth != 8 or color not in _CHANNELS or interlace:
+        raise ValueError(f"png: unsupported image (bit depth {depth}, color type {color}, interlace {interlace})")
+    ch = _CHANNELS[color]
+    try:
+        raw = zlib.decompress(b"".join(idat))
+    except zlib.error as e:
+        raise ValueError(f"png: corrupt image data ({e})") from None
+    if len(raw) < h * (w * ch + 1):
+        raise ValueError("png: truncated image data")
+    px = _unfilter(raw, h, w * ch, ch)
+    if color == 3:
+        lut = np.frombuffer(palette, dtype=np.uint8).reshape(-1, 3)
+        return lut[px.reshape(h, w)]
+    return px.reshape(h, w) if ch == 1 else px.reshape(h, w, ch)
+
+
+def read_png(path: PathLike) -> np.ndarray:
+    if _PIL is not None:
+        with _PIL.open(path) as im:
+            if im.mode == "P":
+                im = im.convert("RGB")
+            if im.mode in ("L", "LA", "RGB", "RGBA"):
+                return np.asarray(im)
+    return decode_png(Path(path).read_bytes())
+
+
+def _chunk(kind: bytes, body: bytes) -> bytes:
+    return struct.pack(">I", len(body)) + kind + body + struct.pack(">I", zlib.crc32(kind + body) & 0xFFFFFFFF)
+
+
+def encode_png(pixels: np.ndarray, level: int = 6) -> bytes:
+    """PNG bytes of a ``(h, w)`` or ``(h, w, 1-4)`` uint8 array."""
+    a = np.asarray(pixels)
+    if a.dtype != np.uint8:
+        raise ValueError(f"png: expected uint8 pixels, got {a.dtype}")
+    if a.ndim == 2:
+        a = a[:, :, None]
+    if a.ndim != 3 or a.shape[2] not in _COLOR_TYPE:
+        raise ValueError(f"png: unsupported pixel array shape {pixels.shape}")
+    h, w, ch = a.shape
+    rows = a.reshape(h, w * ch)
+    filtered = np.empty((h, w * ch + 1), dtype=np.uint8)
+    filtered[:, 0] = 2  # Up
+    filtered[:, 1:] = rows
+    filtered[1:, 1:] -= rows[:-1]
+    header = struct.pack(">IIBBBBB", w, h, 8, _COLOR_TYPE[ch], 0, 0, 0)
+    return (
+        _SIGNATURE
+        + _chunk(b"IHDR", header)
+        + _chunk(b"IDAT", zlib.compress(filtered.tobytes(), level))
+        + _chunk(b"IEND", b"")
+    )
+
+
+def write_png(path: PathLike, pixels: np.ndarray, level: int = 6) -> None:
+    p = Path(path)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    p.write_bytes(encode_png(pixels, level))
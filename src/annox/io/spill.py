@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import sqlite3
+from typing import Iterator, List, Tuple
+
+
+class SpillIndex:
+    """Append-only on-disk multimap from integer keys to byte records.
+
+    Backed by a private temporary SQLite database (deleted on close), so the
+    resident size stays bounded by the page cache regardless of record count.
+    Records are returned in insertion order.
+    """
+
+    _BATCH = 10_000
+
+    def __init__(self) -> None:
+        # "" opens a private on-disk temporary database; it may be handed to
+        # another thread (e.g. a read-ahead reader), one user at a time
+        self._db = sqlite3.connect("", check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=OFF")
+        self._db.execute("PRAGMA synchronous=OFF")
+        self._db.execute("CREATE TABLE rec (seq INTEGER PRIMARY KEY, key INTEGER, data BLOB)")
+        self._pending: List[Tuple[int, bytes]] = []
+        self._indexed = False
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count + len(self._pending)
+
+    def add(self, key: int, record: bytes) -> None:
+        self._pending.append((key, record))
+        if len(self._pending) >= self._BATCH:
+            self._flush()
+
+    def _flush(self) -> None:
+        if self._pending:
+            self._db.executemany("INSERT INTO rec (key, data) VALUES (?, ?)", self._pending)
+            self._count += len(self._pending)
+            self._pending = []
+
+    def get(self, key: int) -> List[bytes]:
+        self._flush()
+        if not self._indexed:
+            self._db.execute("CREATE INDEX rec_key ON rec (key, seq)")
+            self._indexed = True
+        cur = self._db.execute("SELECT data FROM rec WHERE key = ? ORDER BY seq", (key,))
+        return [row[0] for row in cur]
+
+    def __iter__(self) -> Iterator[Tuple[int, bytes]]:
+        self._flush()
+        cur = self._db.execute("SELECT key, data FROM rec ORDER BY seq")
+        for key, data in cur:
+            yield key, data
+
+    def close(self) -> None:
+        self._db.close()
+
+    def __enter__(self) -> "SpillIndex":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
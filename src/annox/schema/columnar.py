@@ -0,0 +1,495 @@
+from __future__ import annotations
+
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from .dataset import (
+    Annotation,
+    BBoxAnnotation,
+    Category,
+    Dataset,
+    KeypointsAnnotation,
+    License,
+    MaskAnnotation,
+    PanopticSegmentAnnotation,
+    PolygonAnnotation,
+    SplitInfo,
+)
+from .trusted import builders
+from .versioning import SCHEMA_VERSION
+
+# Struct-of-arrays representation of a Dataset. One row per annotation; the
+# variable-length geometry lives in flat float64 buffers addressed by offsets:
+#
+#   ring_offsets[a]:ring_offsets[a+1]       polygon rings of annotation a
+#   coord_offsets[r]:coord_offsets[r+1]     xy coords of ring r in ``coords``
+#   kp_offsets[a]:kp_offsets[a+1]           x,y,v triplets of annotation a in ``kp_values``
+#
+# Rows are grouped by item: item_offsets[i]:item_offsets[i+1]. Heterogeneous
+# leftovers (attributes, RLE/PNG masks, panoptic fields) are kept sparsely in
+# ``extras`` keyed by row.
+
+KIND_BBOX = 0
+KIND_POLYGON = 1
+KIND_MASK = 2
+KIND_KEYPOINTS = 3
+KIND_PANOPTIC = 4
+
+KINDS = ("bbox", "polygon", "mask", "keypoints", "panoptic_segment")
+
+NO_CATEGORY = -1
+
+
+class ColumnarDataset:
+    def __init__(
+        self,
+        *,
+        categories: List[Category],
+        item_ids: List[str],
+        file_names: List[str],
+        widths: np.ndarray,
+        heights: np.ndarray,
+        item_offsets: np.ndarray,
+        ann_id: np.ndarray,
+        ann_item: np.ndarray,
+        ann_category: np.ndarray,
+        ann_kind: np.ndarray,
+        ann_normalized: np.ndarray,
+        bbox: np.ndarray,
+        ring_offsets: np.ndarray,
+        coord_offsets: np.ndarray,
+        ring_normalized: np.ndarray,
+        coords: np.ndarray,
+        kp_offsets: np.ndarray,
+        kp_values: np.ndarray,
+        extras: Optional[Dict[int, Dict[str, Any]]] = None,
+        licenses: Optional[List[License]] = None,
+        splits: Optional[List[SplitInfo]] = None,
+        schema_version: str = SCHEMA_VERSION,
+    ) -> None:
+        self.schema_version = schema_version
+        self.licenses = licenses or []
+        self.splits = splits or []
+        self.categories = categories
+        self.item_ids = item_ids
+        self.file_names = file_names
+        self.widths = widths
+        self.heights = heights
+        self.item_offsets = item_offsets
+        self.ann_id = ann_id
+        self.ann_item = ann_item
+        self.ann_category = ann_category
+        self.ann_kind = ann_kind
+        self.ann_normalized = ann_normalized
+        self.bbox = bbox
+        self.ring_offsets = ring_offsets
+        self.coord_offsets = coord_offsets
+        self.ring_normalized = ring_normalized
+        self.coords = coords
+        self.kp_offsets = kp_offsets
+        self.kp_values = kp_values
+        self.extras = extras or {}
+
+    def __len__(self) -> int:
+        return len(self.item_ids)
+
+    @property
+    def num_annotations(self) -> int:
+        return int(self.ann_id.shape[0])
+
+    @property
+    def nbytes(self) -> int:
+        return sum(
+            a.nbytes
+            for a in (
+                self.widths, self.heights, self.item_offsets, self.ann_id, self.ann_item,
+                self.ann_category, self.ann_kind, self.ann_normalized, self.bbox,
+                self.ring_offsets, self.coord_offsets, self.ring_normalized, self.coords,
+                self.kp_offsets, self.kp_values,
+            )
+        )
+
+    # -- pydantic views -------------------------------------------------
+
+    def annotation(self, row: int, trusted: bool = False) -> Annotation:
+        b = builders(trusted)
+        kind = int(self.ann_kind[row])
+        cat = int(self.ann_category[row])
+        extra = self.extras.get(row, {})
+        ann_id = int(self.ann_id[row])
+        cat_id = None if cat == NO_CATEGORY else cat
+        attrs = extra.get("attributes", {})
+        norm = bool(self.ann_normalized[row])
+        if kind == KIND_BBOX:
+            x, y, w, h = self.bbox[row].tolist()
+            return b.bbox(ann_id, cat_id, x, y, w, h, norm, attrs)
+        if kind == KIND_POLYGON:
+            rings = []
+            for r in range(int(self.ring_offsets[row]), int(self.ring_offsets[row + 1])):
+                pts = self.coords[self.coord_offsets[r] : self.coord_offsets[r + 1]].tolist()
+                rings.append(b.ring(pts, bool(self.ring_normalized[r])))
+            return b.polygon(ann_id, cat_id, rings, attrs)
+        if kind == KIND_KEYPOINTS:
+            pts = self.kp_values[self.kp_offsets[row] : self.kp_offsets[row + 1]].tolist()
+            return b.keypoints(ann_id, cat_id, pts, norm, attrs)
+        if kind == KIND_MASK:
+            return b.mask(ann_id, cat_id, extra.get("rle"), extra.get("png_path"), attrs)
+        box = self.bbox[row]
+        return b.panoptic(
+            ann_id,
+            cat_id,
+            extra["segment_id"],
+            extra["area"],
+            attrs,
+            None if np.isnan(box).any() else box.tolist(),
+            extra.get("rle"),
+            extra.get("png_path"),
+        )
+
+    def item(self, index: int, trusted: bool = False) -> Dataset.Item:
+        # trusted: build the pydantic views without validation
+        b = builders(trusted)
+        lo, hi = int(self.item_offsets[index]), int(self.item_offsets[index + 1])
+        image = b.image(self.file_names[index], int(self.widths[index]), int(self.heights[index]))
+        return b.item(self.item_ids[index], image, [self.annotation(r, trusted) for r in range(lo, hi)])
+
+    def iter_items(self, trusted: bool = False) -> Iterator[Dataset.Item]:
+        cmap = {c.id: c for c in self.categories}
+        for i in range(len(self)):
+            it = self.item(i, trusted)
+            it._category_map = cmap
+            yield it
+
+    def to_dataset(self, trusted: bool = False) -> Dataset:
+        return builders(trusted).dataset(
+            self.categories,
+            [self.item(i, trusted) for i in range(len(self))],
+            licenses=self.licenses,
+            splits=self.splits,
+            schema_version=self.schema_version,
+        )
+
+    @classmethod
+    def from_dataset(cls, ds: Dataset) -> "ColumnarDataset":
+        b = ColumnarBuilder(ds.categories, licenses=ds.licenses, splits=ds.splits)
+        b.schema_version = ds.schema_version
+        for it in ds.items:
+            b.add_item(it.id, it.image.file_name, it.image.width, it.image.height)
+            for ann in it.annotations:
+                b.add_annotation(ann)
+        return b.build()
+
+    def select_kinds(self, kinds: Iterable[int]) -> "ColumnarDataset":
+        """The same items with only the annotation rows of ``kinds`` (KIND_* codes)."""
+        keep = np.isin(self.ann_kind, np.fromiter(kinds, dtype=self.ann_kind.dtype))
+        if keep.all():
+            return self
+        rows = np.flatnonzero(keep)
+        ann_item = self.ann_item[rows]
+        rings = _gather(self.ring_offsets, rows)
+        coords = _gather(self.coord_offsets, rings)
+        kps = _gather(self.kp_offsets, rows)
+        extras = {int(np.searchsorted(rows, k)): v for k, v in self.extras.items() if keep[k]}
+        return ColumnarDataset(
+            schema_version=self.schema_version,
+            licenses=self.licenses,
+            splits=self.splits,
+            categories=self.categories,
+            item_ids=self.item_ids,
+            file_names=self.file_names,
+            widths=self.widths,
+            heights=self.heights,
+            item_offsets=np.searchsorted(ann_item, np.arange(len(self) + 1)).astype(np.int64),
+            ann_id=self.ann_id[rows],
+            ann_item=ann_item,
+            ann_category=self.ann_category[rows],
+            ann_kind=self.ann_kind[rows],
+            ann_normalized=self.ann_normalized[rows],
+            bbox=self.bbox[rows],
+            ring_offsets=_lengths_to_offsets(np.diff(self.ring_offsets)[rows]),
+            coord_offsets=_lengths_to_offsets(np.diff(self.coord_offsets)[rings]),
+            ring_normalized=self.ring_normalized[rings],
+            coords=self.coords[coords],
+            kp_offsets=_lengths_to_offsets(np.diff(self.kp_offsets)[rows]),
+            kp_values=self.kp_values[kps],
+            extras=extras,
+        )
+
+
+def _lengths_to_offsets(lengths: np.ndarray) -> np.ndarray:
+    return np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+
+
+def _gather(offsets: np.ndarray, segments: np.ndarray) -> np.ndarray:
+    # indices of all elements of the given segments, in order
+    lo = offsets[segments]
+    n = offsets[segments + 1] - lo
+    starts = np.repeat(lo - np.cumsum(n) + n, n)
+    return starts + np.arange(int(n.sum()), dtype=np.int64)
+
+
+def _int(v: Any) -> int:
+    if isinstance(v, bool) or not isinstance(v, (int, float)) or v != int(v):
+        raise TypeError(f"expected an integer, got {v!r}")
+    return int(v)
+
+
+def _num(v: Any) -> float:
+    if isinstance(v, bool) or not isinstance(v, (int, float)):
+        raise TypeError(f"expected a number, got {v!r}")
+    return float(v)
+
+
+class ColumnarBuilder:
+    """Append-only filler for ColumnarDataset.
+
+    Items are added in order; annotations attach to the most recently added
+    item. Nothing is validated here; see ``annox.core.validate`` for checks.
+    """
+
+    def __init__(
+        self,
+        categories: Sequence[Category] = (),
+        licenses: Sequence[License] = (),
+        splits: Sequence[SplitInfo] = (),
+    ) -> None:
+        self.schema_version = SCHEMA_VERSION
+        self.categories = list(categories)
+        self.licenses = list(licenses)
+        self.splits = list(splits)
+        self.item_ids: List[str] = []
+        self.file_names: List[str] = []
+        self._widths = array("q")
+        self._heights = array("q")
+        self._item_offsets = array("q", [0])
+        self._ann_id = array("q")
+        self._ann_item = array("q")
+        self._ann_category = array("q")
+        self._ann_kind = array("B")
+        self._ann_normalized = array("B")
+        self._bbox = array("d")
+        self._ring_offsets = array("q", [0])
+        self._coord_offsets = array("q", [0])
+        self._ring_normalized = array("B")
+        self._coords = array("d")
+        self._kp_offsets = array("q", [0])
+        self._kp_values = array("d")
+        self._extras: Dict[int, Dict[str, Any]] = {}
+
+    def add_item(self, item_id: str, file_name: str, width: int, height: int) -> int:
+        self.item_ids.append(item_id)
+        self.file_names.append(file_name)
+        self._widths.append(width)
+        self._heights.append(height)
+        self._item_offsets.append(self._item_offsets[-1])
+        return len(self.item_ids) - 1
+
+    def _row(
+        self,
+        kind: int,
+        ann_id: int,
+        category_id: Optional[int],
+        normalized: bool,
+        attributes: Optional[Dict[str, Any]],
+    ) -> int:
+        if not self.item_ids:
+            raise ValueError("add_item must be called before adding annotations")
+        row = len(self._ann_id)
+        self._ann_id.append(ann_id)
+        self._ann_item.append(len(self.item_ids) - 1)
+        self._ann_category.append(NO_CATEGORY if category_id is None else category_id)
+        self._ann_kind.append(kind)
+        self._ann_normalized.append(normalized)
+        self._item_offsets[-1] = row + 1
+        if kind != KIND_BBOX:
+            self._bbox.extend((np.nan, np.nan, np.nan, np.nan))
+        if kind != KIND_POLYGON:
+            self._ring_offsets.append(self._ring_offsets[-1])
+        if kind != KIND_KEYPOINTS:
+            self._kp_offsets.append(self._kp_offsets[-1])
+        if attributes:
+            self._extras[row] = {"attributes": attributes}
+        return row
+
+    def _extra(self, row: int) -> Dict[str, Any]:
+        return self._extras.setdefault(row, {})
+
+    def add_bbox(
+        self,
+        ann_id: int,
+        category_id: Optional[int],
+        x: float,
+        y: float,
+        w: float,
+        h: float,
+        normalized: bool = False,
+        attributes: Optional[Dict[str, Any]] = None,
+    ) -> int:
+        row = self._row(KIND_BBOX, ann_id, category_id, normalized, attributes)
+        self._bbox.extend((x, y, w, h))
+        return row
+
+    def add_polygon(
+        self,
+        ann_id: int,
+        category_id: Optional[int],
+        rings: Sequence[Sequence[float]],
+        normalized: bool = False,
+        attributes: Optional[Dict[str, Any]] = None,
+        ring_normalized: Optional[Sequence[bool]] = None,
+    ) -> int:
+        row = self._row(KIND_POLYGON, ann_id, category_id, normalized, attributes)
+        flags = ring_normalized if ring_normalized is not None else [normalized] * len(rings)
+        for pts, norm in zip(rings, flags):
+            self._coords.extend(pts)
+            self._coord_offsets.append(len(self._coords))
+            self._ring_normalized.append(norm)
+        self._ring_offsets.append(len(self._ring_normalized))
+        return row
+
+    def add_keypoints(
+        self,
+        ann_id: int,
+        category_id: Optional[int],
+        points: Sequence[float],
+        normalized: bool = False,
+        attributes: Optional[Dict[str, Any]] = None,
+    ) -> int:
+        row = self._row(KIND_KEYPOINTS, ann_id, category_id, normalized, attributes)
+        self._kp_values.extend(points)
+        self._kp_offsets.append(len(self._kp_values))
+        return row
+
+    def add_mask(
+        self,
+        ann_id: int,
+        category_id: Optional[int],
+        rle: Any = None,
+        png_path: Optional[str] = None,
+        attributes: Optional[Dict[str, Any]] = None,
+    ) -> int:
+        row = self._row(KIND_MASK, ann_id, category_id, False, attributes)
+        extra = self._extra(row)
+        if rle is not None:
+            extra["rle"] = rle
+        if png_path is not None:
+            extra["png_path"] = png_path
+        return row
+
+    def add_panoptic(
+        self,
+        ann_id: int,
+        category_id: int,
+        segment_id: int,
+        area: int,
+        attributes: Optional[Dict[str, Any]] = None,
+        bbox: Optional[Sequence[float]] = None,
+        rle: Any = None,
+        png_path: Optional[str] = None,
+    ) -> int:
+        # bbox ([x, y, w, h] pixels) goes to the bbox column
+        row = self._row(KIND_PANOPTIC, ann_id, category_id, False, attributes)
+        if bbox is not None:
+            self._bbox[-4:] = array("d", map(float, bbox))
+        extra = self._extra(row)
+        extra.update(segment_id=segment_id, area=area)
+        if rle is not None:
+            extra["rle"] = rle
+        if png_path is not None:
+            extra["png_path"] = png_path
+        return row
+
+    def add_annotation(self, ann: Annotation) -> int:
+        attrs = ann.attributes
+        if isinstance(ann, BBoxAnnotation):
+            b = ann.bbox
+            return self.add_bbox(ann.id, ann.category_id, b.x, b.y, b.w, b.h, b.normalized, attrs)
+        if isinstance(ann, PolygonAnnotation):
+            rings = [p.points for p in ann.polygons]
+            flags = [p.normalized for p in ann.polygons]
+            return self.add_polygon(ann.id, ann.category_id, rings, False, attrs, flags)
+        if isinstance(ann, KeypointsAnnotation):
+            kp = ann.keypoints
+            return self.add_keypoints(ann.id, ann.category_id, kp.points, kp.normalized, attrs)
+        if isinstance(ann, MaskAnnotation):
+            return self.add_mask(ann.id, ann.category_id, ann.rle, ann.png_path, attrs)
+        if isinstance(ann, PanopticSegmentAnnotation):
+            box = None if ann.bbox is None else (ann.bbox.x, ann.bbox.y, ann.bbox.w, ann.bbox.h)
+            return self.add_panoptic(
+                ann.id, ann.category_id, ann.segment_id, ann.area, attrs, box, ann.rle, ann.png_path
+            )
+        raise TypeError(f"unsupported annotation type: {type(ann).__name__}")
+
+    def add_item_obj(self, obj: Dict[str, Any]) -> int:
+        # Fill from the JSON form of a Dataset.Item without building models.
+        # Structural problems raise (KeyError/TypeError/ValueError); value
+        # checks are left to the bulk validator.
+        im = obj["image"]
+        item_id = obj["id"]
+        if not isinstance(item_id, str) or not isinstance(im["file_name"], str):
+            raise TypeError("item id and image.file_name must be strings")
+        index = self.add_item(item_id, im["file_name"], _int(im["width"]), _int(im["height"]))
+        for a in obj.get("annotations", ()):
+            kind = a.get("type")
+            ann_id = _int(a["id"])
+            cat = a.get("category_id")
+            if cat is not None:
+                cat = _int(cat)
+            attrs = a.get("attributes") or None
+            if kind == "bbox":
+                b = a["bbox"]
+                self.add_bbox(
+                    ann_id, cat, _num(b["x"]), _num(b["y"]), _num(b["w"]), _num(b["h"]),
+                    bool(b.get("normalized", False)), attrs,
+                )
+            elif kind == "polygon":
+                polys = a["polygons"]
+                rings = [p["points"] for p in polys]
+                flags = [bool(p.get("normalized", False)) for p in polys]
+                self.add_polygon(ann_id, cat, rings, False, attrs, flags)
+            elif kind == "keypoints":
+                kp = a["keypoints"]
+                self.add_keypoints(ann_id, cat, kp["points"], bool(kp.get("normalized", False)), attrs)
+            elif kind == "mask":
+                self.add_mask(ann_id, cat, a.get("rle"), a.get("png_path"), attrs)
+            elif kind == "panoptic_segment":
+                b = a.get("bbox")
+                box = None if b is None else (_num(b["x"]), _num(b["y"]), _num(b["w"]), _num(b["h"]))
+                self.add_panoptic(
+                    ann_id, _int(a["category_id"]), _int(a["segment_id"]), _int(a["area"]), attrs,
+                    box, a.get("rle"), a.get("png_path"),
+                )
+            else:
+                raise ValueError(f"unknown annotation type: {kind!r}")
+        return index
+
+    def build(self) -> ColumnarDataset:
+        def arr(a: array, dtype: Any) -> np.ndarray:
+            return np.frombuffer(a, dtype=dtype).copy() if len(a) else np.zeros(0, dtype=dtype)
+
+        return ColumnarDataset(
+            schema_version=self.schema_version,
+            licenses=self.licenses,
+            splits=self.splits,
+            categories=self.categories,
+            item_ids=self.item_ids,
+            file_names=self.file_names,
+            widths=arr(self._widths, np.int64),
+            heights=arr(self._heights, np.int64),
+            item_offsets=arr(self._item_offsets, np.int64),
+            ann_id=arr(self._ann_id, np.int64),
+            ann_item=arr(self._ann_item, np.int64),
+            ann_category=arr(self._ann_category, np.int64),
+            ann_kind=arr(self._ann_kind, np.uint8),
+            ann_normalized=arr(self._ann_normalized, np.uint8).astype(bool),
+            bbox=arr(self._bbox, np.float64).reshape(-1, 4),
+            ring_offsets=arr(self._ring_offsets, np.int64),
+            coord_offsets=arr(self._coord_offsets, np.int64),
+            ring_normalized=arr(self._ring_normalized, np.uint8).astype(bool),
+            coords=arr(self._coords, np.float64),
+            kp_offsets=arr(self._kp_offsets, np.int64),
+            kp_values=arr(self._kp_values, np.float64),
+            extras=self._extras,
+        )
@@ -24,6 +24,9 @@ class Category(BaseModel):
     supercategory: Optional[str] = None
     keypoint_names: Optional[List[str]] = None
     skeleton: Optional[List[List[int]]] = None
+    # panoptic: thing (countable) or stuff class, and its display color
+    isthing: Optional[bool] = None
+    color: Optional[List[int]] = None
 
     @model_validator(mode="after")
     def _check(self):
@@ -80,6 +83,24 @@ class MaskAnnotation(AnnotationBase):
             raise ValueError("mask must have rle or png_path")
         return self
 
+    def load_mask(self, root: Optional[str] = None, cache: Any = None) -> Any:
+        """Dense ``(h, w)`` uint8 mask; a PNG is decoded once into the shared
+        mask cache (annox.io.maskcache) and the array is read-only."""
+        from annox.io import maskio
+        from annox.io.maskcache import MaskCache, resolve
+
+        if self.rle is not None:
+            return maskio.decode(self.rle)
+        return (cache or MaskCache.default()).get(resolve(self.png_path, root))
+
+    def load_rle(self, root: Optional[str] = None, cache: Any = None) -> Dict[str, Any]:
+        """Mask as an RLE dict; a PNG is decoded straight to RLE and cached."""
+        from annox.io.maskcache import MaskCache, resolve
+
+        if self.rle is not None:
+            return {"counts": self.rle.counts, "size": list(self.rle.size)}
+        return (cache or MaskCache.default()).get(resolve(self.png_path, root), as_rle=True)
+
 
 class KeypointsAnnotation(AnnotationBase):
     type: Literal["keypoints"] = "keypoints"
@@ -103,10 +124,14 @@ class KeypointsAnnotation(AnnotationBase):
 
 class PanopticSegmentAnnotation(AnnotationBase):
     type: Literal["panoptic_segment"] = "panoptic_segment"
-    # kept minimal for bootstrap; detailed structure in panoptic module
+    # one segment of an image's segment-id PNG (png_path); rle is the
+    # segment's own mask when decoded (see annox.core.panoptic)
     segment_id: int
     category_id: int
     area: int
+    bbox: Optional[BBox] = None
+    rle: Optional[RLE] = None
+    png_path: Optional[str] = None
 
 
 Annotation = BBoxAnnotation | PolygonAnnotation | MaskAnnotation | KeypointsAnnotation | PanopticSegmentAnnotation
@@ -133,3 +158,25 @@ class Dataset(BaseModel):
             it._category_map = cmap
         return self
 
+    def spatial_index(self) -> Any:
+        """Bounds and per-item R-trees over all annotations (``annox.core.spatial.DatasetIndex``)."""
+        from annox.core.spatial import DatasetIndex
+
+        from .columnar import ColumnarDataset
+
+        return DatasetIndex(ColumnarDataset.from_dataset(self))
+
+    def find_duplicates(self, iou: float = 0.9) -> List[Any]:
+        """``(item_id, ann_id, duplicate_ann_id, iou)`` for near-duplicate annotations."""
+        return self.spatial_index().duplicates(iou)
+
+    def validate_bulk(self, **checks: Any) -> List[Any]:
+        """Dataset checks over whole columns (``annox.core.validate.validate_columnar``).
+
+        The way to validate items built without validation (``annox.schema.trusted``).
+        """
+        from annox.core.validate import validate_columnar
+
+        from .columnar import ColumnarDataset
+
+        return validate_columnar(ColumnarDataset.from_dataset(self), **checks)
@@ -0,0 +1,319 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Type, TypeVar
+
+from pydantic import BaseModel
+
+from .dataset import (
+    Annotation,
+    BBoxAnnotation,
+    Category,
+    Dataset,
+    Image,
+    KeypointsAnnotation,
+    License,
+    MaskAnnotation,
+    PanopticSegmentAnnotation,
+    PolygonAnnotation,
+    SplitInfo,
+)
+from .geometry import RLE, BBox, Keypoints, Polygon
+from .versioning import SCHEMA_VERSION
+
+# Schema object builders, validated or trusted.
+#
+# Adapters build through ``builders(trusted)`` so one code path serves both:
+#
+#   VALIDATED   the pydantic constructors (every field and model validator)
+#   TRUSTED     instances assembled directly, for data known to be valid, e.g.
+#               read back from annox's own exports. Nothing is checked.
+#
+# Trusted instances are set up the way ``BaseModel.model_construct`` does it
+# (``__dict__``, fields set, no extra, private attributes), without its
+# per-field Python loop, which makes ``model_construct`` slower than full
+# validation in pydantic 2. Validate trusted data afterwards in bulk with
+# ``Dataset.validate_bulk``.
+
+M = TypeVar("M", bound=BaseModel)
+
+_new = object.__new__
+_set = object.__setattr__
+
+
+def _make(cls: Type[M], values: Dict[str, Any], private: Optional[Dict[str, Any]] = None) -> M:
+    obj = _new(cls)
+    _set(obj, "__dict__", values)
+    _set(obj, "__pydantic_fields_set__", set(values))
+    _set(obj, "__pydantic_extra__", None)
+    _set(obj, "__pydantic_private__", private)
+    return obj
+
+
+def _rle(rle: Any) -> Optional[RLE]:
+    if isinstance(rle, dict):
+        size: Tuple[int, int] = tuple(rle.get("size", (0, 0)))  # type: ignore[assignment]
+        return _make(RLE, {"counts": rle.get("counts"), "size": size})
+    return rle
+
+
+class Builders:
+    """Validated builders (pydantic constructors)."""
+
+    trusted = False
+
+    def image(self, file_name: str, width: int, height: int) -> Image:
+        return Image(file_name=file_name, width=width, height=height)
+
+    def item(self, item_id: str, image: Image, annotations: Optional[List[Annotation]] = None) -> Dataset.Item:
+        return Dataset.Item(id=item_id, image=image, annotations=annotations if annotations is not None else [])
+
+    def ring(self, points: List[float], normalized: bool = False) -> Polygon:
+        return Polygon(points=points, normalized=normalized)
+
+    def bbox(
+        self,
+        ann_id: int,
+        category_id: Optional[int],
+        x: float,
+        y: float,
+        w: float,
+        h: float,
+        normalized: bool = False,
+        attributes: Optional[Dict[str, Any]] = None,
+    ) -> BBoxAnnotation:
+        return BBoxAnnotation(
+            id=ann_id,
+            category_id=category_id,
+            attributes=attributes or {},
+            bbox=BBox(x=x, y=y, w=w, h=h, normalized=normalized),
+        )
+
+    def polygon(
+        self,
+        ann_id: int,
+        category_id: Optional[int],
+        rings: List[Polygon],
+        attributes: Optional[Dict[str, Any]] = None,
+    ) -> PolygonAnnotation:
+        return PolygonAnnotation(id=ann_id, category_id=category_id, attributes=attributes or {}, polygons=rings)
+
+    def keypoints(
+        self,
+        ann_id: int,
+        category_id: Optional[int],
+        points: List[float],
+        normalized: bool = False,
+        attributes: Optional[Dict[str, Any]] = None,
+    ) -> KeypointsAnnotation:
+        return KeypointsAnnotation(
+            id=ann_id,
+            category_id=category_id,
+            attributes=attributes or {},
+            keypoints=Keypoints(points=points, normalized=normalized),
+        )
+
+    def mask(
+        self,
+        ann_id: int,
+        category_id: Optional[int],
+        rle: Any = None,
+        png_path: Optional[str] = None,
+        attributes: Optional[Dict[str, Any]] = None,
+    ) -> MaskAnnotation:
+        # rle: an RLE or a {"counts", "size"} mapping
+        return MaskAnnotation(
+            id=ann_id, category_id=category_id, attributes=attributes or {}, rle=rle, png_path=png_path
+        )
+
+    def panoptic(
+        self,
+        ann_id: int,
+        category_id: int,
+        segment_id: int,
+        area: int,
+        attributes: Optional[Dict[str, Any]] = None,
+        bbox: Optional[Sequence[float]] = None,
+        rle: Any = None,
+        png_path: Optional[str] = None,
+    ) -> PanopticSegmentAnnotation:
+        # bbox: [x, y, w, h] in pixels
+        return PanopticSegmentAnnotation(
+            id=ann_id,
+            category_id=category_id,
+            attributes=attributes or {},
+            segment_id=segment_id,
+            area=area,
+            bbox=None if bbox is None else BBox(x=bbox[0], y=bbox[1], w=bbox[2], h=bbox[3]),
+            rle=rle,
+            png_path=png_path,
+        )
+
+    def dataset(
+        self,
+        categories: Sequence[Category],
+        items: List[Dataset.Item],
+        licenses: Sequence[License] = (),
+        splits: Sequence[SplitInfo] = (),
+        schema_version: str = SCHEMA_VERSION,
+    ) -> Dataset:
+        return Dataset(
+            schema_version=schema_version,
+            licenses=list(licenses),
+            splits=list(splits),
+            categories=list(categories),
+            items=items,
+        )
+
+
+class TrustedBuilders(Builders):
+    """Same objects as ``Builders``, without validation."""
+
+    trusted = True
+
+    def image(self, file_name: str, width: int, height: int) -> Image:
+        return _make(Image, {"file_name": file_name, "width": width, "height": height})
+
+    def item(self, item_id: str, image: Image, annotations: Optional[List[Annotation]] = None) -> Dataset.Item:
+        return _make(
+            Dataset.Item,
+            {"id": item_id, "image": image, "annotations": annotations if annotations is not None else []},
+            {"_category_map": None},
+        )
+
+    def ring(self, points: List[float], normalized: bool = False) -> Polygon:
+        return _make(Polygon, {"points": points, "normalized": normalized})
+
+    def bbox(
+        self,
+        ann_id: int,
+        category_id: Optional[int],
+        x: float,
+        y: float,
+        w: float,
+        h: float,
+        normalized: bool = False,
+        attributes: Optional[Dict[str, Any]] = None,
+    ) -> BBoxAnnotation:
+        box = _make(BBox, {"x": x, "y": y, "w": w, "h": h, "normalized": normalized})
+        return _make(
+            BBoxAnnotation,
+            {"id": ann_id, "category_id": category_id, "attributes": attributes or {}, "type": "bbox", "bbox": box},
+        )
+
+    def polygon(
+        self,
+        ann_id: int,
+        category_id: Optional[int],
+        rings: List[Polygon],
+        attributes: Optional[Dict[str, Any]] = None,
+    ) -> PolygonAnnotation:
+        return _make(
+            PolygonAnnotation,
+            {
+                "id": ann_id,
+                "category_id": category_id,
+                "attributes": attributes or {},
+                "type": "polygon",
+                "polygons": rings,
+            },
+        )
+
+    def keypoints(
+        self,
+        ann_id: int,
+        category_id: Optional[int],
+        points: List[float],
+        normalized: bool = False,
+        attributes: Optional[Dict[str, Any]] = None,
+    ) -> KeypointsAnnotation:
+        kp = _make(Keypoints, {"points": points, "normalized": normalized})
+        return _make(
+            KeypointsAnnotation,
+            {
+                "id": ann_id,
+                "category_id": category_id,
+                "attributes": attributes or {},
+                "type": "keypoints",
+                "keypoints": kp,
+            },
+        )
+
+    def mask(
+        self,
+        ann_id: int,
+        category_id: Optional[int],
+        rle: Any = None,
+        png_path: Optional[str] = None,
+        attributes: Optional[Dict[str, Any]] = None,
+    ) -> MaskAnnotation:
+        return _make(
+            MaskAnnotation,
+            {
+                "id": ann_id,
+                "category_id": category_id,
+                "attributes": attributes or {},
+                "type": "mask",
+                "rle": _rle(rle),
+                "png_path": png_path,
+            },
+        )
+
+    def panoptic(
+        self,
+        ann_id: int,
+        category_id: int,
+        segment_id: int,
+        area: int,
+        attributes: Optional[Dict[str, Any]] = None,
+        bbox: Optional[Sequence[float]] = None,
+        rle: Any = None,
+        png_path: Optional[str] = None,
+    ) -> PanopticSegmentAnnotation:
+        if bbox is not None:
+            x, y, w, h = map(float, bbox)
+            bbox = _make(BBox, {"x": x, "y": y, "w": w, "h": h, "normalized": False})
+        return _make(
+            PanopticSegmentAnnotation,
+            {
+                "id": ann_id,
+                "category_id": category_id,
+                "attributes": attributes or {},
+                "type": "panoptic_segment",
+                "segment_id": segment_id,
+                "area": area,
+                "bbox": bbox,
+                "rle": _rle(rle),
+                "png_path": png_path,
+            },
+        )
+
+    def dataset(
+        self,
+        categories: Sequence[Category],
+        items: List[Dataset.Item],
+        licenses: Sequence[License] = (),
+        splits: Sequence[SplitInfo] = (),
+        schema_version: str = SCHEMA_VERSION,
+    ) -> Dataset:
+        ds = _make(
+            Dataset,
+            {
+                "schema_version": schema_version,
+                "licenses": list(licenses),
+                "splits": list(splits),
+                "categories": list(categories),
+                "items": items,
+            },
+        )
+        cmap = {c.id: c for c in ds.categories}
+        for it in items:
+            it._category_map = cmap
+        return ds
+
+
+VALIDATED = Builders()
+TRUSTED = TrustedBuilders()
+
+
+def builders(trusted: bool = False) -> Builders:
+    return TRUSTED if trusted else VALIDATED
@@ -0,0 +1,71 @@
+import pytest
+
+from annox.adapters.annoxbin.annoxbin import AnnoxBinAdapter, read_columnar
+from annox.adapters.base import BaseAdapter
+from annox.schema.dataset import Category, Dataset
+
+
+def _dataset():
+    return Dataset.model_validate(
+        {
+            "licenses": [{"name": "CC-BY-4.0", "url": "https://creativecommons.org/licenses/by/4.0/"}],
+            "splits": [{"name": "train", "description": "all items"}],
+            "categories": [
+                {"id": 1, "name": "person", "keypoint_names": ["a", "b"], "skeleton": [[0, 1]]},
+                {"id": 2, "name": "box"},
+            ],
+            "items": [
+                {
+                    "id": "x",
+                    "image": {"file_name": "x.jpg", "width": 20, "height": 10},
+                    "annotations": [
+                        {"type": "bbox", "id": 1, "category_id": 2, "bbox": {"x": 1, "y": 2, "w": 3, "h": 4},
+                         "attributes": {"occluded": True}},
+                        {"type": "polygon", "id": 2, "category_id": 2,
+                         "polygons": [{"points": [0, 0, 4, 0, 4, 4]}, {"points": [0.1, 0.1, 0.5, 0.1, 0.5, 0.5], "normalized": True}]},
+                        {"type": "keypoints", "id": 3, "category_id": 1, "keypoints": {"points": [1, 2, 2, 3, 4, 1]}},
+                        {"type": "mask", "id": 4, "category_id": 2, "rle": {"counts": [5, 10, 185], "size": [10, 20]}},
+                        {"type": "mask", "id": 5, "category_id": 2, "rle": {"counts": "52=0g5", "size": [10, 20]}},
+                        {"type": "mask", "id": 6, "category_id": 2, "png_path": "m.png"},
+                    ],
+                },
+                {"id": "y", "image": {"file_name": "y.jpg", "width": 5, "height": 5}},
+            ],
+        }
+    )
+
+
+def test_annoxbin_roundtrip(tmp_path):
+    ds = _dataset()
+    out = tmp_path / "ds.annoxbin"
+    ad = AnnoxBinAdapter()
+    ad.dump(ds, str(out))
+    back = ad.load(str(out))
+    assert back.model_dump() == ds.model_dump()
+
+    cd = read_columnar(str(out))
+    assert not cd.bbox.flags.writeable  # mapped, not copied
+    st = ad.stream(str(out))
+    assert st.licenses == ds.licenses and st.splits == ds.splits
+    assert [it.id for it in st.items] == ["x", "y"]
+
+    out2 = tmp_path / "ds2.annoxbin"
+    ad.dump_stream(ad.stream(str(out)), str(out2))
+    assert out2.read_bytes() == out.read_bytes()
+
+    # the default dump_stream of adapters without a streaming writer
+    class Memory(BaseAdapter):
+        def dump(self, dataset, path):
+            self.dumped = dataset
+
+    mem = Memory()
+    mem.dump_stream(ad.stream(str(out)), "unused")
+    assert mem.dumped.model_dump() == ds.model_dump()
+
+
+def test_annoxbin_rejects_other_major_version(tmp_path):
+    ds = Dataset(schema_version="2.0.0", categories=[Category(id=1, name="a")])
+    out = tmp_path / "v2.annoxbin"
+    AnnoxBinAdapter().dump(ds, str(out))
+    with pytest.raises(ValueError, match="incompatible"):
+        read_columnar(str(out))
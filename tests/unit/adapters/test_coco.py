@@ -55,3 +55,65 @@ def test_coco_roundtrip_minimal(tmp_path):
     assert len(cc["annotations"]) == 3
     assert len(cc["categories"]) == 2
 
+
+
+def test_coco_stream_matches_load_ungrouped(tmp_path):
+    coco = {
+        "info": {"description": "x", "nested": [[1], {"a": "]"}]},
+        "categories": [{"id": 1, "name": "a"}],
+        "images": [
+            {"id": 1, "file_name": "a.jpg", "width": 10, "height": 10},
+            {"id": 2, "file_name": "b.jpg", "width": 10, "height": 10},
+        ],
+        "annotations": [
+            {"id": 1, "image_id": 2, "category_id": 1, "bbox": [1, 1, 2, 2]},
+            {"id": 2, "image_id": 1, "category_id": 1, "bbox": [0, 0, 1, 1]},
+            {"id": 3, "image_id": 2, "category_id": 1, "segmentation": [[0, 0, 4, 0, 4, 4]]},
+            {"id": 4, "image_id": 9, "category_id": 1, "bbox": [0, 0, 1, 1]},
+        ],
+    }
+    src = write_json(tmp_path, "coco.json", coco)
+
+    ad = COCOAdapter()
+    ds = ad.load(str(src))
+    st = ad.stream(str(src))
+    assert [c.name for c in st.categories] == ["a"]
+    items = list(st.items)
+    assert [it.model_dump() for it in items] == [it.model_dump() for it in ds.items]
+    assert [len(it.annotations) for it in items] == [1, 2]
+
+
+def test_coco_dump_stream_matches_dump(tmp_path):
+    from annox.adapters.base import DatasetStream
+
+    coco = {
+        "categories": [{"id": 1, "name": "a"}],
+        "images": [
+            {"id": 1, "file_name": "a.jpg", "width": 10, "height": 10},
+            {"id": 2, "file_name": "b.jpg", "width": 10, "height": 10},
+            {"id": 3, "file_name": "c.jpg", "width": 10, "height": 10},
+        ],
+        "annotations": [
+            {"id": 1, "image_id": 1, "category_id": 1, "bbox": [1, 1, 2, 2]},
+            {"id": 2, "image_id": 3, "category_id": 1, "segmentation": [[0, 0, 4, 0, 4, 4]]},
+        ],
+    }
+    src = write_json(tmp_path, "coco.json", coco)
+    ad = COCOAdapter()
+    ds = ad.load(str(src))
+    ad.dump(ds, str(tmp_path / "a.json"))
+    ad.dump_stream(ad.stream(str(src)), str(tmp_path / "b.json"))
+    assert (tmp_path / "a.json").read_bytes() == (tmp_path / "b.json").read_bytes()
+    assert [a["image_id"] for a in load_json(tmp_path / "b.json")["annotations"]] == [1, 3]
+
+    def failing():
+        yield ds.items[0]
+        raise RuntimeError("boom")
+
+    out = tmp_path / "c.json"
+    try:
+        ad.dump_stream(DatasetStream(categories=ds.categories, items=failing()), str(out))
+    except RuntimeError:
+        pass
+    assert not out.exists()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.json", "b.json", "coco.json"]
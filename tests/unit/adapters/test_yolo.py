@@ -0,0 +1,96 @@
+import struct
+import zlib
+
+import pytest
+
+from annox.adapters.yolo import yolo
+from annox.adapters.yolo.yolo import YOLOAdapter
+from annox.schema.dataset import Dataset
+
+
+@pytest.fixture(autouse=True)
+def _cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("ANNOX_CACHE_DIR", str(tmp_path / "cache"))
+
+
+def _png(path, w, h):
+    ihdr = struct.pack(">IIBBBBB", w, h, 8, 2, 0, 0, 0)
+    chunk = struct.pack(">I", 13) + b"IHDR" + ihdr + struct.pack(">I", zlib.crc32(b"IHDR" + ihdr))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"\x89PNG\r\n\x1a\n" + chunk)
+
+
+def test_yolo_load_detect_and_segment(tmp_path):
+    root = tmp_path / "ds"
+    _png(root / "images" / "train" / "1.png", 100, 50)
+    _png(root / "images" / "train" / "2.png", 10, 10)
+    _png(root / "images" / "val" / "3.png", 10, 10)
+    (root / "labels" / "train").mkdir(parents=True)
+    (root / "labels" / "train" / "1.txt").write_text("0 0.5 0.5 0.2 0.4\n\n1 0.1 0.2 0.5 0.2 0.5 0.6")
+    cfg = "# comment\npath: .\ntrain: images/train\nval: images/val\nnames:\n  0: person\n  1: 'car'  # note\n"
+    (root / "data.yaml").write_text(cfg)
+    assert yolo._parse_yaml(cfg) == {
+        "path": ".", "train": "images/train", "val": "images/val", "names": {0: "person", 1: "car"}
+    }
+    ds = YOLOAdapter(workers=2).load(str(root))
+    assert [c.name for c in ds.categories] == ["person", "car"]
+    assert [s.name for s in ds.splits] == ["train", "val"]
+    assert [it.id for it in ds.items] == ["images/train/1", "images/train/2", "images/val/3"]
+    a, b = ds.items[0].annotations
+    assert (a.bbox.x, a.bbox.y, a.bbox.w, a.bbox.h) == pytest.approx((40, 15, 20, 20))
+    assert b.polygons[0].points == pytest.approx([10, 10, 50, 10, 50, 30])
+    assert ds.items[1].annotations == []
+
+    # the same file name in another split is another item
+    _png(root / "images" / "val" / "1.png", 10, 10)
+    ids = [it.id for it in YOLOAdapter().load(str(root)).items]
+    assert len(set(ids)) == 4 and "images/val/1" in ids
+
+    (root / "labels" / "train" / "2.txt").write_text("0 0.5 0.5\n")
+    with pytest.raises(ValueError, match="2.txt:1"):
+        YOLOAdapter().load(str(root))
+
+
+def test_yolo_pose_roundtrip(tmp_path):
+    ds = Dataset.model_validate(
+        {
+            "categories": [{"id": 1, "name": "person", "keypoint_names": ["a", "b"]}],
+            "items": [
+                {
+                    "id": "7",
+                    "image": {"file_name": "7.png", "width": 200, "height": 100},
+                    "annotations": [
+                        {"type": "bbox", "id": 1, "category_id": 1, "bbox": {"x": 10, "y": 20, "w": 100, "h": 50}},
+                        {"type": "keypoints", "id": 2, "category_id": 1, "keypoints": {"points": [20, 30, 2, 0, 0, 0]}},
+                    ],
+                }
+            ],
+        }
+    )
+    out = tmp_path / "out"
+    YOLOAdapter().dump(ds, str(out))
+    assert (out / "labels" / "7.txt").read_text() == "0 0.3 0.45 0.5 0.5 0.1 0.3 2 0 0 0\n"
+    cfg = yolo._parse_yaml((out / "data.yaml").read_text())
+    assert cfg["names"] == {0: "person"} and cfg["kpt_shape"] == [2, 3]
+
+    _png(out / "images" / "7.png", 200, 100)
+    back = YOLOAdapter().load(str(out))
+    box, kp = back.items[0].annotations
+    assert (box.bbox.x, box.bbox.y, box.bbox.w, box.bbox.h) == pytest.approx((10, 20, 100, 50))
+    assert kp.keypoints.points == pytest.approx([20, 30, 2, 0, 0, 0])
+
+
+def test_yolo_load_without_label_rows_and_from_relative_root(tmp_path, monkeypatch):
+    _png(tmp_path / "images" / "a.png", 10, 10)
+    _png(tmp_path / "images" / "b.png", 20, 10)
+    (tmp_path / "labels").mkdir()
+    (tmp_path / "labels" / "a.txt").write_text("")  # negative image
+    ds = YOLOAdapter().load(str(tmp_path))
+    assert [it.id for it in ds.items] == ["images/a", "images/b"]
+    assert all(it.annotations == [] for it in ds.items)
+
+    (tmp_path / "labels" / "b.txt").write_text("0 0.5 0.5 0.5 0.5\n")
+    monkeypatch.chdir(tmp_path)
+    assert yolo.label_path("images/b.png") == "labels/b.txt"
+    ds = YOLOAdapter().load(".")
+    assert [len(it.annotations) for it in ds.items] == [0, 1]
@@ -0,0 +1,51 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+SRC = str(Path(__file__).resolve().parents[2] / "src")
+
+_PROBE = """
+import sys
+sys.path.insert(0, {src!r})
+from annox.cli import main
+main.build_parser()
+try:
+    main.main(["--help"])
+except SystemExit:
+    pass
+heavy = [m for m in ("numpy", "pydantic", "orjson", "importlib.metadata") if m in sys.modules]
+print("heavy:" + ",".join(heavy))
+"""
+
+
+def test_help_does_not_import_heavy_modules():
+    # guards startup time: subcommand dependencies load only when a command runs
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(src=SRC)], capture_output=True, text=True, check=True
+    )
+    assert out.stdout.strip().splitlines()[-1] == "heavy:"
+
+
+_LIST_PROBE = """
+import sys
+sys.path.insert(0, {src!r})
+from annox.cli import main
+main.main(["list-formats"])
+heavy = [m for m in ("numpy", "pydantic", "sqlite3", "annox.adapters", "importlib.metadata") if m in sys.modules]
+print("heavy:" + ",".join(heavy))
+"""
+
+
+def test_list_formats_reads_capabilities_from_the_index(tmp_path):
+    # a distribution exposing the coco adapter, found through PYTHONPATH
+    dist = tmp_path / "site" / "annox_demo-0.0.dist-info"
+    dist.mkdir(parents=True)
+    (dist / "METADATA").write_text("Metadata-Version: 2.1\nName: annox-demo\nVersion: 0.0\n")
+    (dist / "entry_points.txt").write_text("[annox.adapters]\ndemo = annox.adapters.coco.coco:COCOAdapter\n")
+    env = dict(os.environ, ANNOX_CACHE_DIR=str(tmp_path / "cache"), PYTHONPATH=str(tmp_path / "site"))
+    cmd = [sys.executable, "-c", _LIST_PROBE.format(src=SRC)]
+    first = subprocess.run(cmd, env=env, capture_output=True, text=True, check=True).stdout.splitlines()
+    assert "demo: {'det': True" in first[0] and first[-1] != "heavy:"  # builds the index
+    again = subprocess.run(cmd, env=env, capture_output=True, text=True, check=True).stdout.splitlines()
+    assert again == first[:-1] + ["heavy:"]
@@ -0,0 +1,57 @@
+import json
+
+from annox.adapters.coco.coco import COCOAdapter
+from annox.schema.columnar import KIND_BBOX, KIND_POLYGON, ColumnarDataset
+from annox.schema.dataset import (
+    BBox,
+    BBoxAnnotation,
+    Category,
+    Dataset,
+    Image,
+    Keypoints,
+    KeypointsAnnotation,
+    MaskAnnotation,
+    Polygon,
+    PolygonAnnotation,
+)
+
+
+def test_columnar_roundtrip():
+    item = Dataset.Item(
+        id="a",
+        image=Image(file_name="a.jpg", width=10, height=10),
+        annotations=[
+            BBoxAnnotation(id=1, category_id=1, bbox=BBox(x=1, y=2, w=3, h=4), attributes={"occluded": True}),
+            PolygonAnnotation(
+                id=2,
+                polygons=[Polygon(points=[0, 0, 1, 0, 1, 1]), Polygon(points=[0, 0, 2, 0, 2, 2, 0, 2])],
+            ),
+            KeypointsAnnotation(id=3, category_id=1, keypoints=Keypoints(points=[1, 1, 2])),
+            MaskAnnotation(id=4, rle={"counts": "abc", "size": (10, 10)}),
+        ],
+    )
+    empty = Dataset.Item(id="b", image=Image(file_name="b.jpg", width=5, height=5))
+    ds = Dataset(categories=[Category(id=1, name="x")], items=[item, empty])
+
+    cd = ColumnarDataset.from_dataset(ds)
+    assert len(cd) == 2 and cd.num_annotations == 4
+    assert cd.item_offsets.tolist() == [0, 4, 4]
+    assert cd.ann_kind[:2].tolist() == [KIND_BBOX, KIND_POLYGON]
+    assert cd.coord_offsets.tolist() == [0, 6, 14]
+    assert cd.to_dataset().model_dump() == ds.model_dump()
+
+
+def test_coco_load_columnar_matches_load(tmp_path):
+    coco = {
+        "images": [{"id": 1, "file_name": "a.jpg", "width": 100, "height": 80}, {"id": 2, "file_name": "b.jpg", "width": 1, "height": 1}],
+        "categories": [{"id": 1, "name": "p", "keypoints": ["a"], "skeleton": []}],
+        "annotations": [
+            {"id": 1, "image_id": 1, "category_id": 1, "bbox": [1, 2, 3, 4], "keypoints": [1, 2, 2]},
+            {"id": 2, "image_id": 2, "category_id": 1, "segmentation": {"counts": [0, 1], "size": [1, 1]}},
+            {"id": 3, "image_id": 1, "category_id": 1, "segmentation": [[0, 0, 4, 0, 4, 4]], "bbox": [0, 0, 4, 4]},
+        ],
+    }
+    src = tmp_path / "coco.json"
+    src.write_text(json.dumps(coco))
+    ad = COCOAdapter()
+    assert ad.load_columnar(str(src)).to_dataset().model_dump() == ad.load(str(src)).model_dump()
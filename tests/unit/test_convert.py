@@ -0,0 +1,180 @@
+import json
+import shutil
+
+import numpy as np
+
+from annox.adapters.coco.coco import COCOAdapter
+from annox.core import convert as conv
+from annox.core import metrics
+from annox.core.registry import AdapterRegistry
+
+
+def test_parallel_convert_matches_serial(tmp_path, monkeypatch):
+    monkeypatch.setattr(AdapterRegistry, "index", lambda self: {"coco": "annox.adapters.coco.coco:COCOAdapter"})
+    coco = {
+        "images": [{"id": i, "file_name": f"{i}.jpg", "width": 50, "height": 50} for i in range(1, 8)],
+        "categories": [{"id": 1, "name": "a"}],
+        "annotations": [
+            {"id": j, "image_id": 7 - j % 7, "category_id": 1, "bbox": [j, 1, 2, 3], "segmentation": [[0, 0, j, 0, j, j]]}
+            for j in range(1, 20)
+        ],
+    }
+    src = tmp_path / "src.json"
+    src.write_text(json.dumps(coco))
+
+    serial, sharded = tmp_path / "serial.json", tmp_path / "sharded.json"
+    conv.convert(src, serial, "coco", "coco")
+    conv.convert(src, sharded, "coco", "coco", workers=2, shard_size=2)
+    assert sharded.read_bytes() == serial.read_bytes()
+    out = json.loads(serial.read_bytes())
+    assert [a["id"] for a in out["annotations"]] == list(range(1, 39))
+
+
+def test_convert_cache_reuses_output_and_dataset(tmp_path, monkeypatch):
+    from annox.adapters.annoxbin.annoxbin import AnnoxBinAdapter
+    from annox.core.cache import ConversionCache
+
+    index = {
+        "coco": "annox.adapters.coco.coco:COCOAdapter",
+        "annoxbin": "annox.adapters.annoxbin.annoxbin:AnnoxBinAdapter",
+    }
+    monkeypatch.setattr(AdapterRegistry, "index", lambda self: index)
+    coco = {
+        "images": [{"id": 1, "file_name": "1.jpg", "width": 50, "height": 50}],
+        "categories": [{"id": 1, "name": "a"}],
+        "annotations": [{"id": 1, "image_id": 1, "category_id": 1, "bbox": [1, 1, 2, 3]}],
+    }
+    src = tmp_path / "src.json"
+    src.write_text(json.dumps(coco))
+    cache = ConversionCache(tmp_path / "cache")
+
+    # a streamed conversion stores its output but not the parsed source
+    conv.convert(src, tmp_path / "a.json", "coco", "coco", cache=cache)
+    expected = (tmp_path / "a.json").read_bytes()
+    assert cache.load_dataset(cache.dataset_key(src, "coco", COCOAdapter())) is None
+    # table to table: the source is loaded as tables anyway and stored
+    conv.convert(src, tmp_path / "c.annoxbin", "coco", "annoxbin", cache=cache)
+    assert len(AnnoxBinAdapter().load(str(tmp_path / "c.annoxbin")).items) == 1
+
+    def boom(self, path):
+        raise AssertionError("source was parsed again")
+
+    monkeypatch.setattr(COCOAdapter, "load_columnar", boom)
+    monkeypatch.setattr(COCOAdapter, "stream", boom)
+    # same conversion: output copied from the cache
+    conv.convert(src, tmp_path / "b.json", "coco", "coco", cache=cache)
+    assert (tmp_path / "b.json").read_bytes() == expected
+    # output evicted: rebuilt from the cached parsed dataset
+    options = {"tasks": None, "mask_root": str(tmp_path)}
+    key = cache.output_key(src, "coco", "coco", COCOAdapter(), COCOAdapter(), options)
+    shutil.rmtree(cache.root / "entries" / key)
+    conv.convert(src, tmp_path / "e.json", "coco", "coco", cache=cache)
+    assert (tmp_path / "e.json").read_bytes() == expected
+
+    # changed content misses
+    src.write_text(json.dumps(dict(coco, annotations=[])))
+    try:
+        conv.convert(src, tmp_path / "d.json", "coco", "coco", cache=cache)
+    except AssertionError:
+        pass
+    else:
+        raise AssertionError("stale cache entry used")
+
+    cache.max_bytes = 0
+    assert len(cache.evict()) == 3 and cache.size() == 0
+
+
+def test_convert_cache_skips_outputs_of_png_masks(tmp_path, monkeypatch):
+    from annox.adapters.annoxbin.annoxbin import AnnoxBinAdapter
+    from annox.core.cache import ConversionCache
+    from annox.io import maskio, png
+    from annox.schema.dataset import Dataset
+
+    index = {
+        "coco": "annox.adapters.coco.coco:COCOAdapter",
+        "annoxbin": "annox.adapters.annoxbin.annoxbin:AnnoxBinAdapter",
+    }
+    monkeypatch.setattr(AdapterRegistry, "index", lambda self: index)
+    ds = Dataset.model_validate(
+        {
+            "categories": [{"id": 1, "name": "a"}],
+            "items": [
+                {
+                    "id": "1",
+                    "image": {"file_name": "1.jpg", "width": 4, "height": 4},
+                    "annotations": [{"type": "mask", "id": 1, "category_id": 1, "png_path": "m.png"}],
+                }
+            ],
+        }
+    )
+    src = tmp_path / "src.annoxbin"
+    AnnoxBinAdapter().dump(ds, str(src))
+    cache = ConversionCache(tmp_path / "cache")
+    mask = np.zeros((4, 4), dtype=np.uint8)
+    for rows in (1, 3):  # the PNG changes, the source file does not
+        mask[:rows] = 1
+        png.write_png(tmp_path / "m.png", mask)
+        conv.convert(src, tmp_path / f"out{rows}.json", "annoxbin", "coco", cache=cache)
+        seg = json.loads((tmp_path / f"out{rows}.json").read_text())["annotations"][0]["segmentation"]
+        assert seg == maskio.encode(mask)
+    assert cache.size() == 0
+
+    # the mask root is part of the key of other outputs
+    other = tmp_path / "plain.json"
+    other.write_text(json.dumps({"images": [], "categories": [], "annotations": []}))
+    conv.convert(other, tmp_path / "p1.json", "coco", "coco", cache=cache)
+    with metrics.Recorder() as rec:
+        conv.convert(other, tmp_path / "p2.json", "coco", "coco", cache=cache, mask_root=tmp_path / "masks")
+    assert "cache_hits" not in rec.counters
+
+
+def test_cache_digest_stats_images_and_hashes_annotations(tmp_path, monkeypatch):
+    import os
+
+    from annox.adapters.base import BaseAdapter
+    from annox.core.cache import ConversionCache
+
+    src = tmp_path / "ds"
+    (src / "images").mkdir(parents=True)
+    (src / "labels").mkdir()
+    image, label = src / "images" / "a.jpg", src / "labels" / "a.txt"
+    image.write_bytes(b"\xff\xd8 pixels")
+    label.write_text("0 0.5 0.5 0.1 0.1\n")
+    cache = ConversionCache(tmp_path / "cache")
+    adapter = BaseAdapter()
+
+    def rewrite(path, data):
+        # same size and mtime: only a content hash notices
+        st = path.stat()
+        path.write_bytes(data)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+    hashed = []
+    monkeypatch.setattr("annox.core.cache._hash_file", lambda p: hashed.append(p.name) or p.read_bytes().hex())
+    digest = cache.source_digest(src, adapter)
+    assert hashed == ["a.txt"]
+    rewrite(image, b"\xff\xd8 PIXELS")
+    assert cache.source_digest(src, adapter) == digest
+    rewrite(label, b"1 0.5 0.5 0.1 0.1\n")
+    cache._db.execute("DELETE FROM digests")  # the memo is keyed by stat too
+    changed = cache.source_digest(src, adapter)
+    assert changed != digest and hashed == ["a.txt", "a.txt"]
+    image.write_bytes(b"\xff\xd8 other pixels")  # new size
+    assert cache.source_digest(src, adapter) != changed
+
+
+def test_cache_restore_replaces_directory_output(tmp_path):
+    from annox.core.cache import ConversionCache
+
+    cache = ConversionCache(tmp_path / "cache")
+    out = tmp_path / "out"
+    (out / "labels").mkdir(parents=True)
+    (out / "labels" / "a.txt").write_text("new")
+    cache.store_output("k", out)
+
+    (out / "labels" / "a.txt").write_text("old")
+    (out / "labels" / "stale.txt").write_text("from an earlier run")
+    assert cache.restore_output("k", out)
+    assert sorted(p.name for p in out.rglob("*")) == ["a.txt", "labels"]
+    assert (out / "labels" / "a.txt").read_text() == "new"
+    assert [p.name for p in tmp_path.iterdir() if p.name.startswith(".")] == []
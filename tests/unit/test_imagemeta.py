@@ -0,0 +1,78 @@
+import struct
+import zlib
+
+import pytest
+
+from annox.io import imagemeta
+from annox.io.imagemeta import ImageSizeCache, probe_sizes, read_image_size, scan_sizes
+
+
+def _png(path, w, h):
+    ihdr = struct.pack(">IIBBBBB", w, h, 8, 2, 0, 0, 0)
+    chunk = struct.pack(">I", 13) + b"IHDR" + ihdr + struct.pack(">I", zlib.crc32(b"IHDR" + ihdr))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"\x89PNG\r\n\x1a\n" + chunk)
+
+
+def test_image_size_from_headers(tmp_path):
+    _png(tmp_path / "a.png", 640, 480)
+    assert read_image_size(tmp_path / "a.png") == (640, 480)
+    # APP0 segment, then SOF0 with height 20, width 30
+    jpeg = b"\xff\xd8" + b"\xff\xe0\x00\x04ab" + b"\xff\xc0\x00\x0b\x08\x00\x14\x00\x1e\x01\x01\x11\x00"
+    (tmp_path / "b.jpg").write_bytes(jpeg)
+    assert read_image_size(tmp_path / "b.jpg") == (30, 20)
+    (tmp_path / "d.pfm").write_bytes(b"PF\n12 7\n-1.0\n")
+    assert read_image_size(tmp_path / "d.pfm") == (12, 7)
+    (tmp_path / "c.jpg").write_bytes(b"not an image")
+    with pytest.raises(ValueError):
+        read_image_size(tmp_path / "c.jpg")
+
+
+def _ifd(order, entries, next_ifd=0):
+    # entries: (tag, type, count, value)
+    out = struct.pack(order + "H", len(entries))
+    for tag, typ, count, value in entries:
+        raw = struct.pack(order + ("H" if typ == 3 else "I"), value).ljust(4, b"\x00")
+        out += struct.pack(order + "HHI", tag, typ, count) + raw
+    return out + struct.pack(order + "I", next_ifd)
+
+
+def test_image_size_from_tiff_headers(tmp_path):
+    le = b"II*\x00" + struct.pack("<I", 8) + _ifd("<", [(256, 3, 1, 300), (257, 3, 1, 200)])
+    (tmp_path / "a.tif").write_bytes(le)
+    assert read_image_size(tmp_path / "a.tif") == (300, 200)
+    be = b"MM\x00*" + struct.pack(">I", 8) + _ifd(">", [(256, 4, 1, 70000), (257, 4, 1, 5)])
+    (tmp_path / "b.tiff").write_bytes(be)
+    assert read_image_size(tmp_path / "b.tiff") == (70000, 5)
+    # DNG: a thumbnail first, the full image in a SubIFD
+    thumb = _ifd("<", [(254, 4, 1, 1), (256, 3, 1, 16), (257, 3, 1, 12), (330, 4, 1, 8 + 54)])
+    assert len(thumb) == 54
+    full = _ifd("<", [(254, 4, 1, 0), (256, 4, 1, 4000), (257, 4, 1, 3000)])
+    (tmp_path / "c.dng").write_bytes(b"II*\x00" + struct.pack("<I", 8) + thumb + full)
+    assert read_image_size(tmp_path / "c.dng") == (4000, 3000)
+    (tmp_path / "d.tif").write_bytes(b"II*\x00" + struct.pack("<I", 64))
+    with pytest.raises(ValueError):
+        read_image_size(tmp_path / "d.tif")
+
+
+def test_probe_sizes_uses_persistent_cache(tmp_path, monkeypatch):
+    for i in range(5):
+        _png(tmp_path / "imgs" / f"sub{i % 2}" / f"{i}.png", 10 + i, 20)
+    (tmp_path / "imgs" / "broken.png").write_bytes(b"xx")
+    db = tmp_path / "sizes.sqlite"
+
+    with ImageSizeCache(db) as cache:
+        sizes = scan_sizes(tmp_path / "imgs", workers=4, cache=cache)
+    assert sorted(v for v in sizes.values() if v) == [(10 + i, 20) for i in range(5)]
+    assert sizes[str(tmp_path / "imgs" / "broken.png")] is None
+
+    paths = sorted(p for p, v in sizes.items() if v)
+    monkeypatch.setattr(imagemeta, "_try_size", lambda p: pytest.fail(f"re-read {p}"))
+    with ImageSizeCache(db) as cache:
+        assert probe_sizes(paths, workers=4, cache=cache) == [sizes[p] for p in paths]
+    monkeypatch.undo()
+
+    # a changed file is probed again
+    _png(tmp_path / "imgs" / "sub0" / "0.png", 99, 98)
+    with ImageSizeCache(db) as cache:
+        assert probe_sizes([tmp_path / "imgs" / "sub0" / "0.png"], cache=cache) == [(99, 98)]
@@ -0,0 +1,86 @@
+import json
+
+from annox.core import convert as conv
+from annox.core.incremental import manifest_path
+from annox.core.registry import AdapterRegistry
+
+INDEX = {
+    "coco": "annox.adapters.coco.coco:COCOAdapter",
+    "yolo": "annox.adapters.yolo.yolo:YOLOAdapter",
+}
+
+
+def _coco(images, boxes):
+    return {
+        "images": [{"id": i, "file_name": f"images/{i}.jpg", "width": 100, "height": 100} for i in images],
+        "categories": [{"id": 1, "name": "a"}, {"id": 2, "name": "b"}],
+        "annotations": [
+            {"id": j + 1, "image_id": i, "category_id": 1, "bbox": b, "segmentation": []}
+            for j, (i, b) in enumerate(boxes)
+        ],
+    }
+
+
+def test_coco_delta_keeps_ids_and_matches_full_build(tmp_path, monkeypatch):
+    monkeypatch.setattr(AdapterRegistry, "index", lambda self: INDEX)
+    src, dst = tmp_path / "src.json", tmp_path / "out.json"
+    src.write_text(json.dumps(_coco([1, 2, 3], [(1, [1, 1, 5, 5]), (2, [2, 2, 5, 5]), (3, [3, 3, 5, 5])])))
+
+    report = conv.convert(src, dst, "coco", "coco", incremental=True)
+    assert report.full and report.added == 3
+    assert manifest_path(dst).is_file()
+    conv.convert(src, tmp_path / "plain.json", "coco", "coco")
+    assert dst.read_bytes() == (tmp_path / "plain.json").read_bytes()
+
+    # image 2 changed, 3 removed, 4 added
+    src.write_text(json.dumps(_coco([1, 2, 4], [(1, [1, 1, 5, 5]), (2, [9, 9, 5, 5]), (4, [4, 4, 5, 5])])))
+    report = conv.convert(src, dst, "coco", "coco", incremental=True)
+    assert (report.full, report.added, report.changed, report.removed, report.unchanged) == (False, 1, 1, 1, 1)
+    out = json.loads(dst.read_bytes())
+    assert [im["id"] for im in out["images"]] == [1, 2, 4]
+    anns = {a["image_id"]: a for a in out["annotations"]}
+    assert anns[1]["id"] == 1  # unchanged item keeps its id
+    assert anns[2]["bbox"] == [9, 9, 5, 5] and anns[2]["id"] == 4
+    assert anns[4]["id"] == 5
+
+    report = conv.convert(src, dst, "coco", "coco", incremental=True)
+    assert report.unchanged == 3 and not (report.added or report.changed or report.removed)
+    assert json.loads(dst.read_bytes()) == out
+
+
+def test_yolo_delta_rewrites_only_affected_labels(tmp_path, monkeypatch):
+    monkeypatch.setattr(AdapterRegistry, "index", lambda self: INDEX)
+    src, dst = tmp_path / "src.json", tmp_path / "yolo"
+    src.write_text(json.dumps(_coco([1, 2, 3], [(1, [0, 0, 10, 10]), (2, [0, 0, 20, 20]), (3, [0, 0, 30, 30])])))
+    conv.convert(src, dst, "coco", "yolo", incremental=True)
+    labels = dst / "labels" / "images"
+    assert sorted(p.name for p in labels.iterdir()) == ["1.txt", "2.txt", "3.txt"]
+    first = (labels / "1.txt").stat().st_mtime_ns
+
+    src.write_text(json.dumps(_coco([1, 2, 4], [(1, [0, 0, 10, 10]), (2, [0, 0, 50, 50]), (4, [0, 0, 40, 40])])))
+    report = conv.convert(src, dst, "coco", "yolo", incremental=True)
+    assert (report.added, report.changed, report.removed, report.unchanged) == (1, 1, 1, 1)
+    assert sorted(p.name for p in labels.iterdir()) == ["1.txt", "2.txt", "4.txt"]
+    assert (labels / "1.txt").stat().st_mtime_ns == first
+    assert (labels / "2.txt").read_text() == "0 0.25 0.25 0.5 0.5\n"
+    assert (dst / "data.yaml").is_file()
+
+
+def test_coco_records_are_grouped_per_item():
+    from annox.adapters.coco.coco import COCOAdapter, _number_records
+    from annox.schema.dataset import Dataset
+
+    def item(i, anns):
+        return {"id": str(i), "image": {"file_name": f"{i}.jpg", "width": 10, "height": 10}, "annotations": anns}
+
+    box = {"type": "bbox", "id": 1, "category_id": 1, "bbox": {"x": 1, "y": 1, "w": 2, "h": 2}}
+    seg = {"type": "panoptic_segment", "id": 2, "category_id": 1, "segment_id": 5, "area": 4}
+    poly = {"type": "polygon", "id": 3, "category_id": 1, "polygons": [{"points": [0, 0, 4, 0, 4, 4]}]}
+    items = Dataset.model_validate({"items": [item(1, [box, seg, poly]), item(2, [seg]), item(3, [box])]}).items
+
+    a = COCOAdapter()
+    _, records = a.encode_items(items, 0, 7)
+    assert [[json.loads(r)["id"] for r in recs] for recs in records] == [[7, 8], [], [9]]
+    # shards leave ids to write_shards, which numbers to the same bytes
+    _, unnumbered = a.encode_shard(items, 0)
+    assert _number_records(unnumbered, 7) == b",".join(r for recs in records for r in recs)
@@ -0,0 +1,51 @@
+import json
+
+import pytest
+
+from annox.io.jsonlstore import JsonlDataset, index_path
+
+
+def _item(i, **extra):
+    return {
+        "id": f"img{i}",
+        "image": {"file_name": f"{i}.jpg", "width": 10, "height": 10},
+        "annotations": [{"type": "bbox", "id": 1, "category_id": 1, "bbox": {"x": 0, "y": 0, "w": 1, "h": 1}}] * (i % 2),
+        **extra,
+    }
+
+
+def test_jsonl_dataset_random_access(tmp_path):
+    p = tmp_path / "ds.jsonl"
+    lines = [json.dumps(_item(i)) for i in range(5)]
+    # id not first, blank line, no trailing newline
+    lines[3] = json.dumps({"image": _item(3)["image"], "id": "img3"})
+    p.write_text("\n".join(lines[:2]) + "\n\n" + "\n".join(lines[2:]))
+
+    with JsonlDataset(p) as ds:
+        assert len(ds) == 5
+        assert ds.ids == [f"img{i}" for i in range(5)]
+        assert ds["img3"].image.file_name == "3.jpg"
+        assert ds[-1].id == "img4"
+        assert [it.id for it in ds[1:4:2]] == ["img1", "img3"]
+        assert "img9" not in ds and ds.get("img9") is None
+        with pytest.raises(KeyError):
+            ds["img9"]
+        assert [it.id for it in ds.iter_items(where=lambda it: len(it.annotations) > 0)] == ["img1"]
+        assert [it.id for it in ds.iter_items(ids=["img4", "img0", "x"])] == ["img0", "img4"]
+    assert index_path(p).exists()
+
+    # cached index is reused, and rebuilt once the file changes
+    with JsonlDataset(p) as ds:
+        assert ds.ids[3] == "img3"
+    with p.open("a") as f:
+        f.write("\n" + json.dumps(_item(5)) + "\n")
+    with JsonlDataset(p) as ds:
+        assert len(ds) == 6 and ds["img5"].id == "img5"
+
+
+def test_jsonl_dataset_empty(tmp_path):
+    p = tmp_path / "empty.jsonl"
+    p.write_bytes(b"")
+    with JsonlDataset(p, cache_index=False) as ds:
+        assert len(ds) == 0 and list(ds) == []
+    assert not index_path(p).exists()
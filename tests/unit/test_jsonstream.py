@@ -0,0 +1,19 @@
+import json
+
+from annox.io.jsonstream import iter_array_items, read_member
+
+
+def test_iter_array_items_small_chunks(tmp_path):
+    doc = {
+        "skip": {"s": "x\"]}[{", "n": [1, [2, [3]]]},
+        "a": [{"k": "v\\\\ é"}, 1.5e3, 12345, "str", [], {}, None],
+        "b": [],
+        "c": [{"x": [1, 2]}],
+    }
+    p = tmp_path / "doc.json"
+    p.write_text(json.dumps(doc, indent=2, ensure_ascii=False), encoding="utf-8")
+    for chunk in (1, 3, 7, 1 << 20):
+        got = list(iter_array_items(p, ("a", "b", "c"), chunk_size=chunk))
+        assert got == [("a", v) for v in doc["a"]] + [("c", v) for v in doc["c"]]
+        assert read_member(p, "skip", chunk_size=chunk) == doc["skip"]
+    assert read_member(p, "missing") is None
@@ -0,0 +1,137 @@
+import json
+import logging
+
+import numpy as np
+import pytest
+
+from annox.adapters.base import DatasetStream
+from annox.adapters.coco.coco import COCOAdapter
+from annox.core import convert as conv
+from annox.core import metrics
+from annox.core.registry import AdapterRegistry
+from annox.io import maskio, png
+from annox.io.maskcache import MaskCache, decode_mask_png, prefetch_masks
+from annox.schema.dataset import Dataset, MaskAnnotation
+
+
+def _mask(seed, h=12, w=16):
+    return (np.random.default_rng(seed).random((h, w)) > 0.6).astype(np.uint8)
+
+
+def test_cache_hits_eviction_and_invalidation(tmp_path):
+    paths = []
+    for i in range(3):
+        paths.append(tmp_path / f"{i}.png")
+        png.write_png(paths[-1], _mask(i) * 255)
+    rgb = np.zeros((12, 16, 4), dtype=np.uint8)
+    rgb[2:5, 3:9, 1] = 7
+    rgb[:, :, 3] = 255  # alpha is not foreground
+    png.write_png(tmp_path / "rgba.png", rgb)
+    assert decode_mask_png(tmp_path / "rgba.png").sum() == 18
+
+    cache = MaskCache(max_bytes=2 * 12 * 16)  # room for two arrays
+    a = cache.get(paths[0])
+    assert (a == _mask(0)).all() and not a.flags.writeable
+    assert cache.get(paths[0]) is a
+    cache.get(paths[1])
+    cache.get(paths[2])  # evicts 0, the least recently used
+    assert cache.stats() == {"entries": 2, "bytes": 2 * 12 * 16, "hits": 1, "misses": 3}
+    cache.get(paths[0])
+    assert cache.misses == 4
+
+    # RLE entries are built from a cached array instead of the file
+    paths[0].write_bytes(b"not a png")
+    with pytest.raises(ValueError, match="png"):
+        cache.get(paths[0], as_rle=True)  # rewritten file: stale entry not used
+    png.write_png(paths[0], _mask(0))
+    assert cache.get(paths[0], as_rle=True) == maskio.encode(_mask(0))
+
+    big = tmp_path / "big.png"
+    png.write_png(big, np.ones((40, 40), dtype=np.uint8))
+    cache.get(big)  # larger than the whole cache: returned, not stored
+    assert cache.nbytes <= cache.max_bytes
+
+
+def test_mask_annotation_lazy_loading_and_prefetch(tmp_path):
+    png.write_png(tmp_path / "m" / "a.png", _mask(5))
+    cache = MaskCache()
+    anns = [
+        MaskAnnotation(id=1, png_path="m/a.png"),
+        MaskAnnotation(id=2, png_path=str(tmp_path / "m" / "a.png")),
+        MaskAnnotation(id=3, rle={"counts": [1, 2, 3], "size": [2, 3]}),
+    ]
+    assert prefetch_masks(anns, root=tmp_path, cache=cache, workers=2) == 1
+    assert anns[0].load_rle(str(tmp_path), cache) == maskio.encode(_mask(5))
+    assert anns[1].load_rle(cache=cache) is anns[0].load_rle(str(tmp_path), cache)
+    assert (anns[1].load_mask(cache=cache) == _mask(5)).all()
+    assert anns[2].load_rle(cache=cache)["counts"] == [1, 2, 3]
+    assert anns[2].load_mask(cache=cache).sum() == 2
+    assert cache.stats()["hits"] == 3 and cache.misses == 2  # one RLE prefetch, one array decode
+
+
+def test_coco_export_decodes_each_png_once(tmp_path, monkeypatch):
+    m = _mask(9, 20, 30)
+    png.write_png(tmp_path / "a.png", m)
+    ds = Dataset.model_validate(
+        {
+            "categories": [{"id": 1, "name": "x"}],
+            "items": [
+                {
+                    "id": str(i),
+                    "image": {"file_name": f"{i}.jpg", "width": 30, "height": 20},
+                    "annotations": [{"type": "mask", "id": 1, "category_id": 1, "png_path": "a.png"}],
+                }
+                for i in (1, 2)
+            ],
+        }
+    )
+    cache = MaskCache()
+    monkeypatch.setattr(MaskCache, "default", classmethod(lambda cls: cache))
+    adapter = COCOAdapter()
+    adapter.mask_root = str(tmp_path)
+    with metrics.Recorder() as rec:
+        adapter.dump(ds, str(tmp_path / "out.json"))
+    anns = json.loads((tmp_path / "out.json").read_text())["annotations"]
+    rle = maskio.encode(m)
+    assert [a["segmentation"] for a in anns] == [rle, rle]
+    assert anns[0]["area"] == m.sum() and anns[0]["bbox"] == maskio.to_bbox(rle)
+    assert cache.misses == 1 and rec.counters["maskcache.misses"] == 1
+
+
+def test_coco_export_of_unresolved_png_keeps_empty_segmentation(tmp_path, monkeypatch, caplog):
+    monkeypatch.setattr(AdapterRegistry, "index", lambda self: {"coco": "annox.adapters.coco.coco:COCOAdapter"})
+    monkeypatch.chdir(tmp_path)
+    m = _mask(3, 10, 10)
+    png.write_png(tmp_path / "data" / "masks" / "1.png", m)
+    coco = {
+        "images": [{"id": 1, "file_name": "1.jpg", "width": 10, "height": 10}],
+        "categories": [{"id": 1, "name": "x"}],
+        "annotations": [],
+    }
+    (tmp_path / "data" / "coco.json").write_text(json.dumps(coco))
+    ds = Dataset.model_validate(
+        {
+            "categories": [{"id": 1, "name": "x"}],
+            "items": [
+                {
+                    "id": "1",
+                    "image": {"file_name": "1.jpg", "width": 10, "height": 10},
+                    "annotations": [
+                        {"type": "mask", "id": 1, "category_id": 1, "png_path": "masks/1.png"},
+                        {"type": "mask", "id": 2, "category_id": 1, "png_path": "masks/missing.png"},
+                    ],
+                }
+            ],
+        }
+    )
+    with caplog.at_level(logging.WARNING, logger="annox.coco"):
+        COCOAdapter().dump(ds, str(tmp_path / "out.json"))  # relative to the CWD: neither resolves
+    anns = json.loads((tmp_path / "out.json").read_text())["annotations"]
+    assert [a["segmentation"] for a in anns] == [[], []] and [a["area"] for a in anns] == [0.0, 0.0]
+    assert "masks/1.png" in caplog.text and "masks/missing.png" in caplog.text
+
+    # convert reads relative mask paths from the source dataset's directory
+    monkeypatch.setattr(COCOAdapter, "stream", lambda self, path: DatasetStream(ds.categories, iter(ds.items)))
+    conv.convert(tmp_path / "data" / "coco.json", tmp_path / "conv.json", "coco", "coco")
+    anns = json.loads((tmp_path / "conv.json").read_text())["annotations"]
+    assert anns[0]["segmentation"] == maskio.encode(m) and anns[1]["segmentation"] == []
@@ -0,0 +1,53 @@
+import numpy as np
+
+from annox.io import maskio
+
+
+def _ref_compress(cnts):
+    # straight port of pycocotools rleToString
+    s = []
+    for i, x in enumerate(cnts):
+        if i > 2:
+            x -= cnts[i - 2]
+        more = True
+        while more:
+            c = x & 0x1F
+            x >>= 5
+            more = x != -1 if c & 0x10 else x != 0
+            if more:
+                c |= 0x20
+            s.append(chr(c + 48))
+    return "".join(s)
+
+
+def test_counts_codec_matches_reference():
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        cnts = rng.integers(0, 5000, size=rng.integers(1, 40)).tolist()
+        s = maskio.compress_counts(cnts)
+        assert s == _ref_compress(cnts)
+        assert maskio.decompress_counts(s).tolist() == cnts
+
+
+def test_mask_ops_without_decoding():
+    rng = np.random.default_rng(1)
+    a = rng.random((13, 17)) > 0.6
+    b = rng.random((13, 17)) > 0.5
+    ra, rb = maskio.encode(a), maskio.encode(b)
+    assert (maskio.decode(ra) == a).all()
+    assert maskio.area(ra) == a.sum()
+    assert (maskio.decode(maskio.merge([ra, rb])) == (a | b)).all()
+    assert (maskio.decode(maskio.merge([ra, rb], intersect=True)) == (a & b)).all()
+    expected = (a & b).sum() / (a | b).sum()
+    assert np.isclose(maskio.iou([ra], [rb])[0, 0], expected)
+
+    m = np.zeros((10, 12), dtype=np.uint8)
+    m[2:5, 3:9] = 1
+    assert maskio.to_bbox(maskio.encode(m)) == [3.0, 2.0, 6.0, 3.0]
+
+
+def test_polygon_rasterization():
+    rle = maskio.from_polygons([[2, 1, 8, 1, 8, 5, 2, 5]], 8, 10)
+    m = maskio.decode(rle)
+    assert m.sum() == 24 and m[1:5, 2:8].all()
+    assert maskio.to_bbox(rle) == [2.0, 1.0, 6.0, 4.0]
@@ -0,0 +1,52 @@
+import json
+
+from annox.core import metrics
+from annox.core.registry import AdapterRegistry
+
+
+def test_disabled_is_noop():
+    assert not metrics.enabled()
+    with metrics.span("x"):
+        metrics.count("n", 3)
+    assert metrics.span("x") is metrics._NULL
+
+
+def test_recorder_nests_spans_and_writes_sinks(tmp_path):
+    sinks = [metrics.JsonSink(tmp_path / "m.json"), metrics.PrometheusSink(tmp_path / "m.prom")]
+    with metrics.Recorder(sinks, sample_interval=0.001) as rec:
+        with metrics.span("outer"):
+            for _ in range(3):
+                with metrics.span("inner"):
+                    metrics.count("items", 2)
+    assert not metrics.enabled()
+    report = rec.report()
+    assert list(report["spans"]) == ["outer", "outer/inner"]
+    assert report["spans"]["outer/inner"]["calls"] == 3
+    assert report["counters"] == {"items": 6}
+    assert report["peak_rss_bytes"] > 0
+    assert json.loads((tmp_path / "m.json").read_text())["counters"] == {"items": 6}
+    prom = (tmp_path / "m.prom").read_text()
+    assert 'annox_span_calls{span="outer/inner"} 3' in prom
+    assert "inner" in metrics.format_report(report)
+
+
+def test_convert_reports_adapter_stages(tmp_path, monkeypatch):
+    from annox.core.convert import convert
+
+    monkeypatch.setattr(AdapterRegistry, "index", lambda self: {"coco": "annox.adapters.coco.coco:COCOAdapter"})
+    src = tmp_path / "src.json"
+    src.write_text(
+        json.dumps(
+            {
+                "images": [{"id": 1, "file_name": "1.jpg", "width": 9, "height": 9}],
+                "categories": [{"id": 1, "name": "a"}],
+                "annotations": [{"id": 1, "image_id": 1, "category_id": 1, "bbox": [1, 1, 2, 2]}],
+            }
+        )
+    )
+    with metrics.Recorder(sample_interval=None) as rec:
+        convert(src, tmp_path / "out.json", "coco", "coco")
+    report = rec.report()
+    assert "convert/stream/coco.encode" in report["spans"]
+    assert report["counters"]["items"] == 1
+    assert report["counters"]["bytes_written"] == (tmp_path / "out.json").stat().st_size
@@ -0,0 +1,91 @@
+import json
+
+import pytest
+
+from annox.core import ops
+from annox.core.registry import AdapterRegistry
+from annox.schema.dataset import Category
+
+INDEX = {"coco": "annox.adapters.coco.coco:COCOAdapter"}
+
+
+def _write(path, cats, images, anns):
+    coco = {
+        "images": [{"id": i, "file_name": f"{i}.jpg", "width": 50, "height": 50} for i in images],
+        "categories": [{"id": c, "name": n} for c, n in cats],
+        "annotations": [
+            {"id": k + 1, "image_id": i, "category_id": c, "bbox": [1, 1, 5, 5]} for k, (i, c) in enumerate(anns)
+        ],
+    }
+    path.write_text(json.dumps(coco))
+    return path
+
+
+def test_merge_categories_joins_on_name():
+    a = [Category(id=1, name="cat"), Category(id=2, name="dog")]
+    b = [Category(id=1, name="dog"), Category(id=5, name="bird")]
+    merged, maps = ops.merge_categories([a, b])
+    assert [(c.id, c.name) for c in merged] == [(1, "cat"), (2, "dog"), (5, "bird")]
+    assert maps == [{1: 1, 2: 2}, {1: 2, 5: 5}]
+    merged, maps = ops.merge_categories([a, [Category(id=1, name="bird")]])
+    assert maps[1] == {1: 3}
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_merge_remaps_and_renumbers(tmp_path, monkeypatch, workers):
+    monkeypatch.setattr(AdapterRegistry, "index", lambda self: INDEX)
+    a = _write(tmp_path / "a.json", [(1, "cat"), (2, "dog")], [1, 2], [(1, 1), (2, 2)])
+    b = _write(tmp_path / "b.json", [(1, "dog"), (7, "bird")], [1], [(1, 1), (1, 7)])
+    stats = ops.merge([a, b], tmp_path / "m.json", "coco", "coco", workers=workers)
+    assert (stats.items, stats.annotations) == (3, 4)
+    out = json.loads((tmp_path / "m.json").read_text())
+    assert [im["id"] for im in out["images"]] == [1, 2, 3]
+    assert [(a["id"], a["image_id"], a["category_id"]) for a in out["annotations"]] == [
+        (1, 1, 1),
+        (2, 2, 2),
+        (3, 3, 2),
+        (4, 3, 7),
+    ]
+    assert [c["name"] for c in out["categories"]] == ["cat", "dog", "bird"]
+
+
+def test_filter_and_split(tmp_path, monkeypatch):
+    monkeypatch.setattr(AdapterRegistry, "index", lambda self: INDEX)
+    src = _write(tmp_path / "a.json", [(1, "cat"), (2, "dog")], range(1, 41), [(i, 1 + i % 2) for i in range(1, 41)])
+    flt = ops.ItemFilter(categories={"dog"}, min_annotations=1)
+    stats = ops.filter_dataset([src], tmp_path / "f.json", "coco", "coco", flt)
+    out = json.loads((tmp_path / "f.json").read_text())
+    assert stats.items == 20 and all(a["category_id"] == 2 for a in out["annotations"])
+    assert [c["name"] for c in out["categories"]] == ["dog"]
+
+    splits = ops.parse_splits("train=3,val=1")
+    stats = ops.split([src], str(tmp_path / "{split}.json"), "coco", "coco", splits, seed="s")
+    assert sum(s.items for s in stats.values()) == 40
+    train = json.loads((tmp_path / "train.json").read_text())
+    assert {str(im["id"]) for im in train["images"]} == {
+        str(i) for i in range(1, 41) if ops.split_of(str(i), splits, "s") == "train"
+    }
+    with pytest.raises(ValueError):
+        ops.parse_splits("train")
+
+
+def test_overlapping_inputs_need_renumbering(tmp_path, monkeypatch):
+    monkeypatch.setattr(AdapterRegistry, "index", lambda self: INDEX)
+    v1 = _write(tmp_path / "v1.json", [(1, "cat")], [1, 2, 3], [(1, 1), (2, 1), (3, 1)])
+    v2 = _write(tmp_path / "v2.json", [(1, "cat")], [3, 4], [(3, 1), (4, 1)])
+    splits = ops.parse_splits("train=1,val=1")
+    with pytest.raises(ValueError, match="'3'.*v2.json"):
+        ops.split([v1, v2], str(tmp_path / "s_{split}.json"), "coco", "coco", splits)
+    with pytest.raises(ValueError, match="renumber"):
+        ops.merge([v1, v2], tmp_path / "m.json", "coco", "coco", renumber_ids=False)
+
+    stats = ops.split([v1, v2], str(tmp_path / "s_{split}.json"), "coco", "coco", splits, renumber_ids=True)
+    assert sum(s.items for s in stats.values()) == 5
+    for name in ("train", "val"):
+        out = json.loads((tmp_path / f"s_{name}.json").read_text())
+        ids = [im["id"] for im in out["images"]]
+        assert len(set(ids)) == len(ids) and {a["image_id"] for a in out["annotations"]} <= set(ids)
+    # disjoint inputs keep their ids
+    v3 = _write(tmp_path / "v3.json", [(1, "cat")], [8], [(8, 1)])
+    ops.filter_dataset([v1, v3], tmp_path / "f.json", "coco", "coco", None)
+    assert [im["id"] for im in json.loads((tmp_path / "f.json").read_text())["images"]] == [1, 2, 3, 8]
@@ -0,0 +1,125 @@
+import json
+import struct
+import zlib
+
+import numpy as np
+
+from annox.adapters.coco.panoptic import COCOPanopticAdapter
+from annox.core import panoptic
+from annox.io import maskio, png
+from annox.schema.columnar import ColumnarDataset
+
+
+def _ids(seed=0, h=40, w=60):
+    rng = np.random.default_rng(seed)
+    ids = np.zeros((h, w), dtype=np.int64)
+    for k in range(1, 30):
+        y, x = rng.integers(0, h - 5), rng.integers(0, w - 5)
+        ids[y : y + rng.integers(1, 15), x : x + rng.integers(1, 15)] = k * 4099
+    return ids
+
+
+def test_segment_kernels_match_per_mask_results():
+    ids = _ids()
+    seg, areas, boxes = panoptic.segment_stats(ids)
+    assert 0 not in seg
+    for sid, area, box in zip(seg, areas, boxes):
+        ys, xs = np.nonzero(ids == sid)
+        assert area == len(ys)
+        assert box.tolist() == [xs.min(), ys.min(), xs.max() - xs.min() + 1, ys.max() - ys.min() + 1]
+    rles = panoptic.segments_to_rles(ids, list(seg) + [7])
+    for sid, rle in zip(seg, rles):
+        assert rle == maskio.encode((ids == sid).astype(np.uint8))
+    assert maskio.area(rles[-1]) == 0
+    raw = panoptic.segments_to_rles(ids, seg, compressed=False)
+    assert [maskio.compress_counts(r["counts"]) for r in raw] == [r["counts"] for r in rles[:-1]]
+    assert panoptic.segment_stats(np.zeros((0, 3), dtype=np.int64))[0].size == 0
+    assert (panoptic.rles_to_ids(rles, list(seg) + [7], *ids.shape) == ids).all()
+    assert (panoptic.rgb_to_id(panoptic.id_to_rgb(ids)) == ids).all()
+
+
+def test_png_codec_reads_every_filter():
+    rgb = np.random.default_rng(1).integers(0, 256, (6, 5, 3), dtype=np.uint8)
+    assert (png.decode_png(png.encode_png(rgb)) == rgb).all()
+
+    # one row per filter type: None, Sub, Up, Average, Paeth
+    def predict(f, a, b, c):
+        p = a + b - c
+        paeth = a if abs(p - a) <= abs(p - b) and abs(p - a) <= abs(p - c) else (b if abs(p - b) <= abs(p - c) else c)
+        return [0, a, b, (a + b) // 2, paeth][f]
+
+    rows = rgb.reshape(6, -1).astype(int)
+    raw = b""
+    for y, f in enumerate([0, 1, 2, 3, 4, 4]):
+        prev = rows[y - 1] if y else np.zeros(15, int)
+        line = [
+            (rows[y, i] - predict(f, rows[y, i - 3] if i >= 3 else 0, prev[i], prev[i - 3] if i >= 3 else 0)) & 255
+            for i in range(15)
+        ]
+        raw += bytes([f] + line)
+    header = struct.pack(">IIBBBBB", 5, 6, 8, 2, 0, 0, 0)
+    data = png._SIGNATURE + png._chunk(b"IHDR", header) + png._chunk(b"IDAT", zlib.compress(raw)) + png._chunk(b"IEND", b"")
+    assert (png.decode_png(data) == rgb).all()
+
+
+def _dataset(tmp_path):
+    ids = _ids(h=30, w=40)
+    seg, _, _ = panoptic.segment_stats(ids)
+    png.write_png(tmp_path / "pan" / "a.png", panoptic.id_to_rgb(ids))
+    coco = {
+        "images": [{"id": 1, "file_name": "a.jpg", "width": 40, "height": 30}, {"id": 2, "file_name": "b.jpg", "width": 4, "height": 4}],
+        "categories": [{"id": 1, "name": "thing", "isthing": 1, "color": [1, 2, 3]}, {"id": 2, "name": "sky", "isthing": 0}],
+        "annotations": [
+            {
+                "image_id": 1,
+                "file_name": "a.png",
+                # stale stats: the PNG is authoritative
+                "segments_info": [{"id": int(s), "category_id": 1 + k % 2, "area": 1, "bbox": [0, 0, 1, 1]} for k, s in enumerate(seg)],
+            }
+        ],
+    }
+    (tmp_path / "pan.json").write_text(json.dumps(coco))
+    return ids, seg
+
+
+def test_panoptic_adapter_roundtrip(tmp_path):
+    ids, seg = _dataset(tmp_path)
+    _, areas, boxes = panoptic.segment_stats(ids)
+    a = COCOPanopticAdapter(workers=2)
+    ds = a.load(str(tmp_path / "pan.json"))
+    anns = ds.items[0].annotations
+    assert [x.area for x in anns] == areas.tolist()
+    assert [[x.bbox.x, x.bbox.y, x.bbox.w, x.bbox.h] for x in anns] == boxes.tolist()
+    assert ds.categories[0].isthing and ds.categories[0].color == [1, 2, 3]
+    assert ds.items[1].annotations == []
+
+    # through the columnar tables and back
+    ds = ColumnarDataset.from_dataset(ds).to_dataset()
+    for rle in (True, False):
+        out = tmp_path / f"out{rle}" / "pan.json"
+        if not rle:
+            for x in ds.items[0].annotations:
+                x.rle = None  # copies the source PNG instead
+        a.dump(ds, str(out))
+        assert (panoptic.rgb_to_id(png.read_png(out.with_suffix("") / "a.png")) == ids).all()
+        written = json.loads(out.read_text())
+        info = written["annotations"][0]["segments_info"]
+        assert [s["area"] for s in info] == areas.tolist() and [s["bbox"] for s in info] == boxes.tolist()
+        assert written["categories"][1]["isthing"] == 0
+        assert not (panoptic.rgb_to_id(png.read_png(out.with_suffix("") / "b.png"))).any()
+
+    # images of the same name in different directories keep separate PNGs
+    ds.items[1].image.file_name = "other/a.jpg"
+    out = tmp_path / "clash" / "pan.json"
+    a.dump(ds, str(out))
+    assert [r["file_name"] for r in json.loads(out.read_text())["annotations"]] == ["a.png", "a_2.png"]
+    assert (panoptic.rgb_to_id(png.read_png(out.with_suffix("") / "a.png")) == ids).all()
+    assert not panoptic.rgb_to_id(png.read_png(out.with_suffix("") / "a_2.png")).any()
+
+
+def test_panoptic_projection_skips_decoding(tmp_path):
+    _dataset(tmp_path)
+    (tmp_path / "pan" / "a.png").unlink()
+    a = COCOPanopticAdapter()
+    a.tasks = frozenset({"det"})
+    assert all(not it.annotations for it in a.load(str(tmp_path / "pan.json")).items)
@@ -1,4 +1,8 @@
-from annox.io.parallel import map_parallel
+import pickle
+
+import numpy as np
+
+from annox.io.parallel import SharedArray, imap_parallel, map_parallel
 
 
 def test_map_parallel_ordering():
@@ -6,3 +10,35 @@ def test_map_parallel_ordering():
     out = map_parallel(lambda x: x * 2, data, workers=0)
     assert [v for _, v in out] == [2, 4, 6, 8]
 
+
+def test_imap_parallel_streams_in_order_with_threads():
+    consumed = []
+
+    def source():
+        for i in range(50):
+            consumed.append(i)
+            yield i
+
+    it = imap_parallel(lambda x: x * x, source(), workers=3, chunk_size=4, max_in_flight=2, backend="thread")
+    assert next(it) == 0
+    assert len(consumed) <= 3 * 4  # bounded read-ahead
+    assert list(it) == [i * i for i in range(1, 50)]
+
+
+def _row_sum(task):
+    arr, row = task
+    return float(arr.array[row].sum())
+
+
+def test_shared_array_process_pool():
+    data = np.arange(12, dtype=np.float64).reshape(3, 4)
+    with SharedArray.copy_of(data) as shared:
+        out = map_parallel(_row_sum, [(shared, r) for r in range(3)], workers=2)
+    assert [v for _, v in out] == data.sum(axis=1).tolist()
+
+    # an attached copy closes its own handle and leaves the block in place
+    with SharedArray.copy_of(data) as shared:
+        with pickle.loads(pickle.dumps(shared)) as view:
+            assert (view.array == data).all()
+        assert view.array is None and view._shm.buf is None
+        assert (shared.array == data).all()
@@ -0,0 +1,90 @@
+import io
+import json
+import threading
+
+import pytest
+
+from annox.core import convert as conv
+from annox.core.registry import AdapterRegistry
+from annox.io.pipeline import ReadAheadFile, WriteBehind, read_ahead
+
+
+def test_read_ahead_order_errors_and_backpressure():
+    assert list(read_ahead(range(1000), depth=16)) == list(range(1000))
+    assert list(read_ahead(iter([1, 2]), depth=0)) == [1, 2]
+
+    def failing():
+        yield from range(5)
+        raise ValueError("boom")
+
+    got = []
+    with pytest.raises(ValueError, match="boom"):
+        for x in read_ahead(failing(), depth=4, batch=3):
+            got.append(x)
+    assert got == [0, 1, 2, 3, 4]
+
+    produced = []
+    closed = threading.Event()
+
+    def source():
+        try:
+            for i in range(100):
+                produced.append(i)
+                yield i
+        finally:
+            closed.set()
+
+    src = source()
+    it = read_ahead(src, depth=8, batch=1)
+    assert next(it) == 0
+    it.close()  # the producer stops instead of draining the source
+    assert len(produced) <= 11
+    assert closed.is_set()  # and closes it, even while referenced elsewhere
+
+
+def test_read_ahead_file_reads_like_a_file():
+    data = bytes(range(256)) * 100
+    f = ReadAheadFile(io.BytesIO(data), chunk_size=1000, depth=2)
+    parts = [f.read(10), f.read(5000), f.read(-1), f.read(10)]
+    f.close()
+    assert [len(p) for p in parts[:2]] == [10, 5000] and parts[3] == b""
+    assert b"".join(parts) == data
+
+
+def test_write_behind_runs_in_order_and_reports_errors():
+    out = []
+    gate = threading.Event()
+    with WriteBehind(depth=2) as w:
+        w.submit(gate.wait)
+        threading.Timer(0.2, gate.set).start()
+        for i in range(5):
+            w.submit(out.append, i)  # blocks while two writes are pending
+            assert len(out) >= i - 2
+    assert out == [0, 1, 2, 3, 4]
+
+    def fail(_):
+        raise OSError("disk full")
+
+    w = WriteBehind(depth=4)
+    w.submit(fail, 1)
+    w.submit(out.append, 99)
+    with pytest.raises(OSError, match="disk full"):
+        w.close()
+    assert 99 not in out
+
+
+def test_convert_output_unchanged_by_overlap(tmp_path, monkeypatch):
+    monkeypatch.setattr(AdapterRegistry, "index", lambda self: {"coco": "annox.adapters.coco.coco:COCOAdapter"})
+    coco = {
+        "images": [{"id": i, "file_name": f"{i}.jpg", "width": 50, "height": 50} for i in range(1, 30)],
+        "categories": [{"id": 1, "name": "a"}],
+        "annotations": [
+            {"id": j, "image_id": 1 + j % 29, "category_id": 1, "bbox": [j, 1, 2, 3]} for j in range(1, 80)
+        ],
+    }
+    src = tmp_path / "src.json"
+    src.write_text(json.dumps(coco))
+    plain, overlapped = tmp_path / "plain.json", tmp_path / "overlapped.json"
+    conv.convert(src, plain, "coco", "coco")
+    conv.convert(src, overlapped, "coco", "coco", read_ahead=4, write_behind=2)
+    assert overlapped.read_bytes() == plain.read_bytes()
@@ -0,0 +1,72 @@
+import numpy as np
+
+from annox.adapters.coco.coco import COCOAdapter
+from annox.core import polygons
+from annox.io.jsonio import loads
+from annox.schema.dataset import Dataset, Image, KeypointsAnnotation, PolygonAnnotation
+from annox.schema.geometry import Keypoints, Polygon
+
+
+def _shoelace(points):
+    x, y = np.asarray(points[0::2]), np.asarray(points[1::2])
+    return abs(np.dot(x, np.roll(y, -1)) - np.dot(np.roll(x, -1), y)) / 2
+
+
+def _rings():
+    rng = np.random.default_rng(0)
+    rings = [rng.uniform(0, 100, 2 * n).tolist() for n in rng.integers(1, 40, 300)]
+    coords = np.concatenate(rings)
+    offsets = np.concatenate(([0], np.cumsum([len(r) for r in rings])))
+    return rings, coords, offsets
+
+
+def test_areas_and_bounds_match_reference():
+    rings, coords, offsets = _rings()
+    areas = polygons.ring_areas(coords, offsets)
+    ref = [_shoelace(r) if len(r) >= 6 else 0.0 for r in rings]
+    assert np.allclose(areas, ref)
+    bounds = polygons.ring_bounds(coords, offsets)
+    assert bounds[5].tolist() == [min(rings[5][0::2]), min(rings[5][1::2]), max(rings[5][0::2]), max(rings[5][1::2])]
+    # a sub-range of the buffer takes the gather path
+    assert np.allclose(polygons.ring_areas(coords, offsets[2:5]), ref[2:4])
+    assert np.allclose(polygons.group_sum(areas, [0, 2, 2, 300]), [sum(ref[:2]), 0, sum(ref[2:])])
+    grouped = polygons.group_bounds(bounds, [0, 0, 300])
+    assert np.isnan(grouped[0]).all()
+    assert np.allclose(grouped[1], [coords[0::2].min(), coords[1::2].min(), coords[0::2].max(), coords[1::2].max()])
+
+
+def test_centroid_clip_simplify():
+    square = np.array([0, 0, 10, 0, 10, 10, 0, 10], dtype=float)
+    assert polygons.ring_centroids(square, [0, 8]).tolist() == [[5.0, 5.0]]
+    coords, offsets = polygons.clip_rings(square, [0, 8], [5, -1, 20, 5])
+    assert offsets.tolist() == [0, 8]
+    assert polygons.ring_areas(coords, offsets).tolist() == [25.0]
+    coords, offsets = polygons.clip_rings(square, [0, 8], [20, 20, 30, 30])
+    assert offsets.tolist() == [0, 0]
+    t = np.linspace(0, 2 * np.pi, 200, endpoint=False)
+    circle = np.stack([50 + 40 * np.cos(t), 50 + 40 * np.sin(t)], axis=1).ravel()
+    coords, offsets = polygons.simplify_rings(circle, [0, 400], 0.5)
+    assert 3 <= offsets[1] // 2 < 60
+    assert abs(polygons.ring_areas(coords, offsets)[0] - np.pi * 40**2) < 0.05 * np.pi * 40**2
+    coords, offsets = polygons.simplify_rings(square, [0, 8], 100.0)
+    assert offsets.tolist() == [0, 6]
+
+
+def test_coco_export_area_and_bbox():
+    item = Dataset.Item(
+        id="1",
+        image=Image(file_name="a.jpg", width=100, height=100),
+        annotations=[
+            PolygonAnnotation(
+                id=1,
+                category_id=1,
+                polygons=[Polygon(points=[10, 20, 40, 20, 40, 60, 10, 60]), Polygon(points=[50, 0, 60, 0, 60, 5])],
+            ),
+            KeypointsAnnotation(id=2, category_id=1, keypoints=Keypoints(points=[1, 2, 2, 5, 9, 1])),
+        ],
+    )
+    _, anns = COCOAdapter().encode_item(item, 1, 1)
+    poly, kps = (loads(a) for a in anns)
+    assert poly["bbox"] == [10, 0, 50, 60]
+    assert poly["area"] == 30 * 40 + 25
+    assert kps["bbox"] == [1, 2, 4, 7]
@@ -0,0 +1,42 @@
+import sys
+
+from annox.core import registry
+from annox.core.registry import AdapterRegistry
+
+
+def test_get_imports_only_the_named_adapter(monkeypatch):
+    index = {
+        "coco": "annox.adapters.coco.coco:COCOAdapter",
+        "broken": "annox_missing_plugin.module:Adapter",
+    }
+    monkeypatch.setattr(AdapterRegistry, "index", lambda self: index)
+    reg = AdapterRegistry()
+    from annox.adapters.coco.coco import COCOAdapter
+
+    assert reg.get("coco") is COCOAdapter
+    assert "annox_missing_plugin" not in sys.modules
+    assert isinstance(reg.create("coco"), COCOAdapter)
+
+
+def test_entry_point_index_is_cached_on_disk(tmp_path, monkeypatch):
+    monkeypatch.setenv("ANNOX_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(registry, "_memo", {})
+    calls = []
+
+    def scan(group):
+        calls.append(group)
+        return {"demo": "demo.module:Adapter"}
+
+    monkeypatch.setattr(registry, "_scan", scan)
+    assert registry.entry_point_index("annox.adapters") == {"demo": "demo.module:Adapter"}
+    assert (tmp_path / "entry-points.json").exists()
+
+    monkeypatch.setattr(registry, "_memo", {})
+    assert registry.entry_point_index("annox.adapters") == {"demo": "demo.module:Adapter"}
+    assert calls == ["annox.adapters"]
+
+    # a different sys.path invalidates the stored index
+    monkeypatch.setattr(registry, "_memo", {})
+    monkeypatch.syspath_prepend(str(tmp_path))
+    registry.entry_point_index("annox.adapters")
+    assert len(calls) == 2
@@ -0,0 +1,57 @@
+import numpy as np
+
+from annox.core import spatial
+from annox.core.validate import validate_columnar
+from annox.schema.columnar import ColumnarBuilder
+from annox.schema.dataset import Category
+
+
+def _dataset():
+    b = ColumnarBuilder([Category(id=1, name="a"), Category(id=2, name="b")])
+    b.add_item("img", "img.jpg", 100, 100)
+    b.add_bbox(1, 1, 10, 10, 20, 20)
+    b.add_bbox(2, 1, 11, 10, 20, 20)  # near-duplicate of 1
+    b.add_bbox(3, 2, 10, 10, 20, 20)  # same box, other category
+    b.add_polygon(4, 1, [[60, 60, 80, 60, 80, 90]])
+    b.add_bbox(5, 1, 0.6, 0.6, 0.2, 0.3, normalized=True)
+    b.add_keypoints(6, 1, [1, 2, 2, 50, 50, 0, 5, 9, 1])
+    return b.build()
+
+
+def test_annotation_bounds_in_pixels():
+    bounds = spatial.annotation_bounds(_dataset())
+    assert bounds[0].tolist() == [10, 10, 30, 30]
+    assert bounds[3].tolist() == [60, 60, 80, 90]
+    assert np.allclose(bounds[4], [60, 60, 80, 90])
+    assert bounds[5].tolist() == [1, 2, 5, 9]  # unlabelled point ignored
+
+
+def test_rtree_matches_brute_force():
+    rng = np.random.default_rng(1)
+    xy = rng.uniform(0, 1000, (2000, 2))
+    boxes = np.concatenate([xy, xy + rng.uniform(1, 40, (2000, 2))], axis=1)
+    boxes[::97] = np.nan
+    tree = spatial.SpatialIndex(boxes)
+    p = tree.overlapping_pairs(0.1)
+    iou = spatial.pairwise_iou(boxes, boxes)
+    a, b = np.nonzero(np.triu(iou >= 0.1, k=1))
+    assert set(zip(p.a.tolist(), p.b.tolist())) == set(zip(a.tolist(), b.tolist()))
+    region = [100, 200, 400, 300]
+    inside = tree.query(region, within=True)
+    ok = ~np.isnan(boxes).any(axis=1)
+    expect = np.flatnonzero(
+        ok & (boxes[:, 0] >= 100) & (boxes[:, 1] >= 200) & (boxes[:, 2] <= 400) & (boxes[:, 3] <= 300)
+    )
+    assert inside.tolist() == expect.tolist()
+
+
+def test_duplicates_api_and_validation():
+    cd = _dataset()
+    index = spatial.DatasetIndex(cd)
+    assert [(i, a, b) for i, a, b, _ in index.duplicates(0.8)] == [("img", 1, 2)]
+    assert index.query("img", [55, 55, 85, 95], within=True) == [4, 5]
+    issues = validate_columnar(cd, check_duplicates=True, duplicate_iou=0.8)
+    dup = [i for i in issues if i.rule == "near_duplicate"]
+    assert [(i.annotation_id, i.severity) for i in dup] == [(2, "warning")]
+    assert not any(i.rule == "near_duplicate" for i in validate_columnar(cd))
+    assert cd.to_dataset().find_duplicates(0.8)[0][:3] == ("img", 1, 2)
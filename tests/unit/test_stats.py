@@ -0,0 +1,82 @@
+import json
+
+from annox.adapters.coco.coco import COCOAdapter
+from annox.cli.main import main
+from annox.core import stats as st
+from annox.schema.columnar import ColumnarDataset
+from annox.schema.dataset import Dataset
+
+
+def _items():
+    out = []
+    for i in range(7):
+        anns = [
+            {"id": 1, "type": "bbox", "category_id": 1, "bbox": {"x": 0, "y": 0, "w": 10 * (i + 1), "h": 20}},
+            {"id": 2, "type": "bbox", "category_id": 2, "bbox": {"x": 0, "y": 0, "w": 0.5, "h": 0.25, "normalized": True}},
+            {"id": 3, "type": "polygon", "category_id": 1, "polygons": [{"points": [0, 0, 5, 0, 5, 5]}, {"points": [1, 1, 2, 1, 2, 2, 1, 2]}]},
+            {"id": 4, "type": "keypoints", "category_id": 2, "keypoints": {"points": [1, 1, 2, 3, 3, 1, 0, 0, 0]}},
+        ]
+        out.append({"id": str(i), "image": {"file_name": f"{i}.jpg", "width": 64, "height": 48}, "annotations": anns[: i % 5]})
+    return out
+
+
+def test_histogram_bins_and_merge():
+    a, b = st.Histogram([0, 1, 10]), st.Histogram([0, 1, 10])
+    a.add([-1, 0, 0.5, 1, 9.9])
+    b.add([10, 100, float("nan")])
+    a.merge(b)
+    d = a.to_dict()
+    assert d["counts"] == [1, 2, 2, 2] and d["count"] == 7 and (d["min"], d["max"]) == (-1, 100)
+
+
+def test_jsonl_shards_match_columnar(tmp_path):
+    items = _items()
+    path = tmp_path / "d.jsonl"
+    path.write_text("".join(json.dumps(it) + "\n" for it in items))
+    assert len(st._jsonl_ranges(path, 3)) == 3
+
+    whole = st.DatasetStats()
+    whole.add_columnar(ColumnarDataset.from_dataset(Dataset.model_validate({"items": items})))
+    expected = whole.to_dict()
+    for workers in (0, 2):
+        assert st.dataset_stats(path, workers=workers, batch_size=2).to_dict() == expected
+
+    assert expected["annotations"] == sum(i % 5 for i in range(7))
+    # normalized boxes in pixels: 0.5 * 64
+    assert expected["bbox"]["width"]["mean"] == (20 + 30 + 40 + 50 + 70 + 3 * 32) / 8
+    assert expected["keypoints"]["visibility"] == {"0": 1, "1": 1, "2": 1}
+    assert expected["polygons"]["rings"] == 4 and expected["polygons"]["vertices"]["mean"] == 7
+    assert expected["annotations_per_item"]["counts"][1:6] == [2, 2, 1, 1, 1]
+
+
+def test_coco_counts_images_without_annotations(tmp_path, capsys):
+    coco = {
+        "images": [{"id": i, "file_name": f"{i}.jpg", "width": 100, "height": 50} for i in (1, 2, 3)],
+        "categories": [{"id": 1, "name": "cat"}, {"id": 2, "name": "dog"}],
+        "annotations": [
+            {"id": 1, "image_id": 3, "category_id": 1, "bbox": [0, 0, 10, 10], "keypoints": [1, 1, 2, 0, 0, 0]},
+            {"id": 2, "image_id": 1, "category_id": 1, "bbox": [0, 0, 40, 40], "segmentation": [[0, 0, 4, 0, 4, 4]]},
+            {"id": 3, "image_id": 3, "category_id": 1, "bbox": [0, 0, 100, 96], "segmentation": {"counts": "1", "size": [50, 100]}},
+        ],
+    }
+    path = tmp_path / "coco.json"
+    path.write_text(json.dumps(coco))
+    d = st.dataset_stats(path, batch_size=1).to_dict()
+    # records split into annotations as the importer does
+    assert (d["items"], d["annotations"]) == (3, 6)
+    assert d["annotation_types"] == {"bbox": 3, "polygon": 1, "mask": 1, "keypoints": 1, "panoptic_segment": 0}
+    assert sum(d["annotation_types"].values()) == d["annotations"]
+    assert d["categories"] == [{"id": 1, "name": "cat", "annotations": 6}, {"id": 2, "name": "dog", "annotations": 0}]
+    assert d["annotations_per_item"]["counts"][1:6] == [1, 0, 1, 0, 1]  # images with 0, 2 and 4 annotations
+    assert d["bbox"]["area_ranges"] == {"small": 1, "medium": 1, "large": 1}
+    assert d["keypoints"]["labeled_rate"] == 0.5
+
+    assert main(["stats", str(path)]) == 0
+    assert json.loads(capsys.readouterr().out) == d
+
+    # the same numbers as the imported dataset
+    cd = COCOAdapter().load_columnar(str(path))
+    imported = st.DatasetStats()
+    imported.add_categories((c.id, c.name) for c in cd.categories)
+    imported.add_columnar(cd)
+    assert imported.to_dict() == d
@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+from annox.adapters.coco.coco import COCOAdapter
+from annox.adapters.yolo.yolo import YOLOAdapter
+from annox.core import convert as conv
+from annox.core.registry import AdapterRegistry
+from annox.schema.columnar import KIND_KEYPOINTS, KIND_POLYGON, ColumnarDataset
+
+INDEX = {"coco": "annox.adapters.coco.coco:COCOAdapter"}
+
+
+def _coco(path):
+    coco = {
+        "images": [{"id": i, "file_name": f"{i}.jpg", "width": 100, "height": 80} for i in (1, 2)],
+        "categories": [{"id": 1, "name": "cat"}, {"id": 2, "name": "person", "keypoints": ["n", "e"]}],
+        "annotations": [
+            {"id": 1, "image_id": 1, "category_id": 1, "bbox": [1, 2, 3, 4], "segmentation": [[0, 0, 5, 0, 5, 5]]},
+            {"id": 2, "image_id": 1, "category_id": 1, "segmentation": {"counts": "abc", "size": [80, 100]}},
+            {"id": 3, "image_id": 2, "category_id": 2, "bbox": [0, 0, 9, 9], "keypoints": [1, 1, 2, 3, 3, 2]},
+            {"id": 4, "image_id": 2, "category_id": 1, "segmentation": [[1, 1, 4, 1, 4, 4], [6, 6, 7, 6, 7, 7]]},
+        ],
+    }
+    path.write_text(json.dumps(coco))
+    return path
+
+
+def test_resolve_tasks():
+    coco = COCOAdapter()
+    assert conv.resolve_tasks(coco, COCOAdapter()) is None
+    assert conv.resolve_tasks(coco, YOLOAdapter()) == {"det", "segm_poly", "keypoints"}
+    assert conv.resolve_tasks(coco, YOLOAdapter(task="detect")) == {"det"}
+    assert conv.resolve_tasks(coco, COCOAdapter(), ["det", "keypoints", "panoptic"]) == {"det", "keypoints"}
+    with pytest.raises(ValueError):
+        conv.resolve_tasks(coco, COCOAdapter(), ["boxes"])
+
+
+def test_coco_skips_unwanted_geometry(tmp_path):
+    path = _coco(tmp_path / "c.json")
+    a = COCOAdapter()
+    a.tasks = frozenset({"det", "keypoints"})
+    for items in (a.load(str(path)).items, list(a.stream(str(path)).items), a.load_columnar(str(path)).iter_items()):
+        assert [[ann.type for ann in it.annotations] for it in items] == [["bbox"], ["bbox", "keypoints"]]
+
+
+def test_select_kinds_matches_filtered_dataset(tmp_path):
+    ds = COCOAdapter().load(str(_coco(tmp_path / "c.json")))
+    cd = ColumnarDataset.from_dataset(ds).select_kinds([KIND_POLYGON, KIND_KEYPOINTS])
+    for it in ds.items:
+        it.annotations = [a for a in it.annotations if a.type in ("polygon", "keypoints")]
+    assert cd.to_dataset().model_dump() == ds.model_dump()
+
+
+def test_convert_tasks(tmp_path, monkeypatch):
+    monkeypatch.setattr(AdapterRegistry, "index", lambda self: INDEX)
+    src = _coco(tmp_path / "c.json")
+    conv.convert(src, tmp_path / "det.json", "coco", "coco", tasks=["det"])
+    out = json.loads((tmp_path / "det.json").read_text())
+    assert [a["bbox"] for a in out["annotations"]] == [[1, 2, 3, 4], [0, 0, 9, 9]]
+    assert not any(a.get("keypoints") or a.get("segmentation") for a in out["annotations"])
@@ -0,0 +1,66 @@
+import json
+
+from annox.adapters.coco.coco import COCOAdapter
+from annox.schema.columnar import ColumnarDataset
+from annox.schema.dataset import Category, Dataset
+from annox.schema.trusted import TRUSTED, VALIDATED
+
+
+def _coco(path):
+    coco = {
+        "images": [{"id": 1, "file_name": "a.jpg", "width": 100, "height": 80}],
+        "categories": [{"id": 1, "name": "cat"}, {"id": 2, "name": "person", "keypoint_names": ["n", "e"]}],
+        "annotations": [
+            {"id": 1, "image_id": 1, "category_id": 1, "bbox": [1, 2, 3, 4], "segmentation": [[0, 0, 5, 0, 5, 5]]},
+            {"id": 2, "image_id": 1, "category_id": 1, "segmentation": {"counts": "abc", "size": [80, 100]}},
+            {"id": 3, "image_id": 1, "category_id": 2, "keypoints": [1, 1, 2, 3, 3, 2], "num_keypoints": 2},
+        ],
+    }
+    path.write_text(json.dumps(coco))
+    return path
+
+
+def test_trusted_builders_match_validated():
+    cats = [Category(id=1, name="cat")]
+
+    def build(b):
+        anns = [
+            b.bbox(1, 1, 1.0, 2.0, 3.0, 4.0, attributes={"iscrowd": 0}),
+            b.polygon(2, 1, [b.ring([0.0, 0.0, 1.0, 0.0, 1.0, 1.0])]),
+            b.keypoints(3, None, [1.0, 1.0, 2.0]),
+            b.mask(4, 1, {"counts": "abc", "size": [2, 2]}),
+            b.panoptic(5, 1, 7, 10),
+        ]
+        return b.dataset(cats, [b.item("x", b.image("x.jpg", 10, 10), anns)])
+
+    fast, slow = build(TRUSTED), build(VALIDATED)
+    assert fast.model_dump() == slow.model_dump()
+    assert fast.items[0]._category_map == {1: cats[0]}
+    assert fast.items[0].annotations[0].model_copy(update={"id": 9}).id == 9
+
+
+def test_trusted_coco_load_and_columnar_views(tmp_path):
+    path = _coco(tmp_path / "c.json")
+    a = COCOAdapter()
+    slow = a.load(str(path))
+    a.trusted = True
+    fast = a.load(str(path))
+    assert fast.model_dump() == slow.model_dump()
+    assert [it.model_dump() for it in a.stream(str(path)).items] == [it.model_dump() for it in slow.items]
+    cd = ColumnarDataset.from_dataset(slow)
+    assert cd.to_dataset(trusted=True).model_dump() == cd.to_dataset().model_dump()
+
+
+def test_validate_bulk_reports_trusted_errors():
+    b = TRUSTED
+    ds: Dataset = b.dataset(
+        [Category(id=1, name="cat")],
+        [
+            b.item(
+                "x",
+                b.image("x.jpg", 10, 10),
+                [b.bbox(1, 1, 0.0, 0.0, -1.0, 2.0), b.polygon(2, 1, [b.ring([0.0, 1.0])])],
+            )
+        ],
+    )
+    assert {i.rule for i in ds.validate_bulk()} == {"bbox_negative_size", "polygon_too_short"}
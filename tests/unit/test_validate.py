@@ -0,0 +1,62 @@
+import json
+
+from annox.core.validate import _validate_dataset, validate_dataset_file
+from annox.schema.dataset import BBox, BBoxAnnotation, Category, Dataset, Image, Keypoints, KeypointsAnnotation
+
+
+def _item(iid, anns):
+    return {"id": iid, "image": {"file_name": f"{iid}.jpg", "width": 10, "height": 10}, "annotations": anns}
+
+
+def test_validate_file_reports_structured_issues(tmp_path):
+    doc = {
+        "categories": [{"id": 1, "name": "person", "keypoint_names": ["a", "b"], "skeleton": [[0, 5]]}],
+        "items": [
+            _item("a", [
+                {"id": 1, "type": "bbox", "bbox": {"x": -1, "y": 0, "w": 2, "h": 2}},
+                {"id": 1, "type": "keypoints", "category_id": 1, "keypoints": {"points": [1, 1, 2]}},
+                {"id": 2, "type": "bbox", "bbox": {"x": 0.5, "y": 0, "w": 0.9, "h": 2, "normalized": True}},
+                {"id": 3, "type": "polygon", "polygons": [{"points": [0, 0, 1, 1, 2]}]},
+                {"id": 4, "type": "bbox", "bbox": {"x": 8, "y": 8, "w": 5, "h": 1}},
+            ]),
+            _item("a", []),
+        ],
+    }
+    p = tmp_path / "ds.json"
+    p.write_text(json.dumps(doc))
+    ok, report = validate_dataset_file(p)
+    assert not ok
+    assert report["items"] == 2 and report["annotations"] == 5
+    assert report["errors"] == [
+        "skeleton indices must reference keypoint_names",
+        "bbox has negative coords in item a",
+        "Duplicate annotation id 1 in item a",
+        "keypoints length 3 != expected 6 for category person",
+        "normalized bbox must be within [0,1]",
+        "List should have at least 6 items after validation, not 5",
+        "polygon points length must be even",
+        "Duplicate item id: a",
+    ]
+    assert report["warnings"] == ["bbox extends outside the image in item a"]
+    dup = [i for i in report["issues"] if i["rule"] == "duplicate_annotation_id"][0]
+    assert (dup["item_id"], dup["annotation_id"]) == ("a", 1)
+
+
+def test_validate_dataset_matches_model_checks():
+    item = Dataset.Item(
+        id="x",
+        image=Image(file_name="x.jpg", width=5, height=5),
+        annotations=[
+            BBoxAnnotation(id=1, bbox=BBox(x=-2, y=1, w=1, h=1)),
+            KeypointsAnnotation(id=2, category_id=1, keypoints=Keypoints(points=[1, 1, 1])),
+        ],
+    )
+    ds = Dataset(categories=[Category(id=1, name="c", keypoint_names=["p", "q"])], items=[item])
+    expected = []
+    for ann in item.annotations:
+        try:
+            ann.validate_consistency(item)
+        except ValueError as e:
+            expected.append(str(e))
+    ok, report = _validate_dataset(ds)
+    assert not ok and report["errors"] == expected